@@ -0,0 +1,31 @@
+"""add cameras.substream_url
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-18 10:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0001'
+down_revision: Union[str, None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Tables are created with create_all on startup; only add the column if missing
+    columns = [c['name'] for c in sa.inspect(op.get_bind()).get_columns('cameras')]
+    if 'substream_url' not in columns:
+        with op.batch_alter_table('cameras') as batch_op:
+            batch_op.add_column(sa.Column('substream_url', sa.String(length=500), nullable=True))
+
+
+def downgrade() -> None:
+    with op.batch_alter_table('cameras') as batch_op:
+        batch_op.drop_column('substream_url')
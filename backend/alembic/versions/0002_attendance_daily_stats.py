@@ -0,0 +1,53 @@
+"""add attendance_daily_stats rollup
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-18 12:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0002'
+down_revision: Union[str, None] = '0001'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Tables are created with create_all on startup; only create the table if missing
+    bind = op.get_bind()
+    if 'attendance_daily_stats' not in sa.inspect(bind).get_table_names():
+        op.create_table(
+            'attendance_daily_stats',
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.Column('attendance_date', sa.Date(), nullable=False),
+            sa.Column('group_name', sa.String(length=50), nullable=False),
+            sa.Column('count', sa.Integer(), nullable=False),
+            sa.PrimaryKeyConstraint('id'),
+            sa.UniqueConstraint('attendance_date', 'group_name', name='unique_daily_stat_per_group')
+        )
+        op.create_index('ix_attendance_daily_stats_id', 'attendance_daily_stats', ['id'])
+        op.create_index('ix_attendance_daily_stats_attendance_date', 'attendance_daily_stats', ['attendance_date'])
+
+    # Backfill from existing attendance (recomputed, so re-running is safe)
+    op.execute("DELETE FROM attendance_daily_stats")
+    op.execute(
+        """
+        INSERT INTO attendance_daily_stats (attendance_date, group_name, count)
+        SELECT a.attendance_date, COALESCE(s.group_name, ''), COUNT(*)
+        FROM attendance a
+        LEFT JOIN students s ON s.id = a.student_id
+        GROUP BY a.attendance_date, COALESCE(s.group_name, '')
+        """
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_attendance_daily_stats_attendance_date', table_name='attendance_daily_stats')
+    op.drop_index('ix_attendance_daily_stats_id', table_name='attendance_daily_stats')
+    op.drop_table('attendance_daily_stats')
@@ -1,6 +1,6 @@
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, func, and_
+from sqlalchemy import select, func
 from typing import List, Optional
 import base64
 import cv2
@@ -14,6 +14,8 @@ from app.models.attendance import Attendance
 from app.views.attendance import AttendanceCheckIn, AttendanceResponse, AttendanceWithStudent
 from app.services.face_service import get_face_service
 from app.services.vector_service import get_vector_service
+from app.services.metadata_cache import get_metadata_cache
+from app.services.attendance_service import get_attendance_service
 from app.core.config import settings
 
 router = APIRouter()
@@ -73,11 +75,12 @@ async def check_in_attendance(
         
         student_db_id, confidence = match
         
-        # Get student information
-        result = await db.execute(
-            select(Student).where(Student.id == student_db_id)
-        )
-        student = result.scalar_one_or_none()
+        # Already attended today? (in-memory attended set, no DB access)
+        attendance_service = get_attendance_service()
+        attended_time = await attendance_service.get_attended_time(student_db_id)
+        
+        # Get student information (cached; queries only on a miss)
+        student = await get_metadata_cache().resolve_student(db, student_db_id)
         
         if not student:
             return {
@@ -86,31 +89,21 @@ async def check_in_attendance(
                 "student": None
             }
         
-        # Check if already attended today
-        today = date.today()
-        result = await db.execute(
-            select(Attendance).where(
-                and_(
-                    Attendance.student_id == student.id,
-                    Attendance.attendance_date == today
-                )
-            )
-        )
-        existing_attendance = result.scalar_one_or_none()
+        student_info = {
+            "id": student.id,
+            "student_id": student.student_id,
+            "first_name": student.first_name,
+            "last_name": student.last_name,
+            "group_name": student.group_name
+        }
         
-        if existing_attendance:
+        if attended_time is not None:
             return {
                 "status": "already_attended",
                 "message": "Siz allaqachon davomat qilgansiz",
-                "student": {
-                    "id": student.id,
-                    "student_id": student.student_id,
-                    "first_name": student.first_name,
-                    "last_name": student.last_name,
-                    "group_name": student.group_name
-                },
+                "student": student_info,
                 "confidence": confidence,
-                "check_in_time": existing_attendance.check_in_time.isoformat()
+                "check_in_time": attended_time.isoformat()
             }
         
         # Save snapshot
@@ -122,33 +115,28 @@ async def check_in_attendance(
         snapshot_path = os.path.join(snapshot_dir, snapshot_filename)
         cv2.imwrite(snapshot_path, image)
         
-        # Create attendance record
-        now = datetime.now()
-        attendance = Attendance(
-            student_id=student.id,
-            attendance_date=today,
-            check_in_time=now.time(),
-            confidence_score=confidence,
-            snapshot_path=snapshot_path
-        )
+        # Idempotent insert (ON CONFLICT DO NOTHING), batched with concurrent check-ins
+        attendance = await attendance_service.check_in(student.id, confidence, snapshot_path)
         
-        db.add(attendance)
-        await db.commit()
-        await db.refresh(attendance)
+        if not attendance.created:
+            # Checked in concurrently - the snapshot is not referenced
+            if os.path.exists(snapshot_path):
+                os.remove(snapshot_path)
+            return {
+                "status": "already_attended",
+                "message": "Siz allaqachon davomat qilgansiz",
+                "student": student_info,
+                "confidence": confidence,
+                "check_in_time": attendance.check_in_time.isoformat()
+            }
         
         return {
             "status": "success",
             "message": "Davomat muvaffaqiyatli qabul qilindi",
-            "student": {
-                "id": student.id,
-                "student_id": student.student_id,
-                "first_name": student.first_name,
-                "last_name": student.last_name,
-                "group_name": student.group_name
-            },
+            "student": student_info,
             "confidence": confidence,
             "check_in_time": attendance.check_in_time.isoformat(),
-            "attendance_id": attendance.id
+            "attendance_id": attendance.attendance_id
         }
         
     except Exception as e:
@@ -279,32 +267,25 @@ async def get_student_attendance(
 async def get_attendance_statistics(
     db: AsyncSession = Depends(get_db)
 ):
-    """Get attendance statistics."""
+    """Get attendance statistics (read from the daily rollups, not the attendance table)."""
     today = date.today()
     
-    # Total students
-    total_students_result = await db.execute(select(func.count(Student.id)))
-    total_students = total_students_result.scalar()
-    
-    # Today's attendance
-    today_attendance_result = await db.execute(
-        select(func.count(Attendance.id)).where(Attendance.attendance_date == today)
-    )
-    today_attendance = today_attendance_result.scalar()
+    # Total students (metadata cache after warm-up)
+    metadata = get_metadata_cache()
+    if metadata.warmed:
+        total_students = len(metadata.students)
+    else:
+        total_students_result = await db.execute(select(func.count(Student.id)))
+        total_students = total_students_result.scalar()
     
-    # This week's attendance
+    # Per-day counts since the earlier of week start / month start (at most ~31 rows)
     week_start = today - timedelta(days=today.weekday())
-    week_attendance_result = await db.execute(
-        select(func.count(Attendance.id)).where(Attendance.attendance_date >= week_start)
-    )
-    week_attendance = week_attendance_result.scalar()
-    
-    # This month's attendance
     month_start = today.replace(day=1)
-    month_attendance_result = await db.execute(
-        select(func.count(Attendance.id)).where(Attendance.attendance_date >= month_start)
-    )
-    month_attendance = month_attendance_result.scalar()
+    daily = await get_attendance_service().get_daily_counts(db, min(week_start, month_start))
+    
+    today_attendance = daily.get(today, 0)
+    week_attendance = sum(count for day, count in daily.items() if day >= week_start)
+    month_attendance = sum(count for day, count in daily.items() if day >= month_start)
     
     # Attendance rate
     attendance_rate = (today_attendance / total_students * 100) if total_students > 0 else 0
@@ -317,4 +298,3 @@ async def get_attendance_statistics(
         "attendance_rate": round(attendance_rate, 2),
         "date": today.isoformat()
     }
-
@@ -9,14 +9,23 @@ from typing import Dict, List, Set, Optional
 from collections import defaultdict
 import time
 
-from app.services.multi_rtsp_service import get_multi_rtsp_manager
+from app.services.multi_rtsp_service import get_multi_rtsp_manager, map_bbox
+from app.services.frame_ring import FrameLease
 from app.services.face_service import get_face_service
 from app.services.vector_service import get_vector_service
 from app.services.presence_service import get_presence_service
 from app.services.room_service import get_room_service
+from app.services.degradation_service import get_degradation_controller, DegradationLevel
+from app.services.pipeline_metrics import get_pipeline_metrics, FrameTrace
+from app.services.subscriber_channel import SubscriberChannel
+from app.services.preview_encoder import get_preview_encoder, PreviewTier
+from app.services.mosaic_service import get_mosaic_service, MosaicLayout
+from app.services.mjpeg_service import get_mjpeg_service
+from app.services.presence_publisher import PresencePublisher
+from app.services.metadata_cache import get_metadata_cache
 from app.core.database import AsyncSessionLocal
 from app.core.config import settings
-from app.models.student import Student
+from app.core.json_codec import dumps
 
 logger = logging.getLogger(__name__)
 
@@ -27,14 +36,20 @@ class RoomConnectionManager:
     """Manages WebSocket connections for room monitoring with multi-face recognition."""
 
     def __init__(self):
-        # room_id -> set of WebSocket connections (for presence updates)
-        self.room_subscriptions: Dict[int, Set[WebSocket]] = defaultdict(set)
+        # Every subscriber WebSocket gets its own outbound queue + writer task
+        self.channels: Dict[WebSocket, SubscriberChannel] = {}
 
-        # camera_id -> set of WebSocket connections (for video streams)
-        self.camera_subscriptions: Dict[int, Set[WebSocket]] = defaultdict(set)
+        # room_id -> set of subscriber channels (for presence updates)
+        self.room_subscriptions: Dict[int, Set[SubscriberChannel]] = defaultdict(set)
+
+        # camera_id -> set of subscriber channels (for video streams)
+        self.camera_subscriptions: Dict[int, Set[SubscriberChannel]] = defaultdict(set)
+
+        # Preview tier (max width, fps, quality) requested by each camera stream subscriber
+        self.preview_tiers: Dict[SubscriberChannel, PreviewTier] = {}
 
         # All presence subscribers (for dashboard)
-        self.all_presence_subscribers: Set[WebSocket] = set()
+        self.all_presence_subscribers: Set[SubscriberChannel] = set()
 
         # Services
         self.rtsp_manager = get_multi_rtsp_manager()
@@ -42,6 +57,22 @@ class RoomConnectionManager:
         self.vector_service = get_vector_service()
         self.presence_service = get_presence_service()
         self.room_service = get_room_service()
+        self.metadata = get_metadata_cache()
+        self.degradation = get_degradation_controller()
+        self.degradation.add_listener(self._apply_degradation)
+        self.metrics = get_pipeline_metrics()
+        self.preview_encoder = get_preview_encoder()
+        self.mosaic = get_mosaic_service()
+        self.mjpeg = get_mjpeg_service()
+        # Versioned presence diffs, coalesced per room (PRESENCE_BROADCAST_HZ)
+        self.presence_publisher = PresencePublisher(
+            self._load_room_presence,
+            self._get_active_guests_count,
+            self.broadcast_presence,
+            self._is_presence_watched
+        )
+        # Expired occupants -> "left" diffs
+        self.presence_service.add_listener(self._on_presence_expired)
 
         # Cooldown tracking per room: {room_id: {student_id: timestamp}}
         self.room_cooldowns: Dict[int, Dict[int, float]] = defaultdict(dict)
@@ -56,8 +87,8 @@ class RoomConnectionManager:
         # Last recognition time per camera
         self.last_recognition_time: Dict[int, float] = defaultdict(float)
 
-        # Background cleanup task
-        self._cleanup_task: Optional[asyncio.Task] = None
+        # Last preview frame time per camera and tier (tier FPS limit)
+        self.last_preview_time: Dict[int, Dict[PreviewTier, float]] = defaultdict(dict)
 
         # PERFORMANCE FIX: Periodic cleanup tracking
         self._last_dict_cleanup = time.time()
@@ -70,30 +101,72 @@ class RoomConnectionManager:
 
     # ==================== Connection Management ====================
 
-    async def subscribe_room_presence(self, websocket: WebSocket, room_id: int):
+    def open_channel(self, websocket: WebSocket, label: str) -> SubscriberChannel:
+        """Create the outbound queue and writer task for an accepted WebSocket."""
+        channel = SubscriberChannel(websocket, label, on_close=self._on_channel_closed).start()
+        self.channels[websocket] = channel
+        return channel
+
+    def _on_channel_closed(self, channel: SubscriberChannel):
+        """Writer ended (client gone or too slow) - drop it from every subscription."""
+        for subscriptions in (self.room_subscriptions, self.camera_subscriptions):
+            for key in list(subscriptions.keys()):
+                subscriptions[key].discard(channel)
+                if not subscriptions[key]:
+                    del subscriptions[key]
+        self.all_presence_subscribers.discard(channel)
+        self.preview_tiers.pop(channel, None)
+        if self.channels.get(channel.websocket) is channel:
+            del self.channels[channel.websocket]
+
+    def _close_channel(self, websocket: WebSocket) -> Optional[SubscriberChannel]:
+        channel = self.channels.pop(websocket, None)
+        if channel is not None:
+            channel.close()
+        return channel
+
+    async def subscribe_room_presence(self, websocket: WebSocket, room_id: int) -> SubscriberChannel:
         """Subscribe to presence updates for a specific room."""
         await websocket.accept()
-        self.room_subscriptions[room_id].add(websocket)
+        channel = self.open_channel(websocket, f"room:{room_id}")
+        self.room_subscriptions[room_id].add(channel)
         logger.info(f"WebSocket subscribed to room {room_id} presence. "
                     f"Total subscribers: {len(self.room_subscriptions[room_id])}")
+        return channel
 
-    async def subscribe_camera_stream(self, websocket: WebSocket, camera_id: int):
-        """Subscribe to video stream from a specific camera."""
+    async def subscribe_camera_stream(
+        self,
+        websocket: WebSocket,
+        camera_id: int,
+        tier: Optional[PreviewTier] = None
+    ) -> SubscriberChannel:
+        """Subscribe to video stream from a specific camera at a preview tier (default: full size)."""
         await websocket.accept()
-        self.camera_subscriptions[camera_id].add(websocket)
-        logger.info(f"WebSocket subscribed to camera {camera_id} stream. "
+        channel = self.open_channel(websocket, f"camera:{camera_id}")
+        self.preview_tiers[channel] = tier or PreviewTier.default()
+        self.camera_subscriptions[camera_id].add(channel)
+        logger.info(f"WebSocket subscribed to camera {camera_id} stream "
+                    f"(tier {self.preview_tiers[channel].to_dict()}). "
                     f"Total subscribers: {len(self.camera_subscriptions[camera_id])}")
+        return channel
 
-    async def subscribe_all_presence(self, websocket: WebSocket):
+    def set_preview_tier(self, channel: SubscriberChannel, tier: PreviewTier):
+        """Change the preview tier of a camera stream subscriber."""
+        self.preview_tiers[channel] = tier
+
+    async def subscribe_all_presence(self, websocket: WebSocket) -> SubscriberChannel:
         """Subscribe to presence updates for all rooms (dashboard)."""
         await websocket.accept()
-        self.all_presence_subscribers.add(websocket)
+        channel = self.open_channel(websocket, "rooms:all")
+        self.all_presence_subscribers.add(channel)
         logger.info(f"WebSocket subscribed to all presence. "
                     f"Total subscribers: {len(self.all_presence_subscribers)}")
+        return channel
 
     def unsubscribe_room(self, websocket: WebSocket, room_id: int):
         """Unsubscribe from room presence."""
-        self.room_subscriptions[room_id].discard(websocket)
+        channel = self._close_channel(websocket)
+        self.room_subscriptions[room_id].discard(channel)
         # PERFORMANCE FIX: Clean up empty entries
         if not self.room_subscriptions[room_id]:
             del self.room_subscriptions[room_id]
@@ -101,7 +174,9 @@ class RoomConnectionManager:
 
     def unsubscribe_camera(self, websocket: WebSocket, camera_id: int):
         """Unsubscribe from camera stream."""
-        self.camera_subscriptions[camera_id].discard(websocket)
+        channel = self._close_channel(websocket)
+        self.camera_subscriptions[camera_id].discard(channel)
+        self.preview_tiers.pop(channel, None)
         # PERFORMANCE FIX: Clean up empty entries
         if not self.camera_subscriptions[camera_id]:
             del self.camera_subscriptions[camera_id]
@@ -109,65 +184,94 @@ class RoomConnectionManager:
 
     def unsubscribe_all_presence(self, websocket: WebSocket):
         """Unsubscribe from all presence updates."""
-        self.all_presence_subscribers.discard(websocket)
+        channel = self._close_channel(websocket)
+        self.all_presence_subscribers.discard(channel)
         logger.info("WebSocket unsubscribed from all presence")
 
+    def get_subscriber_stats(self) -> dict:
+        """Per-client queue lag and drop counters."""
+        clients = [channel.get_stats() for channel in self.channels.values()]
+        return {
+            "clients": len(clients),
+            "pending": sum(c["pending"] for c in clients),
+            "dropped": sum(sum(c["dropped"].values()) for c in clients),
+            "max_lag_ms": max((c["max_lag_ms"] for c in clients), default=0.0),
+            "preview": self.preview_encoder.get_stats(),
+            "mosaics": self.mosaic.get_stats(),
+            "mjpeg": self.mjpeg.get_stats(),
+            "presence": self.presence_publisher.get_stats(),
+            "subscribers": clients
+        }
+
     # ==================== Broadcasting ====================
+    # Broadcasts only enqueue into each subscriber's channel (O(subscribers),
+    # never blocked by a slow client); the channel writer tasks do the sends.
+    # JSON messages are encoded once per broadcast and the same text is
+    # queued for every subscriber.
 
     async def broadcast_to_room(self, room_id: int, message: dict):
-        """Broadcast message to all subscribers of a room."""
-        disconnected = []
-        for ws in self.room_subscriptions[room_id]:
-            try:
-                await ws.send_json(message)
-            except Exception as e:
-                logger.error(f"Error broadcasting to room {room_id}: {e}")
-                disconnected.append(ws)
-
-        for ws in disconnected:
-            self.room_subscriptions[room_id].discard(ws)
-
-    async def broadcast_camera_frame(self, camera_id: int, frame_bytes: bytes):
-        """Broadcast frame to all subscribers of a camera."""
-        disconnected = []
-        for ws in self.camera_subscriptions[camera_id]:
-            try:
-                await ws.send_bytes(frame_bytes)
-            except Exception as e:
-                logger.error(f"Error broadcasting to camera {camera_id}: {e}")
-                disconnected.append(ws)
-
-        for ws in disconnected:
-            self.camera_subscriptions[camera_id].discard(ws)
+        """Broadcast presence message to all subscribers of a room (coalesced per room)."""
+        channels = self.room_subscriptions.get(room_id)
+        if not channels:
+            return
+        payload = dumps(message)
+        for channel in channels:
+            channel.send_presence(room_id, payload)
+
+    def _dispatch_previews(self, camera_id: int, frames: Dict[PreviewTier, bytes]):
+        """Hand each subscriber the frame encoded for its tier (runs on the event loop)."""
+        default = PreviewTier.default()
+        for channel in self.camera_subscriptions.get(camera_id, ()):
+            data = frames.get(self.preview_tiers.get(channel, default))
+            if data:
+                channel.send_frame(data)
 
     async def broadcast_to_camera(self, camera_id: int, message: dict):
         """Broadcast JSON message to all subscribers of a camera (e.g., face detections)."""
-        if camera_id not in self.camera_subscriptions:
+        channels = self.camera_subscriptions.get(camera_id)
+        if not channels:
             return
-        
-        disconnected = []
-        for ws in self.camera_subscriptions[camera_id]:
-            try:
-                await ws.send_json(message)
-            except Exception as e:
-                logger.error(f"Error broadcasting JSON to camera {camera_id}: {e}")
-                disconnected.append(ws)
-
-        for ws in disconnected:
-            self.camera_subscriptions[camera_id].discard(ws)
+        payload = dumps(message)
+        for channel in channels:
+            channel.send_detection(payload)
 
     async def broadcast_all_presence(self, message: dict):
-        """Broadcast to all presence subscribers (dashboard)."""
-        disconnected = []
-        for ws in self.all_presence_subscribers:
-            try:
-                await ws.send_json(message)
-            except Exception as e:
-                logger.error(f"Error broadcasting all presence: {e}")
-                disconnected.append(ws)
+        """Broadcast to all presence subscribers (dashboard), coalesced per room."""
+        if not self.all_presence_subscribers:
+            return
+        room_id = message.get("room_id")
+        payload = dumps(message)
+        for channel in self.all_presence_subscribers:
+            channel.send_presence(room_id, payload)
+
+    async def broadcast_presence(self, room_id: int, message: dict):
+        """Broadcast a presence update to room and dashboard subscribers, encoded once."""
+        channels = list(self.room_subscriptions.get(room_id, ())) + list(self.all_presence_subscribers)
+        if not channels:
+            return
+        payload = dumps(message)
+        for channel in channels:
+            channel.send_presence(room_id, payload)
+
+    def _is_presence_watched(self, room_id: int) -> bool:
+        """Room or dashboard presence subscribers exist (unwatched rooms publish on subscribe)."""
+        return bool(self.room_subscriptions.get(room_id) or self.all_presence_subscribers)
+
+    async def _load_room_presence(self, room_id: int) -> Optional[tuple]:
+        """(room name, occupant dicts) of a room for the presence publisher; None if the room is gone."""
+        room_name = self.metadata.get_room_name(room_id)
+        if room_name is None:
+            async with AsyncSessionLocal() as db:
+                room_name = await self.metadata.resolve_room_name(db, room_id)
+            if room_name is None:
+                return None
+        presence_list = self.presence_service.get_room_presence(room_id)
+        return room_name, [p.to_dict() for p in presence_list]
 
-        for ws in disconnected:
-            self.all_presence_subscribers.discard(ws)
+    def _on_presence_expired(self, room_ids: Set[int]):
+        """Occupants of these rooms expired or were removed - publish the change."""
+        for room_id in room_ids:
+            self.presence_publisher.mark_dirty(room_id)
 
     # ==================== Recognition & Presence ====================
 
@@ -259,6 +363,10 @@ class RoomConnectionManager:
             if cam_id not in active_cameras:
                 del self.last_recognition_time[cam_id]
 
+        for cam_id in list(self.last_preview_time.keys()):
+            if cam_id not in active_cameras:
+                del self.last_preview_time[cam_id]
+
         # Cleanup empty subscription entries
         for room_id in list(self.room_subscriptions.keys()):
             if not self.room_subscriptions[room_id]:
@@ -272,38 +380,174 @@ class RoomConnectionManager:
                     f"Frame counters: {len(self.frame_counters)}, "
                     f"Subscriptions: rooms={len(self.room_subscriptions)}, cameras={len(self.camera_subscriptions)}")
 
+    def _is_recognition_interval_due(self, camera_id: int, current_time: float) -> bool:
+        """Check recognition interval without marking it (current_time in ms)."""
+        floor_ms = self.degradation.knobs.recognition_interval_ms
+
+        cadence = self.rtsp_manager.get_cadence(camera_id)
+        if cadence is not None:
+            return cadence.is_due(floor_ms, current_time)
+
+        return current_time - self.last_recognition_time[camera_id] >= floor_ms
+
     def _should_process_recognition(self, camera_id: int) -> bool:
         """Check if enough time has passed for recognition on this camera."""
         current_time = time.time() * 1000
-        elapsed = current_time - self.last_recognition_time[camera_id]
 
-        if elapsed >= settings.RECOGNITION_INTERVAL_MS:
+        if not self._is_recognition_interval_due(camera_id, current_time):
+            return False
+
+        cadence = self.rtsp_manager.get_cadence(camera_id)
+        if cadence is not None:
+            cadence.mark_run(current_time)
+        else:
             self.last_recognition_time[camera_id] = current_time
+        return True
+
+    def _is_recognition_due(self, room_id: int, camera_id: int) -> bool:
+        """Frame skip, room pause and interval checks (does not mark the run)."""
+        if self.frame_counters[camera_id] % settings.FRAME_SKIP != 0:
+            return False
+
+        # Overload: skip recognition in rooms nobody is watching
+        if self.degradation.knobs.pause_unwatched_rooms and not self._is_room_watched(room_id):
+            return False
+
+        return self._is_recognition_interval_due(camera_id, time.time() * 1000)
+
+    def _update_cadence(self, camera_id: int, faces: List[dict]):
+        """Adapt camera recognition cadence to what was seen in the frame."""
+        cadence = self.rtsp_manager.get_cadence(camera_id)
+        if cadence is None:
+            return
+
+        signature = frozenset(
+            f"s{face['student_id']}" if face["type"] == "student"
+            else f"g{self._get_guest_hash(face['bbox'])}"
+            for face in faces
+        )
+        all_identified = all(face["type"] == "student" for face in faces)
+        cadence.update(signature, all_identified)
+
+    def _preview_tiers_due(self, camera_id: int) -> List[PreviewTier]:
+        """Tiers of this camera's subscribers whose FPS limit allows a new frame."""
+        channels = self.camera_subscriptions.get(camera_id)
+        if not channels or self.preview_encoder.is_busy(camera_id):
+            return []
+
+        default = PreviewTier.default()
+        tiers = {self.preview_tiers.get(channel, default) for channel in list(channels)}
+        # Degradation caps every tier's FPS
+        max_fps = max(1, self.degradation.knobs.preview_fps)
+        last_sent = self.last_preview_time[camera_id]
+        now = time.time()
+        return [
+            tier for tier in tiers
+            if now - last_sent.get(tier, 0.0) >= 1.0 / min(tier.fps, max_fps)
+        ]
+
+    def _is_preview_due(self, camera_id: int) -> bool:
+        """Check if any preview tier of a camera is due for a frame."""
+        return bool(self._preview_tiers_due(camera_id))
+
+    def _mark_previews_sent(self, camera_id: int, tiers: List[PreviewTier]):
+        """Start the FPS interval of tiers whose encode was accepted."""
+        now = time.time()
+        for tier in tiers:
+            self.last_preview_time[camera_id][tier] = now
+
+    def _is_room_watched(self, room_id: int) -> bool:
+        """Room has presence subscribers or any of its cameras has stream subscribers."""
+        if self.room_subscriptions.get(room_id):
             return True
-        return False
+        return any(
+            self.camera_subscriptions.get(cam_id)
+            for cam_id in self.rtsp_manager.get_room_cameras(room_id)
+        )
+
+    def _apply_degradation(self, level: DegradationLevel):
+        """Apply knobs that are not read per frame."""
+        self.face_service.set_det_size(level.det_size)
 
     async def process_frame_for_presence(
         self,
         frame: np.ndarray,
         timestamp: datetime,
         room_id: int,
-        camera_id: int
+        camera_id: int,
+        lease: Optional[FrameLease] = None
     ):
-        """Process frame for face recognition and update room presence."""
+        """
+        Process frame for face recognition and update room presence.
+
+        frame may be a read-only view of a camera ring slot; lease keeps the
+        slot pinned until recognition is done and carries the frame's
+        sequence ID, stream PTS and ingest time for the trace.
+        """
+        trace = FrameTrace(
+            camera_id,
+            timestamp,
+            seq=lease.seq if lease else None,
+            pts=lease.pts if lease else None,
+            ingest_time=lease.ingest_time if lease else None
+        )
+        start = time.perf_counter()
         try:
-            # Extract all face embeddings
-            face_results = self.face_service.extract_all_embeddings(frame)
+            await self._process_frame_for_presence(frame, timestamp, room_id, camera_id, trace)
+        finally:
+            if lease is not None:
+                lease.release()
+            trace.timings["total"] = (time.perf_counter() - start) * 1000
+            # End-to-end latency: frame capture (stream PTS) -> results broadcast
+            latency_ms = trace.latency_ms()
+            trace.timings["glass_to_glass"] = latency_ms
+            self.metrics.record_stages(camera_id, trace.timings)
+            self.degradation.record_recognition_latency(latency_ms)
+
+    async def _process_frame_for_presence(
+        self,
+        frame: np.ndarray,
+        timestamp: datetime,
+        room_id: int,
+        camera_id: int,
+        trace: Optional[FrameTrace] = None
+    ):
+        """
+        Recognition, presence update and broadcasts for one frame.
+
+        Stage timings (detect, embed, search, db, mark_dirty, broadcast) are added to
+        trace and sent with the face_detection / presence_diff messages.
+        """
+        if trace is None:
+            trace = FrameTrace(camera_id, timestamp)
+        timings = trace.timings
+
+        try:
+            dual_stream = self.rtsp_manager.is_dual_stream(camera_id)
+
+            # Extract all face embeddings (substream: smaller faces allowed)
+            face_results = self.face_service.extract_all_embeddings(
+                frame,
+                min_face_size=settings.SUBSTREAM_MIN_FACE_SIZE if dual_stream else None,
+                timings=timings
+            )
 
             if not face_results:
+                self._update_cadence(camera_id, [])
                 return
 
+            if dual_stream:
+                with trace.stage("embed"):
+                    face_results = await self._reembed_small_faces(frame, face_results, camera_id)
+
             recognized_students = []
             all_faces = []  # Barcha yuzlar (tanilgan va tanilmagan)
 
             async with AsyncSessionLocal() as db:
                 for embedding, face_info in face_results:
                     # Search in FAISS
-                    match = self.vector_service.search_with_threshold(embedding)
+                    with trace.stage("search"):
+                        match = self.vector_service.search_with_threshold(embedding)
 
                     if match is None:
                         # Tanilmagan yuz - "Mehmon"
@@ -321,11 +565,11 @@ class RoomConnectionManager:
 
                     student_db_id, confidence = match
 
-                    # Get student info
-                    result = await db.execute(
-                        select(Student).where(Student.id == student_db_id)
-                    )
-                    student = result.scalar_one_or_none()
+                    # Get student info (cached; queries only on a miss)
+                    student = self.metadata.get_student(student_db_id)
+                    if student is None:
+                        with trace.stage("db"):
+                            student = await self.metadata.resolve_student(db, student_db_id)
 
                     if not student:
                         all_faces.append({
@@ -349,11 +593,8 @@ class RoomConnectionManager:
                     if self._is_in_cooldown(room_id, student_db_id):
                         continue
 
-                    # Update presence in database
-                    await self.presence_service.update_presence(
-                        db, student_db_id, room_id, camera_id, confidence
-                    )
-                    await db.commit()
+                    # Update presence (in memory; written behind to the database)
+                    self.presence_service.update_presence(student, room_id, camera_id, confidence)
 
                     # Update cooldown
                     self._update_cooldown(room_id, student_db_id)
@@ -370,40 +611,22 @@ class RoomConnectionManager:
 
                     logger.info(
                         f"Presence updated: {student.first_name} {student.last_name} "
-                        f"in Room {room_id} (Camera {camera_id})"
+                        f"in Room {room_id} (Camera {camera_id}, frame {trace.seq})"
                     )
 
-            # Broadcast presence update if any recognized
-            if recognized_students:
-                # Get room name
-                async with AsyncSessionLocal() as db:
-                    room = await self.room_service.get_room(db, room_id)
-                    room_name = room.name if room else f"Room {room_id}"
-
-                    # Get current room presence
-                    presence_list = await self.presence_service.get_room_presence(db, room_id)
-
-                # Get guest count
-                guest_count = self._get_active_guests_count(room_id)
-                total_people = len(presence_list) + guest_count
-
-                presence_message = {
-                    "type": "presence_update",
-                    "room_id": room_id,
-                    "room_name": room_name,
-                    "new_recognitions": recognized_students,
-                    "occupants": [p.to_dict() for p in presence_list],
-                    "total_count": len(presence_list),
-                    "guest_count": guest_count,
-                    "total_people": total_people,
-                    "timestamp": timestamp.isoformat()
-                }
+            self._update_cadence(camera_id, all_faces)
 
-                # Broadcast to room subscribers
-                await self.broadcast_to_room(room_id, presence_message)
+            # Presence changed - published as a coalesced diff on the room's next tick
+            if recognized_students:
+                with trace.stage("mark_dirty"):
+                    self.presence_publisher.mark_dirty(
+                        room_id,
+                        new_recognitions=recognized_students,
+                        extra={"camera_id": camera_id, **trace.to_dict()}
+                    )
 
-                # Broadcast to all presence subscribers
-                await self.broadcast_all_presence(presence_message)
+            # Face boxes for mosaic overlays
+            self.mosaic.update_faces(camera_id, all_faces)
 
             # Har doim yuzlarni yuborish (video stream uchun)
             if all_faces:
@@ -412,11 +635,13 @@ class RoomConnectionManager:
                     "camera_id": camera_id,
                     "faces": all_faces,
                     "total_faces": len(all_faces),
-                    "timestamp": timestamp.isoformat()
+                    "timestamp": timestamp.isoformat(),
+                    **trace.to_dict()
                 }
                 
                 # Broadcast face detections to camera subscribers
-                await self.broadcast_to_camera(camera_id, face_detection_message)
+                with trace.stage("broadcast"):
+                    await self.broadcast_to_camera(camera_id, face_detection_message)
 
             # Cleanup cooldowns periodically
             if sum(len(c) for c in self.room_cooldowns.values()) > 100:
@@ -425,6 +650,51 @@ class RoomConnectionManager:
         except Exception as e:
             logger.error(f"Error in presence recognition: {e}")
 
+    async def _reembed_small_faces(
+        self,
+        frame: np.ndarray,
+        face_results: List[tuple],
+        camera_id: int
+    ) -> List[tuple]:
+        """Re-embed faces too small for reliable recognition from the main stream crop."""
+        small = [
+            i for i, (_, face_info) in enumerate(face_results)
+            if face_info['face_size'] < settings.SUBSTREAM_REEMBED_FACE_SIZE
+        ]
+        if not small:
+            return face_results
+
+        loop = asyncio.get_running_loop()
+        high_res = await loop.run_in_executor(None, self.rtsp_manager.get_high_res_frame, camera_id)
+        if high_res is None:
+            return face_results
+
+        results = list(face_results)
+        for i in small:
+            embedding, face_info = results[i]
+            region = map_bbox(face_info['bbox'], frame.shape, high_res.shape)
+            high_res_embedding = self.face_service.extract_embedding_in_region(high_res, region)
+            if high_res_embedding is not None:
+                # bbox stays in substream coordinates (preview is the substream)
+                results[i] = (high_res_embedding, face_info)
+
+        return results
+
+    def create_decode_predicate(self):
+        """Create predicate telling the stream which grabbed frames to decode."""
+
+        def wants_frame(room_id: int, camera_id: int) -> bool:
+            """Called for every grabbed frame; True if preview, mosaic, MJPEG or recognition needs it."""
+            self.frame_counters[camera_id] += 1
+            return (
+                self._is_preview_due(camera_id)
+                or self.mosaic.wants_frame(camera_id)
+                or self.mjpeg.wants_frame(camera_id)
+                or self._is_recognition_due(room_id, camera_id)
+            )
+
+        return wants_frame
+
     def create_frame_callback(self, loop: asyncio.AbstractEventLoop):
         """Create frame callback for RTSP streaming."""
 
@@ -452,32 +722,52 @@ class RoomConnectionManager:
                     self._cleanup_all_dicts()
                     self._last_dict_cleanup = current_time
 
-                # Increment frame counter
-                self.frame_counters[camera_id] += 1
-
-                # Only broadcast frames if there are subscribers
-                if self.camera_subscriptions.get(camera_id):
-                    # Encode and send frame to subscribers
-                    frame_bytes = self.rtsp_manager.encode_frame_jpeg(frame)
-                    if frame_bytes:
-                        asyncio.run_coroutine_threadsafe(
-                            self.broadcast_camera_frame(camera_id, frame_bytes),
-                            loop
-                        )
-
-                # Frame skip for recognition
-                if self.frame_counters[camera_id] % settings.FRAME_SKIP != 0:
+                # Wake the camera's MJPEG encoder (no-op without viewers)
+                self.mjpeg.notify_threadsafe(camera_id)
+
+                # Only encode previews for tiers that subscribers asked for and
+                # that are due; encoding runs on the preview pool, not this thread
+                # (frame counter is advanced by the decode predicate per grabbed frame)
+                # Tiers are marked as sent only once the encoder accepts the
+                # job, so a busy encoder or a missing frame does not cost a
+                # whole FPS interval
+                tiers = self._preview_tiers_due(camera_id)
+                if tiers:
+                    preview_lease = self.rtsp_manager.acquire_frame(camera_id)
+                    if preview_lease is not None:
+                        if self.preview_encoder.submit(
+                            camera_id,
+                            preview_lease,
+                            tiers,
+                            lambda frames, cam_id=camera_id: loop.call_soon_threadsafe(
+                                self._dispatch_previews, cam_id, frames
+                            ),
+                            quality_cap=self.degradation.knobs.preview_jpeg_quality
+                        ):
+                            self._mark_previews_sent(camera_id, tiers)
+                        else:
+                            preview_lease.release()
+
+                # Frame skip, room pause and time-based throttling
+                if not self._is_recognition_due(room_id, camera_id):
                     return
-
-                # Time-based throttling
                 if not self._should_process_recognition(camera_id):
                     return
 
+                # Pin the ring slot instead of copying the frame for the async task
+                lease = self.rtsp_manager.acquire_frame(camera_id)
+                if lease is None:
+                    return
+
                 # Process recognition
-                asyncio.run_coroutine_threadsafe(
-                    self.process_frame_for_presence(frame, timestamp, room_id, camera_id),
-                    loop
-                )
+                try:
+                    asyncio.run_coroutine_threadsafe(
+                        self.process_frame_for_presence(lease.frame, timestamp, room_id, camera_id, lease),
+                        loop
+                    )
+                except Exception:
+                    lease.release()
+                    raise
 
             except Exception as e:
                 logger.error(f"Error in frame callback: {e}")
@@ -491,9 +781,19 @@ class RoomConnectionManager:
         camera_id: int,
         rtsp_url: str,
         room_id: int,
-        timeout: int = 30
+        timeout: int = 30,
+        substream_url: Optional[str] = None,
+        wait: bool = True
     ) -> bool:
-        """Start camera with recognition callback."""
+        """
+        Start camera with recognition callback.
+
+        If substream_url is set the substream is decoded continuously and
+        rtsp_url (main stream) is opened only on demand for high-res crops.
+
+        Connection runs in the manager's connect pool. With wait=False this
+        returns as soon as the camera is queued ("connecting" state).
+        """
         try:
             loop = asyncio.get_running_loop()
         except RuntimeError:
@@ -501,80 +801,55 @@ class RoomConnectionManager:
 
         callback = self.create_frame_callback(loop)
 
-        success = self.rtsp_manager.start_camera(
+        future = self.rtsp_manager.start_camera_async(
             camera_id=camera_id,
-            rtsp_url=rtsp_url,
+            rtsp_url=substream_url or rtsp_url,
             room_id=room_id,
             frame_callback=callback,
-            timeout=timeout
+            timeout=timeout,
+            decode_predicate=self.create_decode_predicate(),
+            high_res_url=rtsp_url if substream_url else None
         )
 
+        if future is None:
+            return False
+        if not wait:
+            return True
+
+        success = await asyncio.wrap_future(future)
         if success:
             logger.info(f"Camera {camera_id} started with presence callback")
 
         return success
 
-    # ==================== Background Cleanup ====================
-
-    async def start_cleanup_task(self):
-        """Start background task for cleaning stale presence."""
-        if self._cleanup_task and not self._cleanup_task.done():
-            return
-
-        self._cleanup_task = asyncio.create_task(self._cleanup_loop())
-        logger.info("Presence cleanup task started")
-
-    async def _cleanup_loop(self):
-        """Background loop for cleaning stale presence records."""
-        while True:
-            try:
-                await asyncio.sleep(settings.PRESENCE_CLEANUP_INTERVAL)
-
-                async with AsyncSessionLocal() as db:
-                    # Get presence before cleanup
-                    old_presence = await self.presence_service.get_all_rooms_presence_with_names(db)
-
-                    # Cleanup stale records
-                    cleaned = await self.presence_service.cleanup_stale_presence(db)
-                    await db.commit()
-
-                    if cleaned > 0:
-                        # Get updated presence
-                        new_presence = await self.presence_service.get_all_rooms_presence_with_names(db)
-
-                        # Find rooms with changes and broadcast
-                        for room_data in new_presence:
-                            room_id = room_data["room_id"]
-                            guest_count = self._get_active_guests_count(room_id)
-                            total_people = room_data["total_count"] + guest_count
-                            
-                            message = {
-                                "type": "presence_update",
-                                "room_id": room_id,
-                                "room_name": room_data["room_name"],
-                                "occupants": room_data["occupants"],
-                                "total_count": room_data["total_count"],
-                                "guest_count": guest_count,
-                                "total_people": total_people,
-                                "timestamp": datetime.now().isoformat()
-                            }
-                            await self.broadcast_to_room(room_id, message)
-                            await self.broadcast_all_presence(message)
-
-                        logger.info(f"Cleaned {cleaned} stale presence records")
-
-            except Exception as e:
-                logger.error(f"Error in cleanup loop: {e}")
-
-    def stop_cleanup_task(self):
-        """Stop the cleanup task."""
-        if self._cleanup_task:
-            self._cleanup_task.cancel()
-            self._cleanup_task = None
+    async def resume_active_cameras(self) -> int:
+        """
+        Start every active camera of every active room (server boot).
 
+        Cameras connect in the background; unreachable ones are retried by
+        the camera supervisor. Returns count of cameras queued.
+        """
+        room_service = get_room_service()
+        async with AsyncSessionLocal() as db:
+            rooms = await room_service.get_all_rooms(db)
+
+        queued = 0
+        for room in rooms:
+            for camera in room.cameras:
+                if not camera.is_active:
+                    continue
+                if await self.start_camera_with_callback(
+                    camera_id=camera.id,
+                    rtsp_url=camera.rtsp_url,
+                    room_id=room.id,
+                    substream_url=camera.substream_url,
+                    wait=False
+                ):
+                    queued += 1
+
+        logger.info(f"Resumed {queued} active cameras")
+        return queued
 
-# Import here to avoid circular import
-from sqlalchemy import select
 
 # Global manager
 room_manager = RoomConnectionManager()
@@ -586,41 +861,54 @@ room_manager = RoomConnectionManager()
 # "/ws/rooms/all/presence" must be defined before "/ws/rooms/{room_id}/presence"
 # otherwise "all" will be captured as room_id parameter
 
+async def send_presence_snapshot(channel: SubscriberChannel, room_id) -> bool:
+    """Queue a room's versioned presence snapshot (answer to a resync)."""
+    try:
+        snapshot = await room_manager.presence_publisher.snapshot(int(room_id))
+    except (TypeError, ValueError):
+        snapshot = None
+    if snapshot is None:
+        channel.send_control({"type": "error", "message": "Room not found"})
+        return False
+    channel.send_control({
+        "type": "presence_snapshot",
+        **snapshot,
+        "timestamp": datetime.now().isoformat()
+    })
+    return True
+
+
 @router.websocket("/ws/rooms/all/presence")
 async def all_rooms_presence(websocket: WebSocket):
-    """Subscribe to presence updates for ALL rooms (dashboard view)."""
+    """
+    Subscribe to presence updates for ALL rooms (dashboard view).
+
+    Starts with a snapshot of every room (with its version), then receives
+    presence_diff messages. Send {"type": "resync", "room_id": ...} on a
+    version gap for that room's presence_snapshot, or {"type": "refresh"}
+    for all rooms.
+    """
     # WebSocket'ni darhol accept qilish - 403 xatosini oldini olish uchun
-    await websocket.accept()
-    room_manager.all_presence_subscribers.add(websocket)
-    logger.info(f"WebSocket subscribed to all presence. Total: {len(room_manager.all_presence_subscribers)}")
-
-    # Start cleanup task if not running
-    await room_manager.start_cleanup_task()
+    channel = await room_manager.subscribe_all_presence(websocket)
 
     try:
-        # Send initial presence for all rooms
+        # Send initial presence for all rooms (versioned snapshots)
         async with AsyncSessionLocal() as db:
             all_presence = await room_manager.presence_service.get_all_rooms_presence_with_names(db)
-            
-            # Add guest counts
-            for room_data in all_presence:
-                room_id = room_data["room_id"]
-                guest_count = room_manager._get_active_guests_count(room_id)
-                room_data["guest_count"] = guest_count
-                room_data["total_people"] = room_data["total_count"] + guest_count
-            
-            total_students = sum(r["total_count"] for r in all_presence)
-            total_guests = sum(r["guest_count"] for r in all_presence)
-            total_people = total_students + total_guests
-
-            await websocket.send_json({
-                "type": "initial_all_presence",
-                "rooms": all_presence,
-                "total_students": total_students,
-                "total_guests": total_guests,
-                "total_people": total_people,
-                "timestamp": datetime.now().isoformat()
-            })
+        all_presence = await room_manager.presence_publisher.snapshots(all_presence)
+
+        total_students = sum(r["total_count"] for r in all_presence)
+        total_guests = sum(r["guest_count"] for r in all_presence)
+        total_people = total_students + total_guests
+
+        channel.send_control({
+            "type": "initial_all_presence",
+            "rooms": all_presence,
+            "total_students": total_students,
+            "total_guests": total_guests,
+            "total_people": total_people,
+            "timestamp": datetime.now().isoformat()
+        })
 
         # Keep connection alive
         while True:
@@ -629,20 +917,25 @@ async def all_rooms_presence(websocket: WebSocket):
                 message = json.loads(data)
 
                 if message.get("type") == "ping":
-                    await websocket.send_json({"type": "pong"})
+                    channel.send_control({"type": "pong"})
+
+                elif message.get("type") == "resync":
+                    # Client saw a version gap for one room
+                    await send_presence_snapshot(channel, message.get("room_id"))
 
                 elif message.get("type") == "refresh":
                     # Client requesting refresh
                     async with AsyncSessionLocal() as db:
                         all_presence = await room_manager.presence_service.get_all_rooms_presence_with_names(db)
-                        total_people = sum(r["total_count"] for r in all_presence)
-
-                        await websocket.send_json({
-                            "type": "all_presence_refresh",
-                            "rooms": all_presence,
-                            "total_people": total_people,
-                            "timestamp": datetime.now().isoformat()
-                        })
+                    all_presence = await room_manager.presence_publisher.snapshots(all_presence)
+                    total_people = sum(r["total_people"] for r in all_presence)
+
+                    channel.send_control({
+                        "type": "all_presence_refresh",
+                        "rooms": all_presence,
+                        "total_people": total_people,
+                        "timestamp": datetime.now().isoformat()
+                    })
 
             except WebSocketDisconnect:
                 break
@@ -656,37 +949,28 @@ async def all_rooms_presence(websocket: WebSocket):
 
 @router.websocket("/ws/rooms/{room_id}/presence")
 async def room_presence_stream(websocket: WebSocket, room_id: int):
-    """Subscribe to real-time presence updates for a specific room."""
-    # WebSocket'ni darhol accept qilish
-    await websocket.accept()
-    room_manager.room_subscriptions[room_id].add(websocket)
-    logger.info(f"WebSocket subscribed to room {room_id}. Total: {len(room_manager.room_subscriptions[room_id])}")
+    """
+    Subscribe to real-time presence updates for a specific room.
 
-    # Start cleanup task if not running
-    await room_manager.start_cleanup_task()
+    initial_presence carries the room's version; presence_diff messages
+    follow. Send {"type": "resync"} on a version gap for a fresh snapshot.
+    """
+    # WebSocket'ni darhol accept qilish
+    channel = await room_manager.subscribe_room_presence(websocket, room_id)
 
     try:
-        # Send initial presence data
-        async with AsyncSessionLocal() as db:
-            room = await room_manager.room_service.get_room(db, room_id)
-            if not room:
-                await websocket.send_json({"type": "error", "message": "Room not found"})
-                return
+        # Send initial presence data (versioned snapshot)
+        snapshot = await room_manager.presence_publisher.snapshot(room_id)
+        if snapshot is None:
+            # Sent directly - the channel is closed right after
+            await websocket.send_json({"type": "error", "message": "Room not found"})
+            return
 
-            presence_list = await room_manager.presence_service.get_room_presence(db, room_id)
-            guest_count = room_manager._get_active_guests_count(room_id)
-            total_people = len(presence_list) + guest_count
-
-            await websocket.send_json({
-                "type": "initial_presence",
-                "room_id": room_id,
-                "room_name": room.name,
-                "occupants": [p.to_dict() for p in presence_list],
-                "total_count": len(presence_list),
-                "guest_count": guest_count,
-                "total_people": total_people,
-                "timestamp": datetime.now().isoformat()
-            })
+        channel.send_control({
+            "type": "initial_presence",
+            **snapshot,
+            "timestamp": datetime.now().isoformat()
+        })
 
         # Keep connection alive
         while True:
@@ -695,7 +979,11 @@ async def room_presence_stream(websocket: WebSocket, room_id: int):
                 message = json.loads(data)
 
                 if message.get("type") == "ping":
-                    await websocket.send_json({"type": "pong"})
+                    channel.send_control({"type": "pong"})
+
+                elif message.get("type") == "resync":
+                    # Client saw a version gap
+                    await send_presence_snapshot(channel, room_id)
 
             except WebSocketDisconnect:
                 break
@@ -709,21 +997,28 @@ async def room_presence_stream(websocket: WebSocket, room_id: int):
 
 @router.websocket("/ws/cameras/{camera_id}/stream")
 async def camera_stream(websocket: WebSocket, camera_id: int):
-    """Subscribe to video stream from a specific camera."""
+    """
+    Subscribe to video stream from a specific camera.
+
+    Query params select the preview tier, e.g. ?max_width=320&fps=5&quality=60
+    for thumbnail grids (defaults: full size, PREVIEW_MAX_FPS, PREVIEW_JPEG_QUALITY).
+    Each tier is encoded once per frame and shared by its subscribers. Send
+    {"type": "set_tier", "max_width": ..., "fps": ..., "quality": ...} to switch.
+    """
+    tier = PreviewTier.from_params(websocket.query_params)
     # WebSocket'ni darhol accept qilish
-    await websocket.accept()
-    room_manager.camera_subscriptions[camera_id].add(websocket)
-    logger.info(f"WebSocket subscribed to camera {camera_id}. Total: {len(room_manager.camera_subscriptions[camera_id])}")
+    channel = await room_manager.subscribe_camera_stream(websocket, camera_id, tier)
 
     try:
         # Send initial status
         status = room_manager.rtsp_manager.get_camera_status(camera_id)
-        await websocket.send_json({
+        channel.send_control({
             "type": "status",
             "camera_id": camera_id,
             "connected": status.get("connected", False) if status else False,
             "running": status.get("running", False) if status else False,
-            "fps": status.get("fps", 0) if status else 0
+            "fps": status.get("fps", 0) if status else 0,
+            "tier": tier.to_dict()
         })
 
         # Keep connection alive
@@ -733,7 +1028,12 @@ async def camera_stream(websocket: WebSocket, camera_id: int):
                 message = json.loads(data)
 
                 if message.get("type") == "ping":
-                    await websocket.send_json({"type": "pong"})
+                    channel.send_control({"type": "pong"})
+
+                elif message.get("type") == "set_tier":
+                    tier = PreviewTier.from_params(message)
+                    room_manager.set_preview_tier(channel, tier)
+                    channel.send_control({"type": "tier", "camera_id": camera_id, "tier": tier.to_dict()})
 
             except WebSocketDisconnect:
                 break
@@ -745,6 +1045,50 @@ async def camera_stream(websocket: WebSocket, camera_id: int):
         room_manager.unsubscribe_camera(websocket, camera_id)
 
 
+@router.websocket("/ws/mosaic")
+async def mosaic_stream(websocket: WebSocket):
+    """
+    Subscribe to a server-side mosaic of several cameras (one JPEG per tick).
+
+    Query params: cameras=1,2,3 (default: all running), cols, tile_width,
+    tile_height, fps, quality, overlay=1 (face boxes and camera labels).
+    Viewers asking for the same layout share one composed and encoded image.
+    """
+    await websocket.accept()
+    try:
+        layout = MosaicLayout.from_params(
+            websocket.query_params, list(room_manager.rtsp_manager.streams.keys())
+        )
+    except ValueError as e:
+        await websocket.send_json({"type": "error", "message": str(e)})
+        await websocket.close()
+        return
+
+    channel = room_manager.open_channel(websocket, f"mosaic:{len(layout.camera_ids)}")
+    channel.send_control({"type": "layout", **layout.to_dict()})
+    room_manager.mosaic.subscribe(layout, channel)
+
+    try:
+        # Keep connection alive
+        while True:
+            try:
+                data = await websocket.receive_text()
+                message = json.loads(data)
+
+                if message.get("type") == "ping":
+                    channel.send_control({"type": "pong"})
+
+            except WebSocketDisconnect:
+                break
+            except Exception as e:
+                logger.error(f"Mosaic WebSocket error: {e}")
+                break
+
+    finally:
+        room_manager.mosaic.unsubscribe(layout, channel)
+        room_manager._close_channel(websocket)
+
+
 # Function to get the manager (for use in other modules)
 def get_room_manager() -> RoomConnectionManager:
     return room_manager
@@ -1,9 +1,12 @@
+import asyncio
+
 from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import Response, StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
 from typing import List
 
-from app.core.database import get_db
+from app.core.database import get_db, AsyncSessionLocal
 from app.models.room import Room
 from app.models.camera import Camera
 from app.models.student import Student
@@ -17,6 +20,7 @@ from app.views.room import (
 from app.services.room_service import get_room_service
 from app.services.presence_service import get_presence_service
 from app.services.multi_rtsp_service import get_multi_rtsp_manager
+from app.services.mjpeg_service import get_mjpeg_service, MEDIA_TYPE as MJPEG_MEDIA_TYPE
 
 router = APIRouter()
 
@@ -92,12 +96,15 @@ async def get_room(
                 status = "streaming"
             elif cam_status.get("connected"):
                 status = "connected"
+            elif cam_status.get("state") in ("connecting", "reconnecting"):
+                status = "connecting"
 
         cameras.append(CameraResponse(
             id=camera.id,
             room_id=camera.room_id,
             name=camera.name,
             rtsp_url=camera.rtsp_url,
+            substream_url=camera.substream_url,
             is_active=camera.is_active,
             created_at=camera.created_at,
             status=status
@@ -180,7 +187,8 @@ async def add_camera(
     camera = await room_service.add_camera(
         db, room_id,
         name=request.name,
-        rtsp_url=request.rtsp_url
+        rtsp_url=request.rtsp_url,
+        substream_url=request.substream_url
     )
 
     if not camera:
@@ -194,6 +202,7 @@ async def add_camera(
         room_id=camera.room_id,
         name=camera.name,
         rtsp_url=camera.rtsp_url,
+        substream_url=camera.substream_url,
         is_active=camera.is_active,
         created_at=camera.created_at,
         status="disconnected"
@@ -222,12 +231,15 @@ async def list_cameras(
                 status = "streaming"
             elif cam_status.get("connected"):
                 status = "connected"
+            elif cam_status.get("state") in ("connecting", "reconnecting"):
+                status = "connecting"
 
         result.append(CameraResponse(
             id=camera.id,
             room_id=camera.room_id,
             name=camera.name,
             rtsp_url=camera.rtsp_url,
+            substream_url=camera.substream_url,
             is_active=camera.is_active,
             created_at=camera.created_at,
             status=status
@@ -251,6 +263,7 @@ async def update_camera(
         db, camera_id,
         name=request.name,
         rtsp_url=request.rtsp_url,
+        substream_url=request.substream_url,
         is_active=request.is_active
     )
 
@@ -274,6 +287,7 @@ async def update_camera(
         room_id=camera.room_id,
         name=camera.name,
         rtsp_url=camera.rtsp_url,
+        substream_url=camera.substream_url,
         is_active=camera.is_active,
         created_at=camera.created_at,
         status=status
@@ -335,12 +349,15 @@ async def start_camera(
     if not camera.is_active:
         raise HTTPException(status_code=400, detail="Camera is disabled")
 
-    # Start camera with WebSocket callback for frame broadcasting
+    # Start camera with WebSocket callback for frame broadcasting.
+    # Connection runs in the background unless request.wait is set.
     success = await room_manager.start_camera_with_callback(
         camera_id=camera.id,
         rtsp_url=camera.rtsp_url,
         room_id=room_id,
-        timeout=request.timeout
+        timeout=request.timeout,
+        substream_url=camera.substream_url,
+        wait=request.wait
     )
 
     if not success:
@@ -351,18 +368,22 @@ async def start_camera(
         )
 
     status = rtsp_manager.get_camera_status(camera_id)
+    running = status.get("running", False) if status else False
 
     return CameraControlResponse(
         success=True,
-        message="Camera started successfully",
+        message="Camera started successfully" if running else "Camera connecting",
         camera_id=camera_id,
         status=CameraStatusResponse(
             camera_id=camera_id,
             room_id=room_id,
             connected=status.get("connected", False) if status else False,
-            running=status.get("running", False) if status else False,
+            running=running,
+            state=status.get("state") if status else None,
             rtsp_url=camera.rtsp_url,
-            fps=status.get("fps", 0) if status else 0
+            fps=status.get("fps", 0) if status else 0,
+            recognition_interval_ms=status.get("recognition_interval_ms") if status else None,
+            cadence_state=status.get("cadence_state") if status else None
         )
     )
 
@@ -393,6 +414,68 @@ async def stop_camera(
     )
 
 
+@router.get("/{room_id}/cameras/{camera_id}/snapshot")
+async def camera_snapshot(
+    room_id: int,
+    camera_id: int,
+    db: AsyncSession = Depends(get_db)
+):
+    """Highest resolution JPEG snapshot (main stream for dual-stream cameras)."""
+    room_service = get_room_service()
+    rtsp_manager = get_multi_rtsp_manager()
+
+    camera = await room_service.get_camera(db, camera_id)
+    if not camera:
+        raise HTTPException(status_code=404, detail="Camera not found")
+
+    if camera.room_id != room_id:
+        raise HTTPException(status_code=400, detail="Camera does not belong to this room")
+
+    if not rtsp_manager.is_camera_active(camera_id):
+        raise HTTPException(status_code=409, detail="Camera is not streaming")
+
+    loop = asyncio.get_running_loop()
+    frame = await loop.run_in_executor(None, rtsp_manager.get_snapshot_frame, camera_id)
+    if frame is None:
+        raise HTTPException(status_code=503, detail="No frame available")
+
+    jpeg = rtsp_manager.encode_frame_jpeg(frame, quality=95)
+    if jpeg is None:
+        raise HTTPException(status_code=500, detail="Failed to encode frame")
+
+    return Response(content=jpeg, media_type="image/jpeg")
+
+
+@router.get("/{room_id}/cameras/{camera_id}/stream")
+async def camera_stream_mjpeg(room_id: int, camera_id: int):
+    """
+    Camera preview as MJPEG (for <img> tags and direct browser viewing).
+
+    Each new frame is encoded once and shared by all MJPEG viewers of the
+    camera; viewers wait for the next frame instead of re-sending one.
+    """
+    rtsp_manager = get_multi_rtsp_manager()
+
+    # Own session: get_db would stay open for the whole stream
+    async with AsyncSessionLocal() as db:
+        camera = await get_room_service().get_camera(db, camera_id)
+    if not camera:
+        raise HTTPException(status_code=404, detail="Camera not found")
+
+    if camera.room_id != room_id:
+        raise HTTPException(status_code=400, detail="Camera does not belong to this room")
+
+    if not rtsp_manager.is_camera_active(camera_id):
+        raise HTTPException(status_code=409, detail="Camera is not streaming")
+
+    stream = get_mjpeg_service().get_stream(
+        camera_id,
+        lambda: rtsp_manager.acquire_frame(camera_id),
+        lambda: rtsp_manager.is_camera_active(camera_id)
+    )
+    return StreamingResponse(stream.frames(), media_type=MJPEG_MEDIA_TYPE)
+
+
 @router.post("/{room_id}/start-all")
 async def start_all_cameras(
     room_id: int,
@@ -412,28 +495,35 @@ async def start_all_cameras(
 
     cameras = await room_service.get_cameras_by_room(db, room_id)
 
-    started = 0
-    failed = 0
+    # All cameras connect concurrently in the connect pool - a room starts in
+    # the time of its slowest camera. Without wait this returns immediately.
+    results = await asyncio.gather(*[
+        room_manager.start_camera_with_callback(
+            camera_id=camera.id,
+            rtsp_url=camera.rtsp_url,
+            room_id=room_id,
+            timeout=request.timeout,
+            substream_url=camera.substream_url,
+            wait=request.wait
+        )
+        for camera in cameras
+        if camera.is_active
+    ])
+
+    started = sum(1 for success in results if success)
+    failed = len(results) - started
 
-    for camera in cameras:
-        if camera.is_active:
-            # Start camera with WebSocket callback for frame broadcasting
-            success = await room_manager.start_camera_with_callback(
-                camera_id=camera.id,
-                rtsp_url=camera.rtsp_url,
-                room_id=room_id,
-                timeout=request.timeout
-            )
-            if success:
-                started += 1
-            else:
-                failed += 1
+    if request.wait:
+        message = f"Started {started} cameras, {failed} failed"
+    else:
+        message = f"Connecting {started} cameras, {failed} rejected"
 
     return {
         "status": "success",
-        "message": f"Started {started} cameras, {failed} failed",
+        "message": message,
         "started": started,
-        "failed": failed
+        "failed": failed,
+        "connecting": 0 if request.wait else started
     }
 
 
@@ -465,7 +555,7 @@ async def get_room_presence(
     if not room:
         raise HTTPException(status_code=404, detail="Room not found")
 
-    presence_list = await presence_service.get_room_presence(db, room_id)
+    presence_list = presence_service.get_room_presence(room_id)
 
     return RoomPresenceResponse(
         room_id=room.id,
@@ -1,5 +1,7 @@
 from fastapi import APIRouter, HTTPException
+from fastapi.responses import StreamingResponse
 from app.services.rtsp_service import get_rtsp_service
+from app.services.mjpeg_service import get_mjpeg_service, MEDIA_TYPE as MJPEG_MEDIA_TYPE
 from app.controllers.websocket import manager
 from app.views.rtsp import RTSPConnectRequest, RTSPConnectResponse, RTSPStatusResponse
 import logging
@@ -123,37 +125,31 @@ async def get_rtsp_stream_mjpeg():
     """
     Get RTSP stream as MJPEG (for direct browser viewing).
     Note: For real-time updates, use WebSocket endpoint instead.
-    
+
+    Each new frame is encoded once and shared by all MJPEG viewers; viewers
+    wait for the next frame instead of re-sending the same one.
+
     Returns:
         MJPEG stream
     """
-    from fastapi.responses import StreamingResponse
-    import asyncio
-    
     rtsp_service = get_rtsp_service()
-    
+
     if not rtsp_service.is_connected:
         raise HTTPException(
             status_code=400,
             detail="RTSP stream not connected. Please connect first."
         )
-    
-    async def generate_frames():
-        """Generate MJPEG frames from RTSP stream."""
-        while rtsp_service.is_connected:
-            frame = rtsp_service.get_frame()
-            if frame is not None:
-                # Encode as JPEG
-                frame_bytes = rtsp_service.encode_frame_jpeg(frame)
-                
-                # MJPEG format
-                yield (b'--frame\r\n'
-                       b'Content-Type: image/jpeg\r\n\r\n' + frame_bytes + b'\r\n')
-            else:
-                await asyncio.sleep(0.033)  # ~30 FPS
-    
-    return StreamingResponse(
-        generate_frames(),
-        media_type="multipart/x-mixed-replace; boundary=frame"
+
+    mjpeg_service = get_mjpeg_service()
+    stream = mjpeg_service.get_stream(
+        "rtsp",
+        rtsp_service.acquire_frame,
+        lambda: rtsp_service.is_connected
     )
+    rtsp_service.add_frame_listener(_notify_mjpeg)
+
+    return StreamingResponse(stream.frames(), media_type=MJPEG_MEDIA_TYPE)
+
 
+def _notify_mjpeg():
+    get_mjpeg_service().notify_threadsafe("rtsp")
@@ -14,6 +14,9 @@ from app.models.student_image import StudentImage
 from app.views.student import StudentCreate, StudentResponse
 from app.services.face_service import get_face_service
 from app.services.vector_service import get_vector_service
+from app.services.metadata_cache import get_metadata_cache
+from app.services.attendance_service import get_attendance_service
+from app.services.presence_service import get_presence_service
 from app.core.config import settings
 
 router = APIRouter()
@@ -53,6 +56,7 @@ async def register_student(
     db.add(new_student)
     await db.commit()
     await db.refresh(new_student)
+    get_metadata_cache().put_student(new_student)
     
     # Create student image directory
     student_dir = os.path.join(settings.IMAGES_BASE_PATH, student.student_id)
@@ -247,9 +251,14 @@ async def delete_student(
         import shutil
         shutil.rmtree(student_dir)
     
-    # Delete from database (cascade will handle related records)
+    # Delete from database (attendance with its rollups first, cascade will handle the rest)
+    attendance_service = get_attendance_service()
+    await attendance_service.delete_student_attendance(db, student.id)
     await db.delete(student)
     await db.commit()
+    get_metadata_cache().remove_student(student.id)
+    attendance_service.remove_student(student.id)
+    get_presence_service().remove_student(student.id)
     
     return {"status": "success", "message": f"Student {student_id} deleted"}
 
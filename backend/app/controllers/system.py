@@ -0,0 +1,97 @@
+from fastapi import APIRouter
+import logging
+
+from app.services.degradation_service import get_degradation_controller
+from app.services.multi_rtsp_service import get_multi_rtsp_manager
+from app.services.pipeline_metrics import get_pipeline_metrics
+from app.services.presence_service import get_presence_service
+from app.services.metadata_cache import get_metadata_cache
+from app.services.attendance_service import get_attendance_service
+from app.controllers.room_websocket import get_room_manager
+from app.core.database import engine
+from app.core.db_writer import get_db_writer
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter()
+
+
+@router.get("/degradation")
+async def get_degradation_status():
+    """
+    Get SLO degradation controller state.
+
+    Returns:
+        Current level and knobs, SLOs, windowed metrics and recent transitions
+    """
+    return get_degradation_controller().get_status()
+
+
+@router.get("/cameras")
+async def get_cameras_status():
+    """
+    Get status of all supervised cameras.
+
+    Returns:
+        camera_id -> stream status with circuit breaker state
+        (closed / open / half_open, failures, next attempt)
+    """
+    return get_multi_rtsp_manager().get_all_statuses()
+
+
+@router.get("/decoders")
+async def get_decoder_stats():
+    """
+    Get decoder pool scheduling stats.
+
+    Returns:
+        threads, scheduled cameras, late step ratio and average lateness
+        (enabled: false in thread-per-camera mode)
+    """
+    stats = get_multi_rtsp_manager().get_decoder_stats()
+    if stats is None:
+        return {"enabled": False}
+    return {"enabled": True, **stats}
+
+
+@router.get("/pipeline")
+async def get_pipeline_metrics_stats():
+    """
+    Get per-camera recognition pipeline latency.
+
+    Returns:
+        camera_id -> achieved recognition fps and per-stage
+        (decode, detect, embed, search, db, mark_dirty, broadcast, total) avg/p50/p95 ms
+    """
+    return get_pipeline_metrics().get_all_stats()
+
+
+@router.get("/websockets")
+async def get_websocket_stats():
+    """
+    Get per-client WebSocket send queue stats.
+
+    Returns:
+        clients, pending/dropped totals and per-subscriber lag and
+        drop counters by message kind (control, presence, detection, frame)
+    """
+    return get_room_manager().get_subscriber_stats()
+
+
+@router.get("/database")
+async def get_database_stats():
+    """
+    Get database access stats.
+
+    Returns:
+        connection pool status, single-writer batching (jobs, batches,
+        avg batch size and commit time), batched attendance inserts,
+        in-memory presence write-behind and metadata cache hit/miss counters
+    """
+    return {
+        "pool": engine.pool.status(),
+        "writer": get_db_writer().get_stats(),
+        "attendance": get_attendance_service().get_stats(),
+        "presence": get_presence_service().get_stats(),
+        "metadata_cache": get_metadata_cache().get_stats()
+    }
@@ -11,12 +11,11 @@ import time
 from app.services.rtsp_service import get_rtsp_service
 from app.services.face_service import get_face_service
 from app.services.vector_service import get_vector_service
+from app.services.metadata_cache import get_metadata_cache
+from app.services.attendance_service import get_attendance_service
 from app.core.database import AsyncSessionLocal
 from app.core.config import settings
-from app.models.student import Student
-from app.models.attendance import Attendance
-from sqlalchemy import select, and_
-from datetime import date
+from app.core.json_codec import dumps
 
 logger = logging.getLogger(__name__)
 
@@ -34,6 +33,8 @@ class ConnectionManager:
         self.rtsp_service = get_rtsp_service()
         self.face_service = get_face_service()
         self.vector_service = get_vector_service()
+        self.metadata = get_metadata_cache()
+        self.attendance = get_attendance_service()
         self.recognition_task: asyncio.Task = None
 
         # Cooldown tracking: {student_id: last_recognition_timestamp}
@@ -73,11 +74,14 @@ class ConnectionManager:
             self.disconnect(websocket)
     
     async def broadcast(self, message: dict):
-        """Broadcast message to all connected clients."""
+        """Broadcast message to all connected clients (encoded once for all)."""
+        if not self.active_connections:
+            return
+        payload = dumps(message)
         disconnected = []
         for connection in self.active_connections:
             try:
-                await connection.send_json(message)
+                await connection.send_text(payload)
             except Exception as e:
                 logger.error(f"Error broadcasting: {e}")
                 disconnected.append(connection)
@@ -163,28 +167,15 @@ class ConnectionManager:
                     if self._is_in_cooldown(student_db_id):
                         continue
 
-                    # Get student info
-                    result = await db.execute(
-                        select(Student).where(Student.id == student_db_id)
-                    )
-                    student = result.scalar_one_or_none()
+                    # Get student info (cached; queries only on a miss)
+                    student = await self.metadata.resolve_student(db, student_db_id)
 
                     if not student:
                         continue
 
-                    # Check if already attended today
-                    today = date.today()
-                    result = await db.execute(
-                        select(Attendance).where(
-                            and_(
-                                Attendance.student_id == student.id,
-                                Attendance.attendance_date == today
-                            )
-                        )
-                    )
-                    existing_attendance = result.scalar_one_or_none()
-
-                    student_data = {
+                    # Update cooldown
+                    self._update_cooldown(student_db_id)
+                    recognized_students.append({
                         "id": student.id,
                         "student_id": student.student_id,
                         "first_name": student.first_name,
@@ -192,36 +183,28 @@ class ConnectionManager:
                         "group_name": student.group_name,
                         "confidence": confidence,
                         "bbox": face_info['bbox']
-                    }
-
-                    if existing_attendance:
-                        # Already attended today
-                        student_data["status"] = "already_attended"
-                        student_data["check_in_time"] = existing_attendance.check_in_time.isoformat()
-                    else:
-                        # Create new attendance record
-                        now = datetime.now()
-                        attendance = Attendance(
-                            student_id=student.id,
-                            attendance_date=today,
-                            check_in_time=now.time(),
-                            confidence_score=confidence,
-                            snapshot_path=None
-                        )
-
-                        db.add(attendance)
-                        await db.commit()
-                        await db.refresh(attendance)
-
-                        student_data["status"] = "success"
-                        student_data["check_in_time"] = attendance.check_in_time.isoformat()
-                        student_data["attendance_id"] = attendance.id
-
-                        logger.info(f"Davomat olindi: {student.first_name} {student.last_name} ({student.student_id})")
-
-                    # Update cooldown
-                    self._update_cooldown(student_db_id)
-                    recognized_students.append(student_data)
+                    })
+
+            # Students who already attended today are answered from the
+            # in-memory attended set; the rest share one idempotent insert
+            results = await asyncio.gather(
+                *(self.attendance.check_in(s["id"], s["confidence"]) for s in recognized_students),
+                return_exceptions=True
+            )
+            for student_data, attendance in zip(recognized_students, results):
+                if isinstance(attendance, Exception):
+                    logger.error(f"Attendance write failed for {student_data['student_id']}: {attendance}")
+                    student_data["status"] = "error"
+                    continue
+
+                student_data["check_in_time"] = attendance.check_in_time.isoformat()
+                if attendance.created:
+                    student_data["status"] = "success"
+                    student_data["attendance_id"] = attendance.attendance_id
+                    logger.info(f"Davomat olindi: {student_data['first_name']} {student_data['last_name']} ({student_data['student_id']})")
+                else:
+                    # Already attended today
+                    student_data["status"] = "already_attended"
 
             # Cleanup old cooldown entries periodically
             if len(self.cooldown_tracker) > 100:
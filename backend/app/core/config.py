@@ -12,6 +12,14 @@ class Settings(BaseSettings):
     
     # SQLite Database file path
     SQLITE_DB_PATH: str = "./face_attendance.db"
+
+    # SQLite tuning (fayl bazasi uchun; :memory: da StaticPool qoladi)
+    SQLITE_WAL: bool = True  # WAL journal - o'quvchilar yozuvchini kutmaydi
+    SQLITE_READ_POOL_SIZE: int = 4  # O'qish uchun ulanishlar soni
+    SQLITE_MMAP_SIZE: int = 268435456  # mmap_size (bayt), 256 MB
+    SQLITE_CACHE_SIZE_KB: int = 65536  # Sahifa keshi (KB), 64 MB
+    SQLITE_BUSY_TIMEOUT_MS: int = 5000  # Band bo'lsa kutish vaqti (ms)
+    DB_WRITE_BATCH_MAX: int = 200  # Bitta tranzaksiyadagi maksimal yozuv ishlari
     
     # FAISS
     FAISS_INDEX_PATH: str = "./faiss_index/student_faces.index"
@@ -38,12 +46,71 @@ class Settings(BaseSettings):
     MIN_FACE_SIZE: int = 60  # Minimal yuz o'lchami (80 dan 60 ga - kichikroq yuzlarni ham aniqlash)
     FRAME_SKIP: int = 2  # Har nechta kadrda 1 marta aniqlash (5 dan 2 ga - tezroq)
 
+    # Adaptive Recognition Cadence (per camera)
+    ADAPTIVE_MAX_INTERVAL_MS: int = 3000  # Yuz yo'q bo'lganda maksimal oraliq
+    ADAPTIVE_STABLE_INTERVAL_MS: int = 1200  # Hamma tanilgan va barqaror bo'lganda oraliq
+    ADAPTIVE_BACKOFF_FACTOR: float = 2.0  # Yuz topilmaganda oraliqni oshirish koeffitsienti
+    ADAPTIVE_RELAX_FACTOR: float = 1.5  # Barqaror holatda oraliqni oshirish koeffitsienti
+
     # Room Presence Settings
     PRESENCE_TIMEOUT_SECONDS: int = 30  # Xonadan chiqdi deb hisoblash vaqti (soniya)
-    PRESENCE_CLEANUP_INTERVAL: int = 10  # Eskirgan presence ni tozalash oralig'i (soniya)
+    PRESENCE_CLEANUP_INTERVAL: float = 1.0  # Eskirgan presence ni tozalash oralig'i (soniya, timer-heap)
+    PRESENCE_BROADCAST_HZ: float = 2.0  # Presence diff yuborish chastotasi (xona boshiga, Hz)
+    PRESENCE_FLUSH_INTERVAL: float = 3.0  # Presence o'zgarishlarini DB ga yozish oralig'i (soniya)
     MAX_SIMULTANEOUS_STREAMS: int = 20  # Maksimal parallel RTSP stream soni
     MAX_CAMERAS_PER_ROOM: int = 10  # Bir xonada maksimal kamera soni
-    
+    CAMERA_CONNECT_CONCURRENCY: int = 8  # Bir vaqtda ulanayotgan kameralar soni
+
+    # Camera Supervisor (reconnect)
+    RECONNECT_BASE_DELAY: float = 1.0  # Birinchi qayta ulanishdan oldin kutish (soniya)
+    RECONNECT_MAX_DELAY: float = 60.0  # Maksimal kutish (soniya)
+    RECONNECT_MAX_CONCURRENT: int = 4  # Bir vaqtda qayta ulanayotgan kameralar soni
+    CIRCUIT_FAILURE_THRESHOLD: int = 3  # Shuncha ketma-ket xatolikdan keyin circuit ochiladi
+    AUTO_RESUME_CAMERAS: bool = True  # Server ishga tushganda faol kameralarni ulash
+
+    # Frame Buffers
+    FRAME_RING_SIZE: int = 4  # Har bir kamera uchun oldindan ajratilgan kadr buferlari soni
+
+    # Ingestion Mode
+    INGEST_MODE: str = "threads"  # "threads" (kamera uchun thread), "pool" (umumiy decoder pool) yoki "sharded" (alohida jarayonlarda)
+    DECODER_POOL_THREADS: int = 4  # pool rejimida decoder threadlar soni
+    DECODER_TARGET_FPS: float = 15.0  # pool rejimida kamera uchun standart FPS
+    INGEST_WORKERS: int = 4  # sharded rejimda ingest jarayonlari soni
+    SHARD_RING_SLOTS: int = 4  # Har bir kamera uchun shared memory kadr slotlari
+    SHARD_DECODE_FPS: int = 15  # sharded rejimda kamera uchun maksimal decode FPS
+
+    # Ingest Backend
+    RTSP_INGEST_BACKEND: str = "opencv"  # "opencv" yoki "pyav" (keyframe-only rejimi uchun)
+    KEYFRAME_IDLE_SECONDS: int = 120  # Harakat/yuz bo'lmasa keyframe-only rejimga o'tish (soniya)
+    MOTION_THRESHOLD: float = 6.0  # Kadrlar farqi (0-255 o'rtacha) - harakat chegarasi
+
+    # Dual-stream Cameras (substream + main stream)
+    HIGH_RES_IDLE_SECONDS: int = 10  # So'rov bo'lmasa main stream yopiladi (soniya)
+    SUBSTREAM_MIN_FACE_SIZE: int = 24  # Substreamda minimal yuz o'lchami
+    SUBSTREAM_REEMBED_FACE_SIZE: int = 112  # Bundan kichik yuzlar main streamdan qayta olinadi
+
+    # Preview Settings
+    PREVIEW_JPEG_QUALITY: int = 85  # WebSocket preview JPEG sifati
+    PREVIEW_MAX_FPS: int = 30  # Bitta kamera uchun maksimal preview FPS
+    PREVIEW_MIN_WIDTH: int = 160  # Mijoz so'rashi mumkin bo'lgan eng kichik preview kengligi
+    PREVIEW_ENCODE_THREADS: int = 2  # Preview JPEG kodlash oqimlari (capture oqimidan tashqarida)
+    MJPEG_MAX_FPS: int = 15  # MJPEG oqimi uchun maksimal FPS (kadr bir marta kodlanadi)
+    MOSAIC_TILE_WIDTH: int = 320  # Mozaika plitkasi kengligi (balandlik 16:9)
+    MOSAIC_FPS: int = 5  # Mozaika FPS
+    MOSAIC_JPEG_QUALITY: int = 70  # Mozaika JPEG sifati
+    MOSAIC_MAX_CAMERAS: int = 36  # Bitta mozaikadagi maksimal kameralar
+    MOSAIC_OVERLAY_TTL_SECONDS: float = 2.0  # Yuz ramkalari shu vaqtgacha ko'rsatiladi
+    WS_SEND_TIMEOUT_SECONDS: float = 10.0  # Sekin WebSocket mijoz shu vaqtdan keyin uziladi
+    DETECTION_SIZE: int = 640  # InsightFace det_size (kvadrat)
+
+    # SLO / Degradation Settings
+    SLO_RECOGNITION_LATENCY_MS: int = 1500  # Kadr olinganidan natija yuborilguncha (p95)
+    SLO_LOOP_LAG_MS: int = 200  # Event loop kechikishi (p95)
+    DEGRADATION_CHECK_INTERVAL: float = 2.0  # SLO tekshiruv oralig'i (soniya)
+    DEGRADATION_WINDOW_SECONDS: int = 10  # Metrikalar oynasi (soniya)
+    DEGRADATION_RESTORE_RATIO: float = 0.6  # SLO * ratio dan past bo'lsa - tiklash
+    DEGRADATION_RESTORE_CHECKS: int = 3  # Tiklashdan oldin ketma-ket sog'lom tekshiruvlar
+
     # API
     API_HOST: str = "0.0.0.0"
     API_PORT: int = 8000
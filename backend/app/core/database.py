@@ -1,16 +1,64 @@
-from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine, async_sessionmaker
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, create_async_engine, async_sessionmaker
 from sqlalchemy.orm import declarative_base
-from sqlalchemy.pool import StaticPool
+from sqlalchemy.pool import AsyncAdaptedQueuePool, StaticPool
 from app.core.config import settings
 
+
+def _is_memory_sqlite(url: str) -> bool:
+    return ":memory:" in url or "mode=memory" in url or url.rstrip("/").endswith(":")
+
+
+def _set_sqlite_pragmas(dbapi_connection, connection_record):
+    """Per-connection SQLite tuning (WAL is persistent, the rest is per connection)."""
+    cursor = dbapi_connection.cursor()
+    if settings.SQLITE_WAL:
+        cursor.execute("PRAGMA journal_mode=WAL")
+        # Safe with WAL: a crash can lose the last commits, never corrupt the file
+        cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.execute(f"PRAGMA mmap_size={int(settings.SQLITE_MMAP_SIZE)}")
+    # Negative cache_size = KiB instead of pages
+    cursor.execute(f"PRAGMA cache_size=-{int(settings.SQLITE_CACHE_SIZE_KB)}")
+    cursor.execute(f"PRAGMA busy_timeout={int(settings.SQLITE_BUSY_TIMEOUT_MS)}")
+    cursor.execute("PRAGMA temp_store=MEMORY")
+    cursor.close()
+
+
+def create_engine(url: str = settings.DATABASE_URL, tuned: bool = True) -> AsyncEngine:
+    """
+    Create the async engine for url.
+
+    SQLite files get WAL + tuned pragmas and a small pool of connections,
+    so reads (HTTP requests, dashboards) run concurrently. The hot write
+    paths (presence flush, attendance check-ins) go through the
+    DatabaseWriter task (app.core.db_writer); CRUD endpoints still commit
+    on their own sessions and wait out the writer via busy_timeout.
+    In-memory SQLite keeps StaticPool: every connection would otherwise
+    be a separate, empty database. tuned=False gives the old single
+    shared connection (benchmarks).
+    """
+    if "sqlite" not in url:
+        return create_async_engine(url, echo=False)
+
+    connect_args = {"check_same_thread": False}
+    # aiosqlite uchun StaticPool ishlatiladi (NullPool pool_size qo'llab-quvvatlamaydi)
+    if _is_memory_sqlite(url) or not tuned:
+        return create_async_engine(url, echo=False, poolclass=StaticPool, connect_args=connect_args)
+
+    engine = create_async_engine(
+        url,
+        echo=False,
+        poolclass=AsyncAdaptedQueuePool,
+        pool_size=settings.SQLITE_READ_POOL_SIZE,
+        max_overflow=settings.SQLITE_READ_POOL_SIZE,
+        connect_args={**connect_args, "timeout": settings.SQLITE_BUSY_TIMEOUT_MS / 1000},
+    )
+    event.listen(engine.sync_engine, "connect", _set_sqlite_pragmas)
+    return engine
+
+
 # Create async engine
-# aiosqlite uchun StaticPool ishlatiladi (NullPool pool_size qo'llab-quvvatlamaydi)
-engine = create_async_engine(
-    settings.DATABASE_URL,
-    echo=False,
-    poolclass=StaticPool,
-    connect_args={"check_same_thread": False} if "sqlite" in settings.DATABASE_URL else {},
-)
+engine = create_engine()
 
 # Create async session factory
 AsyncSessionLocal = async_sessionmaker(
@@ -36,4 +84,3 @@ async def get_db():
             raise
         finally:
             await session.close()
-
@@ -0,0 +1,140 @@
+import asyncio
+import logging
+import time
+from typing import Any, Awaitable, Callable, List, Optional, Tuple
+
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal
+
+logger = logging.getLogger(__name__)
+
+WriteJob = Callable[[AsyncSession], Awaitable[Any]]
+
+
+class DatabaseWriter:
+    """
+    Single writer task for the high-rate writes (SQLite allows one writer at a time).
+
+    Used by the presence write-behind flush and attendance check-ins.
+    Other writes (CRUD endpoints, startup backfill) commit on their own
+    sessions and wait for the lock via busy_timeout.
+
+    Write jobs are async callables taking a session; they must not commit.
+    The writer takes every job queued at that moment (up to
+    DB_WRITE_BATCH_MAX), runs them in one transaction and commits once
+    (group commit), then resolves each job's future with its result. If
+    the batch fails, its jobs are retried one per transaction so only the
+    failing job gets the exception.
+    """
+
+    def __init__(
+        self,
+        session_factory: Optional[async_sessionmaker] = None,
+        max_batch: Optional[int] = None
+    ):
+        self.session_factory = session_factory or AsyncSessionLocal
+        self.max_batch = max(1, max_batch or settings.DB_WRITE_BATCH_MAX)
+
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+        # Stats
+        self.jobs = 0
+        self.batches = 0
+        self.failed = 0
+        self.total_commit_ms = 0.0
+
+    def _ensure_task(self):
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop or self._task is None or self._task.done():
+            if self._loop is not loop:
+                self._queue = asyncio.Queue()
+                self._loop = loop
+            self._task = loop.create_task(self._run())
+
+    async def submit(self, job: WriteJob) -> Any:
+        """Queue a write job and wait until its transaction is committed."""
+        self._ensure_task()
+        future = self._loop.create_future()
+        self._queue.put_nowait((job, future))
+        return await future
+
+    async def _run(self):
+        stopping = False
+        while not stopping:
+            item = await self._queue.get()
+            if item is None:
+                return
+            batch = [item]
+            while len(batch) < self.max_batch and not self._queue.empty():
+                item = self._queue.get_nowait()
+                if item is None:
+                    # stop() - commit this batch, then exit
+                    stopping = True
+                    break
+                batch.append(item)
+            await self._commit_batch(batch)
+
+    async def _commit_batch(self, batch: List[Tuple[WriteJob, asyncio.Future]]):
+        start = time.perf_counter()
+        try:
+            async with self.session_factory() as db:
+                results = [await job(db) for job, _ in batch]
+                await db.commit()
+        except asyncio.CancelledError:
+            for _, future in batch:
+                if not future.done():
+                    future.cancel()
+            raise
+        except Exception as e:
+            if len(batch) == 1:
+                self.failed += 1
+                logger.error(f"Database write failed: {e}")
+                future = batch[0][1]
+                if not future.done():
+                    future.set_exception(e)
+                return
+            # Isolate the failing job
+            for item in batch:
+                await self._commit_batch([item])
+            return
+
+        self.jobs += len(batch)
+        self.batches += 1
+        self.total_commit_ms += (time.perf_counter() - start) * 1000
+        for (_, future), result in zip(batch, results):
+            if not future.done():
+                future.set_result(result)
+
+    async def stop(self):
+        """Commit what is queued, then stop the task."""
+        if self._task is None or self._loop is not asyncio.get_running_loop():
+            return
+        self._queue.put_nowait(None)
+        await asyncio.gather(self._task, return_exceptions=True)
+        self._task = None
+
+    def get_stats(self) -> dict:
+        return {
+            "jobs": self.jobs,
+            "batches": self.batches,
+            "avg_batch": round(self.jobs / self.batches, 2) if self.batches else 0.0,
+            "avg_commit_ms": round(self.total_commit_ms / self.batches, 2) if self.batches else 0.0,
+            "failed": self.failed,
+            "queued": self._queue.qsize() if self._queue else 0
+        }
+
+
+# Global instance
+_db_writer: Optional[DatabaseWriter] = None
+
+
+def get_db_writer() -> DatabaseWriter:
+    """Get or create global DatabaseWriter instance."""
+    global _db_writer
+    if _db_writer is None:
+        _db_writer = DatabaseWriter()
+    return _db_writer
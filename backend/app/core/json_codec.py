@@ -0,0 +1,44 @@
+"""
+JSON encoding for WebSocket broadcasts.
+
+Broadcast helpers encode a message once with dumps() and send the same text
+to every subscriber (send_text) instead of letting each send_json call
+serialize it again. Uses orjson when installed, the stdlib json otherwise.
+"""
+import json
+from datetime import date, datetime
+
+import numpy as np
+
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    orjson = None
+    ORJSON_AVAILABLE = False
+
+if ORJSON_AVAILABLE:
+    _ORJSON_OPTIONS = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+
+
+def _default(obj):
+    """Types the fast path handles natively: numpy scalars/arrays, dates."""
+    if isinstance(obj, np.generic):
+        return obj.item()
+    if isinstance(obj, np.ndarray):
+        return obj.tolist()
+    if isinstance(obj, (datetime, date)):
+        return obj.isoformat()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def dumps(message) -> str:
+    """Encode a message to compact JSON text (same output shape as send_json)."""
+    if ORJSON_AVAILABLE:
+        return orjson.dumps(message, default=_default, option=_ORJSON_OPTIONS).decode("utf-8")
+    return dumps_stdlib(message)
+
+
+def dumps_stdlib(message) -> str:
+    """Stdlib-only encoding (fallback path, used by the broadcast benchmark)."""
+    return json.dumps(message, default=_default, separators=(",", ":"), ensure_ascii=False)
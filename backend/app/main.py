@@ -4,8 +4,15 @@ from fastapi.staticfiles import StaticFiles
 from contextlib import asynccontextmanager
 from app.core.config import settings
 from app.core.database import engine, Base
-from app.controllers import students, attendance, rtsp, websocket, rooms, room_websocket
-from app.models import Student, StudentImage, Attendance, Room, Camera, RoomPresence
+from app.core.db_writer import get_db_writer
+from app.controllers import students, attendance, rtsp, websocket, rooms, room_websocket, system
+from app.services.degradation_service import get_degradation_controller
+from app.services.multi_rtsp_service import get_multi_rtsp_manager
+from app.services.preview_encoder import get_preview_encoder
+from app.services.presence_service import get_presence_service
+from app.services.metadata_cache import get_metadata_cache
+from app.services.attendance_service import get_attendance_service
+from app.models import Student, StudentImage, Attendance, AttendanceDailyStat, Room, Camera, RoomPresence
 import os
 import asyncio
 
@@ -18,10 +25,35 @@ async def lifespan(app: FastAPI):
     async with engine.begin() as conn:
         await conn.run_sync(Base.metadata.create_all)
     print("✅ Database tables created successfully!")
+
+    degradation_controller = get_degradation_controller()
+    await degradation_controller.start()
+
+    # Student display fields and room names for recognition (no per-face queries)
+    await get_metadata_cache().warm()
+
+    # Attendance rollups (built once if missing) and today's attended students
+    attendance_service = get_attendance_service()
+    await attendance_service.backfill_daily_stats()
+    await attendance_service.load_attended()
+
+    # In-memory presence (loaded from room_presence, written behind)
+    presence_service = get_presence_service()
+    await presence_service.start()
+
+    # Restart cameras that are marked active in the DB
+    if settings.AUTO_RESUME_CAMERAS:
+        await room_websocket.get_room_manager().resume_active_cameras()
     
     yield
     
     # Shutdown
+    get_multi_rtsp_manager().shutdown()
+    get_preview_encoder().shutdown()
+    degradation_controller.stop()
+    await presence_service.stop()
+    await attendance_service.stop()
+    await get_db_writer().stop()
     await engine.dispose()
 
 
@@ -53,6 +85,7 @@ app.include_router(rtsp.router, prefix="/api/rtsp", tags=["rtsp"])
 app.include_router(websocket.router, tags=["websocket"])
 app.include_router(rooms.router, prefix="/api/rooms", tags=["rooms"])
 app.include_router(room_websocket.router, tags=["room-websocket"])
+app.include_router(system.router, prefix="/api/system", tags=["system"])
 
 
 @app.get("/")
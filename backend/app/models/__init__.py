@@ -1,9 +1,10 @@
 from app.models.student import Student
 from app.models.student_image import StudentImage
 from app.models.attendance import Attendance
+from app.models.attendance_daily_stat import AttendanceDailyStat
 from app.models.room import Room
 from app.models.camera import Camera
 from app.models.room_presence import RoomPresence
 
-__all__ = ["Student", "StudentImage", "Attendance", "Room", "Camera", "RoomPresence"]
+__all__ = ["Student", "StudentImage", "Attendance", "AttendanceDailyStat", "Room", "Camera", "RoomPresence"]
 
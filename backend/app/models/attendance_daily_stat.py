@@ -0,0 +1,20 @@
+from sqlalchemy import Column, Integer, String, Date, UniqueConstraint
+from app.core.database import Base
+
+
+class AttendanceDailyStat(Base):
+    """Attendance count per day and group (rollup of the attendance table)."""
+
+    __tablename__ = "attendance_daily_stats"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    attendance_date = Column(Date, nullable=False, index=True)
+    group_name = Column(String(50), nullable=False, default="")  # "" - guruhsiz talabalar
+    count = Column(Integer, nullable=False, default=0)
+    
+    __table_args__ = (
+        UniqueConstraint('attendance_date', 'group_name', name='unique_daily_stat_per_group'),
+    )
+    
+    def __repr__(self):
+        return f"<AttendanceDailyStat(date={self.attendance_date}, group={self.group_name}, count={self.count})>"
@@ -10,6 +10,7 @@ class Camera(Base):
     room_id = Column(Integer, ForeignKey("rooms.id", ondelete="CASCADE"), nullable=False, index=True)
     name = Column(String(100), nullable=False)
     rtsp_url = Column(String(500), nullable=False)
+    substream_url = Column(String(500), nullable=True)  # Past sifatli substream (aniqlash uchun)
     is_active = Column(Boolean, default=True, nullable=False)
     created_at = Column(TIMESTAMP, server_default=func.current_timestamp(), nullable=False)
 
@@ -0,0 +1,408 @@
+import asyncio
+import logging
+from array import array
+from datetime import date, datetime, time
+from typing import Dict, Iterable, List, NamedTuple, Optional, Set, Tuple
+
+from sqlalchemy import delete, func, select, true
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.database import AsyncSessionLocal
+from app.core.db_writer import get_db_writer
+from app.models.attendance import Attendance
+from app.models.attendance_daily_stat import AttendanceDailyStat
+from app.models.student import Student
+
+logger = logging.getLogger(__name__)
+
+AttendanceKey = Tuple[date, int]  # (attendance_date, student DB id)
+
+
+class AttendanceResult(NamedTuple):
+    """
+    Outcome of a check-in: the day's attendance row and whether this call created it.
+
+    attendance_id is None when the answer came from the attended set
+    without touching the database.
+    """
+
+    attendance_id: Optional[int]
+    student_id: int
+    attendance_date: date
+    check_in_time: time
+    created: bool
+
+
+class AttendedSet:
+    """
+    Students who attended on one day, indexed by student DB id.
+
+    A dense array holds each student's check-in time as microseconds of
+    the day (-1 = not attended), so membership and the time are one index
+    operation with no hashing.
+    """
+
+    ABSENT = -1
+
+    def __init__(self, day: date):
+        self.day = day
+        self._times = array("q")
+        self._count = 0
+
+    def add(self, student_db_id: int, check_in_time: time):
+        if student_db_id >= len(self._times):
+            grow = max(student_db_id + 1, len(self._times) * 2) - len(self._times)
+            self._times.extend([self.ABSENT] * grow)
+        if self._times[student_db_id] == self.ABSENT:
+            self._count += 1
+        self._times[student_db_id] = (
+            ((check_in_time.hour * 60 + check_in_time.minute) * 60 + check_in_time.second) * 1_000_000
+            + check_in_time.microsecond
+        )
+
+    def discard(self, student_db_id: int):
+        if student_db_id in self:
+            self._times[student_db_id] = self.ABSENT
+            self._count -= 1
+
+    def get(self, student_db_id: int) -> Optional[time]:
+        """Check-in time, or None if the student has not attended."""
+        if student_db_id >= len(self._times):
+            return None
+        value = self._times[student_db_id]
+        if value == self.ABSENT:
+            return None
+        seconds, microsecond = divmod(value, 1_000_000)
+        return time(seconds // 3600, seconds // 60 % 60, seconds % 60, microsecond)
+
+    def __contains__(self, student_db_id: int) -> bool:
+        return student_db_id < len(self._times) and self._times[student_db_id] != self.ABSENT
+
+    def __len__(self) -> int:
+        return self._count
+
+
+class _PendingCheckIn:
+    __slots__ = ("confidence", "snapshot_path", "check_in_time", "futures")
+
+    def __init__(self, confidence: float, snapshot_path: Optional[str], check_in_time: time):
+        self.confidence = confidence
+        self.snapshot_path = snapshot_path
+        self.check_in_time = check_in_time
+        self.futures: List[asyncio.Future] = []
+
+
+class AttendanceService:
+    """
+    Idempotent, batched attendance inserts.
+
+    Check-ins queued in the same event loop tick are written as one
+    INSERT ... ON CONFLICT(student_id, attendance_date) DO NOTHING RETURNING
+    statement through the single database writer, so concurrent
+    recognitions of the same student cannot race into the unique
+    constraint. Rows not returned already existed; their check-in time is
+    read back in one query for the whole batch.
+
+    Today's attended students are kept in an AttendedSet (loaded at
+    startup and again when the date rolls over, updated on insert), so a
+    repeat check-in is answered without any database access.
+
+    New rows are counted into attendance_daily_stats (date, group) in the
+    same transaction, so statistics read the rollups instead of scanning
+    attendance.
+    """
+
+    INSERT_BATCH_SIZE = 500
+
+    def __init__(self):
+        self._pending: Dict[AttendanceKey, _PendingCheckIn] = {}
+        self._flush_scheduled = False
+        self._flush_tasks: Set[asyncio.Task] = set()
+        self.attended: Optional[AttendedSet] = None
+        self._attended_lock = asyncio.Lock()
+
+        # Stats
+        self.requests = 0
+        self.short_circuits = 0
+        self.batches = 0
+        self.created = 0
+        self.duplicates = 0
+
+    async def check_in(
+        self,
+        student_db_id: int,
+        confidence: float,
+        snapshot_path: Optional[str] = None,
+        attendance_date: Optional[date] = None
+    ) -> AttendanceResult:
+        """Record attendance for a student (today by default); existing rows are left unchanged."""
+        loop = asyncio.get_running_loop()
+        key = (attendance_date or date.today(), student_db_id)
+        self.requests += 1
+
+        check_in_time = await self.get_attended_time(student_db_id, key[0])
+        if check_in_time is not None:
+            self.short_circuits += 1
+            return AttendanceResult(None, student_db_id, key[0], check_in_time, False)
+
+        pending = self._pending.get(key)
+        if pending is None:
+            pending = _PendingCheckIn(confidence, snapshot_path, datetime.now().time())
+            self._pending[key] = pending
+        future = loop.create_future()
+        pending.futures.append(future)
+
+        if not self._flush_scheduled:
+            # The task's first step runs after the check-ins already queued
+            # in this tick, so they all land in the same batch
+            self._flush_scheduled = True
+            task = loop.create_task(self._flush())
+            self._flush_tasks.add(task)
+            task.add_done_callback(self._flush_tasks.discard)
+        return await future
+
+    # ==================== Attended set ====================
+
+    async def load_attended(self, db: Optional[AsyncSession] = None, day: Optional[date] = None) -> AttendedSet:
+        """Load the students who attended on a day (today by default) in one query."""
+        if db is None:
+            async with AsyncSessionLocal() as session:
+                return await self.load_attended(session, day)
+
+        attended = AttendedSet(day or date.today())
+        result = await db.execute(
+            select(Attendance.student_id, Attendance.check_in_time)
+            .where(Attendance.attendance_date == attended.day)
+        )
+        for student_id, check_in_time in result.all():
+            attended.add(student_id, check_in_time)
+
+        self.attended = attended
+        logger.info(f"Attended set loaded for {attended.day}: {len(attended)} students")
+        return attended
+
+    async def get_attended_today(self) -> AttendedSet:
+        """Today's attended set, reloading it when the date has rolled over."""
+        today = date.today()
+        if self.attended is None or self.attended.day != today:
+            async with self._attended_lock:
+                if self.attended is None or self.attended.day != today:
+                    await self.load_attended(day=today)
+        return self.attended
+
+    async def get_attended_time(self, student_db_id: int, day: Optional[date] = None) -> Optional[time]:
+        """Check-in time if the student already attended today (no DB access after the daily load)."""
+        if day is not None and day != date.today():
+            return None
+        attended = await self.get_attended_today()
+        return attended.get(student_db_id)
+
+    def remove_student(self, student_db_id: int):
+        """Forget a deleted student so a reused id is not reported as attended."""
+        if self.attended is not None:
+            self.attended.discard(student_db_id)
+
+    # ==================== Batched insert ====================
+
+    async def _flush(self):
+        self._flush_scheduled = False
+        pending, self._pending = self._pending, {}
+        if not pending:
+            return
+
+        keys = list(pending)
+
+        async def write(db: AsyncSession) -> Dict[AttendanceKey, Tuple[int, time, bool]]:
+            rows: Dict[AttendanceKey, Tuple[int, time, bool]] = {}
+            for i in range(0, len(keys), self.INSERT_BATCH_SIZE):
+                chunk = keys[i:i + self.INSERT_BATCH_SIZE]
+                stmt = sqlite_insert(Attendance).values([
+                    {
+                        "student_id": student_id,
+                        "attendance_date": day,
+                        "check_in_time": pending[(day, student_id)].check_in_time,
+                        "confidence_score": pending[(day, student_id)].confidence,
+                        "snapshot_path": pending[(day, student_id)].snapshot_path
+                    }
+                    for day, student_id in chunk
+                ])
+                stmt = stmt.on_conflict_do_nothing(
+                    index_elements=[Attendance.student_id, Attendance.attendance_date]
+                ).returning(Attendance.id, Attendance.student_id, Attendance.attendance_date, Attendance.check_in_time)
+                for row in (await db.execute(stmt)).all():
+                    rows[(row.attendance_date, row.student_id)] = (row.id, row.check_in_time, True)
+
+            existing = [key for key in keys if key not in rows]
+            for i in range(0, len(existing), self.INSERT_BATCH_SIZE):
+                chunk = existing[i:i + self.INSERT_BATCH_SIZE]
+                result = await db.execute(
+                    select(Attendance.id, Attendance.student_id, Attendance.attendance_date, Attendance.check_in_time)
+                    .where(
+                        Attendance.student_id.in_({student_id for _, student_id in chunk}),
+                        Attendance.attendance_date.in_({day for day, _ in chunk})
+                    )
+                )
+                for row in result.all():
+                    key = (row.attendance_date, row.student_id)
+                    if key in pending and key not in rows:
+                        rows[key] = (row.id, row.check_in_time, False)
+
+            created_ids = [attendance_id for attendance_id, _, created in rows.values() if created]
+            for i in range(0, len(created_ids), self.INSERT_BATCH_SIZE):
+                await db.execute(rollup_statement(Attendance.id.in_(created_ids[i:i + self.INSERT_BATCH_SIZE])))
+            return rows
+
+        try:
+            # Committed by the single database writer
+            rows = await get_db_writer().submit(write)
+        except Exception as e:
+            logger.error(f"Error writing attendance: {e}")
+            for entry in pending.values():
+                for future in entry.futures:
+                    if not future.done():
+                        future.set_exception(e)
+            return
+
+        self.batches += 1
+        attended = self.attended
+        for key, entry in pending.items():
+            row = rows.get(key)
+            if row is not None and attended is not None and key[0] == attended.day:
+                attended.add(key[1], row[1])
+            for n, future in enumerate(entry.futures):
+                if future.done():
+                    continue
+                if row is None:
+                    # The conflicting row was deleted between the INSERT and the read-back SELECT
+                    future.set_exception(LookupError(
+                        f"Attendance for student {key[1]} on {key[0]} conflicted but was gone when read back"
+                    ))
+                    continue
+                attendance_id, check_in_time, created = row
+                # Only the first caller for a key gets created=True
+                created = created and n == 0
+                self.created += created
+                self.duplicates += not created
+                future.set_result(AttendanceResult(attendance_id, key[1], key[0], check_in_time, created))
+
+    async def stop(self):
+        """Write queued check-ins and wait for batches in flight."""
+        if self._pending:
+            await self._flush()
+        if self._flush_tasks:
+            await asyncio.gather(*self._flush_tasks, return_exceptions=True)
+
+    # ==================== Daily rollups ====================
+
+    async def backfill_daily_stats(self, db: Optional[AsyncSession] = None) -> bool:
+        """Build attendance_daily_stats from attendance if the rollup table is still empty."""
+        if db is None:
+            async with AsyncSessionLocal() as session:
+                return await self.backfill_daily_stats(session)
+
+        has_stats = (await db.execute(select(AttendanceDailyStat.id).limit(1))).first()
+        has_attendance = (await db.execute(select(Attendance.id).limit(1))).first()
+        if has_stats or not has_attendance:
+            return False
+
+        await db.execute(rollup_statement(true()))
+        await db.commit()
+        logger.info("Attendance daily stats backfilled from attendance")
+        return True
+
+    async def recompute_daily_stats(self, db: AsyncSession, days: Iterable[date]):
+        """
+        Rebuild the rollups of some days from attendance (in the caller's transaction).
+
+        Needed after changes check_in does not count: deleted attendance
+        rows or a student moved to another group.
+        """
+        days = list(set(days))
+        for i in range(0, len(days), self.INSERT_BATCH_SIZE):
+            chunk = days[i:i + self.INSERT_BATCH_SIZE]
+            await db.execute(delete(AttendanceDailyStat).where(AttendanceDailyStat.attendance_date.in_(chunk)))
+            await db.execute(rollup_statement(Attendance.attendance_date.in_(chunk)))
+
+    async def delete_student_attendance(self, db: AsyncSession, student_db_id: int) -> int:
+        """
+        Delete a student's attendance and fix the rollups of the days it was counted on.
+
+        Done explicitly because SQLite only applies ON DELETE CASCADE with
+        the foreign_keys pragma on. Returns the number of rows deleted.
+        """
+        result = await db.execute(
+            select(Attendance.attendance_date).where(Attendance.student_id == student_db_id)
+        )
+        days = list(result.scalars())
+        if not days:
+            return 0
+        await db.execute(delete(Attendance).where(Attendance.student_id == student_db_id))
+        await self.recompute_daily_stats(db, days)
+        return len(days)
+
+    async def get_daily_counts(
+        self,
+        db: AsyncSession,
+        date_from: date,
+        date_to: Optional[date] = None,
+        group_name: Optional[str] = None
+    ) -> Dict[date, int]:
+        """Attendance per day in a date range (optionally one group), read from the rollups."""
+        query = (
+            select(AttendanceDailyStat.attendance_date, func.sum(AttendanceDailyStat.count))
+            .where(AttendanceDailyStat.attendance_date >= date_from)
+            .group_by(AttendanceDailyStat.attendance_date)
+        )
+        if date_to is not None:
+            query = query.where(AttendanceDailyStat.attendance_date <= date_to)
+        if group_name is not None:
+            query = query.where(AttendanceDailyStat.group_name == group_name)
+        result = await db.execute(query)
+        return {day: int(count) for day, count in result.all()}
+
+    def get_stats(self) -> dict:
+        return {
+            "requests": self.requests,
+            "batches": self.batches,
+            "created": self.created,
+            "duplicates": self.duplicates,
+            "short_circuits": self.short_circuits,
+            "attended_day": self.attended.day.isoformat() if self.attended is not None else None,
+            "attended_today": len(self.attended) if self.attended is not None else 0,
+            "pending": len(self._pending)
+        }
+
+
+def rollup_statement(where):
+    """
+    Count attendance rows matching `where` into attendance_daily_stats.
+
+    INSERT ... SELECT grouped by (date, group) with ON CONFLICT adding to
+    the existing count. Students without a group are counted under "".
+    """
+    group_name = func.coalesce(Student.group_name, "")
+    counts = (
+        select(Attendance.attendance_date, group_name, func.count())
+        .select_from(Attendance)
+        .outerjoin(Student, Student.id == Attendance.student_id)
+        .where(where)
+        .group_by(Attendance.attendance_date, group_name)
+    )
+    stmt = sqlite_insert(AttendanceDailyStat).from_select(["attendance_date", "group_name", "count"], counts)
+    return stmt.on_conflict_do_update(
+        index_elements=[AttendanceDailyStat.attendance_date, AttendanceDailyStat.group_name],
+        set_={"count": AttendanceDailyStat.count + stmt.excluded["count"]}
+    )
+
+
+# Global instance
+_attendance_service: Optional[AttendanceService] = None
+
+
+def get_attendance_service() -> AttendanceService:
+    """Get or create global AttendanceService instance."""
+    global _attendance_service
+    if _attendance_service is None:
+        _attendance_service = AttendanceService()
+    return _attendance_service
@@ -0,0 +1,158 @@
+import heapq
+import itertools
+import logging
+import threading
+import time
+from typing import Optional, Dict, List, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class DecoderPool:
+    """
+    Fixed set of decoder threads servicing many camera streams.
+
+    Instead of one thread per camera pacing itself with sleep(), streams sit
+    in a heap ordered by due time (monotonic). A free decoder thread takes the
+    earliest due stream, runs one stream._step() (grab + decode if needed)
+    and reschedules it one frame interval (1 / target_fps) after its previous
+    due time, so decode time does not add to the pacing delay. A stream that
+    fell behind is rescheduled to "now" instead of bursting to catch up.
+
+    Stream contract:
+        _step() -> Optional[float]: delay until the next step, None when the
+                                    stream ended
+        _finish_loop():             cleanup after the last step
+        frame_interval:             seconds between steps at the fps target
+    """
+
+    def __init__(self, threads: int):
+        self.size = max(1, threads)
+        self._cond = threading.Condition()
+        self._heap: List[Tuple[float, int, object]] = []
+        self._counter = itertools.count()
+        self._streams: Dict[int, object] = {}  # camera_id -> stream
+        self._busy: Dict[int, int] = {}  # camera_id -> thread ident running its step
+        self._threads: List[threading.Thread] = []
+        self._stopped = False
+
+        # Scheduling stats
+        self.steps = 0
+        self.late_steps = 0
+        self.total_lateness = 0.0
+
+    def add(self, stream):
+        """Schedule a stream for its first step now."""
+        with self._cond:
+            self._ensure_threads()
+            self._streams[stream.camera_id] = stream
+            heapq.heappush(self._heap, (time.monotonic(), next(self._counter), stream))
+            self._cond.notify()
+
+    def remove(self, stream) -> bool:
+        """
+        Unschedule a stream and wait for its running step to finish.
+
+        Returns True if the stream was scheduled - the caller then owns the
+        stream's cleanup (_finish_loop), otherwise the pool already ran it.
+        """
+        with self._cond:
+            if self._streams.get(stream.camera_id) is not stream:
+                return False
+            del self._streams[stream.camera_id]
+
+            # Don't wait on ourselves (stop requested from the stream's own callback)
+            while self._busy.get(stream.camera_id) not in (None, threading.get_ident()):
+                self._cond.wait(0.5)
+            return True
+
+    def _ensure_threads(self):
+        if self._threads:
+            return
+        for i in range(self.size):
+            thread = threading.Thread(target=self._worker, daemon=True, name=f"decoder-{i}")
+            thread.start()
+            self._threads.append(thread)
+        logger.info(f"Decoder pool started with {self.size} threads")
+
+    def _next_due(self):
+        """Pop the earliest due live stream, waiting for its due time (call with lock held)."""
+        while not self._stopped:
+            if not self._heap:
+                self._cond.wait()
+                continue
+
+            due, _, stream = self._heap[0]
+            camera_id = stream.camera_id
+            # Removed or replaced streams are dropped lazily; a stream whose
+            # step is still running will be rescheduled by that step
+            if self._streams.get(camera_id) is not stream or camera_id in self._busy:
+                heapq.heappop(self._heap)
+                continue
+
+            wait = due - time.monotonic()
+            if wait > 0:
+                self._cond.wait(wait)
+                continue
+
+            heapq.heappop(self._heap)
+            self._busy[camera_id] = threading.get_ident()
+            return due, stream
+        return None
+
+    def _worker(self):
+        while True:
+            with self._cond:
+                item = self._next_due()
+                if item is None:
+                    return
+            due, stream = item
+
+            lateness = time.monotonic() - due
+            try:
+                delay = stream._step()
+            except Exception as e:
+                logger.error(f"Camera {stream.camera_id}: Decoder step error - {e}")
+                delay = 0.1
+
+            finished = False
+            with self._cond:
+                del self._busy[stream.camera_id]
+                self.steps += 1
+                if lateness > stream.frame_interval:
+                    self.late_steps += 1
+                self.total_lateness += max(0.0, lateness)
+
+                scheduled = self._streams.get(stream.camera_id) is stream
+                if delay is None or not stream.is_running:
+                    if scheduled:
+                        del self._streams[stream.camera_id]
+                        finished = True
+                elif scheduled:
+                    now = time.monotonic()
+                    next_due = due + delay if delay > 0 else now
+                    heapq.heappush(self._heap, (max(next_due, now), next(self._counter), stream))
+                self._cond.notify_all()
+
+            # Cleanup may call back into the manager - run it without the lock
+            if finished:
+                stream._finish_loop()
+
+    def get_stats(self) -> dict:
+        with self._cond:
+            return {
+                "threads": self.size,
+                "cameras": len(self._streams),
+                "busy": len(self._busy),
+                "steps": self.steps,
+                "late_ratio": round(self.late_steps / self.steps, 3) if self.steps else 0.0,
+                "avg_lateness_ms": round(self.total_lateness / self.steps * 1000, 2) if self.steps else 0.0
+            }
+
+    def stop(self):
+        with self._cond:
+            self._stopped = True
+            self._cond.notify_all()
+        for thread in self._threads:
+            thread.join(timeout=2)
+        self._threads = []
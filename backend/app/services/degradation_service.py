@@ -0,0 +1,258 @@
+import asyncio
+import logging
+import time
+from collections import deque
+from datetime import datetime
+from typing import Optional, Callable, Deque, List, Tuple
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class DegradationLevel:
+    """Knob values applied while the system runs at a given degradation level."""
+
+    def __init__(
+        self,
+        name: str,
+        recognition_interval_ms: int,
+        preview_jpeg_quality: int,
+        preview_fps: int,
+        det_size: int,
+        pause_unwatched_rooms: bool
+    ):
+        self.name = name
+        self.recognition_interval_ms = recognition_interval_ms
+        self.preview_jpeg_quality = preview_jpeg_quality
+        self.preview_fps = preview_fps
+        self.det_size = det_size
+        self.pause_unwatched_rooms = pause_unwatched_rooms
+
+    def to_dict(self) -> dict:
+        return {
+            "name": self.name,
+            "recognition_interval_ms": self.recognition_interval_ms,
+            "preview_jpeg_quality": self.preview_jpeg_quality,
+            "preview_fps": self.preview_fps,
+            "det_size": self.det_size,
+            "pause_unwatched_rooms": self.pause_unwatched_rooms
+        }
+
+
+def build_default_levels() -> List[DegradationLevel]:
+    """
+    Build the degradation ladder from settings.
+
+    Each step keeps the knobs of the previous one and degrades one more:
+    recognition interval -> preview quality/FPS -> det size -> unwatched rooms.
+    """
+    interval = settings.RECOGNITION_INTERVAL_MS
+    quality = settings.PREVIEW_JPEG_QUALITY
+    fps = settings.PREVIEW_MAX_FPS
+    det_size = settings.DETECTION_SIZE
+
+    return [
+        DegradationLevel("normal", interval, quality, fps, det_size, False),
+        DegradationLevel("slow_recognition", interval * 3, quality, fps, det_size, False),
+        DegradationLevel("light_preview", interval * 3, min(quality, 60), min(fps, 8), det_size, False),
+        DegradationLevel("small_detection", interval * 3, min(quality, 60), min(fps, 8), min(det_size, 480), False),
+        DegradationLevel("watched_rooms_only", interval * 4, min(quality, 50), min(fps, 5), min(det_size, 320), True),
+    ]
+
+
+class DegradationController:
+    """
+    SLO-driven control loop.
+
+    Watches end-to-end recognition latency and event-loop lag. When either
+    exceeds its SLO the controller moves one step down the degradation ladder;
+    after several healthy checks it moves one step back up.
+    """
+
+    def __init__(self, levels: Optional[List[DegradationLevel]] = None):
+        self.levels = levels or build_default_levels()
+        self.level = 0
+
+        self.latency_slo_ms = settings.SLO_RECOGNITION_LATENCY_MS
+        self.loop_lag_slo_ms = settings.SLO_LOOP_LAG_MS
+        self.window_seconds = settings.DEGRADATION_WINDOW_SECONDS
+        self.restore_ratio = settings.DEGRADATION_RESTORE_RATIO
+        self.restore_checks = settings.DEGRADATION_RESTORE_CHECKS
+        self.check_interval = settings.DEGRADATION_CHECK_INTERVAL
+
+        # (monotonic_time, value_ms) samples
+        self._latency_samples: Deque[Tuple[float, float]] = deque(maxlen=2000)
+        self._loop_lag_samples: Deque[Tuple[float, float]] = deque(maxlen=2000)
+
+        self._healthy_streak = 0
+        self.transitions: Deque[dict] = deque(maxlen=100)
+        self._listeners: List[Callable[[DegradationLevel], None]] = []
+        self._monitor_task: Optional[asyncio.Task] = None
+
+        logger.info(
+            f"DegradationController initialized (latency SLO: {self.latency_slo_ms}ms, "
+            f"loop lag SLO: {self.loop_lag_slo_ms}ms, levels: {len(self.levels)})"
+        )
+
+    @property
+    def knobs(self) -> DegradationLevel:
+        """Knobs of the current level."""
+        return self.levels[self.level]
+
+    def add_listener(self, callback: Callable[[DegradationLevel], None]):
+        """Register callback(level) called after every level transition."""
+        self._listeners.append(callback)
+
+    # ==================== Metrics ====================
+
+    def record_recognition_latency(self, latency_ms: float):
+        """Record end-to-end latency of one recognition (frame capture -> broadcast)."""
+        self._latency_samples.append((time.monotonic(), latency_ms))
+
+    def record_loop_lag(self, lag_ms: float):
+        """Record one event-loop lag measurement."""
+        self._loop_lag_samples.append((time.monotonic(), lag_ms))
+
+    def _window_p95(self, samples: Deque[Tuple[float, float]], now: float) -> Optional[float]:
+        cutoff = now - self.window_seconds
+        while samples and samples[0][0] < cutoff:
+            samples.popleft()
+        if not samples:
+            return None
+        values = sorted(v for _, v in samples)
+        return values[min(len(values) - 1, int(len(values) * 0.95))]
+
+    # ==================== Control ====================
+
+    def evaluate(self, now: Optional[float] = None) -> int:
+        """Run one control step. Returns the (possibly new) level."""
+        now = time.monotonic() if now is None else now
+        latency_p95 = self._window_p95(self._latency_samples, now)
+        loop_lag_p95 = self._window_p95(self._loop_lag_samples, now)
+
+        latency_over = latency_p95 is not None and latency_p95 > self.latency_slo_ms
+        lag_over = loop_lag_p95 is not None and loop_lag_p95 > self.loop_lag_slo_ms
+
+        if latency_over or lag_over:
+            self._healthy_streak = 0
+            if self.level < len(self.levels) - 1:
+                reason = "recognition_latency" if latency_over else "loop_lag"
+                self._transition(self.level + 1, reason, latency_p95, loop_lag_p95)
+            return self.level
+
+        latency_ok = latency_p95 is None or latency_p95 < self.latency_slo_ms * self.restore_ratio
+        lag_ok = loop_lag_p95 is None or loop_lag_p95 < self.loop_lag_slo_ms * self.restore_ratio
+
+        if latency_ok and lag_ok and self.level > 0:
+            self._healthy_streak += 1
+            if self._healthy_streak >= self.restore_checks:
+                self._healthy_streak = 0
+                self._transition(self.level - 1, "headroom", latency_p95, loop_lag_p95)
+        else:
+            self._healthy_streak = 0
+
+        return self.level
+
+    def _transition(
+        self,
+        new_level: int,
+        reason: str,
+        latency_p95: Optional[float],
+        loop_lag_p95: Optional[float]
+    ):
+        old_level = self.level
+        self.level = new_level
+        direction = "degrade" if new_level > old_level else "restore"
+
+        self.transitions.append({
+            "timestamp": datetime.now().isoformat(),
+            "direction": direction,
+            "from_level": old_level,
+            "to_level": new_level,
+            "from_name": self.levels[old_level].name,
+            "to_name": self.levels[new_level].name,
+            "reason": reason,
+            "recognition_latency_p95_ms": latency_p95,
+            "loop_lag_p95_ms": loop_lag_p95
+        })
+
+        log = logger.warning if direction == "degrade" else logger.info
+        log(
+            f"Degradation {direction}: level {old_level} ({self.levels[old_level].name}) -> "
+            f"{new_level} ({self.levels[new_level].name}), reason={reason}, "
+            f"latency_p95={latency_p95}, loop_lag_p95={loop_lag_p95}"
+        )
+
+        for callback in self._listeners:
+            try:
+                callback(self.knobs)
+            except Exception as e:
+                logger.error(f"Degradation listener error: {e}")
+
+    # ==================== Background Monitor ====================
+
+    async def start(self):
+        """Start loop-lag sampling and periodic evaluation."""
+        if self._monitor_task and not self._monitor_task.done():
+            return
+        self._monitor_task = asyncio.create_task(self._monitor_loop())
+        logger.info("Degradation monitor started")
+
+    async def _monitor_loop(self):
+        loop = asyncio.get_running_loop()
+        sample_interval = 0.25
+        last_check = loop.time()
+
+        while True:
+            try:
+                started = loop.time()
+                await asyncio.sleep(sample_interval)
+                lag = loop.time() - started - sample_interval
+                self.record_loop_lag(max(0.0, lag) * 1000)
+
+                if loop.time() - last_check >= self.check_interval:
+                    last_check = loop.time()
+                    self.evaluate()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Error in degradation monitor: {e}")
+
+    def stop(self):
+        """Stop the background monitor."""
+        if self._monitor_task:
+            self._monitor_task.cancel()
+            self._monitor_task = None
+
+    def get_status(self) -> dict:
+        """Current level, knobs, SLOs, windowed metrics and transition log."""
+        now = time.monotonic()
+        return {
+            "level": self.level,
+            "max_level": len(self.levels) - 1,
+            "knobs": self.knobs.to_dict(),
+            "slo": {
+                "recognition_latency_ms": self.latency_slo_ms,
+                "loop_lag_ms": self.loop_lag_slo_ms
+            },
+            "metrics": {
+                "recognition_latency_p95_ms": self._window_p95(self._latency_samples, now),
+                "loop_lag_p95_ms": self._window_p95(self._loop_lag_samples, now),
+                "window_seconds": self.window_seconds
+            },
+            "levels": [level.to_dict() for level in self.levels],
+            "transitions": list(self.transitions)
+        }
+
+
+# Global instance
+_degradation_controller: Optional[DegradationController] = None
+
+
+def get_degradation_controller() -> DegradationController:
+    """Get or create global DegradationController instance."""
+    global _degradation_controller
+    if _degradation_controller is None:
+        _degradation_controller = DegradationController()
+    return _degradation_controller
@@ -2,11 +2,13 @@ import cv2
 import numpy as np
 import insightface
 from insightface.app import FaceAnalysis
+from insightface.app.common import Face
 from typing import List, Optional, Tuple, Dict
 import logging
 import onnxruntime
 import os
 import sys
+import time
 from pathlib import Path
 from app.core.config import settings
 from app.services.gpu_monitor import get_gpu_monitor
@@ -21,6 +23,8 @@ class FaceRecognitionService:
         self.app = None
         self.model_name = settings.INSIGHTFACE_MODEL
         self.embedding_dimension = settings.EMBEDDING_DIMENSION
+        self.det_size = (settings.DETECTION_SIZE, settings.DETECTION_SIZE)
+        self.ctx_id = -1
         self._initialize_model()
     
     def _find_cuda_libraries(self) -> bool:
@@ -302,7 +306,8 @@ class FaceRecognitionService:
                     ]  # GPU first with options, CPU fallback
                 )
                 # ctx_id=0 means use GPU device 0 (or use settings.GPU_DEVICE_ID)
-                self.app.prepare(ctx_id=gpu_device_id, det_size=(640, 640))
+                self.ctx_id = gpu_device_id
+                self.app.prepare(ctx_id=self.ctx_id, det_size=self.det_size)
                 logger.info(f"✓ GPU optimizations enabled: maximum graph optimization, GPU device {gpu_device_id}")
                 if gpu_memory_limit > 0:
                     logger.info(f"✓ GPU memory limit: {gpu_memory_limit}GB")
@@ -313,7 +318,8 @@ class FaceRecognitionService:
                     name=self.model_name,
                     providers=['CPUExecutionProvider']  # CPU only
                 )
-                self.app.prepare(ctx_id=-1, det_size=(640, 640))  # ctx_id=-1 for CPU
+                self.ctx_id = -1  # ctx_id=-1 for CPU
+                self.app.prepare(ctx_id=self.ctx_id, det_size=self.det_size)
             
             # Verify that GPU is actually being used
             gpu_active = False
@@ -388,6 +394,22 @@ class FaceRecognitionService:
             logger.error(error_msg)
             raise RuntimeError(f"GPU initialization failed: {e}")
     
+    def set_det_size(self, det_size: int):
+        """Change detector input size at runtime (used by the degradation controller)."""
+        new_size = (det_size, det_size)
+        if new_size == self.det_size or self.app is None:
+            return
+
+        det_model = self.app.det_model
+        if not isinstance(det_model.input_shape[2], str):
+            logger.warning(f"Detection model has a fixed input size {det_model.input_size}, det_size unchanged")
+            return
+
+        # RetinaFace.prepare() ignores input_size once it is set, so assign it directly
+        det_model.input_size = new_size
+        self.det_size = new_size
+        logger.info(f"Detection size changed to {new_size}")
+
     def preprocess_image(self, image: np.ndarray) -> np.ndarray:
         """Preprocess image for face detection."""
         # Convert to BGR if needed (InsightFace expects BGR)
@@ -398,23 +420,48 @@ class FaceRecognitionService:
         
         return image
     
-    def detect_faces(self, image: np.ndarray) -> List:
+    def detect_faces(self, image: np.ndarray, timings: Optional[Dict[str, float]] = None) -> List:
         """
         Detect faces in an image.
         
         Args:
             image: Input image as numpy array
+            timings: If given, filled with "detect" and "embed" time in ms
             
         Returns:
             List of detected faces with bounding boxes and landmarks
         """
         try:
             image = self.preprocess_image(image)
-            faces = self.app.get(image)
-            return faces
+            if timings is None:
+                return self.app.get(image)
+            return self._detect_faces_timed(image, timings)
         except Exception as e:
             logger.error(f"Face detection failed: {e}")
             return []
+
+    def _detect_faces_timed(self, image: np.ndarray, timings: Dict[str, float]) -> List:
+        """FaceAnalysis.get() split into detection and per-face models (embedding)."""
+        start = time.perf_counter()
+        bboxes, kpss = self.app.det_model.detect(image, max_num=0, metric='default')
+        detected = time.perf_counter()
+        timings["detect"] = (detected - start) * 1000
+
+        faces = []
+        for i in range(bboxes.shape[0]):
+            face = Face(
+                bbox=bboxes[i, 0:4],
+                kps=kpss[i] if kpss is not None else None,
+                det_score=bboxes[i, 4]
+            )
+            for taskname, model in self.app.models.items():
+                if taskname == 'detection':
+                    continue
+                model.get(image, face)
+            faces.append(face)
+
+        timings["embed"] = (time.perf_counter() - detected) * 1000
+        return faces
     
     def extract_embedding(self, image: np.ndarray) -> Optional[np.ndarray]:
         """
@@ -450,25 +497,33 @@ class FaceRecognitionService:
             logger.error(f"Embedding extraction failed: {e}")
             return None
 
-    def extract_all_embeddings(self, image: np.ndarray) -> List[Tuple[np.ndarray, dict]]:
+    def extract_all_embeddings(
+        self,
+        image: np.ndarray,
+        min_face_size: Optional[int] = None,
+        timings: Optional[Dict[str, float]] = None
+    ) -> List[Tuple[np.ndarray, dict]]:
         """
         Extract embeddings from ALL faces in an image (for multi-face attendance).
 
         Args:
             image: Input image as numpy array
+            min_face_size: Minimal face size in pixels (default: MIN_FACE_SIZE)
+            timings: If given, filled with "detect" and "embed" time in ms
 
         Returns:
             List of tuples (embedding, face_info) for each detected face
             face_info contains: bbox, det_score, face_size
         """
         try:
-            faces = self.detect_faces(image)
+            faces = self.detect_faces(image, timings)
 
             if not faces:
                 return []
 
             results = []
-            min_face_size = settings.MIN_FACE_SIZE
+            if min_face_size is None:
+                min_face_size = settings.MIN_FACE_SIZE
             max_faces = settings.MAX_FACES_PER_FRAME
 
             # Filter and sort faces by size (largest first)
@@ -512,6 +567,48 @@ class FaceRecognitionService:
             logger.error(f"Multi-face embedding extraction failed: {e}")
             return []
     
+    def extract_embedding_in_region(
+        self,
+        image: np.ndarray,
+        bbox: List[float],
+        margin: float = 0.3
+    ) -> Optional[np.ndarray]:
+        """
+        Extract embedding of the largest face inside a region of an image.
+
+        Used to re-embed small substream faces from the high-res main stream.
+
+        Args:
+            image: Input image as numpy array
+            bbox: Region [x1, y1, x2, y2] in image coordinates
+            margin: Extra context around the region (fraction of its size)
+
+        Returns:
+            Normalized embedding or None if no face found in region
+        """
+        try:
+            height, width = image.shape[:2]
+            pad_x = (bbox[2] - bbox[0]) * margin
+            pad_y = (bbox[3] - bbox[1]) * margin
+            x1 = max(0, int(bbox[0] - pad_x))
+            y1 = max(0, int(bbox[1] - pad_y))
+            x2 = min(width, int(bbox[2] + pad_x))
+            y2 = min(height, int(bbox[3] + pad_y))
+
+            if x2 <= x1 or y2 <= y1:
+                return None
+
+            faces = self.detect_faces(image[y1:y2, x1:x2])
+            if not faces:
+                return None
+
+            face = max(faces, key=lambda f: (f.bbox[2] - f.bbox[0]) * (f.bbox[3] - f.bbox[1]))
+            return face.embedding / np.linalg.norm(face.embedding)
+
+        except Exception as e:
+            logger.error(f"Region embedding extraction failed: {e}")
+            return None
+
     def extract_embeddings_batch(self, images: List[np.ndarray], batch_size: int = None) -> List[Optional[np.ndarray]]:
         """
         Extract embeddings from multiple images in batch (optimized for GPU).
@@ -0,0 +1,198 @@
+import logging
+import threading
+from datetime import datetime
+from typing import Optional, List, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+class FrameLease:
+    """
+    Borrowed read-only view of a ring slot.
+
+    The slot is pinned - the writer will not overwrite it - until release()
+    is called. Use as a context manager or release explicitly.
+    """
+
+    def __init__(
+        self,
+        ring: "FrameRingBuffer",
+        slot: int,
+        generation: int,
+        seq: int,
+        timestamp: datetime,
+        frame: np.ndarray,
+        pts: Optional[float] = None,
+        ingest_time: Optional[float] = None
+    ):
+        self._ring = ring
+        self.slot = slot
+        self.generation = generation
+        self.seq = seq
+        self.timestamp = timestamp  # capture time (from stream PTS when available)
+        self.frame = frame
+        self.pts = pts  # stream presentation time in seconds
+        self.ingest_time = ingest_time  # time.monotonic() when the frame was grabbed
+        self._released = False
+
+    def release(self):
+        if not self._released:
+            self._released = True
+            self._ring._unpin(self.slot, self.generation)
+
+    def __enter__(self) -> "FrameLease":
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.release()
+
+
+class FrameRingBuffer:
+    """
+    Fixed-size ring of preallocated frame buffers for one camera.
+
+    The capture thread decodes straight into the next free slot
+    (begin_write -> decode into buffer -> commit), so the capture loop does
+    not allocate per frame. Readers borrow read-only views of the latest
+    frame instead of copying it. Pinned slots are skipped by the writer; if
+    every slot is pinned a temporary buffer is allocated for that frame.
+    """
+
+    def __init__(self, size: int = 4):
+        self.size = max(2, size)
+        self.lock = threading.Lock()
+        self._buffers: List[Optional[np.ndarray]] = [None] * self.size
+        self._seqs: List[int] = [0] * self.size
+        self._timestamps: List[Optional[datetime]] = [None] * self.size
+        self._meta: List[Tuple[Optional[float], Optional[float]]] = [(None, None)] * self.size
+        self._pins: List[int] = [0] * self.size
+
+        self._next_slot = 0
+        self._latest_slot: Optional[int] = None
+        self._overflow_frame: Optional[np.ndarray] = None
+        self._overflow_timestamp: Optional[datetime] = None
+        self._overflow_meta: Tuple[Optional[float], Optional[float]] = (None, None)
+        self._generation = 0
+        self.seq = 0
+        self.overflow_count = 0
+
+    def allocate(self, shape: Tuple[int, ...], dtype=np.uint8):
+        """(Re)allocate slots for a frame shape. Pinned buffers stay alive with their leases."""
+        with self.lock:
+            self._generation += 1
+            self._buffers = [np.empty(shape, dtype=dtype) for _ in range(self.size)]
+            self._seqs = [0] * self.size
+            self._timestamps = [None] * self.size
+            self._meta = [(None, None)] * self.size
+            self._pins = [0] * self.size
+            self._latest_slot = None
+            self._next_slot = 0
+
+    def begin_write(self) -> Tuple[int, Optional[np.ndarray]]:
+        """
+        Reserve the next free slot for writing.
+
+        Returns (slot, buffer). slot is -1 if every slot is pinned; buffer is
+        None until allocate() was called - the decoder then allocates.
+        """
+        with self.lock:
+            for offset in range(self.size):
+                slot = (self._next_slot + offset) % self.size
+                if self._pins[slot] == 0 and slot != self._latest_slot:
+                    self._next_slot = (slot + 1) % self.size
+                    return slot, self._buffers[slot]
+
+            self.overflow_count += 1
+            return -1, None
+
+    def commit(
+        self,
+        slot: int,
+        frame: np.ndarray,
+        timestamp: Optional[datetime] = None,
+        pts: Optional[float] = None,
+        ingest_time: Optional[float] = None
+    ) -> int:
+        """
+        Publish a written frame as the latest one. Returns its sequence number.
+
+        frame is normally the slot buffer itself; if the decoder returned a
+        different array (shape change, first frame) the ring is reallocated.
+        pts and ingest_time are handed to readers with the frame's lease.
+        """
+        timestamp = timestamp or datetime.now()
+
+        if slot >= 0 and frame is not self._buffers[slot]:
+            buffer = self._buffers[slot]
+            if buffer is None or buffer.shape != frame.shape or buffer.dtype != frame.dtype:
+                self.allocate(frame.shape, frame.dtype)
+            np.copyto(self._buffers[slot], frame)
+
+        with self.lock:
+            self.seq += 1
+            if slot < 0:
+                # All slots pinned - keep this frame outside the ring
+                self._overflow_frame = frame
+                self._overflow_timestamp = timestamp
+                self._overflow_meta = (pts, ingest_time)
+                self._latest_slot = None
+            else:
+                self._seqs[slot] = self.seq
+                self._timestamps[slot] = timestamp
+                self._meta[slot] = (pts, ingest_time)
+                self._latest_slot = slot
+                self._overflow_frame = None
+            return self.seq
+
+    def acquire_latest(self) -> Optional[FrameLease]:
+        """Pin the latest frame and return a read-only lease on it."""
+        with self.lock:
+            if self._latest_slot is None:
+                if self._overflow_frame is None:
+                    return None
+                frame = self._overflow_frame.view()
+                frame.flags.writeable = False
+                return FrameLease(
+                    self, -1, self._generation, self.seq, self._overflow_timestamp, frame, *self._overflow_meta
+                )
+
+            slot = self._latest_slot
+            self._pins[slot] += 1
+            frame = self._buffers[slot].view()
+            frame.flags.writeable = False
+            return FrameLease(
+                self, slot, self._generation, self._seqs[slot], self._timestamps[slot], frame, *self._meta[slot]
+            )
+
+    def latest_seq(self) -> int:
+        return self.seq
+
+    def copy_latest(self) -> Optional[np.ndarray]:
+        """Private writable copy of the latest frame."""
+        lease = self.acquire_latest()
+        if lease is None:
+            return None
+        with lease:
+            return lease.frame.copy()
+
+    def _unpin(self, slot: int, generation: int):
+        if slot < 0:
+            return
+        with self.lock:
+            # Slots were reallocated since the lease was taken
+            if generation != self._generation:
+                return
+            if self._pins[slot] > 0:
+                self._pins[slot] -= 1
+
+    def pinned_count(self) -> int:
+        with self.lock:
+            return sum(1 for pins in self._pins if pins > 0)
+
+    def clear(self):
+        """Forget the latest frame (buffers stay allocated)."""
+        with self.lock:
+            self._latest_slot = None
+            self._overflow_frame = None
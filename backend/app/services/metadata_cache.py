@@ -0,0 +1,137 @@
+import logging
+from typing import Dict, NamedTuple, Optional
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.database import AsyncSessionLocal
+from app.models.room import Room
+from app.models.student import Student
+
+logger = logging.getLogger(__name__)
+
+
+class StudentInfo(NamedTuple):
+    """Display fields of a student (same attribute names as the Student model)."""
+
+    id: int
+    student_id: str
+    first_name: str
+    last_name: str
+    group_name: Optional[str]
+
+    @classmethod
+    def from_model(cls, student: Student) -> "StudentInfo":
+        return cls(student.id, student.student_id, student.first_name, student.last_name, student.group_name)
+
+
+class MetadataCache:
+    """
+    In-process cache of student display fields and room names.
+
+    Resolving a FAISS hit (student DB id) to a name, or a room id to its
+    name, is a dict lookup with no I/O. The cache is warmed at startup and
+    kept current by the code paths that change students and rooms
+    (register/delete student, room create/update/delete). A miss (e.g. a
+    row written by a script) falls back to one query and is cached.
+    """
+
+    def __init__(self):
+        self.students: Dict[int, StudentInfo] = {}
+        self.room_names: Dict[int, str] = {}
+        self.warmed = False
+
+        # Stats
+        self.hits = 0
+        self.misses = 0
+
+    async def warm(self, db: Optional[AsyncSession] = None):
+        """Load every student and room (two queries)."""
+        if db is None:
+            async with AsyncSessionLocal() as session:
+                return await self.warm(session)
+
+        students = await db.execute(
+            select(Student.id, Student.student_id, Student.first_name, Student.last_name, Student.group_name)
+        )
+        self.students = {row[0]: StudentInfo(*row) for row in students.all()}
+
+        rooms = await db.execute(select(Room.id, Room.name))
+        self.room_names = dict(rooms.all())
+
+        self.warmed = True
+        logger.info(f"Metadata cache warmed: {len(self.students)} students, {len(self.room_names)} rooms")
+
+    # ==================== Students ====================
+
+    def get_student(self, student_db_id: int) -> Optional[StudentInfo]:
+        student = self.students.get(student_db_id)
+        if student is not None:
+            self.hits += 1
+        return student
+
+    async def resolve_student(self, db: AsyncSession, student_db_id: int) -> Optional[StudentInfo]:
+        """Cached student, loading it on a miss."""
+        student = self.get_student(student_db_id)
+        if student is not None:
+            return student
+
+        self.misses += 1
+        result = await db.execute(select(Student).where(Student.id == student_db_id))
+        model = result.scalar_one_or_none()
+        return self.put_student(model) if model else None
+
+    def put_student(self, student: Student) -> StudentInfo:
+        info = StudentInfo.from_model(student)
+        self.students[info.id] = info
+        return info
+
+    def remove_student(self, student_db_id: int):
+        self.students.pop(student_db_id, None)
+
+    # ==================== Rooms ====================
+
+    def get_room_name(self, room_id: int) -> Optional[str]:
+        name = self.room_names.get(room_id)
+        if name is not None:
+            self.hits += 1
+        return name
+
+    async def resolve_room_name(self, db: AsyncSession, room_id: int) -> Optional[str]:
+        """Cached room name, loading it on a miss."""
+        name = self.get_room_name(room_id)
+        if name is not None:
+            return name
+
+        self.misses += 1
+        result = await db.execute(select(Room.name).where(Room.id == room_id))
+        name = result.scalar_one_or_none()
+        if name is not None:
+            self.room_names[room_id] = name
+        return name
+
+    def put_room(self, room: Room):
+        self.room_names[room.id] = room.name
+
+    def remove_room(self, room_id: int):
+        self.room_names.pop(room_id, None)
+
+    def get_stats(self) -> dict:
+        return {
+            "students": len(self.students),
+            "rooms": len(self.room_names),
+            "hits": self.hits,
+            "misses": self.misses
+        }
+
+
+# Global instance
+_metadata_cache: Optional[MetadataCache] = None
+
+
+def get_metadata_cache() -> MetadataCache:
+    """Get or create global MetadataCache instance."""
+    global _metadata_cache
+    if _metadata_cache is None:
+        _metadata_cache = MetadataCache()
+    return _metadata_cache
@@ -0,0 +1,229 @@
+import asyncio
+import logging
+import time
+from typing import AsyncIterator, Callable, Dict, Hashable, Optional
+
+import cv2
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+BOUNDARY = "frame"
+MEDIA_TYPE = f"multipart/x-mixed-replace; boundary={BOUNDARY}"
+
+
+def mjpeg_part(jpeg: bytes) -> bytes:
+    """One multipart/x-mixed-replace part."""
+    return (
+        f"--{BOUNDARY}\r\nContent-Type: image/jpeg\r\nContent-Length: {len(jpeg)}\r\n\r\n".encode()
+        + jpeg + b"\r\n"
+    )
+
+
+class MJPEGStream:
+    """
+    Latest JPEG of one frame source, shared by all of its MJPEG viewers.
+
+    Frames are versioned by the source's sequence number. An encoder task
+    (running only while someone watches) wakes on notify() from the capture
+    side, encodes the new frame once - at most max_fps, never the same seq
+    twice - and wakes the viewers through an asyncio.Condition. Each viewer
+    sends every version it sees once; a slow viewer skips to the newest.
+
+    acquire() returns a lease-like object (seq, frame, release()) or None;
+    is_alive() tells when the source is gone so viewers can finish.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        acquire: Callable,
+        is_alive: Callable[[], bool],
+        max_fps: int,
+        quality: int
+    ):
+        self.name = name
+        self.acquire = acquire
+        self.is_alive = is_alive
+        self.max_fps = max(1, max_fps)
+        self.quality = quality
+
+        self.seq: Optional[int] = None  # source seq of the encoded frame
+        self.version = 0  # bumps on every encoded frame
+        self.part: bytes = b""
+        self.closed = False
+        self.viewers = 0
+
+        self.condition = asyncio.Condition()
+        self._frame_ready = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+
+        # Stats
+        self.encoded = 0
+        self.unchanged = 0
+        self.sent = 0
+
+    def notify(self):
+        """New frame at the source (call on the event loop)."""
+        self._frame_ready.set()
+
+    def _encode_latest(self) -> Optional[tuple]:
+        lease = self.acquire()
+        if lease is None:
+            return None
+        try:
+            if lease.seq == self.seq:
+                self.unchanged += 1
+                return None
+            ret, buffer = cv2.imencode('.jpg', lease.frame, [cv2.IMWRITE_JPEG_QUALITY, self.quality])
+            seq = lease.seq
+        finally:
+            lease.release()
+        if not ret:
+            return None
+        return seq, mjpeg_part(buffer.tobytes())
+
+    async def _publish(self, seq: Optional[int], part: Optional[bytes], closed: bool = False):
+        async with self.condition:
+            if part is not None:
+                self.seq = seq
+                self.part = part
+                self.version += 1
+                self.encoded += 1
+            self.closed = closed
+            self.condition.notify_all()
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        interval = 1.0 / self.max_fps
+        try:
+            while self.viewers > 0:
+                if not self.is_alive():
+                    await self._publish(None, None, closed=True)
+                    return
+
+                started = time.monotonic()
+                # Sources without notifications are still polled at max_fps
+                try:
+                    await asyncio.wait_for(self._frame_ready.wait(), timeout=max(interval, 0.1))
+                except asyncio.TimeoutError:
+                    pass
+                self._frame_ready.clear()
+
+                result = await loop.run_in_executor(None, self._encode_latest)
+                if result is not None:
+                    await self._publish(*result)
+
+                # Rate limit: at most max_fps encodes
+                await asyncio.sleep(max(0.0, interval - (time.monotonic() - started)))
+        except asyncio.CancelledError:
+            pass
+        except Exception as e:
+            logger.error(f"MJPEG {self.name}: Encoder error - {e}")
+            await self._publish(None, None, closed=True)
+        finally:
+            self._task = None
+
+    def _ensure_task(self):
+        if self._task is None:
+            self.closed = False
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def frames(self) -> AsyncIterator[bytes]:
+        """Multipart parts for one viewer: the current frame, then each new version."""
+        self.viewers += 1
+        self._ensure_task()
+        seen = 0
+        try:
+            while True:
+                async with self.condition:
+                    await self.condition.wait_for(lambda: self.version != seen or self.closed)
+                    if self.closed:
+                        return
+                    seen, part = self.version, self.part
+                self.sent += 1
+                yield part
+        finally:
+            self.viewers -= 1
+
+    def get_stats(self) -> dict:
+        return {
+            "name": self.name,
+            "viewers": self.viewers,
+            "seq": self.seq,
+            "encoded": self.encoded,
+            "unchanged": self.unchanged,
+            "sent": self.sent,
+            "max_fps": self.max_fps,
+            "quality": self.quality
+        }
+
+
+class MJPEGService:
+    """Per-source MJPEG streams (legacy RTSP service and multi-camera streams)."""
+
+    def __init__(self):
+        self.streams: Dict[Hashable, MJPEGStream] = {}
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        # Decode demand of watched cameras (see wants_frame)
+        self._last_decode: Dict[Hashable, float] = {}
+
+    def get_stream(
+        self,
+        key: Hashable,
+        acquire: Callable,
+        is_alive: Callable[[], bool],
+        max_fps: Optional[int] = None,
+        quality: Optional[int] = None
+    ) -> MJPEGStream:
+        """Get the shared stream of a source, creating it on first use (call on the event loop)."""
+        self.loop = asyncio.get_running_loop()
+        stream = self.streams.get(key)
+        if stream is None:
+            stream = MJPEGStream(
+                str(key),
+                acquire,
+                is_alive,
+                max_fps or settings.MJPEG_MAX_FPS,
+                quality or settings.PREVIEW_JPEG_QUALITY
+            )
+            self.streams[key] = stream
+        return stream
+
+    def notify_threadsafe(self, key: Hashable):
+        """Wake the encoder of a watched source (call from the capture thread)."""
+        stream = self.streams.get(key)
+        if stream is None or stream.viewers == 0 or self.loop is None:
+            return
+        try:
+            self.loop.call_soon_threadsafe(stream.notify)
+        except RuntimeError:
+            # Loop closed
+            pass
+
+    def wants_frame(self, key: Hashable) -> bool:
+        """Decode predicate: a watched source is due for a new frame at its max_fps."""
+        stream = self.streams.get(key)
+        if stream is None or stream.viewers == 0:
+            return False
+        now = time.monotonic()
+        if now - self._last_decode.get(key, 0.0) < 1.0 / stream.max_fps:
+            return False
+        self._last_decode[key] = now
+        return True
+
+    def get_stats(self) -> list:
+        return [stream.get_stats() for stream in self.streams.values() if stream.viewers]
+
+
+# Global instance
+_mjpeg_service: Optional[MJPEGService] = None
+
+
+def get_mjpeg_service() -> MJPEGService:
+    """Get or create global MJPEGService instance."""
+    global _mjpeg_service
+    if _mjpeg_service is None:
+        _mjpeg_service = MJPEGService()
+    return _mjpeg_service
@@ -0,0 +1,309 @@
+import asyncio
+import logging
+import math
+import threading
+import time
+from typing import Dict, List, Mapping, NamedTuple, Optional, Sequence, Set, Tuple
+
+import cv2
+import numpy as np
+
+from app.core.config import settings
+from app.services.multi_rtsp_service import get_multi_rtsp_manager
+
+logger = logging.getLogger(__name__)
+
+# Overlay colors (BGR)
+STUDENT_COLOR = (80, 200, 80)
+GUEST_COLOR = (0, 165, 255)
+
+
+def _clamp(value, low: int, high: int) -> int:
+    return max(low, min(high, int(value)))
+
+
+class MosaicLayout(NamedTuple):
+    """Grid of cameras composed into one mosaic image; viewers with the same layout share it."""
+
+    camera_ids: Tuple[int, ...]
+    cols: int
+    tile_width: int
+    tile_height: int
+    fps: int
+    quality: int
+    overlay: bool
+
+    @property
+    def rows(self) -> int:
+        return max(1, math.ceil(len(self.camera_ids) / self.cols))
+
+    @classmethod
+    def from_params(cls, params: Mapping, available_camera_ids: Sequence[int]) -> "MosaicLayout":
+        """
+        Build a layout from query params, clamped to server limits.
+
+        cameras=1,2,3 (default: all running cameras), cols (default: square
+        grid), tile_width/tile_height, fps, quality, overlay=1 for face boxes.
+        """
+        try:
+            cameras = params.get("cameras")
+            if cameras:
+                camera_ids = tuple(int(c) for c in str(cameras).split(",") if c.strip())
+            else:
+                camera_ids = tuple(sorted(available_camera_ids))
+            camera_ids = camera_ids[:settings.MOSAIC_MAX_CAMERAS]
+
+            cols = int(params.get("cols", 0)) or math.ceil(math.sqrt(max(1, len(camera_ids))))
+            tile_width = int(params.get("tile_width", settings.MOSAIC_TILE_WIDTH))
+            # Default tile keeps 16:9
+            tile_height = int(params.get("tile_height", 0)) or tile_width * 9 // 16
+            fps = int(params.get("fps", settings.MOSAIC_FPS))
+            quality = int(params.get("quality", settings.MOSAIC_JPEG_QUALITY))
+        except (TypeError, ValueError):
+            raise ValueError("Invalid mosaic layout parameters")
+
+        overlay = str(params.get("overlay", "0")).lower() in ("1", "true", "yes")
+        return cls(
+            camera_ids,
+            _clamp(cols, 1, settings.MOSAIC_MAX_CAMERAS),
+            _clamp(tile_width, 64, 1280),
+            _clamp(tile_height, 36, 720),
+            _clamp(fps, 1, settings.PREVIEW_MAX_FPS),
+            _clamp(quality, 10, settings.PREVIEW_JPEG_QUALITY),
+            overlay
+        )
+
+    def to_dict(self) -> dict:
+        return {
+            "cameras": list(self.camera_ids),
+            "cols": self.cols,
+            "rows": self.rows,
+            "tile_width": self.tile_width,
+            "tile_height": self.tile_height,
+            "fps": self.fps,
+            "quality": self.quality,
+            "overlay": self.overlay
+        }
+
+
+class MosaicStream:
+    """
+    One mosaic composed from the cameras' latest ring frames.
+
+    Runs at the layout fps: pins each camera's latest frame (no copy, no
+    extra decode), downscales it into its tile of a preallocated canvas,
+    encodes the canvas once and hands the JPEG to every viewer's channel.
+    Tiles whose camera has no new frame (and no new face boxes) are left
+    as they are; if nothing changed the mosaic is not re-encoded.
+    """
+
+    def __init__(self, layout: MosaicLayout, rtsp_manager, faces: "Dict[int, Tuple[int, float, List[dict]]]"):
+        self.layout = layout
+        self.rtsp_manager = rtsp_manager
+        self.faces = faces
+        self.channels: Set = set()
+
+        self.canvas = np.zeros(
+            (layout.rows * layout.tile_height, layout.cols * layout.tile_width, 3), dtype=np.uint8
+        )
+        # camera_id -> (frame seq, faces version) drawn in its tile
+        self._drawn: Dict[int, Tuple[Optional[int], int]] = {}
+        self.last_jpeg: Optional[bytes] = None
+        self._task: Optional[asyncio.Task] = None
+
+        # Stats
+        self.composed = 0
+        self.skipped_unchanged = 0
+        self.total_compose_ms = 0.0
+
+    def start(self) -> "MosaicStream":
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._run())
+        return self
+
+    def stop(self):
+        if self._task is not None and not self._task.done():
+            self._task.cancel()
+
+    def _tile(self, index: int) -> np.ndarray:
+        row, col = divmod(index, self.layout.cols)
+        th, tw = self.layout.tile_height, self.layout.tile_width
+        return self.canvas[row * th:(row + 1) * th, col * tw:(col + 1) * tw]
+
+    def _draw_tile(self, tile: np.ndarray, camera_id: int, frame: Optional[np.ndarray], faces: List[dict]):
+        tile[:] = 0
+        th, tw = tile.shape[:2]
+        if frame is not None:
+            height, width = frame.shape[:2]
+            scale = min(tw / width, th / height)
+            fit_w, fit_h = max(1, int(width * scale)), max(1, int(height * scale))
+            x0, y0 = (tw - fit_w) // 2, (th - fit_h) // 2
+            tile[y0:y0 + fit_h, x0:x0 + fit_w] = cv2.resize(
+                frame, (fit_w, fit_h), interpolation=cv2.INTER_AREA
+            )
+
+            for face in faces:
+                x1, y1, x2, y2 = face["bbox"]
+                color = STUDENT_COLOR if face.get("type") == "student" else GUEST_COLOR
+                cv2.rectangle(
+                    tile,
+                    (x0 + int(x1 * scale), y0 + int(y1 * scale)),
+                    (x0 + int(x2 * scale), y0 + int(y2 * scale)),
+                    color, 1
+                )
+
+        if self.layout.overlay:
+            cv2.putText(tile, f"Kamera {camera_id}", (6, 16), cv2.FONT_HERSHEY_SIMPLEX, 0.45, (255, 255, 255), 1)
+
+    def compose(self) -> Optional[bytes]:
+        """Update changed tiles and encode the mosaic; None if nothing changed (runs in a worker thread)."""
+        start = time.perf_counter()
+        changed = False
+        for index, camera_id in enumerate(self.layout.camera_ids):
+            faces_version, faces = 0, []
+            if self.layout.overlay:
+                entry = self.faces.get(camera_id)
+                if entry is not None and time.monotonic() - entry[1] <= settings.MOSAIC_OVERLAY_TTL_SECONDS:
+                    faces_version, _, faces = entry
+
+            lease = self.rtsp_manager.acquire_frame(camera_id)
+            seq = lease.seq if lease is not None else None
+            if self._drawn.get(camera_id) == (seq, faces_version):
+                if lease is not None:
+                    lease.release()
+                continue
+
+            try:
+                self._draw_tile(self._tile(index), camera_id, lease.frame if lease is not None else None, faces)
+            finally:
+                if lease is not None:
+                    lease.release()
+            self._drawn[camera_id] = (seq, faces_version)
+            changed = True
+
+        if not changed and self.last_jpeg is not None:
+            self.skipped_unchanged += 1
+            return None
+
+        ret, buffer = cv2.imencode('.jpg', self.canvas, [cv2.IMWRITE_JPEG_QUALITY, self.layout.quality])
+        if not ret:
+            return None
+        self.last_jpeg = buffer.tobytes()
+        self.composed += 1
+        self.total_compose_ms += (time.perf_counter() - start) * 1000
+        return self.last_jpeg
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        interval = 1.0 / self.layout.fps
+        try:
+            while True:
+                started = time.monotonic()
+                if self.channels:
+                    try:
+                        jpeg = await loop.run_in_executor(None, self.compose)
+                    except Exception as e:
+                        logger.error(f"Mosaic compose error: {e}")
+                        jpeg = None
+                    if jpeg:
+                        for channel in list(self.channels):
+                            channel.send_frame(jpeg)
+                await asyncio.sleep(max(0.0, interval - (time.monotonic() - started)))
+        except asyncio.CancelledError:
+            pass
+
+    def get_stats(self) -> dict:
+        return {
+            **self.layout.to_dict(),
+            "viewers": len(self.channels),
+            "composed": self.composed,
+            "skipped_unchanged": self.skipped_unchanged,
+            "avg_compose_ms": round(self.total_compose_ms / self.composed, 2) if self.composed else 0.0,
+            "last_jpeg_bytes": len(self.last_jpeg) if self.last_jpeg else 0
+        }
+
+
+class MosaicService:
+    """Shares one MosaicStream per distinct layout among all wall viewers."""
+
+    def __init__(self, rtsp_manager):
+        self.rtsp_manager = rtsp_manager
+        self.streams: Dict[MosaicLayout, MosaicStream] = {}
+        # camera_id -> (version, monotonic time, faces) of the latest detections
+        self.faces: Dict[int, Tuple[int, float, List[dict]]] = {}
+        self._faces_lock = threading.Lock()
+        self._faces_version = 0
+
+        # Decode demand: camera_id -> highest fps of the mosaics showing it
+        self._camera_fps: Dict[int, int] = {}
+        self._last_decode: Dict[int, float] = {}
+
+    def _update_camera_fps(self):
+        camera_fps: Dict[int, int] = {}
+        for layout in self.streams:
+            for camera_id in layout.camera_ids:
+                camera_fps[camera_id] = max(camera_fps.get(camera_id, 0), layout.fps)
+        self._camera_fps = camera_fps
+
+    def wants_frame(self, camera_id: int) -> bool:
+        """
+        Decode predicate: a mosaic showing this camera is due for a new tile.
+
+        Tiles are drawn from the frames the camera already decodes, so this
+        only asks the stream to decode at the mosaic fps when nothing else
+        (preview, recognition) does.
+        """
+        fps = self._camera_fps.get(camera_id)
+        if not fps:
+            return False
+        now = time.monotonic()
+        if now - self._last_decode.get(camera_id, 0.0) < 1.0 / fps:
+            return False
+        self._last_decode[camera_id] = now
+        return True
+
+    def update_faces(self, camera_id: int, faces: List[dict]):
+        """Latest face detections of a camera (for overlays)."""
+        with self._faces_lock:
+            self._faces_version += 1
+            self.faces[camera_id] = (self._faces_version, time.monotonic(), faces)
+
+    def subscribe(self, layout: MosaicLayout, channel) -> MosaicStream:
+        """Add a viewer; starts the layout's compose task on the first one."""
+        stream = self.streams.get(layout)
+        if stream is None:
+            stream = MosaicStream(layout, self.rtsp_manager, self.faces).start()
+            self.streams[layout] = stream
+            self._update_camera_fps()
+            logger.info(f"Mosaic started: {layout.to_dict()}")
+        stream.channels.add(channel)
+        if stream.last_jpeg:
+            channel.send_frame(stream.last_jpeg)
+        return stream
+
+    def unsubscribe(self, layout: MosaicLayout, channel):
+        """Remove a viewer; stops the compose task with the last one."""
+        stream = self.streams.get(layout)
+        if stream is None:
+            return
+        stream.channels.discard(channel)
+        if not stream.channels:
+            stream.stop()
+            del self.streams[layout]
+            self._update_camera_fps()
+            logger.info(f"Mosaic stopped: {len(layout.camera_ids)} cameras")
+
+    def get_stats(self) -> List[dict]:
+        return [stream.get_stats() for stream in self.streams.values()]
+
+
+# Global instance
+_mosaic_service: Optional[MosaicService] = None
+
+
+def get_mosaic_service() -> MosaicService:
+    """Get or create global MosaicService instance."""
+    global _mosaic_service
+    if _mosaic_service is None:
+        _mosaic_service = MosaicService(get_multi_rtsp_manager())
+    return _mosaic_service
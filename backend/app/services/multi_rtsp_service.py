@@ -1,48 +1,209 @@
 import cv2
 import numpy as np
 import logging
-from typing import Optional, Callable, Dict
+from typing import Optional, Callable, Dict, List, Tuple
 from datetime import datetime
 import threading
 import time
+import random
+from concurrent.futures import Future, ThreadPoolExecutor
 
 from app.core.config import settings
+from app.services.recognition_cadence import RecognitionCadence
+from app.services.pyav_capture import PyAVCapture, AV_AVAILABLE
+from app.services.frame_ring import FrameRingBuffer, FrameLease
+from app.services.decoder_pool import DecoderPool
+from app.services.virtual_sources import is_virtual_source, open_virtual_source
+from app.services.pipeline_metrics import get_pipeline_metrics
 
 logger = logging.getLogger(__name__)
 
 
+def open_capture(url: str, open_timeout_ms: int = 10000, backend: Optional[str] = None):
+    """
+    Create a capture with low-latency RTSP settings.
+
+    backend: "opencv" (cv2.VideoCapture) or "pyav" (PyAVCapture, supports
+    keyframe-only decode). Defaults to RTSP_INGEST_BACKEND.
+
+    file:// and synthetic:// URLs open local benchmark sources
+    (see virtual_sources).
+    """
+    if is_virtual_source(url):
+        return open_virtual_source(url)
+
+    backend = backend or settings.RTSP_INGEST_BACKEND
+    if backend == "pyav":
+        if AV_AVAILABLE:
+            return PyAVCapture(url, open_timeout_ms)
+        logger.warning("PyAV not installed, falling back to OpenCV ingest backend")
+
+    capture = cv2.VideoCapture(url, cv2.CAP_FFMPEG)
+
+    # Buffer hajmini minimal qilish - lag ni kamaytiradi
+    capture.set(cv2.CAP_PROP_BUFFERSIZE, 1)
+
+    # RTSP transport protokoli - TCP ishonchliroq
+    capture.set(cv2.CAP_PROP_OPEN_TIMEOUT_MSEC, open_timeout_ms)
+    capture.set(cv2.CAP_PROP_READ_TIMEOUT_MSEC, 5000)
+    return capture
+
+
+def map_bbox(bbox: List[float], from_shape: Tuple[int, ...], to_shape: Tuple[int, ...]) -> List[float]:
+    """Map [x1, y1, x2, y2] between frames of different resolution (e.g. substream -> main)."""
+    scale_x = to_shape[1] / from_shape[1]
+    scale_y = to_shape[0] / from_shape[0]
+    return [bbox[0] * scale_x, bbox[1] * scale_y, bbox[2] * scale_x, bbox[3] * scale_y]
+
+
+class OnDemandStream:
+    """
+    High-resolution main stream of a dual-stream camera.
+
+    Opened only when a high-res frame is requested. While requests keep coming
+    a background thread grab()s frames to keep it current; after
+    HIGH_RES_IDLE_SECONDS without requests the stream is closed again.
+    """
+
+    def __init__(self, camera_id: int, url: str):
+        self.camera_id = camera_id
+        self.url = url
+        self.idle_timeout = settings.HIGH_RES_IDLE_SECONDS
+        self.capture: Optional[cv2.VideoCapture] = None
+        self.lock = threading.Lock()
+        self.thread: Optional[threading.Thread] = None
+        self.last_request = 0.0
+        self.frame_shape: Optional[Tuple[int, ...]] = None
+
+    @property
+    def is_open(self) -> bool:
+        return self.capture is not None
+
+    def read(self) -> Optional[np.ndarray]:
+        """Get the current high-res frame, opening the stream if needed (blocking)."""
+        with self.lock:
+            self.last_request = time.time()
+
+            if self.capture is None:
+                logger.info(f"Camera {self.camera_id}: Opening high-res stream")
+                capture = open_capture(self.url)
+                ret, frame = capture.read()
+                if not ret or frame is None:
+                    logger.error(f"Camera {self.camera_id}: High-res stream unavailable")
+                    capture.release()
+                    return None
+
+                self.capture = capture
+                self.frame_shape = frame.shape
+                self.thread = threading.Thread(target=self._grab_loop, daemon=True)
+                self.thread.start()
+                return frame
+
+            ret, frame = self.capture.retrieve()
+            if not ret or frame is None:
+                return None
+            self.frame_shape = frame.shape
+            return frame
+
+    def _grab_loop(self):
+        """Keep the main stream current with grab() until it goes idle."""
+        while True:
+            with self.lock:
+                if self.capture is None:
+                    return
+                if time.time() - self.last_request > self.idle_timeout or not self.capture.grab():
+                    self._release()
+                    return
+            time.sleep(0.001)
+
+    def _release(self):
+        if self.capture is not None:
+            try:
+                self.capture.release()
+            except Exception as e:
+                logger.error(f"Camera {self.camera_id}: High-res release error - {e}")
+            self.capture = None
+            logger.info(f"Camera {self.camera_id}: High-res stream closed")
+
+    def close(self):
+        with self.lock:
+            self._release()
+
+
 class RTSPStreamInstance:
     """Individual RTSP stream instance for a single camera."""
 
-    def __init__(self, camera_id: int, rtsp_url: str, room_id: int):
+    def __init__(
+        self,
+        camera_id: int,
+        rtsp_url: str,
+        room_id: int,
+        high_res_url: Optional[str] = None
+    ):
         self.camera_id = camera_id
         self.rtsp_url = rtsp_url
         self.room_id = room_id
+
+        # Dual-stream: rtsp_url is the substream, high_res_url the main stream
+        self.high_res: Optional[OnDemandStream] = (
+            OnDemandStream(camera_id, high_res_url) if high_res_url else None
+        )
         self.capture: Optional[cv2.VideoCapture] = None
         self.is_connected: bool = False
         self.is_running: bool = False
         self.thread: Optional[threading.Thread] = None
+        # Shared decoder threads instead of self.thread (INGEST_MODE=pool)
+        self.pool: Optional[DecoderPool] = None
+        self.frame_interval = 0.033  # ~30 FPS max - barqaror stream uchun
+        self._consecutive_fails = 0
         self.lock = threading.Lock()
-        self.last_frame: Optional[np.ndarray] = None
+        # Preallocated decode targets; readers borrow read-only views
+        self.ring = FrameRingBuffer(settings.FRAME_RING_SIZE)
         self.frame_count = 0
+        self.decoded_count = 0
         self.fps = 0
+        self.decode_fps = 0
         self.last_fps_time = time.time()
         self.frame_callback: Optional[Callable] = None
+        self.cadence = RecognitionCadence()
+        # disconnected -> connecting -> connected -> streaming
+        self.state = "disconnected"
+        # Called from the stream thread when the stream dies unexpectedly
+        self.on_lost: Optional[Callable[["RTSPStreamInstance"], None]] = None
+
+        # decode_predicate(room_id, camera_id) -> True if a consumer needs the
+        # grabbed frame decoded. None means decode every frame.
+        self.decode_predicate: Optional[Callable] = None
+        self._frame_requested = threading.Event()
+        self._frame_ready = threading.Event()
+
+        # Stream PTS -> wall clock mapping: (pts, wall time) of the anchor frame
+        self._pts_anchor: Optional[Tuple[float, float]] = None
+        self.last_pts: Optional[float] = None
+        self.last_ingest_time: Optional[float] = None
+
+        # Keyframe-only decode for idle cameras (pyav backend)
+        self.idle_seconds = settings.KEYFRAME_IDLE_SECONDS
+        self.motion_threshold = settings.MOTION_THRESHOLD
+        self.last_activity = time.time()
+        self._motion_thumb: Optional[np.ndarray] = None
+
+    @property
+    def supports_keyframe_mode(self) -> bool:
+        return self.capture is not None and hasattr(self.capture, "set_keyframes_only")
+
+    @property
+    def keyframes_only(self) -> bool:
+        return self.supports_keyframe_mode and self.capture.keyframes_only
 
     def connect(self, timeout: int = 30) -> bool:
         """Connect to RTSP stream."""
         try:
+            self.state = "connecting"
             logger.info(f"Camera {self.camera_id}: Connecting to {self.rtsp_url}")
 
             # RTSP stream uchun optimallashtirilgan sozlamalar
-            self.capture = cv2.VideoCapture(self.rtsp_url, cv2.CAP_FFMPEG)
-
-            # Buffer hajmini minimal qilish - lag ni kamaytiradi
-            self.capture.set(cv2.CAP_PROP_BUFFERSIZE, 1)
-
-            # RTSP transport protokoli - TCP ishonchliroq
-            self.capture.set(cv2.CAP_PROP_OPEN_TIMEOUT_MSEC, timeout * 1000)
-            self.capture.set(cv2.CAP_PROP_READ_TIMEOUT_MSEC, 5000)
+            self.capture = open_capture(self.rtsp_url, timeout * 1000)
 
             # Frame size optimization
             # self.capture.set(cv2.CAP_PROP_FRAME_WIDTH, 1280)
@@ -62,8 +223,16 @@ class RTSPStreamInstance:
                 self.disconnect()
                 return False
 
+            # Size ring slots for this stream
+            self.ring.allocate(frame.shape, frame.dtype)
+            slot, _ = self.ring.begin_write()
+            self.ring.commit(slot, frame)
+            self._consecutive_fails = 0
+            self._pts_anchor = None
+
             self.is_connected = True
-            self.last_frame = frame
+            self.state = "connected"
+            self.last_activity = time.time()
             logger.info(f"Camera {self.camera_id}: Connected successfully")
             return True
 
@@ -76,9 +245,9 @@ class RTSPStreamInstance:
         """Disconnect from RTSP stream."""
         self.is_running = False
         self.is_connected = False
+        self.state = "disconnected"
 
-        if self.thread and self.thread.is_alive():
-            self.thread.join(timeout=2)
+        self._join_loop()
 
         if self.capture:
             try:
@@ -87,11 +256,19 @@ class RTSPStreamInstance:
                 logger.error(f"Camera {self.camera_id}: Release error - {e}")
             self.capture = None
 
-        self.last_frame = None
+        if self.high_res:
+            self.high_res.close()
+
+        self.ring.clear()
         self.frame_count = 0
+        self.decoded_count = 0
         logger.info(f"Camera {self.camera_id}: Disconnected")
 
-    def start_streaming(self, frame_callback: Optional[Callable] = None):
+    def start_streaming(
+        self,
+        frame_callback: Optional[Callable] = None,
+        decode_predicate: Optional[Callable] = None
+    ):
         """Start streaming in background thread."""
         if not self.is_connected:
             logger.error(f"Camera {self.camera_id}: Cannot start - not connected")
@@ -102,122 +279,271 @@ class RTSPStreamInstance:
             return
 
         self.frame_callback = frame_callback
+        self.decode_predicate = decode_predicate
         self.is_running = True
-        self.thread = threading.Thread(target=self._stream_loop, daemon=True)
-        self.thread.start()
+        self.state = "streaming"
+        self._consecutive_fails = 0
+        if self.pool is not None:
+            self.pool.add(self)
+        else:
+            self.thread = threading.Thread(target=self._stream_loop, daemon=True)
+            self.thread.start()
         logger.info(f"Camera {self.camera_id}: Streaming started")
 
     def stop_streaming(self):
         """Stop streaming."""
         self.is_running = False
-        if self.thread and self.thread.is_alive():
-            self.thread.join(timeout=2)
+        self._join_loop()
         logger.info(f"Camera {self.camera_id}: Streaming stopped")
 
+    def _join_loop(self):
+        """Wait for the stream loop to end (no-op from the loop itself)."""
+        if self.pool is not None:
+            # Unscheduled before its last step ended it - clean up here
+            if self.pool.remove(self):
+                self._finish_loop()
+        elif self.thread and self.thread.is_alive() and self.thread is not threading.current_thread():
+            self.thread.join(timeout=2)
+
+    def set_target_fps(self, fps: float):
+        """Frame rate the decoder pool schedules this camera at."""
+        self.frame_interval = 1.0 / max(0.1, fps)
+
     def _stream_loop(self):
-        """Background thread loop for reading frames."""
-        reconnect_attempts = 0
-        max_reconnect_attempts = 10  # Ko'proq urinishlar
-        consecutive_fails = 0
-        max_consecutive_fails = 3  # 3 ta ketma-ket xatolikdan keyin reconnect
+        """
+        Background thread loop for reading frames (one thread per camera).
 
+        The loop does not reconnect by itself: when the stream is lost it ends
+        and on_lost(stream) hands the camera to the CameraSupervisor.
+        """
         try:
             while self.is_running and self.is_connected:
-                try:
-                    if not self.capture or not self.capture.isOpened():
-                        logger.error(f"Camera {self.camera_id}: Capture not available")
-                        break
-
-                    # Grab va retrieve alohida - buffer tozalash uchun
-                    ret = self.capture.grab()
-
-                    if not ret:
-                        consecutive_fails += 1
-                        if consecutive_fails >= max_consecutive_fails:
-                            reconnect_attempts += 1
-                            logger.warning(
-                                f"Camera {self.camera_id}: Frame read failed, "
-                                f"reconnect attempt {reconnect_attempts}/{max_reconnect_attempts}"
-                            )
-
-                            if reconnect_attempts >= max_reconnect_attempts:
-                                logger.error(f"Camera {self.camera_id}: Max reconnect attempts reached")
-                                break
-
-                            # Try to reconnect
-                            if self.capture:
-                                try:
-                                    self.capture.release()
-                                except:
-                                    pass
-                            time.sleep(0.5)  # Qisqaroq kutish
-                            self.capture = cv2.VideoCapture(self.rtsp_url, cv2.CAP_FFMPEG)
-                            self.capture.set(cv2.CAP_PROP_BUFFERSIZE, 1)
-                            self.capture.set(cv2.CAP_PROP_OPEN_TIMEOUT_MSEC, 10000)
-                            self.capture.set(cv2.CAP_PROP_READ_TIMEOUT_MSEC, 5000)
-                            consecutive_fails = 0
-                        continue
-
-                    # Retrieve frame
-                    ret, frame = self.capture.retrieve()
-                    if not ret or frame is None:
-                        consecutive_fails += 1
-                        continue
-
-                    # Success - reset counters
-                    consecutive_fails = 0
-                    reconnect_attempts = 0
-
-                    # Don't copy frame unless needed - just reference
-                    with self.lock:
-                        self.last_frame = frame  # No copy for internal storage
-                        self.frame_count += 1
-
-                    # Calculate FPS
-                    current_time = time.time()
-                    if current_time - self.last_fps_time >= 1.0:
-                        self.fps = self.frame_count
-                        self.frame_count = 0
-                        self.last_fps_time = current_time
-
-                    # Call callback with room_id and camera_id
-                    if self.frame_callback:
-                        try:
-                            self.frame_callback(
-                                frame,
-                                datetime.now(),
-                                self.room_id,
-                                self.camera_id
-                            )
-                        except Exception as e:
-                            logger.error(f"Camera {self.camera_id}: Callback error - {e}")
-
-                    time.sleep(0.033)  # ~30 FPS max - barqaror stream uchun
+                delay = self._step()
+                if delay is None:
+                    break
+                if delay > 0:
+                    time.sleep(delay)
+        finally:
+            self._finish_loop()
 
-                except Exception as e:
-                    logger.error(f"Camera {self.camera_id}: Stream loop error - {e}")
-                    time.sleep(0.1)
+    def _step(self) -> Optional[float]:
+        """
+        Grab one frame and decode it if a consumer needs it.
 
-        finally:
-            # CRITICAL: Always release capture when loop ends
-            if self.capture:
+        Returns the delay before the next step, or None when the stream is
+        lost. Shared by the per-camera thread and the DecoderPool.
+        """
+        max_consecutive_fails = 3  # 3 ta ketma-ket xatolikdan keyin reconnect
+
+        if not self.is_running or not self.is_connected:
+            return None
+
+        try:
+            if not self.capture or not self.capture.isOpened():
+                logger.error(f"Camera {self.camera_id}: Capture not available")
+                return None
+
+            # Grab va retrieve alohida - buffer tozalash uchun
+            ret = self.capture.grab()
+
+            if not ret:
+                self._consecutive_fails += 1
+                if self._consecutive_fails >= max_consecutive_fails:
+                    logger.warning(f"Camera {self.camera_id}: Frame read failed, stream lost")
+                    return None
+                return 0
+
+            # Grab succeeded - stream is alive
+            grabbed_at = time.monotonic()
+            self._consecutive_fails = 0
+            self.frame_count += 1
+            self._update_fps()
+            self._update_decode_mode()
+
+            # Decode only frames someone needs, others are just grabbed.
+            # In keyframe mode every keyframe is checked for motion.
+            if not self._needs_decode() and not self.keyframes_only:
+                return self.frame_interval
+
+            # Retrieve frame straight into a free ring slot (no allocation)
+            decode_start = time.perf_counter()
+            slot, buffer = self.ring.begin_write()
+            if buffer is not None:
+                ret, frame = self.capture.retrieve(buffer)
+            else:
+                ret, frame = self.capture.retrieve()
+            if not ret or frame is None:
+                self._consecutive_fails += 1
+                return 0
+            get_pipeline_metrics().record(
+                self.camera_id, "decode", (time.perf_counter() - decode_start) * 1000
+            )
+
+            if self.supports_keyframe_mode and self._detect_motion(frame):
+                self.last_activity = time.time()
+
+            pts = self._frame_pts()
+            timestamp = datetime.fromtimestamp(self._capture_time(pts))
+            self.last_pts = pts
+            self.last_ingest_time = grabbed_at
+            self.ring.commit(slot, frame, timestamp, pts=pts, ingest_time=grabbed_at)
+            with self.lock:
+                self.decoded_count += 1
+
+            self._frame_ready.set()
+
+            # Call callback with room_id and camera_id.
+            # The view is valid during the callback; consumers that
+            # keep the frame longer pin it with acquire_frame().
+            # No lease if the ring was cleared (disconnect) since the commit.
+            lease = self.ring.acquire_latest() if self.frame_callback else None
+            if lease is not None:
                 try:
-                    self.capture.release()
-                    logger.info(f"Camera {self.camera_id}: Capture released in finally block")
+                    self.frame_callback(
+                        lease.frame,
+                        timestamp,
+                        self.room_id,
+                        self.camera_id
+                    )
                 except Exception as e:
-                    logger.error(f"Camera {self.camera_id}: Error releasing capture - {e}")
-                self.capture = None
+                    logger.error(f"Camera {self.camera_id}: Callback error - {e}")
+                finally:
+                    lease.release()
 
-            self.is_connected = False
-            self.last_frame = None  # Free memory
-            logger.info(f"Camera {self.camera_id}: Stream loop ended")
+            return self.frame_interval
 
-    def get_frame(self) -> Optional[np.ndarray]:
-        """Get latest frame."""
-        with self.lock:
-            if self.last_frame is not None:
-                return self.last_frame.copy()
+        except Exception as e:
+            logger.error(f"Camera {self.camera_id}: Stream loop error - {e}")
+            return 0.1
+
+    def _finish_loop(self):
+        """Release the capture after the last step and report an unexpected end."""
+        # CRITICAL: Always release capture when loop ends
+        if self.capture:
+            try:
+                self.capture.release()
+                logger.info(f"Camera {self.camera_id}: Capture released in finally block")
+            except Exception as e:
+                logger.error(f"Camera {self.camera_id}: Error releasing capture - {e}")
+            self.capture = None
+
+        # is_running is still set if the loop ended without stop_streaming()
+        lost = self.is_running
+        self.is_running = False
+        self.is_connected = False
+        self.state = "disconnected"
+        self.ring.clear()
+        logger.info(f"Camera {self.camera_id}: Stream loop ended")
+
+        if lost and self.on_lost:
+            try:
+                self.on_lost(self)
+            except Exception as e:
+                logger.error(f"Camera {self.camera_id}: on_lost handler error - {e}")
+
+    def _frame_pts(self) -> Optional[float]:
+        """Presentation time (seconds) of the grabbed frame, if the source reports it."""
+        pts = getattr(self.capture, "last_pts_time", None)
+        if pts is None and isinstance(self.capture, cv2.VideoCapture):
+            msec = self.capture.get(cv2.CAP_PROP_POS_MSEC)
+            pts = msec / 1000 if msec > 0 else None
+        return pts
+
+    def _capture_time(self, pts: Optional[float]) -> float:
+        """
+        Wall-clock capture time of a frame from its PTS.
+
+        The first frame anchors PTS to the wall clock; later frames keep the
+        PTS spacing, so frames that sat in a buffer show up as stale. The
+        anchor is reset when PTS jumps back (stream restart, file loop) or
+        runs ahead of the clock.
+        """
+        now = time.time()
+        if pts is None:
+            return now
+
+        anchor = self._pts_anchor
+        if anchor is None or pts < anchor[0] or anchor[1] + (pts - anchor[0]) > now + 1.0:
+            self._pts_anchor = (pts, now)
+            return now
+
+        return min(now, anchor[1] + (pts - anchor[0]))
+
+    def _needs_decode(self) -> bool:
+        """Check if the grabbed frame must be decoded (retrieve)."""
+        if self._frame_requested.is_set():
+            self._frame_requested.clear()
+            return True
+
+        if self.decode_predicate is None:
+            return True
+
+        try:
+            return bool(self.decode_predicate(self.room_id, self.camera_id))
+        except Exception as e:
+            logger.error(f"Camera {self.camera_id}: Decode predicate error - {e}")
+            return True
+
+    def _detect_motion(self, frame: np.ndarray) -> bool:
+        """Compare a small grayscale thumbnail with the previous decoded frame."""
+        thumb = cv2.resize(cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY), (64, 36), interpolation=cv2.INTER_AREA)
+        previous = self._motion_thumb
+        self._motion_thumb = thumb
+        if previous is None:
+            return False
+        return float(cv2.absdiff(thumb, previous).mean()) > self.motion_threshold
+
+    def _update_decode_mode(self):
+        """Switch to keyframe-only decode after KEYFRAME_IDLE_SECONDS without motion or faces."""
+        if not self.supports_keyframe_mode:
+            return
+
+        now = time.time()
+        # Faces were found by the last recognition
+        if self.cadence.state != "idle":
+            self.last_activity = now
+
+        idle = now - self.last_activity > self.idle_seconds
+        if idle != self.capture.keyframes_only:
+            self.capture.set_keyframes_only(idle)
+            logger.info(
+                f"Camera {self.camera_id}: "
+                f"{'Idle - keyframe-only decode' if idle else 'Activity - full decode'}"
+            )
+
+    def _update_fps(self):
+        """Update grab and decode FPS once per second."""
+        current_time = time.time()
+        if current_time - self.last_fps_time >= 1.0:
+            self.fps = self.frame_count
+            self.decode_fps = self.decoded_count
+            self.frame_count = 0
+            self.decoded_count = 0
+            self.last_fps_time = current_time
+
+    def request_frame(self, timeout: float = 2.0) -> Optional[np.ndarray]:
+        """Force decoding of the next grabbed frame and return it (snapshot)."""
+        if not self.is_running:
+            return self.get_frame()
+
+        self._frame_ready.clear()
+        self._frame_requested.set()
+        self._frame_ready.wait(timeout)
+        return self.get_frame()
+
+    def get_high_res_frame(self) -> Optional[np.ndarray]:
+        """Get a main-stream frame for dual-stream cameras (blocking, opens on demand)."""
+        if self.high_res is None:
             return None
+        return self.high_res.read()
+
+    def acquire_frame(self) -> Optional[FrameLease]:
+        """Borrow the latest decoded frame (read-only, zero-copy). Call release() when done."""
+        return self.ring.acquire_latest()
+
+    def get_frame(self) -> Optional[np.ndarray]:
+        """Get a private copy of the latest decoded frame."""
+        return self.ring.copy_latest()
 
     def get_status(self) -> dict:
         """Get stream status."""
@@ -226,29 +552,250 @@ class RTSPStreamInstance:
             "room_id": self.room_id,
             "connected": self.is_connected,
             "running": self.is_running,
+            "state": self.state,
             "rtsp_url": self.rtsp_url,
-            "fps": self.fps
+            "fps": self.fps,
+            "decode_fps": self.decode_fps,
+            "target_fps": round(1.0 / self.frame_interval, 1),
+            "scheduler": "pool" if self.pool is not None else "thread",
+            "decode_mode": "keyframes" if self.keyframes_only else "full",
+            "last_pts": self.last_pts,
+            "frame_seq": self.ring.latest_seq(),
+            "ring_pinned": self.ring.pinned_count(),
+            "dual_stream": self.high_res is not None,
+            "high_res_open": self.high_res.is_open if self.high_res else False,
+            **self.cadence.to_dict()
         }
 
 
+class SupervisedCamera:
+    """Desired-running camera tracked by the supervisor, with its circuit breaker."""
+
+    def __init__(
+        self,
+        camera_id: int,
+        rtsp_url: str,
+        room_id: int,
+        frame_callback: Optional[Callable],
+        timeout: int,
+        decode_predicate: Optional[Callable],
+        high_res_url: Optional[str]
+    ):
+        self.camera_id = camera_id
+        self.rtsp_url = rtsp_url
+        self.room_id = room_id
+        self.frame_callback = frame_callback
+        self.timeout = timeout
+        self.decode_predicate = decode_predicate
+        self.high_res_url = high_res_url
+        self.target_fps: Optional[float] = None  # None - DECODER_TARGET_FPS
+
+        # closed: healthy, open: failing - waiting for backoff, half_open: trial reconnect
+        self.circuit = "closed"
+        self.failures = 0
+        self.next_attempt: Optional[float] = None  # monotonic time of next reconnect
+        self.in_flight = False
+        self.restarts = 0
+        self.last_error: Optional[str] = None
+
+    def to_dict(self) -> dict:
+        next_in = None
+        if self.next_attempt is not None:
+            next_in = round(max(0.0, self.next_attempt - time.monotonic()), 1)
+        return {
+            "state": self.circuit,
+            "failures": self.failures,
+            "next_attempt_in": next_in,
+            "restarts": self.restarts,
+            "last_error": self.last_error
+        }
+
+
+class CameraSupervisor:
+    """
+    Owns camera lifecycles for MultiRTSPStreamManager.
+
+    Every started camera is registered as desired-running. When its connect
+    fails or its stream dies, a reconnect is scheduled with jittered
+    exponential backoff. After CIRCUIT_FAILURE_THRESHOLD consecutive failures
+    the circuit opens; the next attempt after the backoff is a half-open
+    trial. At most RECONNECT_MAX_CONCURRENT reconnects run at a time, so a
+    network blip across all cameras does not turn into a reconnect storm.
+    """
+
+    def __init__(self, manager: "MultiRTSPStreamManager"):
+        self.manager = manager
+        self.cameras: Dict[int, SupervisedCamera] = {}
+        self.lock = threading.Lock()
+        self.base_delay = settings.RECONNECT_BASE_DELAY
+        self.max_delay = settings.RECONNECT_MAX_DELAY
+        self.failure_threshold = settings.CIRCUIT_FAILURE_THRESHOLD
+        self.max_concurrent = settings.RECONNECT_MAX_CONCURRENT
+
+        self._wake = threading.Event()
+        self._running = False
+        self._thread: Optional[threading.Thread] = None
+
+    # ==================== Registration ====================
+
+    def register(self, camera: SupervisedCamera):
+        """Mark a camera as desired-running (replaces previous registration)."""
+        with self.lock:
+            self.cameras[camera.camera_id] = camera
+        self._ensure_thread()
+
+    def unregister(self, camera_id: int) -> bool:
+        """Camera was stopped on purpose - no more reconnects."""
+        with self.lock:
+            return self.cameras.pop(camera_id, None) is not None
+
+    def get(self, camera_id: int) -> Optional[SupervisedCamera]:
+        with self.lock:
+            return self.cameras.get(camera_id)
+
+    # ==================== Events ====================
+
+    def on_connect_result(self, camera_id: int, success: bool):
+        """Connect attempt (initial or reconnect) finished."""
+        with self.lock:
+            camera = self.cameras.get(camera_id)
+            if camera is None:
+                return
+            camera.in_flight = False
+
+            if success:
+                if camera.failures:
+                    logger.info(f"Camera {camera_id}: Recovered after {camera.failures} failures")
+                camera.circuit = "closed"
+                camera.failures = 0
+                camera.next_attempt = None
+                camera.last_error = None
+                return
+
+            self._record_failure(camera, "connect failed")
+        self._wake.set()
+
+    def on_stream_lost(self, stream: "RTSPStreamInstance"):
+        """Stream thread died unexpectedly."""
+        self.manager._remove_stream(stream)
+        with self.lock:
+            camera = self.cameras.get(stream.camera_id)
+            if camera is None:
+                return
+            camera.restarts += 1
+            self._record_failure(camera, "stream lost")
+        self._wake.set()
+
+    def _record_failure(self, camera: SupervisedCamera, error: str):
+        """Schedule the next attempt with jittered exponential backoff (call with lock held)."""
+        camera.failures += 1
+        camera.last_error = error
+        if camera.failures >= self.failure_threshold:
+            if camera.circuit != "open":
+                logger.warning(f"Camera {camera.camera_id}: Circuit open after {camera.failures} failures")
+            camera.circuit = "open"
+
+        delay = self.backoff_delay(camera.failures)
+        camera.next_attempt = time.monotonic() + delay
+        logger.info(f"Camera {camera.camera_id}: {error}, retry in {delay:.1f}s")
+
+    def backoff_delay(self, failures: int) -> float:
+        """Exponential delay with equal jitter: half fixed, half random."""
+        delay = min(self.max_delay, self.base_delay * (2 ** max(0, failures - 1)))
+        return delay / 2 + random.uniform(0, delay / 2)
+
+    # ==================== Reconnect Loop ====================
+
+    def _ensure_thread(self):
+        if self._running:
+            return
+        self._running = True
+        self._thread = threading.Thread(target=self._run, daemon=True, name="camera-supervisor")
+        self._thread.start()
+
+    def _run(self):
+        while self._running:
+            wait = self._dispatch_due(time.monotonic())
+            self._wake.wait(timeout=wait)
+            self._wake.clear()
+
+    def _dispatch_due(self, now: float) -> float:
+        """Start reconnects that are due. Returns seconds until the next check."""
+        next_wait = 1.0
+        due: List[SupervisedCamera] = []
+
+        with self.lock:
+            in_flight = sum(1 for camera in self.cameras.values() if camera.in_flight)
+            waiting = sorted(
+                (camera for camera in self.cameras.values()
+                 if camera.next_attempt is not None and not camera.in_flight),
+                key=lambda camera: camera.next_attempt
+            )
+            for camera in waiting:
+                if camera.next_attempt > now:
+                    next_wait = min(next_wait, camera.next_attempt - now)
+                    break
+                if in_flight >= self.max_concurrent:
+                    break
+                if camera.circuit == "open":
+                    camera.circuit = "half_open"
+                camera.in_flight = True
+                camera.next_attempt = None
+                in_flight += 1
+                due.append(camera)
+
+        for camera in due:
+            logger.info(f"Camera {camera.camera_id}: Reconnecting (attempt {camera.failures + 1})")
+            if not self.manager._submit_connect(camera):
+                self.on_connect_result(camera.camera_id, False)
+
+        return max(0.05, next_wait)
+
+    def stop(self):
+        """Stop the reconnect loop and forget all cameras."""
+        self._running = False
+        with self.lock:
+            self.cameras.clear()
+        self._wake.set()
+
+
 class MultiRTSPStreamManager:
     """Manages multiple RTSP streams for room monitoring."""
 
     def __init__(self):
         self.streams: Dict[int, RTSPStreamInstance] = {}  # camera_id -> stream instance
+        # Cameras waiting for / running connect() in the pool
+        self.connecting: Dict[int, RTSPStreamInstance] = {}
+        self._connect_futures: Dict[int, Future] = {}
+        self.connect_pool = ThreadPoolExecutor(
+            max_workers=settings.CAMERA_CONNECT_CONCURRENCY,
+            thread_name_prefix="camera-connect"
+        )
         self.lock = threading.Lock()
+        self.supervisor = CameraSupervisor(self)
+        # INGEST_MODE=pool: fixed decoder threads instead of a thread per camera
+        self.decoder_pool: Optional[DecoderPool] = (
+            DecoderPool(settings.DECODER_POOL_THREADS) if settings.INGEST_MODE == "pool" else None
+        )
         logger.info("MultiRTSPStreamManager initialized")
 
-    def start_camera(
+    def start_camera_async(
         self,
         camera_id: int,
         rtsp_url: str,
         room_id: int,
         frame_callback: Optional[Callable] = None,
-        timeout: int = 30
-    ) -> bool:
+        timeout: int = 30,
+        decode_predicate: Optional[Callable] = None,
+        high_res_url: Optional[str] = None
+    ) -> Optional[Future]:
         """
-        Start streaming from a camera.
+        Queue a camera for connection in the connect pool and return immediately.
+
+        The camera is reported with state "connecting" until connect() finishes.
+        At most CAMERA_CONNECT_CONCURRENCY cameras connect at the same time.
+        The camera is handed to the supervisor, which reconnects it with
+        backoff if this attempt fails or the stream dies later.
 
         Args:
             camera_id: Camera ID from database
@@ -256,53 +803,181 @@ class MultiRTSPStreamManager:
             room_id: Room ID this camera belongs to
             frame_callback: Callback function(frame, timestamp, room_id, camera_id)
             timeout: Connection timeout in seconds
+            decode_predicate: Function(room_id, camera_id) -> bool, decode frame only if True
+            high_res_url: Main stream URL when rtsp_url is a low-res substream
 
         Returns:
-            True if started successfully
+            Future resolving to True if the first attempt started the camera,
+            None if rejected (stream limit)
         """
-        with self.lock:
-            if len(self.streams) >= settings.MAX_SIMULTANEOUS_STREAMS:
-                logger.error(f"Max simultaneous streams ({settings.MAX_SIMULTANEOUS_STREAMS}) reached")
-                return False
+        camera = SupervisedCamera(
+            camera_id, rtsp_url, room_id, frame_callback, timeout, decode_predicate, high_res_url
+        )
 
+        with self.lock:
             if camera_id in self.streams:
                 logger.warning(f"Camera {camera_id} already streaming")
+                future = Future()
+                future.set_result(True)
+                return future
+
+            if camera_id in self.connecting:
+                return self._connect_futures[camera_id]
+
+            if len(self.streams) + len(self.connecting) >= settings.MAX_SIMULTANEOUS_STREAMS:
+                logger.error(f"Max simultaneous streams ({settings.MAX_SIMULTANEOUS_STREAMS}) reached")
+                return None
+
+            # Lock order: manager -> supervisor
+            self.supervisor.register(camera)
+            return self._queue_connect(camera)
+
+    def _queue_connect(self, camera: SupervisedCamera) -> Future:
+        """Create the stream and submit connect() to the pool (call with lock held)."""
+        stream = self._create_stream(camera)
+        stream.state = "connecting"
+        stream.on_lost = self.supervisor.on_stream_lost
+
+        # The worker registers the stream under this lock, so it cannot finish first
+        future = self.connect_pool.submit(
+            self._connect_and_start, stream, camera.frame_callback, camera.timeout, camera.decode_predicate
+        )
+        self.connecting[camera.camera_id] = stream
+        self._connect_futures[camera.camera_id] = future
+        future.add_done_callback(
+            lambda f: self.supervisor.on_connect_result(camera.camera_id, f.result())
+        )
+        logger.info(f"Camera {camera.camera_id} queued for connection")
+        return future
+
+    def _create_stream(self, camera: SupervisedCamera) -> RTSPStreamInstance:
+        """Stream object for a camera (ingestion modes override this)."""
+        stream = RTSPStreamInstance(camera.camera_id, camera.rtsp_url, camera.room_id, camera.high_res_url)
+        if self.decoder_pool is not None:
+            stream.pool = self.decoder_pool
+            stream.set_target_fps(camera.target_fps or settings.DECODER_TARGET_FPS)
+        return stream
+
+    def _submit_connect(self, camera: SupervisedCamera) -> bool:
+        """Supervisor reconnect. Returns False if the camera could not be queued."""
+        with self.lock:
+            if camera.camera_id in self.connecting:
+                return True
+            if camera.camera_id not in self.streams:
+                if len(self.streams) + len(self.connecting) >= settings.MAX_SIMULTANEOUS_STREAMS:
+                    return False
+                try:
+                    self._queue_connect(camera)
+                except RuntimeError:
+                    # Connect pool already shut down
+                    return False
                 return True
 
-            stream = RTSPStreamInstance(camera_id, rtsp_url, room_id)
+        # Already streaming again
+        self.supervisor.on_connect_result(camera.camera_id, True)
+        return True
 
-            if not stream.connect(timeout):
-                return False
+    def _remove_stream(self, stream: RTSPStreamInstance):
+        """Drop a dead stream (called from its own thread via the supervisor)."""
+        with self.lock:
+            if self.streams.get(stream.camera_id) is stream:
+                del self.streams[stream.camera_id]
+        stream.disconnect()
 
-            stream.start_streaming(frame_callback)
-            self.streams[camera_id] = stream
+    def _connect_and_start(
+        self,
+        stream: RTSPStreamInstance,
+        frame_callback: Optional[Callable],
+        timeout: int,
+        decode_predicate: Optional[Callable]
+    ) -> bool:
+        """Connect pool worker: connect without holding the manager lock, then register."""
+        camera_id = stream.camera_id
+        connected = stream.connect(timeout)
 
-            logger.info(f"Camera {camera_id} started. Total active streams: {len(self.streams)}")
-            return True
+        with self.lock:
+            # stop_camera() during connect removes the pending entry
+            cancelled = self.connecting.get(camera_id) is not stream
+            if not cancelled:
+                del self.connecting[camera_id]
+                self._connect_futures.pop(camera_id, None)
+
+            if connected and not cancelled:
+                stream.start_streaming(frame_callback, decode_predicate)
+                self.streams[camera_id] = stream
+                logger.info(f"Camera {camera_id} started. Total active streams: {len(self.streams)}")
+                return True
+
+        if connected:
+            logger.info(f"Camera {camera_id}: Stopped while connecting")
+            stream.disconnect()
+        else:
+            logger.error(f"Camera {camera_id}: Failed to start")
+        return False
+
+    def start_camera(
+        self,
+        camera_id: int,
+        rtsp_url: str,
+        room_id: int,
+        frame_callback: Optional[Callable] = None,
+        timeout: int = 30,
+        decode_predicate: Optional[Callable] = None,
+        high_res_url: Optional[str] = None
+    ) -> bool:
+        """
+        Start streaming from a camera and wait for the connection (blocking).
+
+        Use start_camera_async() from the event loop.
+
+        Returns:
+            True if started successfully
+        """
+        future = self.start_camera_async(
+            camera_id, rtsp_url, room_id, frame_callback, timeout, decode_predicate, high_res_url
+        )
+        if future is None:
+            return False
+        return future.result()
 
     def stop_camera(self, camera_id: int) -> bool:
-        """Stop streaming from a camera."""
+        """Stop streaming from a camera (or cancel a pending connection / reconnect)."""
         with self.lock:
-            if camera_id not in self.streams:
+            supervised = self.supervisor.unregister(camera_id)
+
+            if camera_id in self.connecting:
+                del self.connecting[camera_id]
+                self._connect_futures.pop(camera_id, None)
+                logger.info(f"Camera {camera_id} connection cancelled")
+                return True
+
+            stream = self.streams.pop(camera_id, None)
+            if stream is None:
+                if supervised:
+                    logger.info(f"Camera {camera_id} reconnect cancelled")
+                    return True
                 logger.warning(f"Camera {camera_id} not found in active streams")
                 return False
 
-            stream = self.streams[camera_id]
-            stream.stop_streaming()
-            stream.disconnect()
-            del self.streams[camera_id]
+        # Thread join outside the manager lock
+        stream.stop_streaming()
+        stream.disconnect()
 
-            logger.info(f"Camera {camera_id} stopped. Total active streams: {len(self.streams)}")
-            return True
+        logger.info(f"Camera {camera_id} stopped. Total active streams: {len(self.streams)}")
+        return True
 
     def stop_room_cameras(self, room_id: int) -> int:
         """Stop all cameras in a room. Returns count of stopped cameras."""
         stopped = 0
         with self.lock:
             cameras_to_stop = [
-                cam_id for cam_id, stream in self.streams.items()
+                cam_id for cam_id, stream in self._all_streams().items()
                 if stream.room_id == room_id
             ]
+            cameras_to_stop += [
+                camera.camera_id for camera in self._waiting_cameras()
+                if camera.room_id == room_id
+            ]
 
         for cam_id in cameras_to_stop:
             if self.stop_camera(cam_id):
@@ -313,43 +988,154 @@ class MultiRTSPStreamManager:
     def stop_all(self):
         """Stop all streams."""
         with self.lock:
-            camera_ids = list(self.streams.keys())
+            camera_ids = list(self._all_streams().keys())
+            camera_ids += [camera.camera_id for camera in self._waiting_cameras()]
 
         for camera_id in camera_ids:
             self.stop_camera(camera_id)
 
         logger.info("All streams stopped")
 
+    def shutdown(self):
+        """Stop supervisor and all streams (server shutdown)."""
+        self.supervisor.stop()
+        self.stop_all()
+        self.connect_pool.shutdown(wait=False, cancel_futures=True)
+        if self.decoder_pool is not None:
+            self.decoder_pool.stop()
+
+    def set_target_fps(self, camera_id: int, fps: float) -> bool:
+        """Set a camera's decoder pool frame rate (kept across reconnects)."""
+        camera = self.supervisor.get(camera_id)
+        if camera is None:
+            return False
+        camera.target_fps = fps
+        with self.lock:
+            stream = self._all_streams().get(camera_id)
+        if stream is not None and hasattr(stream, "set_target_fps"):
+            stream.set_target_fps(fps)
+        return True
+
+    def get_decoder_stats(self) -> Optional[dict]:
+        """Decoder pool scheduling stats (None in thread-per-camera mode)."""
+        if self.decoder_pool is None:
+            return None
+        return self.decoder_pool.get_stats()
+
+    def _all_streams(self) -> Dict[int, RTSPStreamInstance]:
+        """Running and connecting streams (call with lock held)."""
+        return {**self.connecting, **self.streams}
+
+    def _waiting_cameras(self) -> List[SupervisedCamera]:
+        """Supervised cameras waiting for a reconnect (call with lock held)."""
+        streams = self._all_streams()
+        with self.supervisor.lock:
+            return [
+                camera for camera_id, camera in self.supervisor.cameras.items()
+                if camera_id not in streams
+            ]
+
+    def _status(
+        self,
+        camera_id: int,
+        stream: Optional[RTSPStreamInstance],
+        camera: Optional[SupervisedCamera]
+    ) -> Optional[dict]:
+        """Stream status plus circuit breaker state (None if the camera is gone)."""
+        if stream is not None:
+            status = stream.get_status()
+        elif camera is not None:
+            status = {
+                "camera_id": camera_id,
+                "room_id": camera.room_id,
+                "connected": False,
+                "running": False,
+                "state": "reconnecting",
+                "rtsp_url": camera.rtsp_url,
+                "fps": 0
+            }
+        else:
+            return None
+        status["circuit"] = camera.to_dict() if camera else None
+        return status
+
+    def _statuses(self) -> Dict[int, dict]:
+        # Take the stream and supervised camera objects together under the
+        # lock; a camera stopped afterwards is reported from these objects
+        with self.lock:
+            streams = self._all_streams()
+            entries = [(cam_id, stream, self.supervisor.get(cam_id)) for cam_id, stream in streams.items()]
+            entries += [(camera.camera_id, None, camera) for camera in self._waiting_cameras()]
+        statuses = {}
+        for cam_id, stream, camera in entries:
+            status = self._status(cam_id, stream, camera)
+            if status is not None:
+                statuses[cam_id] = status
+        return statuses
+
     def get_camera_status(self, camera_id: int) -> Optional[dict]:
         """Get status of a specific camera."""
+        with self.lock:
+            stream = self._all_streams().get(camera_id)
+            camera = self.supervisor.get(camera_id)
+        return self._status(camera_id, stream, camera)
+
+    def get_cadence(self, camera_id: int) -> Optional[RecognitionCadence]:
+        """Get adaptive recognition cadence of a camera."""
         with self.lock:
             if camera_id in self.streams:
-                return self.streams[camera_id].get_status()
+                return self.streams[camera_id].cadence
             return None
 
-    def get_camera_frame(self, camera_id: int) -> Optional[np.ndarray]:
-        """Get latest frame from a camera."""
+    def get_camera_frame(self, camera_id: int, fresh: bool = False) -> Optional[np.ndarray]:
+        """Get latest frame from a camera. fresh=True decodes the next frame (snapshot)."""
         with self.lock:
-            if camera_id in self.streams:
-                return self.streams[camera_id].get_frame()
+            stream = self.streams.get(camera_id)
+
+        if stream is None:
             return None
+        return stream.request_frame() if fresh else stream.get_frame()
 
-    def get_all_statuses(self) -> Dict[int, dict]:
-        """Get status of all cameras."""
+    def acquire_frame(self, camera_id: int) -> Optional[FrameLease]:
+        """Borrow the latest frame of a camera without copying. Caller must release()."""
         with self.lock:
-            return {
-                cam_id: stream.get_status()
-                for cam_id, stream in self.streams.items()
-            }
+            stream = self.streams.get(camera_id)
+        if stream is None:
+            return None
+        return stream.acquire_frame()
 
-    def get_room_cameras(self, room_id: int) -> Dict[int, dict]:
-        """Get status of all cameras in a room."""
+    def is_dual_stream(self, camera_id: int) -> bool:
+        """Check if a camera decodes a substream and has an on-demand main stream."""
         with self.lock:
-            return {
-                cam_id: stream.get_status()
-                for cam_id, stream in self.streams.items()
-                if stream.room_id == room_id
-            }
+            stream = self.streams.get(camera_id)
+        return stream is not None and stream.high_res is not None
+
+    def get_high_res_frame(self, camera_id: int) -> Optional[np.ndarray]:
+        """Get main-stream frame of a dual-stream camera (blocking, run in executor)."""
+        with self.lock:
+            stream = self.streams.get(camera_id)
+        if stream is None:
+            return None
+        return stream.get_high_res_frame()
+
+    def get_snapshot_frame(self, camera_id: int) -> Optional[np.ndarray]:
+        """Highest resolution frame available: main stream if dual-stream, else a fresh decode."""
+        frame = self.get_high_res_frame(camera_id)
+        if frame is not None:
+            return frame
+        return self.get_camera_frame(camera_id, fresh=True)
+
+    def get_all_statuses(self) -> Dict[int, dict]:
+        """Get status of all cameras (including connecting and reconnecting ones)."""
+        return self._statuses()
+
+    def get_room_cameras(self, room_id: int) -> Dict[int, dict]:
+        """Get status of all cameras in a room (including connecting and reconnecting ones)."""
+        return {
+            cam_id: status
+            for cam_id, status in self._statuses().items()
+            if status["room_id"] == room_id
+        }
 
     def is_camera_active(self, camera_id: int) -> bool:
         """Check if a camera is active."""
@@ -379,5 +1165,10 @@ def get_multi_rtsp_manager() -> MultiRTSPStreamManager:
     """Get or create global MultiRTSPStreamManager instance."""
     global _multi_rtsp_manager
     if _multi_rtsp_manager is None:
-        _multi_rtsp_manager = MultiRTSPStreamManager()
+        if settings.INGEST_MODE == "sharded":
+            # Import here to avoid circular import
+            from app.services.sharded_ingest import ShardedIngestManager
+            _multi_rtsp_manager = ShardedIngestManager()
+        else:
+            _multi_rtsp_manager = MultiRTSPStreamManager()
     return _multi_rtsp_manager
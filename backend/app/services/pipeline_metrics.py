@@ -0,0 +1,164 @@
+import logging
+import threading
+import time
+from collections import defaultdict, deque
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Dict, Deque, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Recognition pipeline stages in order. queue: grab -> recognition start,
+# mark_dirty: queueing the presence diff (sent on the room's next tick),
+# broadcast: face_detection send, glass_to_glass: capture (stream PTS) -> results broadcast
+STAGES = ("decode", "queue", "detect", "embed", "search", "db", "mark_dirty", "broadcast", "total", "glass_to_glass")
+
+
+def _percentile(values, q: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(q * (len(ordered) - 1))))
+    return ordered[index]
+
+
+class FrameTrace:
+    """
+    Identity and stage timings of one frame through the recognition pipeline.
+
+    Carries the frame sequence ID, stream PTS, capture time and monotonic
+    ingest time from the camera ring to the broadcast messages.
+    """
+
+    def __init__(
+        self,
+        camera_id: int,
+        capture_time: datetime,
+        seq: Optional[int] = None,
+        pts: Optional[float] = None,
+        ingest_time: Optional[float] = None
+    ):
+        self.camera_id = camera_id
+        self.capture_time = capture_time
+        self.seq = seq
+        self.pts = pts
+        self.ingest_time = ingest_time
+        self.timings: Dict[str, float] = {}
+
+        if ingest_time is not None:
+            self.timings["queue"] = (time.monotonic() - ingest_time) * 1000
+
+    def add(self, stage: str, ms: float):
+        self.timings[stage] = self.timings.get(stage, 0.0) + ms
+
+    @contextmanager
+    def stage(self, name: str):
+        """Time a block and add it to a stage (stages may run several times per frame)."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, (time.perf_counter() - start) * 1000)
+
+    def latency_ms(self) -> float:
+        """Glass-to-glass latency so far: capture time -> now."""
+        return (time.time() - self.capture_time.timestamp()) * 1000
+
+    def to_dict(self) -> dict:
+        """Trace fields attached to face_detection / presence_diff messages."""
+        return {
+            "frame_seq": self.seq,
+            "pts": self.pts,
+            "capture_time": self.capture_time.isoformat(),
+            "latency_ms": round(self.latency_ms(), 1),
+            "timings_ms": {stage: round(ms, 2) for stage, ms in self.timings.items()}
+        }
+
+
+class PipelineMetrics:
+    """
+    Per-camera latency of each recognition pipeline stage.
+
+    Keeps the last `window` samples per (camera, stage) for percentiles and
+    timestamps of recognized frames for achieved recognition fps.
+    """
+
+    def __init__(self, window: int = 500, fps_window_seconds: float = 10.0):
+        self.window = window
+        self.fps_window_seconds = fps_window_seconds
+        self.lock = threading.Lock()
+        self._samples: Dict[Tuple[int, str], Deque[float]] = defaultdict(lambda: deque(maxlen=self.window))
+        self._recognitions: Dict[int, Deque[float]] = defaultdict(lambda: deque(maxlen=10000))
+
+    def record(self, camera_id: int, stage: str, ms: float):
+        with self.lock:
+            self._samples[(camera_id, stage)].append(ms)
+
+    def record_stages(self, camera_id: int, timings: Dict[str, float]):
+        """Record one recognized frame with its stage timings (ms)."""
+        now = time.monotonic()
+        with self.lock:
+            for stage, ms in timings.items():
+                self._samples[(camera_id, stage)].append(ms)
+            self._recognitions[camera_id].append(now)
+
+    def recognition_fps(self, camera_id: int) -> float:
+        cutoff = time.monotonic() - self.fps_window_seconds
+        with self.lock:
+            times = self._recognitions.get(camera_id)
+            if not times:
+                return 0.0
+            recent = sum(1 for t in times if t >= cutoff)
+        return recent / self.fps_window_seconds
+
+    def get_camera_stats(self, camera_id: int) -> dict:
+        with self.lock:
+            stages = {
+                stage: list(samples)
+                for (cam_id, stage), samples in self._samples.items()
+                if cam_id == camera_id
+            }
+        return {
+            "camera_id": camera_id,
+            "recognition_fps": round(self.recognition_fps(camera_id), 2),
+            "stages": {
+                stage: {
+                    "count": len(values),
+                    "avg_ms": round(sum(values) / len(values), 2),
+                    "p50_ms": round(_percentile(values, 0.5), 2),
+                    "p95_ms": round(_percentile(values, 0.95), 2)
+                }
+                for stage, values in sorted(
+                    stages.items(),
+                    key=lambda item: STAGES.index(item[0]) if item[0] in STAGES else len(STAGES)
+                )
+                if values
+            }
+        }
+
+    def get_all_stats(self) -> Dict[int, dict]:
+        with self.lock:
+            camera_ids = {cam_id for cam_id, _ in self._samples} | set(self._recognitions)
+        return {cam_id: self.get_camera_stats(cam_id) for cam_id in sorted(camera_ids)}
+
+    def reset(self, camera_id: Optional[int] = None):
+        with self.lock:
+            if camera_id is None:
+                self._samples.clear()
+                self._recognitions.clear()
+                return
+            for key in [key for key in self._samples if key[0] == camera_id]:
+                del self._samples[key]
+            self._recognitions.pop(camera_id, None)
+
+
+# Global instance
+_pipeline_metrics: Optional[PipelineMetrics] = None
+
+
+def get_pipeline_metrics() -> PipelineMetrics:
+    """Get or create global PipelineMetrics instance."""
+    global _pipeline_metrics
+    if _pipeline_metrics is None:
+        _pipeline_metrics = PipelineMetrics()
+    return _pipeline_metrics
@@ -0,0 +1,250 @@
+import asyncio
+import logging
+import time
+from datetime import datetime
+from typing import Awaitable, Callable, Dict, Iterable, List, Optional, Tuple
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Occupant fields that make an occupant "updated" when they change
+UPDATE_FIELDS = ("last_seen_at", "confidence", "camera_id", "first_name", "last_name", "group_name")
+
+
+class RoomPresenceState:
+    """Last published presence of one room and the changes waiting to be published."""
+
+    def __init__(self, room_id: int, room_name: str):
+        self.room_id = room_id
+        self.room_name = room_name
+        self.version = 0
+        self.occupants: Dict[int, dict] = {}  # student_id -> occupant dict
+        self.guest_count = 0
+
+        # Pending changes
+        self.dirty = False
+        self.new_recognitions: List[dict] = []
+        self.extra: dict = {}  # camera_id / trace fields of the latest contributing frame
+        self.last_publish = 0.0
+
+    def snapshot(self) -> dict:
+        occupants = list(self.occupants.values())
+        return {
+            "room_id": self.room_id,
+            "room_name": self.room_name,
+            "version": self.version,
+            "occupants": occupants,
+            "total_count": len(occupants),
+            "guest_count": self.guest_count,
+            "total_people": len(occupants) + self.guest_count
+        }
+
+
+def diff_occupants(old: Dict[int, dict], new: Dict[int, dict]) -> Tuple[List[dict], List[int], List[dict]]:
+    """(joined, left student_ids, updated) between two occupant maps."""
+    joined = [occupant for student_id, occupant in new.items() if student_id not in old]
+    left = [student_id for student_id in old if student_id not in new]
+    updated = [
+        occupant for student_id, occupant in new.items()
+        if student_id in old and any(old[student_id].get(f) != occupant.get(f) for f in UPDATE_FIELDS)
+    ]
+    return joined, left, updated
+
+
+class PresencePublisher:
+    """
+    Coalesces presence changes per room into versioned diffs.
+
+    Recognitions and cleanups only mark a room dirty. A loop publishes each
+    dirty, watched room at most PRESENCE_BROADCAST_HZ times per second: it
+    loads the room's presence once, diffs it against the last published
+    occupants and broadcasts a presence_diff (joined / left / updated) with
+    a version that increases by one per published diff.
+
+    Clients start from a snapshot (on subscribe) and apply diffs whose
+    version is exactly theirs + 1; on a gap (e.g. a slow client whose
+    pending diff was coalesced) they ask for a fresh snapshot.
+
+    Callbacks:
+        load_room(room_id) -> (room_name, [occupant dict]) or None
+        guest_count(room_id) -> int
+        broadcast(room_id, message)
+        is_watched(room_id) -> bool
+    """
+
+    def __init__(
+        self,
+        load_room: Callable[[int], Awaitable[Optional[Tuple[str, List[dict]]]]],
+        guest_count: Callable[[int], int],
+        broadcast: Callable[[int, dict], Awaitable[None]],
+        is_watched: Callable[[int], bool],
+        hz: Optional[float] = None
+    ):
+        self.load_room = load_room
+        self.guest_count = guest_count
+        self.broadcast = broadcast
+        self.is_watched = is_watched
+        self.interval = 1.0 / max(0.1, hz or settings.PRESENCE_BROADCAST_HZ)
+
+        self.states: Dict[int, RoomPresenceState] = {}
+        self._lock = asyncio.Lock()
+        self._task: Optional[asyncio.Task] = None
+
+        # Stats
+        self.marked = 0
+        self.published = 0
+        self.unchanged = 0
+
+    # ==================== Change notification ====================
+
+    def mark_dirty(self, room_id: int, new_recognitions: Optional[List[dict]] = None, extra: Optional[dict] = None):
+        """Room presence changed; it is published on the next tick (call on the event loop)."""
+        state = self.states.get(room_id)
+        if state is None:
+            # Version 0: not loaded yet - the first load becomes the base snapshot
+            state = self.states[room_id] = RoomPresenceState(room_id, f"Room {room_id}")
+        state.dirty = True
+        if new_recognitions:
+            state.new_recognitions.extend(new_recognitions)
+        if extra:
+            state.extra = extra
+        self.marked += 1
+        self._ensure_task()
+
+    # ==================== Snapshots ====================
+
+    async def snapshot(self, room_id: int) -> Optional[dict]:
+        """Current published state of a room (pending changes are published first)."""
+        async with self._lock:
+            state = self.states.get(room_id)
+            if state is None or state.dirty or state.version == 0:
+                state = await self._publish_room(room_id)
+            return state.snapshot() if state else None
+
+    async def snapshots(self, rooms: Iterable[dict]) -> List[dict]:
+        """
+        Snapshots for rooms listed by get_all_rooms_presence_with_names.
+
+        Rooms seen for the first time are seeded from that data without a
+        second query; rooms with pending changes are published first.
+        """
+        result = []
+        async with self._lock:
+            for room_data in rooms:
+                room_id = room_data["room_id"]
+                state = self.states.get(room_id)
+                if state is None:
+                    state = self.states[room_id] = RoomPresenceState(room_id, room_data["room_name"])
+                    state.occupants = {o["student_id"]: o for o in room_data["occupants"]}
+                    state.guest_count = self.guest_count(room_id)
+                    state.version = 1
+                elif state.dirty or state.version == 0:
+                    state = await self._publish_room(room_id) or state
+                result.append(state.snapshot())
+        return result
+
+    # ==================== Publishing ====================
+
+    async def _publish_room(self, room_id: int) -> Optional[RoomPresenceState]:
+        """Load, diff and broadcast one room (call with the lock held)."""
+        loaded = await self.load_room(room_id)
+        if loaded is None:
+            self.states.pop(room_id, None)
+            return None
+        room_name, occupants = loaded
+
+        state = self.states.get(room_id)
+        if state is None:
+            state = self.states[room_id] = RoomPresenceState(room_id, room_name)
+
+        new_occupants = {o["student_id"]: o for o in occupants}
+        joined, left, updated = diff_occupants(state.occupants, new_occupants)
+        guest_count = self.guest_count(room_id)
+
+        state.dirty = False
+        state.last_publish = time.monotonic()
+        new_recognitions, state.new_recognitions = state.new_recognitions, []
+        extra, state.extra = state.extra, {}
+
+        first = state.version == 0
+        changed = (
+            joined or left or updated or new_recognitions
+            or guest_count != state.guest_count or room_name != state.room_name
+        )
+        if not changed and not first:
+            self.unchanged += 1
+            return state
+
+        state.version += 1
+        state.room_name = room_name
+        state.occupants = new_occupants
+        state.guest_count = guest_count
+        if first:
+            # No client can hold an older version - this is the base snapshot
+            return state
+
+        message = {
+            "type": "presence_diff",
+            "room_id": room_id,
+            "room_name": room_name,
+            "version": state.version,
+            "joined": joined,
+            "left": left,
+            "updated": updated,
+            "new_recognitions": new_recognitions,
+            "total_count": len(new_occupants),
+            "guest_count": guest_count,
+            "total_people": len(new_occupants) + guest_count,
+            "timestamp": datetime.now().isoformat(),
+            **extra
+        }
+        await self.broadcast(room_id, message)
+        self.published += 1
+        return state
+
+    async def flush(self):
+        """Publish every dirty room that has subscribers and is due."""
+        now = time.monotonic()
+        async with self._lock:
+            for room_id, state in list(self.states.items()):
+                if not state.dirty or not self.is_watched(room_id):
+                    continue
+                if now - state.last_publish < self.interval:
+                    continue
+                try:
+                    await self._publish_room(room_id)
+                except Exception as e:
+                    logger.error(f"Room {room_id}: Presence publish error - {e}")
+
+    async def _run(self):
+        try:
+            while True:
+                await asyncio.sleep(self.interval)
+                await self.flush()
+        except asyncio.CancelledError:
+            pass
+        finally:
+            self._task = None
+
+    def _ensure_task(self):
+        if self._task is None:
+            try:
+                self._task = asyncio.get_running_loop().create_task(self._run())
+            except RuntimeError:
+                # No running loop (called from a thread) - started by the next caller on the loop
+                pass
+
+    def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+
+    def get_stats(self) -> dict:
+        return {
+            "rooms": len(self.states),
+            "dirty": sum(1 for state in self.states.values() if state.dirty),
+            "marked": self.marked,
+            "published": self.published,
+            "unchanged": self.unchanged,
+            "max_hz": round(1.0 / self.interval, 2)
+        }
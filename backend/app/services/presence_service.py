@@ -1,14 +1,20 @@
+import asyncio
+import heapq
 import logging
-from typing import Optional, List, Dict
+import time
+from typing import Optional, List, Dict, Set, Tuple, Callable
 from datetime import datetime, timedelta
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, delete, and_
-from sqlalchemy.orm import selectinload
+from sqlalchemy import select, delete, func
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 
 from app.models.room_presence import RoomPresence
 from app.models.room import Room
 from app.models.student import Student
 from app.core.config import settings
+from app.core.database import AsyncSessionLocal
+from app.core.db_writer import get_db_writer
+from app.services.metadata_cache import get_metadata_cache
 
 logger = logging.getLogger(__name__)
 
@@ -49,67 +55,131 @@ class PresenceInfo:
         }
 
 
+class _PresenceEntry:
+    """In-memory presence of one student."""
+
+    __slots__ = ("info", "room_id", "expires_at")
+
+    def __init__(self, info: PresenceInfo, room_id: int):
+        self.info = info
+        self.room_id = room_id
+        self.expires_at = 0.0
+
+
 class PresenceService:
-    """Service for tracking real-time room presence."""
+    """
+    Service for tracking real-time room presence.
+
+    Presence lives in memory, keyed by student (a student is in one room at
+    a time), so recognition and presence reads never wait on the database.
+    Expiry uses a timer heap of (expires_at, student_id); entries refreshed
+    since they were pushed are skipped when popped.
+
+    Changes are written behind to room_presence: a background loop upserts
+    changed students and deletes expired ones in batches every
+    PRESENCE_FLUSH_INTERVAL seconds, and once more on shutdown.
+    """
+
+    FLUSH_BATCH_SIZE = 500
 
     def __init__(self):
         self.presence_timeout = settings.PRESENCE_TIMEOUT_SECONDS
+        self.expire_interval = settings.PRESENCE_CLEANUP_INTERVAL
+        self.flush_interval = settings.PRESENCE_FLUSH_INTERVAL
+
+        self._entries: Dict[int, _PresenceEntry] = {}  # student_id -> entry
+        self._rooms: Dict[int, Set[int]] = {}  # room_id -> student_ids
+        self._expiry_heap: List[Tuple[float, int]] = []
+
+        # Write-behind state
+        self._dirty: Set[int] = set()  # student_ids to upsert
+        self._removed: Set[int] = set()  # student_ids to delete
+        self._flush_lock = asyncio.Lock()
+
+        self._listeners: List[Callable[[Set[int]], None]] = []
+        self._task: Optional[asyncio.Task] = None
+
+        # Stats
+        self.updates = 0
+        self.expired = 0
+        self.flushed_rows = 0
+
         logger.info(f"PresenceService initialized (timeout: {self.presence_timeout}s)")
 
-    async def update_presence(
+    def add_listener(self, callback: Callable[[Set[int]], None]):
+        """Register callback(room_ids) called when occupants of rooms expire or are removed."""
+        self._listeners.append(callback)
+
+    def _notify(self, room_ids: Set[int]):
+        for callback in self._listeners:
+            try:
+                callback(set(room_ids))
+            except Exception as e:
+                logger.error(f"Presence listener error: {e}")
+
+    # ==================== In-memory presence ====================
+
+    def _set_entry(self, student_id: int, entry: _PresenceEntry):
+        old = self._entries.get(student_id)
+        if old is not None and old.room_id != entry.room_id:
+            self._discard_from_room(student_id, old.room_id)
+
+        entry.expires_at = entry.info.last_seen_at.timestamp() + self.presence_timeout
+        self._entries[student_id] = entry
+        self._rooms.setdefault(entry.room_id, set()).add(student_id)
+        heapq.heappush(self._expiry_heap, (entry.expires_at, student_id))
+
+    def _discard_from_room(self, student_id: int, room_id: int):
+        students = self._rooms.get(room_id)
+        if students is not None:
+            students.discard(student_id)
+            if not students:
+                del self._rooms[room_id]
+
+    def _remove_entry(self, student_id: int) -> Optional[_PresenceEntry]:
+        entry = self._entries.pop(student_id, None)
+        if entry is not None:
+            self._discard_from_room(student_id, entry.room_id)
+            self._dirty.discard(student_id)
+            self._removed.add(student_id)
+        return entry
+
+    def update_presence(
         self,
-        db: AsyncSession,
-        student_db_id: int,
+        student,
         room_id: int,
         camera_id: int,
         confidence: float
-    ) -> Optional[RoomPresence]:
+    ) -> PresenceInfo:
         """
-        Update student's current room presence (UPSERT).
+        Update student's current room presence (in memory, persisted by the flush loop).
         Student can only be in one room at a time.
-        """
-        try:
-            # Check if presence record exists for this student
-            result = await db.execute(
-                select(RoomPresence).where(RoomPresence.student_id == student_db_id)
-            )
-            presence = result.scalar_one_or_none()
-
-            now = datetime.now()
-
-            if presence:
-                # Update existing record
-                presence.room_id = room_id
-                presence.camera_id = camera_id
-                presence.last_seen_at = now
-                presence.confidence_score = confidence
-            else:
-                # Create new record
-                presence = RoomPresence(
-                    student_id=student_db_id,
-                    room_id=room_id,
-                    camera_id=camera_id,
-                    last_seen_at=now,
-                    confidence_score=confidence
-                )
-                db.add(presence)
-
-            await db.flush()
-            await db.refresh(presence)
-
-            logger.debug(
-                f"Presence updated: Student {student_db_id} -> Room {room_id} "
-                f"(Camera {camera_id}, Confidence: {confidence:.2f})"
-            )
-            return presence
 
-        except Exception as e:
-            logger.error(f"Error updating presence: {e}")
-            return None
+        student is anything with id, student_id, first_name, last_name and group_name.
+        """
+        info = PresenceInfo(
+            student_id=student.id,
+            student_number=student.student_id,
+            first_name=student.first_name,
+            last_name=student.last_name,
+            group_name=student.group_name,
+            last_seen_at=datetime.now(),
+            confidence=confidence,
+            camera_id=camera_id
+        )
+        self._set_entry(student.id, _PresenceEntry(info, room_id))
+        self._removed.discard(student.id)
+        self._dirty.add(student.id)
+        self.updates += 1
+
+        logger.debug(
+            f"Presence updated: Student {student.id} -> Room {room_id} "
+            f"(Camera {camera_id}, Confidence: {confidence:.2f})"
+        )
+        return info
 
-    async def get_room_presence(
+    def get_room_presence(
         self,
-        db: AsyncSession,
         room_id: int,
         include_stale: bool = False
     ) -> List[PresenceInfo]:
@@ -117,76 +187,45 @@ class PresenceService:
         Get all students currently in a room.
         By default excludes stale entries (older than timeout).
         """
-        cutoff_time = datetime.now() - timedelta(seconds=self.presence_timeout)
-
-        query = (
-            select(RoomPresence, Student)
-            .join(Student, RoomPresence.student_id == Student.id)
-            .where(RoomPresence.room_id == room_id)
-        )
-
+        now = time.time()
+        entries = [self._entries[student_id] for student_id in self._rooms.get(room_id, ())]
         if not include_stale:
-            query = query.where(RoomPresence.last_seen_at >= cutoff_time)
-
-        query = query.order_by(RoomPresence.last_seen_at.desc())
-
-        result = await db.execute(query)
-        rows = result.all()
-
-        return [
-            PresenceInfo(
-                student_id=student.id,
-                student_number=student.student_id,
-                first_name=student.first_name,
-                last_name=student.last_name,
-                group_name=student.group_name,
-                last_seen_at=presence.last_seen_at,
-                confidence=presence.confidence_score or 0.0,
-                camera_id=presence.camera_id
-            )
-            for presence, student in rows
-        ]
+            entries = [e for e in entries if e.expires_at >= now]
+        entries.sort(key=lambda e: e.info.last_seen_at, reverse=True)
+        return [e.info for e in entries]
 
     async def get_all_rooms_presence(
         self,
         db: AsyncSession
     ) -> Dict[int, List[PresenceInfo]]:
         """Get presence for all rooms."""
-        cutoff_time = datetime.now() - timedelta(seconds=self.presence_timeout)
-
         # Get all active rooms
         rooms_result = await db.execute(
-            select(Room).where(Room.is_active == True)
+            select(Room.id).where(Room.is_active == True)
         )
-        rooms = rooms_result.scalars().all()
-
-        # Get presence for each room
-        result = {}
-        for room in rooms:
-            presence_list = await self.get_room_presence(db, room.id)
-            result[room.id] = presence_list
-
-        return result
+        return {room_id: self.get_room_presence(room_id) for room_id in rooms_result.scalars().all()}
 
     async def get_all_rooms_presence_with_names(
         self,
         db: AsyncSession
     ) -> List[dict]:
-        """Get presence for all rooms with room names."""
-        cutoff_time = datetime.now() - timedelta(seconds=self.presence_timeout)
+        """
+        Get presence for all rooms with room names.
 
+        One query (active room ids and names) regardless of room count;
+        occupants come from memory.
+        """
         # Get all active rooms
         rooms_result = await db.execute(
-            select(Room).where(Room.is_active == True).order_by(Room.name)
+            select(Room.id, Room.name).where(Room.is_active == True).order_by(Room.name)
         )
-        rooms = rooms_result.scalars().all()
 
         result = []
-        for room in rooms:
-            presence_list = await self.get_room_presence(db, room.id)
+        for room_id, room_name in rooms_result.all():
+            presence_list = self.get_room_presence(room_id)
             result.append({
-                "room_id": room.id,
-                "room_name": room.name,
+                "room_id": room_id,
+                "room_name": room_name,
                 "occupants": [p.to_dict() for p in presence_list],
                 "total_count": len(presence_list)
             })
@@ -199,111 +238,227 @@ class PresenceService:
         student_db_id: int
     ) -> Optional[dict]:
         """Get where a specific student is currently located."""
-        cutoff_time = datetime.now() - timedelta(seconds=self.presence_timeout)
-
-        result = await db.execute(
-            select(RoomPresence, Room)
-            .join(Room, RoomPresence.room_id == Room.id)
-            .where(
-                and_(
-                    RoomPresence.student_id == student_db_id,
-                    RoomPresence.last_seen_at >= cutoff_time
-                )
-            )
-        )
-        row = result.first()
+        entry = self._entries.get(student_db_id)
+        if entry is None or entry.expires_at < time.time():
+            return None
 
-        if not row:
+        room_name = await get_metadata_cache().resolve_room_name(db, entry.room_id)
+        if room_name is None:
             return None
 
-        presence, room = row
         return {
-            "room_id": room.id,
-            "room_name": room.name,
-            "last_seen_at": presence.last_seen_at.isoformat(),
-            "confidence": presence.confidence_score,
-            "camera_id": presence.camera_id
+            "room_id": entry.room_id,
+            "room_name": room_name,
+            "last_seen_at": entry.info.last_seen_at.isoformat(),
+            "confidence": entry.info.confidence,
+            "camera_id": entry.info.camera_id
         }
 
-    async def cleanup_stale_presence(
-        self,
-        db: AsyncSession
-    ) -> int:
+    def expire_stale(self) -> Dict[int, int]:
         """
-        Remove presence entries older than timeout.
-        Returns count of removed entries.
+        Remove presence entries older than timeout (timer heap).
+        Returns {room_id: removed count}.
         """
-        cutoff_time = datetime.now() - timedelta(seconds=self.presence_timeout)
-
-        # Get count before delete
-        count_result = await db.execute(
-            select(RoomPresence).where(RoomPresence.last_seen_at < cutoff_time)
-        )
-        stale_records = count_result.scalars().all()
-        count = len(stale_records)
-
-        if count > 0:
-            await db.execute(
-                delete(RoomPresence).where(RoomPresence.last_seen_at < cutoff_time)
-            )
-            await db.flush()
-            logger.info(f"Cleaned up {count} stale presence records")
-
-        return count
-
-    async def clear_room_presence(
+        now = time.time()
+        expired_rooms: Dict[int, int] = {}
+        heap = self._expiry_heap
+        while heap and heap[0][0] < now:
+            expires_at, student_id = heapq.heappop(heap)
+            entry = self._entries.get(student_id)
+            # Refreshed (newer heap item pending) or already removed
+            if entry is None or entry.expires_at != expires_at:
+                continue
+            self._remove_entry(student_id)
+            expired_rooms[entry.room_id] = expired_rooms.get(entry.room_id, 0) + 1
+
+        if expired_rooms:
+            self.expired += sum(expired_rooms.values())
+            logger.info(f"Expired {sum(expired_rooms.values())} stale presence entries")
+        return expired_rooms
+
+    def clear_room_presence(
         self,
-        db: AsyncSession,
         room_id: int
     ) -> int:
-        """Clear all presence records for a room. Returns count cleared."""
-        result = await db.execute(
-            select(RoomPresence).where(RoomPresence.room_id == room_id)
-        )
-        records = result.scalars().all()
-        count = len(records)
+        """Clear all presence for a room. Returns count cleared."""
+        student_ids = list(self._rooms.get(room_id, ()))
+        for student_id in student_ids:
+            self._remove_entry(student_id)
 
-        if count > 0:
-            await db.execute(
-                delete(RoomPresence).where(RoomPresence.room_id == room_id)
-            )
-            await db.flush()
-            logger.info(f"Cleared {count} presence records for room {room_id}")
+        if student_ids:
+            logger.info(f"Cleared {len(student_ids)} presence records for room {room_id}")
+        return len(student_ids)
 
-        return count
+    def remove_student(self, student_id: int) -> Optional[int]:
+        """
+        Drop a student's presence (e.g. the student was deleted).
+
+        The pending upsert is replaced by a delete, so the next flush does
+        not write the row back. Returns the room the student was in.
+        """
+        entry = self._remove_entry(student_id)
+        if entry is None:
+            return None
+        self._notify({entry.room_id})
+        return entry.room_id
 
     async def get_presence_stats(
         self,
         db: AsyncSession
     ) -> dict:
         """Get overall presence statistics."""
+        now = time.time()
+        active = [e for e in self._entries.values() if e.expires_at >= now]
+
+        # Count total rooms (one COUNT query)
+        room_count = (await db.execute(
+            select(func.count(Room.id)).where(Room.is_active == True)
+        )).scalar_one()
+
+        return {
+            "total_people_tracked": len(active),
+            "total_rooms": room_count,
+            "occupied_rooms": len({e.room_id for e in active}),
+            "presence_timeout_seconds": self.presence_timeout
+        }
+
+    # ==================== Persistence ====================
+
+    async def load_from_db(self, db: AsyncSession) -> int:
+        """Load current presence from room_presence (startup); stale rows are deleted."""
         cutoff_time = datetime.now() - timedelta(seconds=self.presence_timeout)
 
-        # Count active presence records
-        active_result = await db.execute(
-            select(RoomPresence).where(RoomPresence.last_seen_at >= cutoff_time)
+        stale = await db.execute(
+            delete(RoomPresence).where(RoomPresence.last_seen_at < cutoff_time)
         )
-        active_count = len(active_result.scalars().all())
+        if stale.rowcount:
+            logger.info(f"Cleaned up {stale.rowcount} stale presence records")
 
-        # Count total rooms
-        rooms_result = await db.execute(
-            select(Room).where(Room.is_active == True)
+        result = await db.execute(
+            select(RoomPresence, Student)
+            .join(Student, RoomPresence.student_id == Student.id)
+            .where(RoomPresence.room_id.is_not(None))
         )
-        room_count = len(rooms_result.scalars().all())
 
-        # Count rooms with people
-        rooms_with_presence = await db.execute(
-            select(RoomPresence.room_id)
-            .where(RoomPresence.last_seen_at >= cutoff_time)
-            .distinct()
-        )
-        occupied_rooms = len(rooms_with_presence.scalars().all())
+        count = 0
+        for presence, student in result.all():
+            info = PresenceInfo(
+                student_id=student.id,
+                student_number=student.student_id,
+                first_name=student.first_name,
+                last_name=student.last_name,
+                group_name=student.group_name,
+                last_seen_at=presence.last_seen_at,
+                confidence=presence.confidence_score or 0.0,
+                camera_id=presence.camera_id
+            )
+            self._set_entry(student.id, _PresenceEntry(info, presence.room_id))
+            count += 1
+        return count
 
+    async def flush(self) -> int:
+        """Write changed presence to room_presence in batched upserts/deletes. Returns rows written."""
+        async with self._flush_lock:
+            dirty, self._dirty = self._dirty, set()
+            removed, self._removed = self._removed, set()
+            if not dirty and not removed:
+                return 0
+
+            rows = []
+            for student_id in dirty:
+                entry = self._entries.get(student_id)
+                if entry is None:
+                    continue
+                rows.append({
+                    "student_id": student_id,
+                    "room_id": entry.room_id,
+                    "camera_id": entry.info.camera_id,
+                    "last_seen_at": entry.info.last_seen_at,
+                    "confidence_score": entry.info.confidence
+                })
+            removed_ids = list(removed)
+
+            async def write(db: AsyncSession):
+                for i in range(0, len(rows), self.FLUSH_BATCH_SIZE):
+                    stmt = sqlite_insert(RoomPresence).values(rows[i:i + self.FLUSH_BATCH_SIZE])
+                    await db.execute(stmt.on_conflict_do_update(
+                        index_elements=[RoomPresence.student_id],
+                        set_={
+                            "room_id": stmt.excluded.room_id,
+                            "camera_id": stmt.excluded.camera_id,
+                            "last_seen_at": stmt.excluded.last_seen_at,
+                            "confidence_score": stmt.excluded.confidence_score
+                        }
+                    ))
+                for i in range(0, len(removed_ids), self.FLUSH_BATCH_SIZE):
+                    await db.execute(
+                        delete(RoomPresence).where(
+                            RoomPresence.student_id.in_(removed_ids[i:i + self.FLUSH_BATCH_SIZE])
+                        )
+                    )
+
+            try:
+                # Committed by the single database writer
+                await get_db_writer().submit(write)
+            except Exception as e:
+                # Keep the changes for the next flush (newer changes win)
+                self._dirty |= {s for s in dirty if s not in self._removed}
+                self._removed |= {s for s in removed if s not in self._dirty}
+                logger.error(f"Error flushing presence: {e}")
+                return 0
+
+            self.flushed_rows += len(rows) + len(removed_ids)
+            return len(rows) + len(removed_ids)
+
+    # ==================== Background loop ====================
+
+    async def start(self):
+        """Load persisted presence and start the expiry / write-behind loop."""
+        if self._task and not self._task.done():
+            return
+        try:
+            async with AsyncSessionLocal() as db:
+                loaded = await self.load_from_db(db)
+                await db.commit()
+            logger.info(f"Loaded {loaded} presence entries")
+        except Exception as e:
+            logger.error(f"Error loading presence: {e}")
+        self._task = asyncio.create_task(self._run())
+
+    async def _run(self):
+        last_flush = time.monotonic()
+        while True:
+            try:
+                await asyncio.sleep(min(self.expire_interval, self.flush_interval))
+                expired_rooms = self.expire_stale()
+                if expired_rooms:
+                    self._notify(set(expired_rooms))
+
+                if time.monotonic() - last_flush >= self.flush_interval:
+                    last_flush = time.monotonic()
+                    await self.flush()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Error in presence loop: {e}")
+
+    async def stop(self):
+        """Stop the loop and write pending changes."""
+        if self._task:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        await self.flush()
+
+    def get_stats(self) -> dict:
         return {
-            "total_people_tracked": active_count,
-            "total_rooms": room_count,
-            "occupied_rooms": occupied_rooms,
-            "presence_timeout_seconds": self.presence_timeout
+            "entries": len(self._entries),
+            "rooms": len(self._rooms),
+            "heap": len(self._expiry_heap),
+            "pending_writes": len(self._dirty) + len(self._removed),
+            "updates": self.updates,
+            "expired": self.expired,
+            "flushed_rows": self.flushed_rows
         }
 
 
@@ -0,0 +1,209 @@
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Iterable, Mapping, NamedTuple, Optional, Set, Tuple
+
+import cv2
+import numpy as np
+
+from app.core.config import settings
+from app.services.frame_ring import FrameLease
+
+logger = logging.getLogger(__name__)
+
+
+def _clamp(value, low: int, high: int) -> int:
+    return max(low, min(high, int(value)))
+
+
+class PreviewTier(NamedTuple):
+    """Preview a camera stream subscriber asked for."""
+
+    max_width: int  # 0 = source resolution
+    fps: int
+    quality: int
+
+    @classmethod
+    def default(cls) -> "PreviewTier":
+        return cls(0, settings.PREVIEW_MAX_FPS, settings.PREVIEW_JPEG_QUALITY)
+
+    @classmethod
+    def from_params(cls, params: Mapping) -> "PreviewTier":
+        """
+        Build a tier from query params / a set_tier message, clamped to server limits.
+
+        Missing values fall back to the default (full size) tier.
+        """
+        default = cls.default()
+        try:
+            max_width = int(params.get("max_width", default.max_width) or 0)
+            fps = int(params.get("fps", default.fps))
+            quality = int(params.get("quality", default.quality))
+        except (TypeError, ValueError):
+            return default
+
+        if max_width:
+            max_width = _clamp(max_width, settings.PREVIEW_MIN_WIDTH, 4096)
+        return cls(
+            max_width,
+            _clamp(fps, 1, settings.PREVIEW_MAX_FPS),
+            _clamp(quality, 10, settings.PREVIEW_JPEG_QUALITY)
+        )
+
+    def to_dict(self) -> dict:
+        return {"max_width": self.max_width, "fps": self.fps, "quality": self.quality}
+
+
+def encode_tiers(
+    frame: np.ndarray,
+    tiers: Iterable[PreviewTier],
+    quality_cap: Optional[int] = None
+) -> Dict[PreviewTier, bytes]:
+    """
+    JPEG-encode a frame for each tier.
+
+    Tiers that end up with the same size and quality share one encode, and
+    each target width is resized once.
+    """
+    height, width = frame.shape[:2]
+    resized: Dict[int, np.ndarray] = {}
+    encoded: Dict[Tuple[int, int], bytes] = {}
+    results: Dict[PreviewTier, bytes] = {}
+
+    for tier in tiers:
+        target_width = tier.max_width if 0 < tier.max_width < width else width
+        quality = min(tier.quality, quality_cap) if quality_cap else tier.quality
+        key = (target_width, quality)
+
+        if key not in encoded:
+            if target_width not in resized:
+                if target_width == width:
+                    resized[target_width] = frame
+                else:
+                    target_height = max(1, round(height * target_width / width))
+                    resized[target_width] = cv2.resize(
+                        frame, (target_width, target_height), interpolation=cv2.INTER_AREA
+                    )
+            ret, buffer = cv2.imencode('.jpg', resized[target_width], [cv2.IMWRITE_JPEG_QUALITY, quality])
+            encoded[key] = buffer.tobytes() if ret else b''
+
+        if encoded[key]:
+            results[tier] = encoded[key]
+
+    return results
+
+
+class PreviewEncoder:
+    """
+    Encodes camera preview tiers on a small worker pool instead of the capture thread.
+
+    The capture thread only pins the latest ring slot (FrameLease) and hands
+    it over. At most one encode job per camera is in flight; a frame arriving
+    while the previous one is still being encoded is skipped, so a slow
+    encoder lowers the preview fps instead of building a backlog.
+    """
+
+    def __init__(self, threads: int = 2):
+        self.executor = ThreadPoolExecutor(max_workers=max(1, threads), thread_name_prefix="preview")
+        self.lock = threading.Lock()
+        self._busy: Set[int] = set()
+
+        # Stats
+        self.jobs = 0
+        self.skipped_busy = 0
+        self.encoded: Dict[PreviewTier, int] = {}
+        self.encoded_bytes: Dict[PreviewTier, int] = {}
+        self.total_encode_ms = 0.0
+
+    def is_busy(self, camera_id: int) -> bool:
+        with self.lock:
+            return camera_id in self._busy
+
+    def submit(
+        self,
+        camera_id: int,
+        lease: FrameLease,
+        tiers: Iterable[PreviewTier],
+        on_done: Callable[[Dict[PreviewTier, bytes]], None],
+        quality_cap: Optional[int] = None
+    ) -> bool:
+        """
+        Queue an encode of the leased frame for the given tiers.
+
+        The lease is released by the worker. Returns False (lease not taken)
+        if an encode for this camera is still running.
+        """
+        with self.lock:
+            if camera_id in self._busy:
+                self.skipped_busy += 1
+                return False
+            self._busy.add(camera_id)
+            self.jobs += 1
+
+        try:
+            self.executor.submit(self._run, camera_id, lease, list(tiers), on_done, quality_cap)
+        except RuntimeError:
+            # Executor shut down
+            with self.lock:
+                self._busy.discard(camera_id)
+            return False
+        return True
+
+    def _run(self, camera_id, lease, tiers, on_done, quality_cap):
+        start = time.perf_counter()
+        try:
+            results = encode_tiers(lease.frame, tiers, quality_cap)
+        except Exception as e:
+            logger.error(f"Camera {camera_id}: Preview encode error - {e}")
+            results = {}
+        finally:
+            lease.release()
+            elapsed_ms = (time.perf_counter() - start) * 1000
+
+        with self.lock:
+            self.total_encode_ms += elapsed_ms
+            for tier, data in results.items():
+                self.encoded[tier] = self.encoded.get(tier, 0) + 1
+                self.encoded_bytes[tier] = self.encoded_bytes.get(tier, 0) + len(data)
+
+        try:
+            if results:
+                on_done(results)
+        except Exception as e:
+            logger.error(f"Camera {camera_id}: Preview dispatch error - {e}")
+        finally:
+            # The camera stays busy until its frames are handed off
+            with self.lock:
+                self._busy.discard(camera_id)
+
+    def get_stats(self) -> dict:
+        with self.lock:
+            return {
+                "jobs": self.jobs,
+                "skipped_busy": self.skipped_busy,
+                "avg_encode_ms": round(self.total_encode_ms / self.jobs, 2) if self.jobs else 0.0,
+                "tiers": [
+                    {
+                        **tier.to_dict(),
+                        "frames": count,
+                        "avg_bytes": self.encoded_bytes[tier] // count
+                    }
+                    for tier, count in self.encoded.items()
+                ]
+            }
+
+    def shutdown(self):
+        self.executor.shutdown(wait=False)
+
+
+# Global instance
+_preview_encoder: Optional[PreviewEncoder] = None
+
+
+def get_preview_encoder() -> PreviewEncoder:
+    """Get or create global PreviewEncoder instance."""
+    global _preview_encoder
+    if _preview_encoder is None:
+        _preview_encoder = PreviewEncoder(settings.PREVIEW_ENCODE_THREADS)
+    return _preview_encoder
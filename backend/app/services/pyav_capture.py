@@ -0,0 +1,137 @@
+import logging
+from typing import Optional, Tuple
+
+import numpy as np
+
+try:
+    import av
+    AV_AVAILABLE = True
+except ImportError:
+    av = None
+    AV_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+
+class PyAVCapture:
+    """
+    Packet-level ingestion backend with a cv2.VideoCapture-like interface.
+
+    Demuxes packets itself so that in "keyframes only" mode non-key packets are
+    dropped before they reach the decoder - only I-frames (~1 per GOP) are
+    decoded. When switching back to full decode, packets are skipped until the
+    next keyframe because P-frames need the frames that were not decoded.
+
+    grab() decodes (like OpenCV's FFmpeg backend), retrieve() only converts
+    the decoded frame to a BGR ndarray.
+    """
+
+    def __init__(self, url: str, open_timeout_ms: int = 10000):
+        self.url = url
+        self.container = None
+        self.stream = None
+        self._packets = None
+        self._frame = None
+
+        self.keyframes_only = False
+        self._await_keyframe = False
+
+        # Counters for monitoring decode savings
+        self.packets_demuxed = 0
+        self.packets_decoded = 0
+        self.last_pts_time: Optional[float] = None
+
+        if not AV_AVAILABLE:
+            logger.error("PyAV is not installed - pyav ingest backend unavailable")
+            return
+
+        options = {}
+        if url.startswith("rtsp://"):
+            # RTSP transport protokoli - TCP ishonchliroq
+            options = {"rtsp_transport": "tcp", "fflags": "nobuffer"}
+
+        try:
+            self.container = av.open(
+                url,
+                options=options,
+                timeout=(open_timeout_ms / 1000, 5.0)
+            )
+            self.stream = self.container.streams.video[0]
+            self.stream.thread_type = "AUTO"
+            self._packets = self.container.demux(self.stream)
+        except Exception as e:
+            logger.error(f"PyAV open failed for {url}: {e}")
+            self.release()
+
+    def isOpened(self) -> bool:
+        return self.container is not None
+
+    def set_keyframes_only(self, enabled: bool):
+        """Switch between full decode and keyframe-only decode."""
+        if enabled == self.keyframes_only:
+            return
+        self.keyframes_only = enabled
+        if not enabled:
+            # Skipped P-frames are missing - resume at the next keyframe
+            self._await_keyframe = True
+
+    def grab(self) -> bool:
+        """Demux packets until one decodes into a frame."""
+        if self._packets is None:
+            return False
+
+        try:
+            for packet in self._packets:
+                # Empty packet marks the end of the stream
+                if packet.size == 0:
+                    continue
+
+                self.packets_demuxed += 1
+
+                if (self.keyframes_only or self._await_keyframe) and not packet.is_keyframe:
+                    continue
+                self._await_keyframe = False
+
+                self.packets_decoded += 1
+                frames = packet.decode()
+                if frames:
+                    self._frame = frames[-1]
+                    self.last_pts_time = self._frame.time
+                    return True
+
+        except Exception as e:
+            logger.error(f"PyAV read error for {self.url}: {e}")
+
+        # End of stream or read error: close, so isOpened() is False and the stream reconnects
+        self.release()
+        return False
+
+    def retrieve(self, image: Optional[np.ndarray] = None) -> Tuple[bool, Optional[np.ndarray]]:
+        """Convert the last grabbed frame to a BGR ndarray (into image if it fits)."""
+        if self._frame is None:
+            return False, None
+        frame = self._frame.to_ndarray(format="bgr24")
+        if image is not None and image.shape == frame.shape:
+            np.copyto(image, frame)
+            return True, image
+        return True, frame
+
+    def read(self) -> Tuple[bool, Optional[np.ndarray]]:
+        if not self.grab():
+            return False, None
+        return self.retrieve()
+
+    def set(self, prop_id: int, value) -> bool:
+        # OpenCV capture properties are not applicable
+        return False
+
+    def release(self):
+        if self.container is not None:
+            try:
+                self.container.close()
+            except Exception as e:
+                logger.error(f"PyAV close error for {self.url}: {e}")
+        self.container = None
+        self.stream = None
+        self._packets = None
+        self._frame = None
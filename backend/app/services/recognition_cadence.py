@@ -0,0 +1,70 @@
+import logging
+import time
+from typing import Optional, FrozenSet
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class RecognitionCadence:
+    """
+    Adaptive recognition interval for a single camera.
+
+    - idle:   no faces -> interval backs off exponentially up to ADAPTIVE_MAX_INTERVAL_MS
+    - active: faces appeared or tracks changed -> snap to the fast interval
+    - stable: same tracks, all identified -> relax up to ADAPTIVE_STABLE_INTERVAL_MS
+    """
+
+    def __init__(self):
+        self.min_interval_ms = settings.RECOGNITION_INTERVAL_MS
+        self.max_interval_ms = max(settings.ADAPTIVE_MAX_INTERVAL_MS, self.min_interval_ms)
+        self.stable_interval_ms = max(settings.ADAPTIVE_STABLE_INTERVAL_MS, self.min_interval_ms)
+        self.backoff_factor = settings.ADAPTIVE_BACKOFF_FACTOR
+        self.relax_factor = settings.ADAPTIVE_RELAX_FACTOR
+
+        self.interval_ms: float = self.min_interval_ms
+        self.state = "active"
+        self.last_run_ms: float = 0
+        self._last_signature: Optional[FrozenSet[str]] = None
+
+    def is_due(self, floor_ms: float = 0, now_ms: Optional[float] = None) -> bool:
+        """Check if recognition is due. floor_ms is a global lower bound on the interval."""
+        now_ms = time.time() * 1000 if now_ms is None else now_ms
+        return now_ms - self.last_run_ms >= max(self.interval_ms, floor_ms)
+
+    def mark_run(self, now_ms: Optional[float] = None):
+        """Record that recognition was scheduled."""
+        self.last_run_ms = time.time() * 1000 if now_ms is None else now_ms
+
+    def update(self, signature: FrozenSet[str], all_identified: bool):
+        """
+        Adapt interval after a recognition result.
+
+        Args:
+            signature: Track keys seen in the frame (student ids / guest positions)
+            all_identified: True if every face in the frame was recognized
+        """
+        if not signature:
+            self.state = "idle"
+            self.interval_ms = min(self.interval_ms * self.backoff_factor, self.max_interval_ms)
+        elif signature != self._last_signature or not all_identified:
+            self.state = "active"
+            self.interval_ms = self.min_interval_ms
+        else:
+            self.state = "stable"
+            self.interval_ms = min(self.interval_ms * self.relax_factor, self.stable_interval_ms)
+
+        self._last_signature = signature
+
+    def reset(self):
+        """Snap back to the fast interval."""
+        self.state = "active"
+        self.interval_ms = self.min_interval_ms
+        self._last_signature = None
+
+    def to_dict(self) -> dict:
+        return {
+            "recognition_interval_ms": int(self.interval_ms),
+            "cadence_state": self.state
+        }
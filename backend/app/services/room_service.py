@@ -7,6 +7,7 @@ from sqlalchemy.orm import selectinload
 from app.models.room import Room
 from app.models.camera import Camera
 from app.core.config import settings
+from app.services.metadata_cache import get_metadata_cache
 
 logger = logging.getLogger(__name__)
 
@@ -26,6 +27,7 @@ class RoomService:
         db.add(room)
         await db.flush()
         await db.refresh(room)
+        get_metadata_cache().put_room(room)
         logger.info(f"Room created: {room.name} (ID: {room.id})")
         return room
 
@@ -86,6 +88,7 @@ class RoomService:
 
         await db.flush()
         await db.refresh(room)
+        get_metadata_cache().put_room(room)
         logger.info(f"Room updated: {room.name} (ID: {room.id})")
         return room
 
@@ -101,6 +104,7 @@ class RoomService:
 
         await db.delete(room)
         await db.flush()
+        get_metadata_cache().remove_room(room_id)
         logger.info(f"Room deleted: ID {room_id}")
         return True
 
@@ -111,7 +115,8 @@ class RoomService:
         db: AsyncSession,
         room_id: int,
         name: str,
-        rtsp_url: str
+        rtsp_url: str,
+        substream_url: Optional[str] = None
     ) -> Optional[Camera]:
         """Add a camera to a room."""
         # Check room exists
@@ -129,7 +134,8 @@ class RoomService:
         camera = Camera(
             room_id=room_id,
             name=name,
-            rtsp_url=rtsp_url
+            rtsp_url=rtsp_url,
+            substream_url=substream_url
         )
         db.add(camera)
         await db.flush()
@@ -194,6 +200,7 @@ class RoomService:
         camera_id: int,
         name: Optional[str] = None,
         rtsp_url: Optional[str] = None,
+        substream_url: Optional[str] = None,
         is_active: Optional[bool] = None
     ) -> Optional[Camera]:
         """Update camera."""
@@ -205,6 +212,9 @@ class RoomService:
             camera.name = name
         if rtsp_url is not None:
             camera.rtsp_url = rtsp_url
+        if substream_url is not None:
+            # Empty string removes the substream
+            camera.substream_url = substream_url or None
         if is_active is not None:
             camera.is_active = is_active
 
@@ -2,7 +2,7 @@ import cv2
 import numpy as np
 import asyncio
 import logging
-from typing import Optional, Callable, Tuple
+from typing import Optional, Callable, Tuple, List
 from datetime import datetime
 import threading
 import time
@@ -10,6 +10,22 @@ import time
 logger = logging.getLogger(__name__)
 
 
+class FrameRef:
+    """
+    Latest frame with its sequence number (FrameLease-compatible).
+
+    capture.read() allocates a new array per frame and last_frame is never
+    written in place, so readers can hold it without a copy.
+    """
+
+    def __init__(self, seq: int, frame: np.ndarray):
+        self.seq = seq
+        self.frame = frame
+
+    def release(self):
+        pass
+
+
 class RTSPStreamService:
     """RTSP stream service for reading and processing video frames."""
     
@@ -23,6 +39,8 @@ class RTSPStreamService:
         self.lock = threading.Lock()
         self.last_frame: Optional[np.ndarray] = None
         self.frame_count = 0
+        self.frame_seq = 0  # increases with every frame (never reset)
+        self.frame_listeners: List[Callable[[], None]] = []
         self.fps = 0
         self.last_fps_time = time.time()
     
@@ -166,6 +184,14 @@ class RTSPStreamService:
                     with self.lock:
                         self.last_frame = frame  # No copy for internal storage
                         self.frame_count += 1
+                        self.frame_seq += 1
+
+                    # Wake MJPEG encoders etc.
+                    for listener in list(self.frame_listeners):
+                        try:
+                            listener()
+                        except Exception as e:
+                            logger.error(f"Error in frame listener: {e}")
 
                     # Calculate FPS
                     current_time = time.time()
@@ -214,6 +240,22 @@ class RTSPStreamService:
                 return self.last_frame.copy()
             return None
     
+    def acquire_frame(self) -> Optional[FrameRef]:
+        """Latest frame without copying (read-only) with its sequence number."""
+        with self.lock:
+            if self.last_frame is None:
+                return None
+            return FrameRef(self.frame_seq, self.last_frame)
+
+    def add_frame_listener(self, listener: Callable[[], None]):
+        """Call listener() from the capture thread after each new frame."""
+        if listener not in self.frame_listeners:
+            self.frame_listeners.append(listener)
+
+    def remove_frame_listener(self, listener: Callable[[], None]):
+        if listener in self.frame_listeners:
+            self.frame_listeners.remove(listener)
+
     def get_status(self) -> dict:
         """
         Get stream status.
@@ -0,0 +1,564 @@
+import logging
+import multiprocessing as mp
+import os
+import queue
+import threading
+import time
+from datetime import datetime
+from multiprocessing import shared_memory
+from typing import Optional, Callable, Dict, List, Tuple
+
+import numpy as np
+
+from app.core.config import settings
+from app.services.frame_ring import FrameRingBuffer, FrameLease
+from app.services.multi_rtsp_service import (
+    MultiRTSPStreamManager, RTSPStreamInstance, SupervisedCamera
+)
+from app.services.recognition_cadence import RecognitionCadence
+
+logger = logging.getLogger(__name__)
+
+# seq header (one int64 per slot), padded so frames start cache-line aligned
+_HEADER_BYTES = 64
+
+
+class SharedFrameRing:
+    """
+    Per-camera ring of frame slots in multiprocessing.shared_memory.
+
+    Written by one ingest worker, read by the API process. Each slot has a
+    sequence number in the header: -1 while being written, then the frame's
+    seq. Readers check it before and after copying and drop torn frames.
+    """
+
+    def __init__(self, shm: shared_memory.SharedMemory, shape: Tuple[int, ...], dtype: np.dtype, slots: int):
+        self.shm = shm
+        self.shape = tuple(shape)
+        self.dtype = np.dtype(dtype)
+        self.slots = slots
+        self.header = np.ndarray((slots,), dtype=np.int64, buffer=shm.buf, offset=0)
+        self.frames = np.ndarray((slots,) + self.shape, dtype=self.dtype, buffer=shm.buf, offset=_HEADER_BYTES)
+        self.seq = 0
+
+    @staticmethod
+    def nbytes(shape: Tuple[int, ...], dtype: np.dtype, slots: int) -> int:
+        return _HEADER_BYTES + slots * int(np.prod(shape)) * np.dtype(dtype).itemsize
+
+    @classmethod
+    def create(cls, name: str, shape: Tuple[int, ...], dtype: np.dtype, slots: int) -> "SharedFrameRing":
+        if slots * 8 > _HEADER_BYTES:
+            raise ValueError(f"At most {_HEADER_BYTES // 8} slots supported")
+        shm = shared_memory.SharedMemory(name=name, create=True, size=cls.nbytes(shape, dtype, slots))
+        ring = cls(shm, shape, dtype, slots)
+        ring.header[:] = 0
+        return ring
+
+    @classmethod
+    def attach(cls, name: str, shape: Tuple[int, ...], dtype: np.dtype, slots: int) -> "SharedFrameRing":
+        # Spawned workers share the API process' resource tracker, so the
+        # segment stays registered once and is unlinked by the worker
+        shm = shared_memory.SharedMemory(name=name)
+        return cls(shm, shape, dtype, slots)
+
+    def write(self, frame: np.ndarray) -> Tuple[int, int]:
+        """Copy a frame into the next slot. Returns (slot, seq)."""
+        self.seq += 1
+        slot = self.seq % self.slots
+        self.header[slot] = -1
+        np.copyto(self.frames[slot], frame)
+        self.header[slot] = self.seq
+        return slot, self.seq
+
+    def read_into(self, slot: int, seq: int, out: np.ndarray) -> bool:
+        """Copy slot into out if it still holds seq. False if overwritten."""
+        if self.header[slot] != seq:
+            return False
+        np.copyto(out, self.frames[slot])
+        return self.header[slot] == seq
+
+    def close(self):
+        # Drop ndarray views before closing the mapping
+        self.header = None
+        self.frames = None
+        try:
+            self.shm.close()
+        except Exception:
+            pass
+
+    def unlink(self):
+        try:
+            self.shm.unlink()
+        except FileNotFoundError:
+            pass
+
+
+# ==================== Worker Process ====================
+
+def ingest_worker_main(shard_index: int, control: mp.Queue, events: mp.Queue):
+    """
+    Ingest worker process: decodes its shard of cameras and publishes frames.
+
+    Control messages:  ("start", camera_id, rtsp_url, room_id, timeout)
+                       ("stop", camera_id), ("shutdown",)
+    Events:            ("started", camera_id, ok)
+                       ("ring", camera_id, shm_name, shape, dtype, slots)
+                       ("frame", camera_id, slot, seq, timestamp, pts, ingest_time)
+                       ("lost", camera_id)
+    """
+    logging.basicConfig(level=logging.INFO, format=f"[ingest-{shard_index}] %(levelname)s %(message)s")
+    streams: Dict[int, RTSPStreamInstance] = {}
+    rings: Dict[int, SharedFrameRing] = {}
+    starts: Dict[int, int] = {}  # camera_id -> latest start request still connecting
+    lock = threading.Lock()
+    min_interval = 1.0 / max(1, settings.SHARD_DECODE_FPS)
+
+    def release_ring(camera_id: int):
+        ring = rings.pop(camera_id, None)
+        if ring is not None:
+            ring.close()
+            ring.unlink()
+
+    def make_publisher(camera_id: int):
+        generation = [0]
+
+        def publish(frame: np.ndarray, timestamp: datetime, room_id: int, cam_id: int):
+            ring = rings.get(camera_id)
+            if ring is None or ring.shape != frame.shape:
+                release_ring(camera_id)
+                generation[0] += 1
+                name = f"anvar_{os.getpid()}_{camera_id}_{generation[0]}"
+                ring = SharedFrameRing.create(name, frame.shape, frame.dtype, settings.SHARD_RING_SLOTS)
+                rings[camera_id] = ring
+                events.put(("ring", camera_id, name, frame.shape, frame.dtype.str, ring.slots))
+
+            slot, seq = ring.write(frame)
+            # CLOCK_MONOTONIC is system-wide, so ingest_time is valid in the API process
+            stream = streams.get(camera_id)
+            pts = stream.last_pts if stream else None
+            ingest_time = stream.last_ingest_time if stream else None
+            events.put(("frame", camera_id, slot, seq, timestamp.timestamp(), pts, ingest_time))
+
+        return publish
+
+    def make_rate_limit():
+        last = [0.0]
+
+        def due(room_id: int, camera_id: int) -> bool:
+            now = time.monotonic()
+            if now - last[0] >= min_interval:
+                last[0] = now
+                return True
+            return False
+
+        return due
+
+    def start_camera(camera_id: int, rtsp_url: str, room_id: int, timeout: int, request: int):
+        stream = RTSPStreamInstance(camera_id, rtsp_url, room_id)
+        ok = stream.connect(timeout)
+        with lock:
+            current = starts.get(camera_id) == request
+            if current:
+                del starts[camera_id]
+                if ok:
+                    streams[camera_id] = stream
+        if not current:
+            # Superseded by a newer start or stopped while connecting
+            if ok:
+                stream.disconnect()
+            return
+        if ok:
+            stream.on_lost = lambda s: events.put(("lost", s.camera_id))
+            stream.start_streaming(make_publisher(camera_id), make_rate_limit())
+        events.put(("started", camera_id, ok))
+
+    def stop_camera(camera_id: int):
+        with lock:
+            starts.pop(camera_id, None)
+            stream = streams.pop(camera_id, None)
+        if stream is not None:
+            stream.on_lost = None
+            stream.stop_streaming()
+            stream.disconnect()
+        release_ring(camera_id)
+
+    logger.info(f"Ingest worker {shard_index} started (pid {os.getpid()})")
+    requests = 0
+    while True:
+        message = control.get()
+        command = message[0]
+
+        if command == "start":
+            _, camera_id, rtsp_url, room_id, timeout = message
+            # A retried start replaces the camera's stream or pending start
+            stop_camera(camera_id)
+            requests += 1
+            with lock:
+                starts[camera_id] = requests
+            # Connect in a thread so one dead camera does not block the shard
+            threading.Thread(
+                target=start_camera, args=(camera_id, rtsp_url, room_id, timeout, requests), daemon=True
+            ).start()
+        elif command == "stop":
+            stop_camera(message[1])
+        elif command == "shutdown":
+            with lock:
+                camera_ids = set(streams) | set(starts)
+            for camera_id in camera_ids:
+                stop_camera(camera_id)
+            break
+
+    logger.info(f"Ingest worker {shard_index} stopped")
+
+
+# ==================== API Process ====================
+
+class IngestShard:
+    """API-side handle of one ingest worker process and its event dispatcher."""
+
+    # How often the dispatcher checks the worker is alive while no events arrive
+    LIVENESS_INTERVAL = 1.0
+
+    def __init__(self, index: int):
+        self.index = index
+        self.proxies: Dict[int, "ShardedStreamProxy"] = {}
+        self.lock = threading.Lock()
+        self.process: Optional[mp.Process] = None
+        self._ctx = mp.get_context("spawn")
+        self.control = self._ctx.Queue()
+        self.events = self._ctx.Queue()
+        self._dispatcher: Optional[threading.Thread] = None
+        self._dead_process: Optional[mp.Process] = None
+
+    def ensure_started(self):
+        with self.lock:
+            if self.process is not None and self.process.is_alive():
+                return
+            lost = self._reset_dead_worker()
+            self.process = self._ctx.Process(
+                target=ingest_worker_main,
+                args=(self.index, self.control, self.events),
+                daemon=True,
+                name=f"ingest-{self.index}"
+            )
+            self.process.start()
+            if self._dispatcher is None:
+                self._dispatcher = threading.Thread(
+                    target=self._dispatch_loop, daemon=True, name=f"ingest-dispatch-{self.index}"
+                )
+                self._dispatcher.start()
+            logger.info(f"Ingest shard {self.index} started (pid {self.process.pid})")
+        self._notify_lost(lost)
+
+    def send(self, message: tuple):
+        self.ensure_started()
+        self.control.put(message)
+
+    def register(self, proxy: "ShardedStreamProxy"):
+        with self.lock:
+            self.proxies[proxy.camera_id] = proxy
+
+    def unregister(self, proxy: "ShardedStreamProxy"):
+        with self.lock:
+            if self.proxies.get(proxy.camera_id) is proxy:
+                del self.proxies[proxy.camera_id]
+
+    def _dispatch_loop(self):
+        while True:
+            try:
+                message = self.events.get(timeout=self.LIVENESS_INTERVAL)
+            except queue.Empty:
+                self._check_worker()
+                continue
+            except (EOFError, OSError):
+                return
+
+            if message is None:
+                return
+
+            with self.lock:
+                proxy = self.proxies.get(message[1])
+            if proxy is None:
+                continue
+
+            try:
+                kind = message[0]
+                if kind == "frame":
+                    proxy.on_frame(*message[2:])
+                elif kind == "ring":
+                    proxy.on_ring(message[2], message[3], message[4], message[5])
+                elif kind == "started":
+                    proxy.on_started(message[2])
+                elif kind == "lost":
+                    proxy.on_worker_lost()
+            except Exception as e:
+                logger.error(f"Ingest shard {self.index}: Event error for camera {message[1]} - {e}")
+
+    def _check_worker(self):
+        with self.lock:
+            if self.process is None or self.process.is_alive():
+                return
+            lost = self._reset_dead_worker()
+        self._notify_lost(lost)
+
+    def _reset_dead_worker(self) -> List["ShardedStreamProxy"]:
+        """
+        Handle a worker that exited on its own (call with lock held).
+
+        A crashed or killed worker sends no "lost" events, so every proxy
+        of the shard is returned to be told once. The worker may have died
+        holding a queue lock, which would block later puts and gets (and
+        interpreter exit), so the queues are replaced.
+        """
+        process = self.process
+        if process is None or process is self._dead_process:
+            return []
+        self._dead_process = process
+        logger.error(f"Ingest shard {self.index}: Worker process exited (code {process.exitcode})")
+
+        for old in (self.control, self.events):
+            old.cancel_join_thread()
+        self.control = self._ctx.Queue()
+        self.events = self._ctx.Queue()
+        return list(self.proxies.values())
+
+    def _notify_lost(self, proxies: List["ShardedStreamProxy"]):
+        for proxy in proxies:
+            try:
+                proxy.on_worker_lost()
+            except Exception as e:
+                logger.error(f"Ingest shard {self.index}: Lost handler error for camera {proxy.camera_id} - {e}")
+
+    def stop(self):
+        with self.lock:
+            # Exiting on request is not a lost worker
+            self._dead_process = self.process
+        if self.process is not None and self.process.is_alive():
+            self.control.put(("shutdown",))
+            self.process.join(timeout=5)
+            if self.process.is_alive():
+                self.process.terminate()
+        self.events.put(None)
+
+
+class ShardedStreamProxy:
+    """
+    API-process stand-in for an RTSPStreamInstance decoded in a worker process.
+
+    Descriptors (camera_id, slot, seq, timestamp) arrive over the shard event
+    queue. Frames a consumer needs are copied once from shared memory into
+    the local FrameRingBuffer, so all existing readers (callbacks, leases,
+    snapshots) work unchanged.
+    """
+
+    def __init__(self, shard: IngestShard, camera_id: int, rtsp_url: str, room_id: int):
+        self.shard = shard
+        self.camera_id = camera_id
+        self.rtsp_url = rtsp_url
+        self.room_id = room_id
+        self.high_res = None  # dual-stream main stream is not opened in sharded mode
+
+        self.is_connected = False
+        self.is_running = False
+        self.state = "disconnected"
+        self.on_lost: Optional[Callable] = None
+        self.frame_callback: Optional[Callable] = None
+        self.decode_predicate: Optional[Callable] = None
+
+        self.ring = FrameRingBuffer(settings.FRAME_RING_SIZE)
+        self.cadence = RecognitionCadence()
+        self.shared: Optional[SharedFrameRing] = None
+
+        self.frame_count = 0
+        self.decoded_count = 0
+        self.dropped_count = 0
+        self.fps = 0
+        self.decode_fps = 0
+        self.last_fps_time = time.time()
+
+        self._started = threading.Event()
+        self._start_ok = False
+        self._frame_requested = threading.Event()
+        self._frame_ready = threading.Event()
+
+    # ==================== Lifecycle ====================
+
+    def connect(self, timeout: int = 30) -> bool:
+        self.state = "connecting"
+        self.shard.register(self)
+        self._started.clear()
+        self.shard.send(("start", self.camera_id, self.rtsp_url, self.room_id, timeout))
+
+        if not self._started.wait(timeout + 5) or not self._start_ok:
+            logger.error(f"Camera {self.camera_id}: Connection failed in ingest shard {self.shard.index}")
+            self.disconnect()
+            return False
+
+        self.is_connected = True
+        self.state = "connected"
+        logger.info(f"Camera {self.camera_id}: Connected in ingest shard {self.shard.index}")
+        return True
+
+    def start_streaming(self, frame_callback: Optional[Callable] = None, decode_predicate: Optional[Callable] = None):
+        self.frame_callback = frame_callback
+        self.decode_predicate = decode_predicate
+        self.is_running = True
+        self.state = "streaming"
+
+    def stop_streaming(self):
+        self.is_running = False
+
+    def disconnect(self):
+        self.is_running = False
+        self.is_connected = False
+        self.state = "disconnected"
+        self.shard.unregister(self)
+        try:
+            self.shard.send(("stop", self.camera_id))
+        except Exception as e:
+            logger.error(f"Camera {self.camera_id}: Stop message failed - {e}")
+        if self.shared is not None:
+            self.shared.close()
+            self.shared = None
+        self.ring.clear()
+
+    # ==================== Shard Events ====================
+
+    def on_started(self, ok: bool):
+        self._start_ok = ok
+        self._started.set()
+
+    def on_ring(self, name: str, shape: Tuple[int, ...], dtype: str, slots: int):
+        if self.shared is not None:
+            self.shared.close()
+        self.shared = SharedFrameRing.attach(name, shape, dtype, slots)
+        self.ring.allocate(tuple(shape), np.dtype(dtype))
+
+    def on_frame(
+        self,
+        slot: int,
+        seq: int,
+        timestamp: float,
+        pts: Optional[float] = None,
+        ingest_time: Optional[float] = None
+    ):
+        self.frame_count += 1
+        self._update_fps()
+
+        if self.shared is None or not self._needs_frame():
+            return
+
+        local_slot, buffer = self.ring.begin_write()
+        if buffer is None:
+            buffer = np.empty(self.shared.shape, dtype=self.shared.dtype)
+        if not self.shared.read_into(slot, seq, buffer):
+            # Worker already reused the slot - API is lagging
+            self.dropped_count += 1
+            return
+
+        frame_time = datetime.fromtimestamp(timestamp)
+        self.ring.commit(local_slot, buffer, frame_time, pts=pts, ingest_time=ingest_time)
+        self.decoded_count += 1
+        self._frame_ready.set()
+
+        lease = self.ring.acquire_latest() if self.frame_callback and self.is_running else None
+        if lease is not None:
+            try:
+                self.frame_callback(lease.frame, frame_time, self.room_id, self.camera_id)
+            except Exception as e:
+                logger.error(f"Camera {self.camera_id}: Callback error - {e}")
+            finally:
+                lease.release()
+
+    def on_worker_lost(self):
+        lost = self.is_running
+        self.is_running = False
+        self.is_connected = False
+        self.state = "disconnected"
+        if lost and self.on_lost:
+            self.on_lost(self)
+
+    def _needs_frame(self) -> bool:
+        if self._frame_requested.is_set():
+            self._frame_requested.clear()
+            return True
+        if not self.is_running or self.decode_predicate is None:
+            return True
+        try:
+            return bool(self.decode_predicate(self.room_id, self.camera_id))
+        except Exception as e:
+            logger.error(f"Camera {self.camera_id}: Decode predicate error - {e}")
+            return True
+
+    def _update_fps(self):
+        current_time = time.time()
+        if current_time - self.last_fps_time >= 1.0:
+            self.fps = self.frame_count
+            self.decode_fps = self.decoded_count
+            self.frame_count = 0
+            self.decoded_count = 0
+            self.last_fps_time = current_time
+
+    # ==================== Readers ====================
+
+    def acquire_frame(self) -> Optional[FrameLease]:
+        return self.ring.acquire_latest()
+
+    def get_frame(self) -> Optional[np.ndarray]:
+        return self.ring.copy_latest()
+
+    def request_frame(self, timeout: float = 2.0) -> Optional[np.ndarray]:
+        if not self.is_running:
+            return self.get_frame()
+        self._frame_ready.clear()
+        self._frame_requested.set()
+        self._frame_ready.wait(timeout)
+        return self.get_frame()
+
+    def get_high_res_frame(self) -> Optional[np.ndarray]:
+        return None
+
+    def get_status(self) -> dict:
+        return {
+            "camera_id": self.camera_id,
+            "room_id": self.room_id,
+            "connected": self.is_connected,
+            "running": self.is_running,
+            "state": self.state,
+            "rtsp_url": self.rtsp_url,
+            "fps": self.fps,
+            "decode_fps": self.decode_fps,
+            "ingest_shard": self.shard.index,
+            "dropped_frames": self.dropped_count,
+            "frame_seq": self.ring.latest_seq(),
+            "ring_pinned": self.ring.pinned_count(),
+            "dual_stream": False,
+            "high_res_open": False,
+            **self.cadence.to_dict()
+        }
+
+
+class ShardedIngestManager(MultiRTSPStreamManager):
+    """
+    MultiRTSPStreamManager whose cameras decode in INGEST_WORKERS processes.
+
+    Cameras are sharded by camera_id. Supervisor, connect pool and status
+    APIs are inherited; only the stream objects are proxies.
+    """
+
+    def __init__(self, workers: Optional[int] = None):
+        super().__init__()
+        count = max(1, workers or settings.INGEST_WORKERS)
+        self.shards = [IngestShard(i) for i in range(count)]
+        logger.info(f"Sharded ingestion enabled with {count} worker processes")
+
+    def _create_stream(self, camera: SupervisedCamera) -> ShardedStreamProxy:
+        if camera.high_res_url:
+            logger.warning(f"Camera {camera.camera_id}: Dual-stream high-res not available in sharded mode")
+        shard = self.shards[camera.camera_id % len(self.shards)]
+        return ShardedStreamProxy(shard, camera.camera_id, camera.rtsp_url, camera.room_id)
+
+    def shutdown(self):
+        super().shutdown()
+        for shard in self.shards:
+            shard.stop()
@@ -0,0 +1,191 @@
+import asyncio
+import logging
+import time
+from collections import deque, OrderedDict
+from typing import Optional, Callable, Deque, Dict, Hashable, Tuple, Any
+
+from app.core.config import settings
+from app.core.json_codec import dumps
+
+logger = logging.getLogger(__name__)
+
+# Message kinds in send priority order
+KIND_CONTROL = "control"      # initial state, pong, errors - bounded FIFO
+KIND_PRESENCE = "presence"    # presence updates - coalesced per room
+KIND_DETECTION = "detection"  # face detections - latest only
+KIND_FRAME = "frame"          # JPEG preview frames - latest only
+KINDS = (KIND_CONTROL, KIND_PRESENCE, KIND_DETECTION, KIND_FRAME)
+
+
+class SubscriberChannel:
+    """
+    Outbound queue and writer task of one WebSocket subscriber.
+
+    Broadcasters only enqueue (never await the socket), so one slow client
+    cannot delay the others. Each message kind has its own drop policy:
+    frames and detections keep only the latest message, presence updates
+    are coalesced per room (a newer snapshot replaces the pending one) and
+    control messages are a small FIFO that drops the oldest on overflow.
+
+    Payloads may be dicts, pre-encoded JSON text (json_codec.dumps, so a
+    broadcast is serialized once for all subscribers) or bytes (frames).
+
+    Must be used from the event loop thread.
+    """
+
+    def __init__(
+        self,
+        websocket,
+        label: str = "",
+        on_close: Optional[Callable[["SubscriberChannel"], None]] = None,
+        max_control: int = 32,
+        send_timeout: Optional[float] = None
+    ):
+        self.websocket = websocket
+        self.label = label
+        self.on_close = on_close
+        self.max_control = max_control
+        self.send_timeout = send_timeout or settings.WS_SEND_TIMEOUT_SECONDS
+
+        # (enqueued_at, payload) per kind
+        self._control: Deque[Tuple[float, Any]] = deque()
+        self._presence: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+        self._detection: Optional[Tuple[float, Any]] = None
+        self._frame: Optional[Tuple[float, Any]] = None
+
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self.closed = False
+
+        # Per-client counters
+        self.sent: Dict[str, int] = {kind: 0 for kind in KINDS}
+        self.dropped: Dict[str, int] = {kind: 0 for kind in KINDS}
+        self.last_lag_ms = 0.0
+        self.max_lag_ms = 0.0
+        self.connected_at = time.time()
+
+    def start(self) -> "SubscriberChannel":
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._writer())
+        return self
+
+    # ==================== Enqueue (non-blocking) ====================
+
+    def send_frame(self, data: bytes):
+        if self.closed:
+            return
+        if self._frame is not None:
+            self.dropped[KIND_FRAME] += 1
+        self._frame = (time.monotonic(), data)
+        self._wakeup.set()
+
+    def send_detection(self, message):
+        if self.closed:
+            return
+        if self._detection is not None:
+            self.dropped[KIND_DETECTION] += 1
+        self._detection = (time.monotonic(), message)
+        self._wakeup.set()
+
+    def send_presence(self, key: Hashable, message):
+        """Queue a presence snapshot; replaces a pending one with the same key (room)."""
+        if self.closed:
+            return
+        pending = self._presence.pop(key, None)
+        if pending is not None:
+            self.dropped[KIND_PRESENCE] += 1
+            # Keep the original enqueue time so lag reflects how stale the room view is
+            self._presence[key] = (pending[0], message)
+        else:
+            self._presence[key] = (time.monotonic(), message)
+        self._wakeup.set()
+
+    def send_control(self, message):
+        if self.closed:
+            return
+        if len(self._control) >= self.max_control:
+            self._control.popleft()
+            self.dropped[KIND_CONTROL] += 1
+        self._control.append((time.monotonic(), message))
+        self._wakeup.set()
+
+    def pending(self) -> int:
+        return (
+            len(self._control) + len(self._presence)
+            + (self._detection is not None) + (self._frame is not None)
+        )
+
+    # ==================== Writer ====================
+
+    def _next(self) -> Optional[Tuple[str, float, Any]]:
+        if self._control:
+            enqueued_at, payload = self._control.popleft()
+            return KIND_CONTROL, enqueued_at, payload
+        if self._presence:
+            _, (enqueued_at, payload) = self._presence.popitem(last=False)
+            return KIND_PRESENCE, enqueued_at, payload
+        if self._detection is not None:
+            (enqueued_at, payload), self._detection = self._detection, None
+            return KIND_DETECTION, enqueued_at, payload
+        if self._frame is not None:
+            (enqueued_at, payload), self._frame = self._frame, None
+            return KIND_FRAME, enqueued_at, payload
+        return None
+
+    async def _send(self, kind: str, payload):
+        if isinstance(payload, bytes):
+            await self.websocket.send_bytes(payload)
+        elif isinstance(payload, str):
+            await self.websocket.send_text(payload)
+        else:
+            await self.websocket.send_text(dumps(payload))
+
+    async def _writer(self):
+        try:
+            while not self.closed:
+                item = self._next()
+                if item is None:
+                    self._wakeup.clear()
+                    await self._wakeup.wait()
+                    continue
+
+                kind, enqueued_at, payload = item
+                lag_ms = (time.monotonic() - enqueued_at) * 1000
+                self.last_lag_ms = lag_ms
+                self.max_lag_ms = max(self.max_lag_ms, lag_ms)
+
+                # A client that cannot take a message within the timeout is dropped
+                await asyncio.wait_for(self._send(kind, payload), self.send_timeout)
+                self.sent[kind] += 1
+
+        except asyncio.CancelledError:
+            pass
+        except asyncio.TimeoutError:
+            logger.warning(f"WebSocket {self.label}: Send timed out, closing slow client")
+        except Exception as e:
+            logger.debug(f"WebSocket {self.label}: Send failed - {e}")
+        finally:
+            self.closed = True
+            if self.on_close:
+                try:
+                    self.on_close(self)
+                except Exception as e:
+                    logger.error(f"WebSocket {self.label}: on_close error - {e}")
+
+    def close(self):
+        """Stop the writer task (pending messages are discarded)."""
+        self.closed = True
+        if self._task is not None and not self._task.done():
+            self._task.cancel()
+
+    def get_stats(self) -> dict:
+        return {
+            "label": self.label,
+            "pending": self.pending(),
+            "sent": dict(self.sent),
+            "dropped": dict(self.dropped),
+            "last_lag_ms": round(self.last_lag_ms, 1),
+            "max_lag_ms": round(self.max_lag_ms, 1),
+            "connected_seconds": round(time.time() - self.connected_at, 1),
+            "closed": self.closed
+        }
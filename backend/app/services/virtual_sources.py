@@ -0,0 +1,249 @@
+import glob
+import logging
+import os
+import time
+from typing import Optional, List, Tuple
+from urllib.parse import urlparse, parse_qs
+
+import cv2
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Pacing: "realtime" behaves like a live camera, "fast" as fast as the consumer reads
+PACE_REALTIME = "realtime"
+PACE_FAST = "fast"
+
+
+def is_virtual_source(url: str) -> bool:
+    return url.startswith("file://") or url.startswith("synthetic://")
+
+
+def open_virtual_source(url: str):
+    """
+    Open a local camera source with a cv2.VideoCapture-like interface.
+
+    file:///path/video.mp4?loop=1&pace=realtime
+        Local video, looped by default. pace=fast reads as fast as possible.
+    synthetic://640x480?fps=25&faces=/path/to/faces&count=3&pace=realtime
+        Generated frames; optional face images (file or directory) are
+        pasted as moving sprites so a real detector finds faces offline.
+    """
+    parsed = urlparse(url)
+    query = {key: values[-1] for key, values in parse_qs(parsed.query).items()}
+    pace = query.get("pace", PACE_REALTIME)
+
+    if parsed.scheme == "file":
+        path = parsed.netloc + parsed.path
+        return FileCapture(path, loop=query.get("loop", "1") != "0", pace=pace)
+
+    width, height = 640, 480
+    if parsed.netloc:
+        width, height = (int(v) for v in parsed.netloc.lower().split("x"))
+    return SyntheticCapture(
+        width,
+        height,
+        fps=float(query.get("fps", 25)),
+        faces=query.get("faces"),
+        count=int(query.get("count", 1)),
+        pace=pace
+    )
+
+
+class _Pacer:
+    """Frame clock of a live camera: frame index due at the current time."""
+
+    def __init__(self, fps: float):
+        self.interval = 1.0 / max(1.0, fps)
+        self.start: Optional[float] = None
+
+    def due_index(self) -> int:
+        now = time.monotonic()
+        if self.start is None:
+            self.start = now
+        return int((now - self.start) / self.interval)
+
+    def wait_for(self, index: int):
+        """Sleep until frame index is 'captured'."""
+        if self.start is None:
+            self.start = time.monotonic()
+        delay = self.start + index * self.interval - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+
+
+class FileCapture:
+    """
+    Local video file as a camera.
+
+    Realtime pacing follows the file's frame rate like a live camera: a
+    consumer that is ahead waits for the next frame, one that fell behind
+    skips the frames it missed (a live stream drops them too).
+    """
+
+    def __init__(self, path: str, loop: bool = True, pace: str = PACE_REALTIME):
+        self.path = path
+        self.loop = loop
+        self.realtime = pace != PACE_FAST
+        self.capture = cv2.VideoCapture(path)
+        self.fps = (self.capture.get(cv2.CAP_PROP_FPS) or 25.0) if self.capture.isOpened() else 25.0
+        self._pacer = _Pacer(self.fps)
+        self.index = -1  # frames grabbed since open (across loops)
+        self.loops = 0
+        self.skipped = 0
+        self.last_pts_time: Optional[float] = None
+
+        if not self.capture.isOpened():
+            logger.error(f"Video file could not be opened: {path}")
+
+    def isOpened(self) -> bool:
+        return self.capture.isOpened()
+
+    def _grab_one(self) -> bool:
+        if self.capture.grab():
+            return True
+        if not self.loop:
+            return False
+        self.capture.set(cv2.CAP_PROP_POS_FRAMES, 0)
+        self.loops += 1
+        return self.capture.grab()
+
+    def grab(self) -> bool:
+        if self.realtime:
+            due = self._pacer.due_index()
+            # Behind the clock: drop missed frames
+            while self.index + 1 < due:
+                if not self._grab_one():
+                    return False
+                self.index += 1
+                self.skipped += 1
+            self._pacer.wait_for(self.index + 1)
+
+        if not self._grab_one():
+            return False
+        self.index += 1
+        self.last_pts_time = self.index / self.fps
+        return True
+
+    def retrieve(self, image: Optional[np.ndarray] = None) -> Tuple[bool, Optional[np.ndarray]]:
+        return self.capture.retrieve(image)
+
+    def read(self) -> Tuple[bool, Optional[np.ndarray]]:
+        if not self.grab():
+            return False, None
+        return self.retrieve()
+
+    def set(self, prop_id: int, value) -> bool:
+        return self.capture.set(prop_id, value)
+
+    def get(self, prop_id: int) -> float:
+        if prop_id == cv2.CAP_PROP_FPS:
+            return self.fps
+        return self.capture.get(prop_id)
+
+    def release(self):
+        self.capture.release()
+
+
+class SyntheticCapture:
+    """
+    Generated camera: scrolling background with optional moving face sprites.
+
+    Frames are rendered straight into the caller's buffer in retrieve(), so
+    the source itself costs little CPU and does not allocate per frame.
+    """
+
+    def __init__(
+        self,
+        width: int = 640,
+        height: int = 480,
+        fps: float = 25.0,
+        faces: Optional[str] = None,
+        count: int = 1,
+        pace: str = PACE_REALTIME
+    ):
+        self.width = width
+        self.height = height
+        self.fps = fps
+        self.realtime = pace != PACE_FAST
+        self._pacer = _Pacer(fps)
+        self.index = -1
+        self.last_pts_time: Optional[float] = None
+        self._opened = True
+
+        # Horizontal gradient, twice as wide so any offset gives a full frame
+        ramp = np.linspace(40, 200, width, dtype=np.float32)
+        row = np.concatenate([ramp, ramp[::-1]]).astype(np.uint8)
+        self._background = np.repeat(
+            np.repeat(row[None, :, None], height, axis=0), 3, axis=2
+        )
+
+        self._sprites = self._load_sprites(faces, count)
+
+    def _load_sprites(self, faces: Optional[str], count: int) -> List[np.ndarray]:
+        if not faces:
+            return []
+        paths = sorted(glob.glob(os.path.join(faces, "*"))) if os.path.isdir(faces) else [faces]
+        images = [image for image in (cv2.imread(path) for path in paths) if image is not None]
+        if not images:
+            logger.warning(f"No face images found in {faces}")
+            return []
+
+        size = max(32, min(self.width // (count + 1), self.height // 2))
+        sprites = []
+        for i in range(count):
+            image = images[i % len(images)]
+            scale = size / max(image.shape[:2])
+            sprites.append(cv2.resize(image, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA))
+        return sprites
+
+    def isOpened(self) -> bool:
+        return self._opened
+
+    def grab(self) -> bool:
+        if not self._opened:
+            return False
+        if self.realtime:
+            self.index = max(self.index + 1, self._pacer.due_index())
+            self._pacer.wait_for(self.index)
+        else:
+            self.index += 1
+        self.last_pts_time = self.index / self.fps
+        return True
+
+    def retrieve(self, image: Optional[np.ndarray] = None) -> Tuple[bool, Optional[np.ndarray]]:
+        if not self._opened or self.index < 0:
+            return False, None
+        if image is None or image.shape != (self.height, self.width, 3):
+            image = np.empty((self.height, self.width, 3), dtype=np.uint8)
+
+        offset = (self.index * 4) % self.width
+        np.copyto(image, self._background[:, offset:offset + self.width])
+
+        slots = len(self._sprites) + 1
+        for i, sprite in enumerate(self._sprites):
+            h, w = sprite.shape[:2]
+            # Each face drifts slowly around its own slot
+            x = int(self.width * (i + 1) / slots - w / 2 + 10 * np.sin(self.index / 15 + i))
+            y = int(self.height / 2 - h / 2 + 10 * np.cos(self.index / 20 + i))
+            x = min(max(0, x), self.width - w)
+            y = min(max(0, y), self.height - h)
+            image[y:y + h, x:x + w] = sprite
+
+        return True, image
+
+    def read(self) -> Tuple[bool, Optional[np.ndarray]]:
+        if not self.grab():
+            return False, None
+        return self.retrieve()
+
+    def set(self, prop_id: int, value) -> bool:
+        return False
+
+    def get(self, prop_id: int) -> float:
+        if prop_id == cv2.CAP_PROP_FPS:
+            return self.fps
+        return 0.0
+
+    def release(self):
+        self._opened = False
@@ -41,11 +41,13 @@ class RoomDetailResponse(BaseModel):
 class CameraCreate(BaseModel):
     name: str = Field(..., min_length=1, max_length=100)
     rtsp_url: str = Field(..., min_length=1, max_length=500)
+    substream_url: Optional[str] = Field(None, min_length=1, max_length=500)
 
 
 class CameraUpdate(BaseModel):
     name: Optional[str] = Field(None, min_length=1, max_length=100)
     rtsp_url: Optional[str] = Field(None, min_length=1, max_length=500)
+    substream_url: Optional[str] = Field(None, max_length=500)
     is_active: Optional[bool] = None
 
 
@@ -54,9 +56,10 @@ class CameraResponse(BaseModel):
     room_id: int
     name: str
     rtsp_url: str
+    substream_url: Optional[str] = None
     is_active: bool
     created_at: datetime
-    status: str = "disconnected"  # connected, streaming, disconnected
+    status: str = "disconnected"  # connecting, connected, streaming, disconnected
 
     class Config:
         from_attributes = True
@@ -67,8 +70,11 @@ class CameraStatusResponse(BaseModel):
     room_id: int
     connected: bool
     running: bool
+    state: Optional[str] = None  # connecting / connected / streaming / disconnected
     rtsp_url: str
     fps: int = 0
+    recognition_interval_ms: Optional[int] = None
+    cadence_state: Optional[str] = None
 
 
 # ==================== Presence Schemas ====================
@@ -116,6 +122,7 @@ class PresenceStatsResponse(BaseModel):
 
 class CameraControlRequest(BaseModel):
     timeout: int = Field(default=30, ge=5, le=120)
+    wait: bool = False  # True - ulanish tugashini kutish
 
 
 class CameraControlResponse(BaseModel):
@@ -0,0 +1,171 @@
+"""
+WebSocket broadcast serialization microbenchmark.
+
+Compares the old broadcast path (send_json per subscriber, i.e. one
+json.dumps per client) with encoding a message once and sending the same
+text to every subscriber, using stdlib json and orjson. Also pushes the
+messages through real SubscriberChannel writer tasks to measure the whole
+broadcast -> send path.
+
+Examples:
+    python scripts/benchmark_broadcast.py
+    python scripts/benchmark_broadcast.py --subscribers 50 --occupants 120 --messages 2000
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+from datetime import datetime
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.core import json_codec  # noqa: E402
+from app.services.subscriber_channel import SubscriberChannel  # noqa: E402
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Broadcast serialization microbenchmark")
+    parser.add_argument("--subscribers", type=int, default=50, help="WebSocket subscribers per broadcast")
+    parser.add_argument("--occupants", type=int, default=60, help="Occupants in the presence message")
+    parser.add_argument("--messages", type=int, default=1000, help="Broadcasts per measurement")
+    return parser.parse_args()
+
+
+def presence_message(occupants: int) -> dict:
+    """presence_diff message in which every occupant joined (the largest presence payload)."""
+    now = datetime.now()
+    return {
+        "type": "presence_diff",
+        "room_id": 1,
+        "room_name": "Xona 101",
+        "version": 42,
+        "new_recognitions": [{"student_id": 1, "name": "Talaba 1", "confidence": 0.8731}],
+        "left": [],
+        "updated": [],
+        "joined": [
+            {
+                "student_id": i,
+                "student_number": f"S{i:05d}",
+                "first_name": "Talaba",
+                "last_name": f"Familiya {i}",
+                "group_name": f"G{i % 12}",
+                "last_seen_at": now.isoformat(),
+                "confidence": 0.6 + (i % 40) / 100,
+                "camera_id": 1 + i % 4
+            }
+            for i in range(occupants)
+        ],
+        "total_count": occupants,
+        "guest_count": 2,
+        "total_people": occupants + 2,
+        "timestamp": now.isoformat(),
+        "camera_id": 1,
+        "frame_seq": 123456,
+        "pts": 4115.2,
+        "capture_time": now.isoformat(),
+        "latency_ms": 84.3,
+        "timings_ms": {"queue": 1.2, "detect": 38.5, "embed": 6.1, "search": 0.4, "db": 12.8}
+    }
+
+
+class NullWebSocket:
+    """Socket that accepts everything immediately (isolates the server-side cost)."""
+
+    def __init__(self):
+        self.messages = 0
+        self.bytes = 0
+
+    async def send_json(self, message):
+        # What Starlette's WebSocket.send_json does before sending
+        text = json.dumps(message, separators=(",", ":"), ensure_ascii=False)
+        self.bytes += len(text)
+        self.messages += 1
+
+    async def send_text(self, text: str):
+        self.bytes += len(text)
+        self.messages += 1
+
+    async def send_bytes(self, data: bytes):
+        self.bytes += len(data)
+        self.messages += 1
+
+
+def bench_encoding(message: dict, subscribers: int, messages: int) -> dict:
+    """Serialization cost per broadcast, in microseconds."""
+    results = {}
+
+    start = time.perf_counter()
+    for _ in range(messages):
+        for _ in range(subscribers):
+            json.dumps(message, separators=(",", ":"), ensure_ascii=False)
+    results["per_subscriber_json"] = (time.perf_counter() - start) / messages * 1e6
+
+    start = time.perf_counter()
+    for _ in range(messages):
+        json_codec.dumps_stdlib(message)
+    results["once_stdlib"] = (time.perf_counter() - start) / messages * 1e6
+
+    if json_codec.ORJSON_AVAILABLE:
+        start = time.perf_counter()
+        for _ in range(messages):
+            json_codec.dumps(message)
+        results["once_orjson"] = (time.perf_counter() - start) / messages * 1e6
+
+    return results
+
+
+async def bench_channels(message: dict, subscribers: int, messages: int, pre_encode: bool) -> float:
+    """Broadcast through SubscriberChannel writers; returns microseconds per broadcast."""
+    sockets = [NullWebSocket() for _ in range(subscribers)]
+    channels = [SubscriberChannel(ws, f"bench-{i}").start() for i, ws in enumerate(sockets)]
+
+    start = time.perf_counter()
+    for _ in range(messages):
+        payload = json_codec.dumps(message) if pre_encode else message
+        for channel in channels:
+            channel.send_control(payload)
+        # Let every writer drain its queue before the next broadcast
+        while any(channel.pending() for channel in channels):
+            await asyncio.sleep(0)
+        await asyncio.sleep(0)
+    elapsed = time.perf_counter() - start
+
+    for channel in channels:
+        channel.close()
+    return elapsed / messages * 1e6
+
+
+def main():
+    args = parse_args()
+    message = presence_message(args.occupants)
+    size = len(json_codec.dumps(message))
+
+    print(f"Message: presence_diff, {args.occupants} occupants, {size} bytes")
+    print(f"Subscribers: {args.subscribers}, broadcasts: {args.messages}")
+    print(f"orjson: {'available' if json_codec.ORJSON_AVAILABLE else 'not installed (stdlib fallback)'}")
+
+    encoding = bench_encoding(message, args.subscribers, args.messages)
+    baseline = encoding["per_subscriber_json"]
+    print("\n" + "=" * 60)
+    print("SERIALIZATION PER BROADCAST")
+    print("=" * 60)
+    print(f"{'method':<24}{'us/broadcast':>16}{'speedup':>12}")
+    for name, us in encoding.items():
+        print(f"{name:<24}{us:>16.1f}{baseline / us:>11.1f}x")
+
+    # Old channel path serializes in each writer (send_json); new path sends shared text
+    per_subscriber = asyncio.run(bench_channels(message, args.subscribers, args.messages, pre_encode=False))
+    shared = asyncio.run(bench_channels(message, args.subscribers, args.messages, pre_encode=True))
+    print("\n" + "=" * 60)
+    print("BROADCAST THROUGH SUBSCRIBER CHANNELS")
+    print("=" * 60)
+    print(f"{'method':<24}{'us/broadcast':>16}{'speedup':>12}")
+    print(f"{'encode per subscriber':<24}{per_subscriber:>16.1f}{1.0:>11.1f}x")
+    print(f"{'encode once':<24}{shared:>16.1f}{per_subscriber / shared:>11.1f}x")
+
+
+if __name__ == "__main__":
+    main()
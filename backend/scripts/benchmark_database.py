@@ -0,0 +1,194 @@
+"""
+SQLite mixed read/write benchmark.
+
+Runs the same presence + attendance load against two setups on a
+temporary database file:
+
+  baseline - one shared connection (StaticPool, default rollback journal),
+             every write in its own session and commit
+  tuned    - WAL + tuned pragmas, pooled reader connections, writes
+             through the single DatabaseWriter (batched commits)
+
+Readers do what dashboards and HTTP requests do (room presence join,
+today's attendance count, student lookup); writers do what recognition
+does (presence upserts, attendance inserts that may already exist).
+
+Examples:
+    python scripts/benchmark_database.py
+    python scripts/benchmark_database.py --readers 16 --writers 32 --seconds 10 --students 10000
+"""
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import date, datetime, timedelta
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import func, select  # noqa: E402
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert  # noqa: E402
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker  # noqa: E402
+
+from app.core.database import Base, create_engine  # noqa: E402
+from app.core.db_writer import DatabaseWriter  # noqa: E402
+from app.models import Attendance, Room, RoomPresence, Student  # noqa: E402
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="SQLite mixed read/write benchmark")
+    parser.add_argument("--students", type=int, default=5000, help="Students in the database")
+    parser.add_argument("--rooms", type=int, default=50, help="Rooms in the database")
+    parser.add_argument("--readers", type=int, default=8, help="Concurrent reader coroutines")
+    parser.add_argument("--writers", type=int, default=16, help="Concurrent writer coroutines (recognitions)")
+    parser.add_argument("--seconds", type=float, default=5.0, help="Duration per setup")
+    return parser.parse_args()
+
+
+async def seed(factory: async_sessionmaker, students: int, rooms: int):
+    async with factory() as db:
+        db.add_all(Room(id=i, name=f"Xona {i}") for i in range(1, rooms + 1))
+        db.add_all(
+            Student(id=i, student_id=f"S{i:06d}", first_name="Talaba", last_name=f"Familiya {i}", group_name=f"G{i % 40}")
+            for i in range(1, students + 1)
+        )
+        await db.commit()
+
+
+# ==================== Load ====================
+
+async def read_op(db: AsyncSession, args):
+    kind = random.random()
+    if kind < 0.5:
+        room_id = random.randint(1, args.rooms)
+        await db.execute(
+            select(RoomPresence, Student)
+            .join(Student, RoomPresence.student_id == Student.id)
+            .where(RoomPresence.room_id == room_id)
+        )
+    elif kind < 0.8:
+        await db.execute(select(func.count(Attendance.id)).where(Attendance.attendance_date == date.today()))
+    else:
+        await db.execute(select(Student).where(Student.id == random.randint(1, args.students)))
+
+
+def write_job(args):
+    """One recognition: presence upsert, or attendance insert (often a duplicate)."""
+    student_id = random.randint(1, args.students)
+    if random.random() < 0.7:
+        stmt = sqlite_insert(RoomPresence).values(
+            student_id=student_id,
+            room_id=random.randint(1, args.rooms),
+            last_seen_at=datetime.now(),
+            confidence_score=0.8
+        )
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[RoomPresence.student_id],
+            set_={"room_id": stmt.excluded.room_id, "last_seen_at": stmt.excluded.last_seen_at}
+        )
+    else:
+        stmt = sqlite_insert(Attendance).values(
+            student_id=student_id,
+            attendance_date=date.today() - timedelta(days=random.randint(0, 30)),
+            check_in_time=datetime.now().time(),
+            confidence_score=0.8
+        ).on_conflict_do_nothing()
+
+    async def job(db: AsyncSession):
+        await db.execute(stmt)
+    return job
+
+
+async def run_load(factory: async_sessionmaker, writer, args) -> dict:
+    read_ms, write_ms = [], []
+    deadline = time.perf_counter() + args.seconds
+
+    async def reader():
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            async with factory() as db:
+                await read_op(db, args)
+            read_ms.append((time.perf_counter() - start) * 1000)
+
+    async def writer_loop():
+        while time.perf_counter() < deadline:
+            job = write_job(args)
+            start = time.perf_counter()
+            if writer is None:
+                async with factory() as db:
+                    await job(db)
+                    await db.commit()
+            else:
+                await writer.submit(job)
+            write_ms.append((time.perf_counter() - start) * 1000)
+
+    start = time.perf_counter()
+    await asyncio.gather(
+        *(reader() for _ in range(args.readers)),
+        *(writer_loop() for _ in range(args.writers))
+    )
+    elapsed = time.perf_counter() - start
+
+    def p95(values):
+        return statistics.quantiles(values, n=20)[18] if len(values) >= 20 else max(values, default=0.0)
+
+    return {
+        "reads_per_s": len(read_ms) / elapsed,
+        "writes_per_s": len(write_ms) / elapsed,
+        "read_p50": statistics.median(read_ms) if read_ms else 0.0,
+        "read_p95": p95(read_ms),
+        "write_p50": statistics.median(write_ms) if write_ms else 0.0,
+        "write_p95": p95(write_ms),
+    }
+
+
+async def bench(tuned: bool, args) -> dict:
+    with tempfile.TemporaryDirectory() as tmp:
+        url = f"sqlite+aiosqlite:///{os.path.join(tmp, 'bench.db')}"
+        engine = create_engine(url, tuned=tuned)
+        factory = async_sessionmaker(engine, expire_on_commit=False)
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        await seed(factory, args.students, args.rooms)
+
+        writer = DatabaseWriter(factory) if tuned else None
+        try:
+            result = await run_load(factory, writer, args)
+            if writer is not None:
+                result["writer"] = writer.get_stats()
+        finally:
+            if writer is not None:
+                await writer.stop()
+            await engine.dispose()
+        return result
+
+
+def main():
+    args = parse_args()
+    print(f"Students: {args.students}, rooms: {args.rooms}, readers: {args.readers}, "
+          f"writers: {args.writers}, {args.seconds}s per setup")
+
+    results = {
+        "baseline": asyncio.run(bench(False, args)),
+        "tuned": asyncio.run(bench(True, args)),
+    }
+
+    print("\n" + "=" * 84)
+    print(f"{'setup':<10}{'reads/s':>10}{'writes/s':>10}{'read p50':>11}{'read p95':>11}{'write p50':>12}{'write p95':>12}  (ms)")
+    print("=" * 84)
+    for name, r in results.items():
+        print(f"{name:<10}{r['reads_per_s']:>10.0f}{r['writes_per_s']:>10.0f}"
+              f"{r['read_p50']:>11.2f}{r['read_p95']:>11.2f}{r['write_p50']:>12.2f}{r['write_p95']:>12.2f}")
+
+    writer = results["tuned"].get("writer")
+    if writer:
+        print(f"\nWriter: {writer['jobs']} jobs in {writer['batches']} commits "
+              f"(avg batch {writer['avg_batch']}, avg commit {writer['avg_commit_ms']} ms)")
+
+
+if __name__ == "__main__":
+    main()
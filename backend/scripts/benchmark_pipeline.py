@@ -0,0 +1,307 @@
+"""
+End-to-end recognition pipeline benchmark with virtual cameras.
+
+Starts N file:// or synthetic:// cameras through room_websocket's real frame
+callback path (decode predicate -> frame callback -> recognition -> presence
+DB -> broadcast) against a throwaway SQLite database and FAISS index, and
+reports per-stage latency, achieved recognition fps per camera, CPU and RSS.
+
+Runs offline on a CPU-only box. --detector stub replaces InsightFace with a
+generator of registered-student embeddings to measure the pipeline without
+the model; --detector real needs the InsightFace model files already cached.
+
+Examples:
+    python scripts/benchmark_pipeline.py --cameras 8 --duration 30
+    python scripts/benchmark_pipeline.py --source "file:///data/class.mp4?pace=realtime" --detector real
+    python scripts/benchmark_pipeline.py --source "synthetic://1280x720?fps=25&faces=images/&count=4" --detector real
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Offline end-to-end pipeline benchmark")
+    parser.add_argument("--cameras", type=int, default=4, help="Number of virtual cameras")
+    parser.add_argument("--source", default="synthetic://640x480?fps=25",
+                        help="Camera source URL (file://... or synthetic://...)")
+    parser.add_argument("--duration", type=float, default=20.0, help="Measurement time in seconds")
+    parser.add_argument("--warmup", type=float, default=3.0, help="Warmup time before measuring")
+    parser.add_argument("--detector", choices=["stub", "real"], default="stub",
+                        help="stub: synthetic embeddings, real: InsightFace")
+    parser.add_argument("--faces-per-frame", type=int, default=2, help="Faces per frame for the stub detector")
+    parser.add_argument("--detect-ms", type=float, default=0.0, help="Simulated detection time for the stub detector")
+    parser.add_argument("--students", type=int, default=1000, help="Registered students in the FAISS index")
+    parser.add_argument("--subscribers", type=int, default=1, help="Simulated WebSocket clients per room and camera")
+    parser.add_argument("--ingest-mode", choices=["threads", "pool"], default="threads")
+    parser.add_argument("--json", dest="json_path", help="Write the report to this file")
+    return parser.parse_args()
+
+
+def configure_environment(workdir: str, args):
+    """Point DB and FAISS at a throwaway directory (before app imports)."""
+    os.environ["DATABASE_URL"] = f"sqlite+aiosqlite:///{os.path.join(workdir, 'benchmark.db')}"
+    os.environ["FAISS_INDEX_PATH"] = os.path.join(workdir, "faces.index")
+    os.environ["FAISS_ID_MAP_PATH"] = os.path.join(workdir, "id_map.pkl")
+    os.environ["INGEST_MODE"] = args.ingest_mode
+    os.environ["AUTO_RESUME_CAMERAS"] = "false"
+
+
+class StubFaceService:
+    """Detector stand-in: returns embeddings of registered students at fixed bboxes."""
+
+    det_size = (640, 640)
+
+    def __init__(self, embeddings: np.ndarray, faces_per_frame: int, detect_ms: float):
+        self.embeddings = embeddings
+        self.faces_per_frame = faces_per_frame
+        self.detect_ms = detect_ms
+        self.rng = np.random.default_rng(0)
+
+    def set_det_size(self, det_size: int):
+        self.det_size = (det_size, det_size)
+
+    def extract_all_embeddings(self, image, min_face_size=None, timings=None):
+        start = time.perf_counter()
+        if self.detect_ms:
+            time.sleep(self.detect_ms / 1000)
+        detected = time.perf_counter()
+
+        results = []
+        height, width = image.shape[:2]
+        for i in range(self.faces_per_frame):
+            index = self.rng.integers(len(self.embeddings))
+            embedding = self.embeddings[index] + self.rng.normal(0, 0.01, self.embeddings.shape[1])
+            embedding = (embedding / np.linalg.norm(embedding)).astype(np.float32)
+            x = width * (i + 1) // (self.faces_per_frame + 1)
+            bbox = [x - 40, height // 2 - 40, x + 40, height // 2 + 40]
+            results.append((embedding, {"bbox": bbox, "det_score": 0.99, "face_size": 80}))
+
+        if timings is not None:
+            timings["detect"] = (detected - start) * 1000
+            timings["embed"] = (time.perf_counter() - detected) * 1000
+        return results
+
+    def extract_embedding_in_region(self, image, bbox, margin=0.3):
+        return None
+
+
+class SimulatedWebSocket:
+    """WebSocket client stand-in: pays the JSON serialization cost of a real send."""
+
+    def __init__(self):
+        self.messages = 0
+        self.bytes = 0
+
+    async def send_json(self, message: dict):
+        self.bytes += len(json.dumps(message))
+        self.messages += 1
+
+    async def send_bytes(self, data: bytes):
+        self.bytes += len(data)
+        self.messages += 1
+
+    async def send_text(self, data: str):
+        self.bytes += len(data)
+        self.messages += 1
+
+
+async def setup_database(args, embeddings: np.ndarray):
+    from app.core.database import engine, Base, AsyncSessionLocal
+    from app.models.student import Student
+    from app.models.room import Room
+    from app.models.camera import Camera
+    from app.models.room_presence import RoomPresence  # noqa: F401 (table)
+
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+
+    async with AsyncSessionLocal() as db:
+        room = Room(name="Benchmark")
+        db.add(room)
+        await db.flush()
+        for i in range(args.cameras):
+            db.add(Camera(room_id=room.id, name=f"Virtual {i + 1}", rtsp_url=args.source))
+        students = [
+            Student(student_id=f"B{i:05d}", first_name="Student", last_name=str(i), group_name=f"G{i % 20}")
+            for i in range(len(embeddings))
+        ]
+        db.add_all(students)
+        await db.commit()
+        return room.id, [student.id for student in students]
+
+
+def sample_process(process, samples: list):
+    if process is None:
+        return
+    samples.append({
+        "cpu_percent": process.cpu_percent(interval=None),
+        "rss_mb": process.memory_info().rss / (1024 * 1024)
+    })
+
+
+async def run(args):
+    try:
+        import psutil
+        process = psutil.Process()
+        process.cpu_percent(interval=None)
+    except ImportError:
+        process = None
+        print("psutil not installed - CPU and RSS are not reported")
+
+    from app.core.config import settings
+
+    rng = np.random.default_rng(42)
+    embeddings = rng.normal(size=(args.students, settings.EMBEDDING_DIMENSION)).astype(np.float32)
+    embeddings /= np.linalg.norm(embeddings, axis=1, keepdims=True)
+
+    if args.detector == "stub":
+        import app.services.face_service as face_module
+        stub = StubFaceService(embeddings, args.faces_per_frame, args.detect_ms)
+        face_module.get_face_service = lambda: stub
+
+    from app.controllers.room_websocket import get_room_manager
+    from app.services.vector_service import get_vector_service
+    from app.services.pipeline_metrics import get_pipeline_metrics
+
+    room_id, student_ids = await setup_database(args, embeddings)
+    get_vector_service().add_embeddings_batch(list(embeddings), student_ids)
+
+    manager = get_room_manager()
+    camera_ids = list(range(1, args.cameras + 1))
+
+    subscribers = []
+    for camera_id in camera_ids:
+        for _ in range(args.subscribers):
+            ws = SimulatedWebSocket()
+            manager.camera_subscriptions[camera_id].add(manager.open_channel(ws, f"camera:{camera_id}"))
+            subscribers.append(ws)
+    for _ in range(args.subscribers):
+        ws = SimulatedWebSocket()
+        manager.room_subscriptions[room_id].add(manager.open_channel(ws, f"room:{room_id}"))
+        subscribers.append(ws)
+
+    print(f"Starting {args.cameras} cameras: {args.source} (detector={args.detector}, ingest={args.ingest_mode})")
+    started = await asyncio.gather(*[
+        manager.start_camera_with_callback(camera_id, args.source, room_id, timeout=10)
+        for camera_id in camera_ids
+    ])
+    if not all(started):
+        print(f"Failed to start {started.count(False)} cameras")
+
+    await asyncio.sleep(args.warmup)
+    get_pipeline_metrics().reset()
+    samples = []
+    sample_process(process, [])
+    measure_start = time.monotonic()
+    while time.monotonic() - measure_start < args.duration:
+        await asyncio.sleep(1.0)
+        sample_process(process, samples)
+
+    metrics = get_pipeline_metrics()
+    statuses = manager.rtsp_manager.get_all_statuses()
+    cameras = {}
+    for camera_id in camera_ids:
+        stats = metrics.get_camera_stats(camera_id)
+        status = statuses.get(camera_id, {})
+        # recognition_fps uses a fixed window - use the measured duration instead
+        recognized = stats["stages"].get("total", {}).get("count", 0)
+        cameras[camera_id] = {
+            "grab_fps": status.get("fps", 0),
+            "decode_fps": status.get("decode_fps", 0),
+            "recognition_fps": round(recognized / args.duration, 2),
+            "stages": stats["stages"]
+        }
+
+    for camera_id in camera_ids:
+        manager.rtsp_manager.stop_camera(camera_id)
+    manager.rtsp_manager.shutdown()
+
+    report = {
+        "config": vars(args),
+        "cameras": cameras,
+        "stages": aggregate_stages(cameras),
+        "process": summarize_samples(samples),
+        "broadcast": {
+            "messages": sum(ws.messages for ws in subscribers),
+            "bytes": sum(ws.bytes for ws in subscribers)
+        }
+    }
+    return report
+
+
+def aggregate_stages(cameras: dict) -> dict:
+    """Count-weighted average and worst p95 per stage across cameras."""
+    result = {}
+    for camera in cameras.values():
+        for stage, stats in camera["stages"].items():
+            entry = result.setdefault(stage, {"count": 0, "sum_ms": 0.0, "p95_ms": 0.0})
+            entry["count"] += stats["count"]
+            entry["sum_ms"] += stats["avg_ms"] * stats["count"]
+            entry["p95_ms"] = max(entry["p95_ms"], stats["p95_ms"])
+    return {
+        stage: {
+            "count": entry["count"],
+            "avg_ms": round(entry["sum_ms"] / entry["count"], 2) if entry["count"] else 0.0,
+            "max_p95_ms": round(entry["p95_ms"], 2)
+        }
+        for stage, entry in result.items()
+    }
+
+
+def summarize_samples(samples: list) -> dict:
+    if not samples:
+        return {}
+    cpu = [s["cpu_percent"] for s in samples]
+    rss = [s["rss_mb"] for s in samples]
+    return {
+        "cpu_percent_avg": round(sum(cpu) / len(cpu), 1),
+        "cpu_percent_max": round(max(cpu), 1),
+        "rss_mb_avg": round(sum(rss) / len(rss), 1),
+        "rss_mb_max": round(max(rss), 1)
+    }
+
+
+def print_report(report: dict):
+    print("\n" + "=" * 70)
+    print("PIPELINE BENCHMARK")
+    print("=" * 70)
+    print(f"{'stage':<16}{'count':>8}{'avg ms':>12}{'max p95 ms':>14}")
+    for stage, stats in report["stages"].items():
+        print(f"{stage:<16}{stats['count']:>8}{stats['avg_ms']:>12.2f}{stats['max_p95_ms']:>14.2f}")
+
+    print(f"\n{'camera':<8}{'grab fps':>10}{'decode fps':>12}{'recog fps':>11}")
+    for camera_id, camera in report["cameras"].items():
+        print(f"{camera_id:<8}{camera['grab_fps']:>10}{camera['decode_fps']:>12}{camera['recognition_fps']:>11.2f}")
+
+    process = report["process"]
+    if process:
+        print(f"\nCPU: avg {process['cpu_percent_avg']}%  max {process['cpu_percent_max']}%")
+        print(f"RSS: avg {process['rss_mb_avg']} MB  max {process['rss_mb_max']} MB")
+    print(f"Broadcast: {report['broadcast']['messages']} messages, {report['broadcast']['bytes']} bytes")
+
+
+def main():
+    args = parse_args()
+    with tempfile.TemporaryDirectory(prefix="anvar-bench-") as workdir:
+        configure_environment(workdir, args)
+        report = asyncio.run(run(args))
+
+    print_report(report)
+    if args.json_path:
+        with open(args.json_path, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"\nReport written to {args.json_path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+import pytest
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+from sqlalchemy.pool import StaticPool
+
+import app.core.db_writer as db_writer_module
+import app.services.attendance_service as attendance_module
+import app.services.metadata_cache as metadata_cache_module
+import app.services.presence_service as presence_module
+from app.core.database import Base
+from app.core.db_writer import DatabaseWriter
+from tests.helpers import run
+
+
+@pytest.fixture
+def seed_rows() -> list:
+    """Rows added to the test database (override in a test module to seed it)."""
+    return []
+
+
+@pytest.fixture
+def sessions(seed_rows, monkeypatch):
+    """
+    Fresh in-memory database with the app tables and seed_rows.
+
+    Yields the session factory; the global DatabaseWriter and the services
+    that open their own sessions use the same database for the duration
+    of the test.
+    """
+    engine = create_async_engine(
+        "sqlite+aiosqlite:///:memory:",
+        poolclass=StaticPool,
+        connect_args={"check_same_thread": False}
+    )
+    factory = async_sessionmaker(engine, expire_on_commit=False)
+
+    async def setup():
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        if seed_rows:
+            async with factory() as db:
+                db.add_all(seed_rows)
+                await db.commit()
+
+    run(setup())
+    monkeypatch.setattr(db_writer_module, "_db_writer", DatabaseWriter(factory))
+    for module in (attendance_module, metadata_cache_module, presence_module):
+        monkeypatch.setattr(module, "AsyncSessionLocal", factory)
+    yield factory
+    run(engine.dispose())
+
+
+@pytest.fixture
+def statements(sessions):
+    """First keyword of every SQL statement run on the test database (clear() before the measured part)."""
+    executed = []
+    engine = sessions.kw["bind"].sync_engine
+
+    def count(conn, cursor, statement, parameters, context, executemany):
+        executed.append(statement.split()[0].upper())
+
+    event.listen(engine, "before_cursor_execute", count)
+    yield executed
+    event.remove(engine, "before_cursor_execute", count)
@@ -0,0 +1,302 @@
+import pytest
+import asyncio
+from datetime import date, time, timedelta
+
+from sqlalchemy import select
+
+from app.models import Student, Attendance, AttendanceDailyStat
+from app.services.attendance_service import AttendanceService, AttendedSet
+from tests.helpers import run
+
+
+@pytest.fixture
+def seed_rows() -> list:
+    """Five students (three in G1, one in G2, one without a group)."""
+    return [
+        Student(
+            id=i,
+            student_id=f"S{i:03d}",
+            first_name="Ali",
+            last_name=f"Valiyev {i}",
+            group_name="G1" if i <= 3 else ("G2" if i == 4 else None)
+        )
+        for i in range(1, 6)
+    ]
+
+
+async def attendance_rows(factory) -> list:
+    async with factory() as db:
+        result = await db.execute(select(Attendance.student_id, Attendance.attendance_date).order_by(Attendance.id))
+        return result.all()
+
+
+class TestAttendanceService:
+    """Tests for idempotent, batched attendance inserts."""
+
+    def test_first_check_in_creates(self, sessions):
+        """Test the first check-in creates the row and a repeat does not."""
+        service = AttendanceService()
+
+        async def scenario():
+            first = await service.check_in(1, 0.9)
+            second = await service.check_in(1, 0.8)
+            return first, second, await attendance_rows(sessions)
+
+        first, second, rows = run(scenario())
+        assert first.created and not second.created
+        assert first.check_in_time == second.check_in_time
+        assert rows == [(1, date.today())]
+
+    def test_concurrent_check_ins_share_one_statement(self, sessions, statements):
+        """Test check-ins from the same tick are one INSERT in one transaction."""
+        service = AttendanceService()
+
+        async def scenario():
+            await service.load_attended()
+            statements.clear()
+            return await asyncio.gather(*(service.check_in(i, 0.9) for i in range(1, 6)))
+
+        results = run(scenario())
+        assert all(r.created for r in results)
+        assert statements == ["INSERT", "INSERT"]  # attendance rows + daily rollups
+        assert service.batches == 1
+
+    def test_duplicates_in_one_batch(self, sessions):
+        """Test the same student twice in one batch creates exactly one row."""
+        service = AttendanceService()
+
+        async def scenario():
+            results = await asyncio.gather(service.check_in(2, 0.9), service.check_in(2, 0.95))
+            return results, await attendance_rows(sessions)
+
+        results, rows = run(scenario())
+        assert [r.created for r in results] == [True, False]
+        assert len(rows) == 1
+
+    def test_existing_rows_report_check_in_time(self, sessions):
+        """Test rows written by another process are reported as existing with their time."""
+        service = AttendanceService()
+
+        async def scenario():
+            await service.load_attended()
+            async with sessions() as db:
+                db.add(Attendance(student_id=3, attendance_date=date.today(), check_in_time=time(8, 15), confidence_score=0.7))
+                await db.commit()
+            return await asyncio.gather(service.check_in(3, 0.9), service.check_in(4, 0.9))
+
+        existing, new = run(scenario())
+        assert not existing.created and existing.check_in_time == time(8, 15)
+        assert new.created
+        assert service.get_stats()["duplicates"] == 1
+
+    def test_attendance_date_is_part_of_key(self, sessions):
+        """Test the same student on different days gets separate rows."""
+        service = AttendanceService()
+        yesterday = date.today() - timedelta(days=1)
+
+        async def scenario():
+            return await asyncio.gather(
+                service.check_in(5, 0.9, attendance_date=yesterday),
+                service.check_in(5, 0.9)
+            )
+
+        results = run(scenario())
+        assert all(r.created for r in results)
+        assert {r.attendance_date for r in results} == {yesterday, date.today()}
+
+    def test_stop_writes_queued_check_ins(self, sessions):
+        """Test stop() writes check-ins whose flush task has not run yet."""
+        service = AttendanceService()
+
+        async def scenario():
+            await service.load_attended()
+            pending = [asyncio.ensure_future(service.check_in(i, 0.9)) for i in (1, 2)]
+            await asyncio.sleep(0)
+            scheduled = len(service._flush_tasks)
+            await service.stop()
+            results = await asyncio.gather(*pending)
+            return scheduled, [r.created for r in results], await attendance_rows(sessions)
+
+        scheduled, created, rows = run(scenario())
+        assert scheduled == 1
+        assert created == [True, True]
+        assert len(rows) == 2
+        assert not service._flush_tasks
+
+
+class TestAttendedSet:
+    """Tests for the per-day in-memory attended set."""
+
+    def test_membership_and_time(self):
+        """Test added students are members with their exact check-in time."""
+        attended = AttendedSet(date.today())
+        attended.add(3, time(8, 15, 30, 123456))
+        attended.add(10000, time(0, 0))
+
+        assert 3 in attended and 10000 in attended
+        assert 4 not in attended and 20000 not in attended
+        assert attended.get(3) == time(8, 15, 30, 123456)
+        assert attended.get(10000) == time(0, 0)
+        assert len(attended) == 2
+
+    def test_discard(self):
+        """Test a discarded student is no longer a member and the count drops."""
+        attended = AttendedSet(date.today())
+        attended.add(3, time(8, 0))
+        attended.discard(3)
+        attended.discard(3)
+        attended.discard(500)
+
+        assert 3 not in attended and attended.get(3) is None
+        assert len(attended) == 0
+
+    def test_repeat_check_in_needs_no_query(self, sessions, statements):
+        """Test a student who already attended is answered without DB access."""
+        service = AttendanceService()
+
+        async def scenario():
+            async with sessions() as db:
+                db.add(Attendance(student_id=1, attendance_date=date.today(), check_in_time=time(8, 0), confidence_score=0.7))
+                await db.commit()
+            await service.load_attended()
+            created = await service.check_in(2, 0.9)
+            statements.clear()
+            loaded = await service.check_in(1, 0.9)
+            inserted = await service.check_in(2, 0.9)
+            return created, loaded, inserted
+
+        created, loaded, inserted = run(scenario())
+        assert statements == []
+        assert created.created
+        assert not loaded.created and loaded.check_in_time == time(8, 0)
+        assert not inserted.created and inserted.check_in_time == created.check_in_time
+        assert service.short_circuits == 2
+
+    def test_date_rollover_reloads(self, sessions):
+        """Test a set loaded for an earlier day is replaced by today's."""
+        service = AttendanceService()
+        yesterday = date.today() - timedelta(days=1)
+
+        async def scenario():
+            async with sessions() as db:
+                db.add(Attendance(student_id=1, attendance_date=yesterday, check_in_time=time(9, 0), confidence_score=0.7))
+                await db.commit()
+            await service.load_attended(day=yesterday)
+            return await service.check_in(1, 0.9)
+
+        result = run(scenario())
+        assert result.created
+        assert service.attended.day == date.today()
+        assert 1 in service.attended
+
+
+async def daily_stats(factory) -> dict:
+    async with factory() as db:
+        result = await db.execute(
+            select(AttendanceDailyStat.attendance_date, AttendanceDailyStat.group_name, AttendanceDailyStat.count)
+        )
+        return {(day, group_name): count for day, group_name, count in result.all()}
+
+
+class TestDailyStats:
+    """Tests for the incrementally maintained attendance rollups."""
+
+    def test_inserts_update_rollups(self, sessions):
+        """Test new rows are counted per group and duplicates are not."""
+        service = AttendanceService()
+        today = date.today()
+
+        async def scenario():
+            await asyncio.gather(*(service.check_in(i, 0.9) for i in range(1, 6)))
+            await asyncio.gather(service.check_in(1, 0.9), service.check_in(4, 0.9))
+            await service.check_in(2, 0.9, attendance_date=today - timedelta(days=1))
+            return await daily_stats(sessions)
+
+        assert run(scenario()) == {
+            (today, "G1"): 3,
+            (today, "G2"): 1,
+            (today, ""): 1,
+            (today - timedelta(days=1), "G1"): 1,
+        }
+
+    def test_backfill_from_attendance(self, sessions):
+        """Test an empty rollup table is built from existing attendance once."""
+        service = AttendanceService()
+        day = date(2026, 9, 1)
+
+        async def scenario():
+            async with sessions() as db:
+                for i in (1, 2, 4):
+                    db.add(Attendance(student_id=i, attendance_date=day, check_in_time=time(8, 0), confidence_score=0.7))
+                await db.commit()
+            first = await service.backfill_daily_stats()
+            second = await service.backfill_daily_stats()
+            return first, second, await daily_stats(sessions)
+
+        first, second, stats = run(scenario())
+        assert first and not second
+        assert stats == {(day, "G1"): 2, (day, "G2"): 1}
+
+    def test_deleted_student_leaves_rollups(self, sessions):
+        """Test deleting a student's attendance recomputes the days it was counted on."""
+        service = AttendanceService()
+        today = date.today()
+        yesterday = today - timedelta(days=1)
+
+        async def scenario():
+            await asyncio.gather(*(service.check_in(i, 0.9) for i in (1, 2, 4)))
+            await service.check_in(1, 0.9, attendance_date=yesterday)
+            async with sessions() as db:
+                deleted = await service.delete_student_attendance(db, 1)
+                await db.commit()
+            return deleted, await attendance_rows(sessions), await daily_stats(sessions)
+
+        deleted, rows, stats = run(scenario())
+        assert deleted == 2
+        assert {student_id for student_id, _ in rows} == {2, 4}
+        assert stats == {(today, "G1"): 1, (today, "G2"): 1}
+
+    def test_group_change_recompute(self, sessions):
+        """Test recomputing a day moves a student's count to the new group."""
+        service = AttendanceService()
+        today = date.today()
+
+        async def scenario():
+            await asyncio.gather(*(service.check_in(i, 0.9) for i in (1, 4)))
+            async with sessions() as db:
+                student = await db.get(Student, 4)
+                student.group_name = "G1"
+                await db.flush()
+                await service.recompute_daily_stats(db, [today])
+                await db.commit()
+            return await daily_stats(sessions)
+
+        assert run(scenario()) == {(today, "G1"): 2}
+
+    def test_daily_counts(self, sessions, statements):
+        """Test per-day counts are summed over groups and filtered by range and group."""
+        service = AttendanceService()
+        today = date.today()
+
+        async def scenario():
+            async with sessions() as db:
+                db.add_all([
+                    AttendanceDailyStat(attendance_date=today, group_name="G1", count=5),
+                    AttendanceDailyStat(attendance_date=today, group_name="G2", count=2),
+                    AttendanceDailyStat(attendance_date=today - timedelta(days=2), group_name="G1", count=4),
+                    AttendanceDailyStat(attendance_date=today - timedelta(days=40), group_name="G1", count=9),
+                ])
+                await db.commit()
+                statements.clear()
+                all_groups = await service.get_daily_counts(db, today - timedelta(days=7))
+                g1 = await service.get_daily_counts(db, today - timedelta(days=7), today, group_name="G1")
+            return all_groups, g1
+
+        all_groups, g1 = run(scenario())
+        assert all_groups == {today: 7, today - timedelta(days=2): 4}
+        assert g1 == {today: 5, today - timedelta(days=2): 4}
+        assert statements == ["SELECT", "SELECT"]
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,118 @@
+import pytest
+import asyncio
+
+from sqlalchemy import select, text
+from sqlalchemy.pool import StaticPool
+
+from app.core.database import create_engine
+from app.core.db_writer import DatabaseWriter
+from app.models import Room
+from tests.helpers import run
+
+
+def add_room(room_id: int, name: str):
+    async def job(db):
+        db.add(Room(id=room_id, name=name))
+        await db.flush()
+        return room_id
+    return job
+
+
+async def room_names(factory) -> list:
+    async with factory() as db:
+        result = await db.execute(select(Room.name).order_by(Room.id))
+        return list(result.scalars())
+
+
+class TestDatabaseWriter:
+    """Tests for the single batching database writer."""
+
+    def test_concurrent_jobs_share_commits(self, sessions):
+        """Test jobs queued together are committed in one transaction."""
+        writer = DatabaseWriter(sessions)
+
+        async def scenario():
+            results = await asyncio.gather(*(writer.submit(add_room(i, f"Xona {i}")) for i in range(1, 21)))
+            await writer.stop()
+            return results, await room_names(sessions)
+
+        results, names = run(scenario())
+        assert results == list(range(1, 21))
+        assert len(names) == 20
+        assert writer.get_stats()["batches"] < 20
+
+    def test_max_batch(self, sessions):
+        """Test a batch never exceeds max_batch jobs."""
+        writer = DatabaseWriter(sessions, max_batch=4)
+
+        async def scenario():
+            await asyncio.gather(*(writer.submit(add_room(i, f"Xona {i}")) for i in range(1, 11)))
+            await writer.stop()
+
+        run(scenario())
+        assert writer.jobs == 10
+        assert writer.batches >= 3
+
+    def test_failing_job_is_isolated(self, sessions):
+        """Test one failing job gets the error and the rest are committed."""
+        writer = DatabaseWriter(sessions)
+
+        async def scenario():
+            results = await asyncio.gather(
+                writer.submit(add_room(1, "Xona 1")),
+                writer.submit(add_room(1, "Dublikat")),
+                writer.submit(add_room(2, "Xona 2")),
+                return_exceptions=True
+            )
+            await writer.stop()
+            return results, await room_names(sessions)
+
+        results, names = run(scenario())
+        assert results[0] == 1 and results[2] == 2
+        assert isinstance(results[1], Exception)
+        assert names == ["Xona 1", "Xona 2"]
+        assert writer.failed == 1
+
+    def test_stop_commits_queued_jobs(self, sessions):
+        """Test stop() drains the queue before the task exits."""
+        writer = DatabaseWriter(sessions)
+
+        async def scenario():
+            pending = [asyncio.ensure_future(writer.submit(add_room(i, f"Xona {i}"))) for i in (1, 2, 3)]
+            await asyncio.sleep(0)
+            await writer.stop()
+            return [p.result() for p in pending], await room_names(sessions)
+
+        results, names = run(scenario())
+        assert results == [1, 2, 3]
+        assert len(names) == 3
+
+
+class TestEngine:
+    """Tests for the tuned SQLite engine."""
+
+    def test_file_database_uses_wal(self, tmp_path):
+        """Test a file database gets WAL and a connection pool."""
+        engine = create_engine(f"sqlite+aiosqlite:///{tmp_path / 'app.db'}")
+
+        async def scenario():
+            async with engine.connect() as conn:
+                journal = (await conn.execute(text("PRAGMA journal_mode"))).scalar()
+                busy = (await conn.execute(text("PRAGMA busy_timeout"))).scalar()
+            await engine.dispose()
+            return journal, busy
+
+        journal, busy = run(scenario())
+        assert journal == "wal"
+        assert busy > 0
+        assert not isinstance(engine.pool, StaticPool)
+
+    def test_memory_database_uses_static_pool(self):
+        """Test an in-memory database keeps one shared connection."""
+        engine = create_engine("sqlite+aiosqlite:///:memory:")
+        assert isinstance(engine.pool, StaticPool)
+        run(engine.dispose())
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,164 @@
+import pytest
+import threading
+import time
+import numpy as np
+import cv2
+from app.core.config import settings
+from app.services.decoder_pool import DecoderPool
+from app.services.multi_rtsp_service import MultiRTSPStreamManager
+
+
+class FakeStream:
+    """Stream stub following the DecoderPool contract."""
+
+    def __init__(self, camera_id: int, fps: float, steps_left: int = -1, step_time: float = 0.0):
+        self.camera_id = camera_id
+        self.frame_interval = 1.0 / fps
+        self.is_running = True
+        self.steps = 0
+        self.finished = 0
+        self.steps_left = steps_left
+        self.step_time = step_time
+
+    def _step(self):
+        self.steps += 1
+        if self.step_time:
+            time.sleep(self.step_time)
+        if self.steps_left == 0:
+            return None
+        self.steps_left -= 1
+        return self.frame_interval
+
+    def _finish_loop(self):
+        self.finished += 1
+        self.is_running = False
+
+
+@pytest.fixture
+def video_path(tmp_path):
+    """Write a local video file long enough to stream for a few seconds."""
+    path = str(tmp_path / "camera.avi")
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"MJPG"), 25, (160, 120))
+    for i in range(300):
+        writer.write(np.full((120, 160, 3), i % 255, dtype=np.uint8))
+    writer.release()
+    return path
+
+
+class TestDecoderPool:
+    """Tests for due-time scheduled decoder threads."""
+
+    @pytest.fixture
+    def pool(self):
+        pool = DecoderPool(threads=2)
+        yield pool
+        pool.stop()
+
+    def test_thread_count_is_flat(self, pool):
+        """Test many cameras are serviced by the fixed set of threads."""
+        before = threading.active_count()
+        streams = [FakeStream(i, fps=20) for i in range(16)]
+        for stream in streams:
+            pool.add(stream)
+
+        time.sleep(0.5)
+        assert threading.active_count() - before == 2
+        assert all(stream.steps >= 5 for stream in streams)
+
+    def test_per_camera_fps_targets(self, pool):
+        """Test each camera is stepped at its own frame rate."""
+        slow = FakeStream(1, fps=5)
+        fast = FakeStream(2, fps=40)
+        pool.add(slow)
+        pool.add(fast)
+
+        time.sleep(1.0)
+        assert 4 <= slow.steps <= 7
+        assert 30 <= fast.steps <= 45
+
+    def test_pacing_does_not_add_decode_time(self, pool):
+        """Test the next due time is counted from the previous due time, not step end."""
+        stream = FakeStream(1, fps=20, step_time=0.03)
+        pool.add(stream)
+
+        time.sleep(1.0)
+        # sleep-after-decode pacing would give ~1 / (0.05 + 0.03) = 12 steps
+        assert stream.steps >= 17
+
+    def test_ended_stream_is_finished_once(self, pool):
+        """Test a lost stream is cleaned up by the pool exactly once."""
+        stream = FakeStream(1, fps=50, steps_left=3)
+        pool.add(stream)
+
+        time.sleep(0.3)
+        assert stream.steps == 4
+        assert stream.finished == 1
+        assert not pool.remove(stream)
+        assert pool.get_stats()["cameras"] == 0
+
+    def test_remove_waits_for_running_step(self, pool):
+        """Test remove() returns only after the stream's step finished."""
+        stream = FakeStream(1, fps=50, step_time=0.2)
+        pool.add(stream)
+        time.sleep(0.05)
+
+        assert pool.remove(stream)
+        steps = stream.steps
+        time.sleep(0.3)
+        assert stream.steps == steps
+
+
+class TestPoolIngestMode:
+    """Tests for MultiRTSPStreamManager with INGEST_MODE=pool."""
+
+    @pytest.fixture
+    def manager(self, monkeypatch):
+        monkeypatch.setattr(settings, "INGEST_MODE", "pool")
+        monkeypatch.setattr(settings, "DECODER_POOL_THREADS", 2)
+        manager = MultiRTSPStreamManager()
+        yield manager
+        manager.shutdown()
+
+    def test_cameras_share_decoder_threads(self, manager, video_path):
+        """Test frames flow for several cameras without a thread per camera."""
+        received = {}
+
+        def callback(frame, timestamp, room_id, camera_id):
+            received[camera_id] = received.get(camera_id, 0) + 1
+
+        for camera_id in range(1, 5):
+            assert manager.start_camera(camera_id, video_path, room_id=1, frame_callback=callback)
+
+        time.sleep(0.5)
+        decoders = [t for t in threading.enumerate() if t.name.startswith("decoder-")]
+        assert len(decoders) == 2
+        assert set(received) == {1, 2, 3, 4}
+
+        status = manager.get_camera_status(1)
+        assert status["scheduler"] == "pool"
+        assert manager.get_decoder_stats()["cameras"] == 4
+
+        assert manager.set_target_fps(1, 5)
+        assert manager.get_camera_status(1)["target_fps"] == 5.0
+
+        manager.stop_camera(1)
+        assert manager.get_decoder_stats()["cameras"] == 3
+
+    def test_lost_stream_handed_to_supervisor(self, manager, tmp_path):
+        """Test a stream ending inside the pool is reported as lost."""
+        path = str(tmp_path / "short.avi")
+        writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"MJPG"), 25, (160, 120))
+        for i in range(10):
+            writer.write(np.full((120, 160, 3), i, dtype=np.uint8))
+        writer.release()
+
+        manager.supervisor.stop()  # keep the camera from being restarted
+        assert manager.start_camera(1, path, room_id=1)
+        time.sleep(1.0)
+
+        assert not manager.is_camera_active(1)
+        assert manager.get_decoder_stats()["cameras"] == 0
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
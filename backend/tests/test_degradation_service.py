@@ -0,0 +1,87 @@
+import pytest
+from app.services.degradation_service import DegradationController
+
+
+class TestDegradationController:
+    """Tests for SLO-driven degradation controller."""
+
+    @pytest.fixture
+    def controller(self):
+        """Create a controller with predictable SLOs."""
+        controller = DegradationController()
+        controller.latency_slo_ms = 1000
+        controller.loop_lag_slo_ms = 100
+        controller.restore_ratio = 0.5
+        controller.restore_checks = 2
+        return controller
+
+    def test_starts_at_normal_level(self, controller):
+        """Test initial level and knobs."""
+        assert controller.level == 0
+        assert controller.knobs.name == "normal"
+        assert not controller.knobs.pause_unwatched_rooms
+
+    def test_degrades_step_by_step(self, controller):
+        """Test that each overloaded check moves one level down the ladder."""
+        controller.record_recognition_latency(3000)
+        assert controller.evaluate() == 1
+        assert controller.evaluate() == 2
+
+        assert controller.knobs.recognition_interval_ms > controller.levels[0].recognition_interval_ms
+        assert len(controller.transitions) == 2
+        assert controller.transitions[-1]["direction"] == "degrade"
+        assert controller.transitions[-1]["reason"] == "recognition_latency"
+
+    def test_loop_lag_triggers_degradation(self, controller):
+        """Test that event loop lag alone degrades."""
+        controller.record_loop_lag(500)
+        assert controller.evaluate() == 1
+        assert controller.transitions[-1]["reason"] == "loop_lag"
+
+    def test_stops_at_last_level(self, controller):
+        """Test that the controller never goes past the last level."""
+        controller.record_recognition_latency(3000)
+        for _ in range(len(controller.levels) + 3):
+            controller.evaluate()
+
+        assert controller.level == len(controller.levels) - 1
+        assert controller.knobs.pause_unwatched_rooms
+        assert len(controller.transitions) == len(controller.levels) - 1
+
+    def test_restores_after_healthy_checks(self, controller):
+        """Test restore requires consecutive healthy checks."""
+        controller.record_recognition_latency(3000)
+        controller.evaluate()
+        assert controller.level == 1
+
+        # Old samples fall out of the window
+        controller._latency_samples.clear()
+        controller.record_recognition_latency(100)
+
+        assert controller.evaluate() == 1
+        assert controller.evaluate() == 0
+        assert controller.transitions[-1]["direction"] == "restore"
+
+    def test_listener_called_on_transition(self, controller):
+        """Test listeners receive the new knobs."""
+        received = []
+        controller.add_listener(lambda level: received.append(level.name))
+
+        controller.record_recognition_latency(3000)
+        controller.evaluate()
+
+        assert received == [controller.levels[1].name]
+
+    def test_status(self, controller):
+        """Test status payload."""
+        controller.record_recognition_latency(200)
+        status = controller.get_status()
+
+        assert status["level"] == 0
+        assert status["metrics"]["recognition_latency_p95_ms"] == 200
+        assert status["slo"]["recognition_latency_ms"] == 1000
+        assert len(status["levels"]) == len(controller.levels)
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -1,6 +1,7 @@
 import pytest
 import numpy as np
 import cv2
+from types import SimpleNamespace
 from app.services.face_service import FaceRecognitionService, get_face_service
 
 
@@ -81,6 +82,36 @@ class TestFaceRecognitionService:
         assert similarity > 0.99  # Should be nearly identical
 
 
+class TestDetSize:
+    """Tests for changing the detector input size at runtime."""
+
+    def make_service(self, input_shape):
+        from insightface.model_zoo.retinaface import RetinaFace
+
+        det_model = RetinaFace.__new__(RetinaFace)
+        det_model.input_shape = input_shape
+        det_model.input_size = (640, 640)
+        service = FaceRecognitionService.__new__(FaceRecognitionService)
+        service.app = SimpleNamespace(det_model=det_model)
+        service.det_size = (640, 640)
+        service.ctx_id = -1
+        return service
+
+    def test_detector_uses_new_size(self):
+        """Test set_det_size changes the size the detector actually runs at."""
+        service = self.make_service([1, 3, "?", "?"])
+        service.set_det_size(320)
+        assert service.app.det_model.input_size == (320, 320)
+        assert service.det_size == (320, 320)
+
+    def test_fixed_size_model_is_unchanged(self):
+        """Test a detector exported with a fixed input shape keeps its size."""
+        service = self.make_service([1, 3, 640, 640])
+        service.set_det_size(320)
+        assert service.app.det_model.input_size == (640, 640)
+        assert service.det_size == (640, 640)
+
+
 if __name__ == "__main__":
     pytest.main([__file__, "-v"])
 
@@ -0,0 +1,107 @@
+import pytest
+import numpy as np
+from app.services.frame_ring import FrameRingBuffer
+
+SHAPE = (120, 160, 3)
+
+
+def write_frame(ring: FrameRingBuffer, value: int) -> int:
+    """Write a frame the way the capture loop does (decode into slot)."""
+    slot, buffer = ring.begin_write()
+    if buffer is None:
+        buffer = np.empty(SHAPE, dtype=np.uint8)
+    buffer[:] = value
+    return ring.commit(slot, buffer)
+
+
+class TestFrameRingBuffer:
+    """Tests for preallocated per-camera frame ring."""
+
+    @pytest.fixture
+    def ring(self):
+        ring = FrameRingBuffer(size=3)
+        ring.allocate(SHAPE)
+        return ring
+
+    def test_empty_ring(self):
+        """Test reading before any frame was written."""
+        ring = FrameRingBuffer()
+        assert ring.acquire_latest() is None
+        assert ring.copy_latest() is None
+
+    def test_writes_reuse_preallocated_buffers(self, ring):
+        """Test the writer cycles through the same buffers."""
+        buffers = {id(buffer) for buffer in ring._buffers}
+        for i in range(10):
+            write_frame(ring, i)
+
+        assert {id(buffer) for buffer in ring._buffers} == buffers
+        assert ring.latest_seq() == 10
+
+    def test_lease_is_read_only_view(self, ring):
+        """Test readers get a zero-copy read-only view."""
+        write_frame(ring, 7)
+        with ring.acquire_latest() as lease:
+            assert lease.seq == 1
+            assert lease.frame[0, 0, 0] == 7
+            assert not lease.frame.flags.writeable
+            assert np.shares_memory(lease.frame, ring._buffers[lease.slot])
+            with pytest.raises(ValueError):
+                lease.frame[0, 0, 0] = 1
+
+    def test_pinned_slot_not_overwritten(self, ring):
+        """Test a borrowed frame stays intact while newer frames arrive."""
+        write_frame(ring, 1)
+        lease = ring.acquire_latest()
+
+        for i in range(2, 10):
+            write_frame(ring, i)
+
+        assert lease.frame[0, 0, 0] == 1
+        assert ring.pinned_count() == 1
+        lease.release()
+        assert ring.pinned_count() == 0
+
+    def test_overflow_when_all_slots_pinned(self, ring):
+        """Test writer falls back to a temporary buffer when every slot is pinned."""
+        leases = []
+        for i in range(ring.size):
+            write_frame(ring, i)
+            leases.append(ring.acquire_latest())
+
+        write_frame(ring, 99)
+        assert ring.overflow_count == 1
+        with ring.acquire_latest() as lease:
+            assert lease.frame[0, 0, 0] == 99
+        assert [lease.frame[0, 0, 0] for lease in leases] == [0, 1, 2]
+
+        for lease in leases:
+            lease.release()
+
+    def test_lease_carries_frame_metadata(self, ring):
+        """Test PTS and ingest time committed with a frame reach its readers."""
+        slot, buffer = ring.begin_write()
+        buffer[:] = 3
+        ring.commit(slot, buffer, pts=12.5, ingest_time=100.0)
+
+        with ring.acquire_latest() as lease:
+            assert (lease.pts, lease.ingest_time) == (12.5, 100.0)
+
+    def test_reallocates_on_shape_change(self, ring):
+        """Test a resolution change reallocates the slots."""
+        write_frame(ring, 1)
+        old_lease = ring.acquire_latest()
+
+        slot, _ = ring.begin_write()
+        ring.commit(slot, np.full((240, 320, 3), 5, dtype=np.uint8))
+
+        with ring.acquire_latest() as lease:
+            assert lease.frame.shape == (240, 320, 3)
+        # Old lease keeps its buffer alive and releasing it is harmless
+        assert old_lease.frame.shape == SHAPE
+        old_lease.release()
+        assert ring.pinned_count() == 0
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
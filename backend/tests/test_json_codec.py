@@ -0,0 +1,47 @@
+import pytest
+import json
+from datetime import datetime
+
+import numpy as np
+
+from app.core import json_codec
+
+
+class TestJsonCodec:
+    """Tests for the broadcast JSON encoder."""
+
+    def test_matches_stdlib_output(self):
+        """Test fast and fallback encoders produce the same JSON."""
+        message = {
+            "type": "presence_update",
+            "room_id": 3,
+            "room_name": "Xona 101",
+            "occupants": [{"student_id": i, "name": f"Talaba {i}", "confidence": 0.5} for i in range(5)],
+            "timestamp": "2024-01-01T10:00:00"
+        }
+        assert json.loads(json_codec.dumps(message)) == message
+        assert json.loads(json_codec.dumps_stdlib(message)) == message
+
+    def test_numpy_and_datetime_values(self):
+        """Test numpy scalars/arrays and datetimes are encoded on both paths."""
+        message = {
+            "confidence": np.float32(0.75),
+            "bbox": np.array([1, 2, 3, 4], dtype=np.int32),
+            "count": np.int64(7),
+            "at": datetime(2024, 1, 1, 10, 0, 0)
+        }
+        for encode in (json_codec.dumps, json_codec.dumps_stdlib):
+            decoded = json.loads(encode(message))
+            assert decoded["confidence"] == pytest.approx(0.75)
+            assert decoded["bbox"] == [1, 2, 3, 4]
+            assert decoded["count"] == 7
+            assert decoded["at"] == "2024-01-01T10:00:00"
+
+    def test_returns_text(self):
+        """Test the payload is text (sent as a WebSocket text frame)."""
+        assert isinstance(json_codec.dumps({"a": 1}), str)
+        assert isinstance(json_codec.dumps_stdlib({"a": 1}), str)
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
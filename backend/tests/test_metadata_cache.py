@@ -0,0 +1,84 @@
+import pytest
+
+import app.services.metadata_cache as metadata_module
+from app.models import Student, Room
+from app.services.metadata_cache import MetadataCache, StudentInfo
+from app.services.room_service import RoomService
+from tests.helpers import run
+
+
+@pytest.fixture
+def seed_rows() -> list:
+    """Three students and two rooms."""
+    return [
+        *(Student(id=i, student_id=f"S{i:03d}", first_name="Ali", last_name=f"Valiyev {i}", group_name="G1") for i in (1, 2, 3)),
+        *(Room(id=i, name=f"Xona {i}") for i in (1, 2)),
+    ]
+
+
+class TestMetadataCache:
+    """Tests for cached student display fields and room names."""
+
+    def test_warm_then_lookups_do_no_io(self, sessions, statements):
+        """Test resolving students and rooms after warm-up runs no queries."""
+        cache = MetadataCache()
+
+        async def scenario():
+            async with sessions() as db:
+                await cache.warm(db)
+                statements.clear()
+                student = await cache.resolve_student(db, 2)
+                room_name = await cache.resolve_room_name(db, 1)
+            return student, room_name
+
+        student, room_name = run(scenario())
+        assert statements == []
+        assert student == StudentInfo(2, "S002", "Ali", "Valiyev 2", "G1")
+        assert room_name == "Xona 1"
+        assert cache.get_stats()["misses"] == 0
+
+    def test_miss_loads_once(self, sessions):
+        """Test an unknown id is loaded once and then served from the cache."""
+        cache = MetadataCache()
+
+        async def scenario():
+            async with sessions() as db:
+                first = await cache.resolve_student(db, 3)
+                second = await cache.resolve_student(db, 3)
+                missing = await cache.resolve_student(db, 99)
+            return first, second, missing
+
+        first, second, missing = run(scenario())
+        assert first == second
+        assert missing is None
+        assert cache.misses == 2
+
+    def test_student_invalidation(self):
+        """Test registered students are added and deleted ones removed."""
+        cache = MetadataCache()
+        cache.put_student(Student(id=5, student_id="S005", first_name="Vali", last_name="Aliyev", group_name=None))
+        assert cache.get_student(5).first_name == "Vali"
+        cache.remove_student(5)
+        assert cache.get_student(5) is None
+
+    def test_room_service_keeps_names_current(self, sessions, monkeypatch):
+        """Test room create/update/delete update the cached names."""
+        cache = MetadataCache()
+        monkeypatch.setattr(metadata_module, "_metadata_cache", cache)
+        service = RoomService()
+
+        async def scenario():
+            async with sessions() as db:
+                room = await service.create_room(db, "Yangi xona")
+                created = cache.get_room_name(room.id)
+                await service.update_room(db, room.id, name="Qayta nomlangan")
+                updated = cache.get_room_name(room.id)
+                await service.delete_room(db, room.id)
+                await db.commit()
+                return created, updated, cache.get_room_name(room.id)
+
+        assert run(scenario()) == ("Yangi xona", "Qayta nomlangan", None)
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,128 @@
+import pytest
+import asyncio
+
+import numpy as np
+
+from app.services.mjpeg_service import MJPEGService, BOUNDARY
+from app.services.rtsp_service import FrameRef
+from tests.helpers import run
+
+
+class FakeSource:
+    """Frame source with a sequence number, like a camera ring."""
+
+    def __init__(self):
+        self.seq = 0
+        self.frame = np.zeros((48, 64, 3), dtype=np.uint8)
+        self.alive = True
+
+    def new_frame(self):
+        self.seq += 1
+        self.frame = np.full((48, 64, 3), self.seq % 255, dtype=np.uint8)
+
+    def acquire(self):
+        return FrameRef(self.seq, self.frame) if self.seq else None
+
+
+async def collect(stream, count: int, timeout: float = 5.0) -> list:
+    parts = []
+
+    async def read():
+        async for part in stream.frames():
+            parts.append(part)
+            if len(parts) >= count:
+                break
+
+    await asyncio.wait_for(read(), timeout)
+    return parts
+
+
+class TestMJPEGService:
+    """Tests for shared, condition-driven MJPEG streams."""
+
+    def test_viewers_share_one_encode_per_frame(self):
+        """Test every viewer gets each new frame, encoded once."""
+        async def scenario():
+            service, source = MJPEGService(), FakeSource()
+            stream = service.get_stream("cam", source.acquire, lambda: source.alive, max_fps=50)
+            viewers = [asyncio.create_task(collect(stream, 3)) for _ in range(4)]
+            await asyncio.sleep(0.01)  # viewers connected
+
+            for _ in range(3):
+                source.new_frame()
+                service.notify_threadsafe("cam")
+                await asyncio.sleep(0.1)
+
+            return await asyncio.gather(*viewers), stream
+
+        results, stream = run(scenario())
+        assert stream.encoded == 3
+        for parts in results:
+            assert len(parts) == 3
+            assert parts[0].startswith(f"--{BOUNDARY}\r\nContent-Type: image/jpeg".encode())
+        assert results[0] == results[1]
+
+    def test_same_frame_is_not_resent(self):
+        """Test viewers wait for a new sequence number instead of re-sending."""
+        async def scenario():
+            service, source = MJPEGService(), FakeSource()
+            source.new_frame()
+            stream = service.get_stream("cam", source.acquire, lambda: source.alive, max_fps=50)
+
+            parts = []
+
+            async def read():
+                async for part in stream.frames():
+                    parts.append(part)
+
+            task = asyncio.create_task(read())
+            await asyncio.sleep(0.5)  # encoder polls several times, seq unchanged
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+            return parts, stream
+
+        parts, stream = run(scenario())
+        assert len(parts) == 1
+        assert stream.encoded == 1
+        assert stream.unchanged > 0
+
+    def test_viewers_finish_when_source_stops(self):
+        """Test the response ends once the source is gone."""
+        async def scenario():
+            service, source = MJPEGService(), FakeSource()
+            source.new_frame()
+            stream = service.get_stream("cam", source.acquire, lambda: source.alive, max_fps=50)
+
+            parts = []
+
+            async def read():
+                async for part in stream.frames():
+                    parts.append(part)
+
+            task = asyncio.create_task(read())
+            await asyncio.sleep(0.1)
+            source.alive = False
+            await asyncio.wait_for(task, 2)
+            return parts, stream
+
+        parts, stream = run(scenario())
+        assert len(parts) == 1
+        assert stream.viewers == 0
+
+    def test_decode_demand_only_while_watched(self):
+        """Test the decode predicate follows MJPEG viewers at max_fps."""
+        async def scenario():
+            service, source = MJPEGService(), FakeSource()
+            stream = service.get_stream(1, source.acquire, lambda: True, max_fps=5)
+            before = service.wants_frame(1)
+            stream.viewers = 1
+            return before, service.wants_frame(1), service.wants_frame(1)
+
+        before, first, second = run(scenario())
+        assert not before
+        assert first
+        assert not second
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,133 @@
+import pytest
+import time
+
+import cv2
+import numpy as np
+
+from app.services.frame_ring import FrameRingBuffer
+from app.services.mosaic_service import MosaicLayout, MosaicStream, MosaicService
+
+SHAPE = (480, 640, 3)
+
+
+class FakeRTSPManager:
+    """Per-camera frame rings, like MultiRTSPStreamManager.acquire_frame."""
+
+    def __init__(self, camera_ids):
+        self.rings = {}
+        for camera_id in camera_ids:
+            ring = FrameRingBuffer(size=3)
+            ring.allocate(SHAPE)
+            self.rings[camera_id] = ring
+
+    def write(self, camera_id: int, value: int):
+        ring = self.rings[camera_id]
+        slot, buffer = ring.begin_write()
+        buffer[:] = value
+        ring.commit(slot, buffer)
+
+    def acquire_frame(self, camera_id: int):
+        ring = self.rings.get(camera_id)
+        return ring.acquire_latest() if ring else None
+
+
+def decode(jpeg: bytes) -> np.ndarray:
+    return cv2.imdecode(np.frombuffer(jpeg, np.uint8), cv2.IMREAD_COLOR)
+
+
+class TestMosaicLayout:
+    """Tests for mosaic layout parsing."""
+
+    def test_defaults_to_square_grid_of_running_cameras(self):
+        """Test all running cameras in a near-square grid with 16:9 tiles."""
+        layout = MosaicLayout.from_params({"tile_width": "320"}, [3, 1, 2, 4, 5])
+        assert layout.camera_ids == (1, 2, 3, 4, 5)
+        assert (layout.cols, layout.rows) == (3, 2)
+        assert (layout.tile_width, layout.tile_height) == (320, 180)
+
+    def test_explicit_cameras_and_cols(self):
+        """Test the requested camera order and column count are kept."""
+        layout = MosaicLayout.from_params({"cameras": "7,2", "cols": "1", "overlay": "1"}, [1, 2, 7])
+        assert layout.camera_ids == (7, 2)
+        assert (layout.cols, layout.rows) == (1, 2)
+        assert layout.overlay
+
+    def test_invalid_params(self):
+        """Test non-numeric values are rejected."""
+        with pytest.raises(ValueError):
+            MosaicLayout.from_params({"cameras": "1,abc"}, [1])
+
+
+class TestMosaicStream:
+    """Tests for mosaic composition from ring frames."""
+
+    @pytest.fixture
+    def manager(self):
+        manager = FakeRTSPManager([1, 2])
+        manager.write(1, 50)
+        manager.write(2, 200)
+        return manager
+
+    def test_tiles_are_downscaled_frames(self, manager):
+        """Test each camera lands in its own tile of one image."""
+        layout = MosaicLayout((1, 2), 2, 320, 240, 5, 90, False)
+        jpeg = MosaicStream(layout, manager, {}).compose()
+
+        image = decode(jpeg)
+        assert image.shape == (240, 640, 3)
+        assert abs(int(image[120, 160, 0]) - 50) < 5
+        assert abs(int(image[120, 480, 0]) - 200) < 5
+
+    def test_missing_camera_tile_is_black(self, manager):
+        """Test a camera without frames leaves a blank tile."""
+        layout = MosaicLayout((1, 99), 2, 320, 240, 5, 90, False)
+        image = decode(MosaicStream(layout, manager, {}).compose())
+        assert image[120, 480].max() < 10
+
+    def test_unchanged_frames_are_not_reencoded(self, manager):
+        """Test the mosaic is encoded only when a camera has a new frame."""
+        layout = MosaicLayout((1, 2), 2, 320, 240, 5, 90, False)
+        stream = MosaicStream(layout, manager, {})
+
+        assert stream.compose() is not None
+        assert stream.compose() is None
+        manager.write(2, 10)
+        assert stream.compose() is not None
+        assert stream.composed == 2
+        assert stream.skipped_unchanged == 1
+
+    def test_overlay_redraws_on_new_faces(self, manager):
+        """Test new face boxes redraw the tile even without a new frame."""
+        layout = MosaicLayout((1, 2), 2, 320, 240, 5, 90, True)
+        faces = {}
+        stream = MosaicStream(layout, manager, faces)
+        stream.compose()
+
+        faces[1] = (1, time.monotonic(), [{"type": "student", "bbox": [100, 100, 300, 300]}])
+        assert stream.compose() is not None
+        # Box edge at x = 100 * 0.5 in the first tile
+        assert stream.canvas[100, 50, 1] > 150
+
+
+class TestMosaicService:
+    """Tests for sharing mosaics between viewers."""
+
+    def test_decode_demand_follows_viewers(self):
+        """Test cameras are asked to decode at the mosaic fps only while viewed."""
+        service = MosaicService(FakeRTSPManager([1]))
+        layout = MosaicLayout((1,), 1, 320, 180, 2, 70, False)
+        service.streams[layout] = MosaicStream(layout, service.rtsp_manager, service.faces)
+        service._update_camera_fps()
+
+        assert service.wants_frame(1)
+        assert not service.wants_frame(1)  # within 1/fps
+        assert not service.wants_frame(2)
+
+        service.streams.clear()
+        service._update_camera_fps()
+        service._last_decode.clear()
+        assert not service.wants_frame(1)
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,377 @@
+import pytest
+import threading
+import time
+import numpy as np
+import cv2
+from datetime import datetime
+from app.services.multi_rtsp_service import (
+    RTSPStreamInstance, MultiRTSPStreamManager, OnDemandStream, SupervisedCamera, map_bbox
+)
+
+
+@pytest.fixture
+def video_path(tmp_path):
+    """Write a short local video file usable as a stream source."""
+    path = str(tmp_path / "camera.avi")
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"MJPG"), 25, (160, 120))
+    for i in range(50):
+        frame = np.full((120, 160, 3), i * 5 % 255, dtype=np.uint8)
+        writer.write(frame)
+    writer.release()
+    return path
+
+
+@pytest.fixture
+def main_video_path(tmp_path):
+    """Write a higher resolution video playing the role of the main stream."""
+    path = str(tmp_path / "camera_main.avi")
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"MJPG"), 25, (640, 480))
+    for i in range(50):
+        writer.write(np.full((480, 640, 3), i * 5 % 255, dtype=np.uint8))
+    writer.release()
+    return path
+
+
+def test_map_bbox_scales_to_main_stream():
+    """Test bbox mapping from substream to main stream resolution."""
+    bbox = map_bbox([10, 20, 40, 60], (120, 160, 3), (480, 640, 3))
+    assert bbox == [40, 80, 160, 240]
+
+
+class TestOnDemandStream:
+    """Tests for on-demand high-res stream."""
+
+    def test_opens_on_request_and_closes_when_idle(self, main_video_path):
+        """Test main stream is opened lazily and released after idle timeout."""
+        stream = OnDemandStream(1, main_video_path)
+        stream.idle_timeout = 0.2
+        assert not stream.is_open
+
+        frame = stream.read()
+        assert frame is not None
+        assert frame.shape == (480, 640, 3)
+        assert stream.is_open
+
+        time.sleep(0.6)
+        assert not stream.is_open
+
+
+class TestRTSPStreamInstance:
+    """Tests for single camera stream ingestion."""
+
+    def test_connect_local_file(self, video_path):
+        """Test connecting to a local video source."""
+        stream = RTSPStreamInstance(1, video_path, room_id=1)
+        assert stream.connect(timeout=5)
+        assert stream.get_frame() is not None
+        stream.disconnect()
+
+    def test_decodes_only_requested_frames(self, video_path):
+        """Test that frames rejected by the decode predicate are grabbed but not decoded."""
+        grabbed = []
+        decoded = []
+
+        def wants_frame(room_id, camera_id):
+            grabbed.append(camera_id)
+            return len(grabbed) % 3 == 0
+
+        stream = RTSPStreamInstance(1, video_path, room_id=1)
+        assert stream.connect(timeout=5)
+        stream.start_streaming(
+            lambda frame, ts, room_id, camera_id: decoded.append(frame.shape),
+            decode_predicate=wants_frame
+        )
+        time.sleep(0.8)
+        stream.stop_streaming()
+        stream.disconnect()
+
+        assert len(grabbed) >= 9
+        assert len(decoded) == len(grabbed) // 3
+
+    def test_frames_decoded_into_ring(self, video_path):
+        """Test decoded frames land in preallocated ring slots and readers borrow views."""
+        stream = RTSPStreamInstance(1, video_path, room_id=1)
+        assert stream.connect(timeout=5)
+        buffers = [id(buffer) for buffer in stream.ring._buffers]
+
+        stream.start_streaming(None)
+        time.sleep(0.3)
+
+        lease = stream.acquire_frame()
+        assert lease is not None
+        assert not lease.frame.flags.writeable
+        lease.release()
+
+        stream.stop_streaming()
+        assert [id(buffer) for buffer in stream.ring._buffers] == buffers
+        assert stream.get_status()["frame_seq"] > 1
+        stream.disconnect()
+
+    def test_step_without_lease_skips_callback(self, video_path, monkeypatch):
+        """Test a ring cleared after the commit skips the callback instead of failing the step."""
+        called = []
+        stream = RTSPStreamInstance(1, video_path, room_id=1)
+        assert stream.connect(timeout=5)
+        stream.is_running = True
+        stream.frame_callback = lambda *args: called.append(args)
+        monkeypatch.setattr(stream.ring, "acquire_latest", lambda: None)
+
+        assert stream._step() == stream.frame_interval
+        assert called == []
+        stream.is_running = False
+        stream.disconnect()
+
+    def test_capture_time_follows_stream_pts(self):
+        """Test PTS spacing is kept so buffered frames show their real age."""
+        stream = RTSPStreamInstance(1, "unused", room_id=1)
+        first = stream._capture_time(10.0)
+
+        time.sleep(0.3)
+        # Frame captured 0.1s after the first one but read 0.3s later
+        assert stream._capture_time(10.1) == pytest.approx(first + 0.1, abs=0.01)
+
+        # PTS jumps back (stream restart) - re-anchor to now
+        assert stream._capture_time(0.0) == pytest.approx(time.time(), abs=0.05)
+
+    def test_frames_carry_pts_and_ingest_time(self, video_path):
+        """Test decoded frames get PTS, ingest time and capture timestamp."""
+        stream = RTSPStreamInstance(1, video_path, room_id=1)
+        assert stream.connect(timeout=5)
+        got = threading.Event()
+        stream.start_streaming(lambda *args: got.set())
+        assert got.wait(5)
+
+        with stream.acquire_frame() as lease:
+            assert lease.pts is not None and lease.pts > 0
+            assert lease.ingest_time <= time.monotonic()
+            assert lease.timestamp <= datetime.now()
+        stream.disconnect()
+
+    def test_request_frame_forces_decode(self, video_path):
+        """Test snapshot request decodes even when no consumer wants frames."""
+        stream = RTSPStreamInstance(1, video_path, room_id=1)
+        assert stream.connect(timeout=5)
+        stream.start_streaming(None, decode_predicate=lambda room_id, camera_id: False)
+
+        stream.ring.clear()
+        frame = stream.request_frame(timeout=2)
+
+        stream.stop_streaming()
+        stream.disconnect()
+        assert frame is not None
+        assert frame.shape == (120, 160, 3)
+
+
+class TestMultiRTSPStreamManager:
+    """Tests for multi-camera stream manager."""
+
+    def test_start_and_stop_camera(self, video_path):
+        """Test starting and stopping a camera."""
+        manager = MultiRTSPStreamManager()
+        assert manager.start_camera(1, video_path, room_id=7, timeout=5)
+
+        status = manager.get_camera_status(1)
+        assert status["room_id"] == 7
+        assert "recognition_interval_ms" in status
+        assert manager.get_room_cameras(7).keys() == {1}
+
+        assert manager.stop_camera(1)
+        assert manager.get_active_count() == 0
+
+    def test_dual_stream_camera(self, video_path, main_video_path):
+        """Test substream decoded continuously and main stream served on demand."""
+        manager = MultiRTSPStreamManager()
+        assert manager.start_camera(1, video_path, room_id=7, timeout=5, high_res_url=main_video_path)
+
+        assert manager.is_dual_stream(1)
+        assert manager.get_camera_status(1)["dual_stream"]
+        assert manager.get_camera_frame(1).shape == (120, 160, 3)
+        assert manager.get_snapshot_frame(1).shape == (480, 640, 3)
+        assert manager.get_camera_status(1)["high_res_open"]
+
+        manager.stop_camera(1)
+
+
+class TestConcurrentStartup:
+    """Tests for non-blocking camera startup in the connect pool."""
+
+    @pytest.fixture
+    def slow_connect(self, monkeypatch):
+        """Make every connect take 0.5s like a slow RTSP handshake."""
+        original_connect = RTSPStreamInstance.connect
+
+        def connect(self, timeout=30):
+            time.sleep(0.5)
+            return original_connect(self, timeout)
+
+        monkeypatch.setattr(RTSPStreamInstance, "connect", connect)
+
+    def test_start_returns_immediately_with_connecting_state(self, video_path, slow_connect):
+        """Test async start does not wait for the connection."""
+        manager = MultiRTSPStreamManager()
+
+        started_at = time.time()
+        future = manager.start_camera_async(1, video_path, room_id=7, timeout=5)
+        assert time.time() - started_at < 0.1
+
+        assert manager.get_camera_status(1)["state"] == "connecting"
+        assert manager.get_room_cameras(7).keys() == {1}
+
+        assert future.result(timeout=5)
+        assert manager.get_camera_status(1)["state"] == "streaming"
+        manager.stop_all()
+
+    def test_room_starts_in_time_of_slowest_camera(self, video_path, slow_connect):
+        """Test cameras connect concurrently."""
+        manager = MultiRTSPStreamManager()
+
+        started_at = time.time()
+        futures = [
+            manager.start_camera_async(camera_id, video_path, room_id=7, timeout=5)
+            for camera_id in range(1, 5)
+        ]
+        assert all(future.result(timeout=5) for future in futures)
+        assert time.time() - started_at < 1.5
+
+        assert manager.get_active_count() == 4
+        manager.stop_all()
+
+    def test_dead_camera_does_not_block_others(self, video_path, tmp_path):
+        """Test a failing camera only fails itself."""
+        manager = MultiRTSPStreamManager()
+
+        dead = manager.start_camera_async(1, str(tmp_path / "missing.avi"), room_id=7, timeout=5)
+        alive = manager.start_camera_async(2, video_path, room_id=7, timeout=5)
+
+        assert alive.result(timeout=5)
+        assert not dead.result(timeout=10)
+        assert manager.get_camera_status(1)["state"] == "reconnecting"
+        manager.stop_all()
+
+    def test_stop_while_connecting(self, video_path, slow_connect):
+        """Test stopping a camera cancels its pending connection."""
+        manager = MultiRTSPStreamManager()
+        future = manager.start_camera_async(1, video_path, room_id=7, timeout=5)
+
+        assert manager.stop_camera(1)
+        assert not future.result(timeout=5)
+        assert manager.get_active_count() == 0
+
+
+class TestCameraSupervisor:
+    """Tests for supervised reconnects with backoff and circuit breaker."""
+
+    @pytest.fixture
+    def manager(self):
+        manager = MultiRTSPStreamManager()
+        manager.supervisor.base_delay = 0.05
+        manager.supervisor.max_delay = 0.2
+        manager.supervisor.failure_threshold = 2
+        yield manager
+        manager.shutdown()
+
+    @pytest.fixture
+    def failing_connect(self, monkeypatch):
+        """Connect fails fast for 'dead://' URLs and records concurrency."""
+        original_connect = RTSPStreamInstance.connect
+        stats = {"active": 0, "max_active": 0, "calls": 0}
+        lock = threading.Lock()
+
+        def connect(self, timeout=30):
+            if not self.rtsp_url.startswith("dead://"):
+                return original_connect(self, timeout)
+            with lock:
+                stats["calls"] += 1
+                stats["active"] += 1
+                stats["max_active"] = max(stats["max_active"], stats["active"])
+            time.sleep(0.1)
+            with lock:
+                stats["active"] -= 1
+            return False
+
+        monkeypatch.setattr(RTSPStreamInstance, "connect", connect)
+        return stats
+
+    def test_backoff_delay_is_jittered_and_capped(self, manager):
+        """Test exponential delay with equal jitter."""
+        supervisor = manager.supervisor
+        supervisor.base_delay = 1.0
+        supervisor.max_delay = 8.0
+
+        for failures, full_delay in [(1, 1.0), (2, 2.0), (3, 4.0), (10, 8.0)]:
+            delays = [supervisor.backoff_delay(failures) for _ in range(50)]
+            assert all(full_delay / 2 <= delay <= full_delay for delay in delays)
+            assert len(set(delays)) > 1
+
+    def test_failed_camera_retries_and_opens_circuit(self, manager, failing_connect):
+        """Test failures are retried and the circuit opens after the threshold."""
+        future = manager.start_camera_async(1, "dead://camera", room_id=7)
+        assert not future.result(timeout=5)
+
+        time.sleep(0.8)
+        status = manager.get_all_statuses()[1]
+        assert failing_connect["calls"] >= 3
+        assert status["circuit"]["state"] in ("open", "half_open")
+        assert status["circuit"]["failures"] >= 2
+        assert status["circuit"]["last_error"] == "connect failed"
+
+    def test_lost_stream_is_restarted(self, manager, video_path):
+        """Test a stream that dies (file ends) is reconnected by the supervisor."""
+        assert manager.start_camera(1, video_path, room_id=7, timeout=5)
+
+        deadline = time.time() + 10
+        while time.time() < deadline:
+            circuit = manager.supervisor.get(1)
+            if circuit.restarts >= 1 and manager.is_camera_active(1):
+                break
+            time.sleep(0.1)
+
+        assert manager.supervisor.get(1).restarts >= 1
+        assert manager.is_camera_active(1)
+
+    def test_stop_cancels_reconnects(self, manager, failing_connect):
+        """Test a stopped camera is no longer retried."""
+        manager.start_camera_async(1, "dead://camera", room_id=7).result(timeout=5)
+        assert manager.stop_camera(1)
+
+        calls = failing_connect["calls"]
+        time.sleep(0.5)
+        assert failing_connect["calls"] == calls
+        assert manager.get_camera_status(1) is None
+
+    def test_status_survives_camera_unregistered_mid_listing(self, manager, failing_connect, monkeypatch):
+        """Test a camera stopped between collecting and reporting statuses does not break listing."""
+        manager.supervisor.register(SupervisedCamera(3, "dead://camera", 7, None, 5, None, None))
+        waiting_cameras = manager._waiting_cameras
+
+        def waiting_then_unregister():
+            cameras = waiting_cameras()
+            manager.supervisor.unregister(3)
+            return cameras
+
+        monkeypatch.setattr(manager, "_waiting_cameras", waiting_then_unregister)
+        statuses = manager.get_all_statuses()
+        assert statuses[3]["state"] == "reconnecting"
+        assert statuses[3]["room_id"] == 7
+        assert manager.get_room_cameras(7) == {}
+        assert manager.get_camera_status(3) is None
+
+    def test_reconnect_storm_is_bounded(self, manager, failing_connect):
+        """Test only RECONNECT_MAX_CONCURRENT reconnects run at once."""
+        manager.supervisor.max_concurrent = 2
+        futures = [
+            manager.start_camera_async(camera_id, "dead://camera", room_id=7)
+            for camera_id in range(1, 9)
+        ]
+        for future in futures:
+            future.result(timeout=5)
+
+        # Initial attempts are bounded by the connect pool only
+        failing_connect["max_active"] = 0
+        time.sleep(1.0)
+
+        assert failing_connect["max_active"] <= 2
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,58 @@
+import pytest
+import time
+from datetime import datetime, timedelta
+from app.services.pipeline_metrics import PipelineMetrics, FrameTrace
+
+
+class TestPipelineMetrics:
+    """Tests for per-camera pipeline stage metrics."""
+
+    def test_stage_stats_per_camera(self):
+        """Test stage percentiles are kept per camera and ordered by pipeline stage."""
+        metrics = PipelineMetrics()
+        for ms in range(1, 101):
+            metrics.record_stages(1, {"detect": float(ms), "db": 2.0, "total": ms + 2.0})
+        metrics.record(1, "decode", 3.0)
+        metrics.record_stages(2, {"detect": 50.0, "total": 50.0})
+
+        stats = metrics.get_camera_stats(1)
+        assert list(stats["stages"]) == ["decode", "detect", "db", "total"]
+        assert stats["stages"]["detect"]["p50_ms"] == pytest.approx(50, abs=1)
+        assert stats["stages"]["detect"]["p95_ms"] == pytest.approx(95, abs=1)
+        assert stats["stages"]["db"]["avg_ms"] == 2.0
+        assert metrics.get_camera_stats(2)["stages"]["detect"]["count"] == 1
+
+    def test_recognition_fps(self):
+        """Test achieved recognition fps over the window."""
+        metrics = PipelineMetrics(fps_window_seconds=10.0)
+        for _ in range(30):
+            metrics.record_stages(1, {"total": 1.0})
+        assert metrics.recognition_fps(1) == 3.0
+
+        metrics.reset(1)
+        assert metrics.recognition_fps(1) == 0.0
+
+
+class TestFrameTrace:
+    """Tests for per-frame latency tracing."""
+
+    def test_trace_fields(self):
+        """Test queue time, accumulated stages and glass-to-glass latency."""
+        capture_time = datetime.now() - timedelta(milliseconds=200)
+        trace = FrameTrace(1, capture_time, seq=42, pts=3.2, ingest_time=time.monotonic() - 0.05)
+        assert trace.timings["queue"] >= 50
+
+        with trace.stage("db"):
+            time.sleep(0.01)
+        with trace.stage("db"):
+            time.sleep(0.01)
+
+        fields = trace.to_dict()
+        assert fields["frame_seq"] == 42
+        assert fields["pts"] == 3.2
+        assert fields["timings_ms"]["db"] >= 20
+        assert fields["latency_ms"] >= 220
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
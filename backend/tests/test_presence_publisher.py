@@ -0,0 +1,185 @@
+import pytest
+import asyncio
+
+from app.services.presence_publisher import PresencePublisher, diff_occupants
+from tests.helpers import run
+
+
+def occupant(student_id: int, last_seen_at: str = "10:00:00", camera_id: int = 1) -> dict:
+    return {
+        "student_id": student_id,
+        "student_number": f"S{student_id}",
+        "first_name": "Ali",
+        "last_name": "Valiyev",
+        "group_name": "G1",
+        "last_seen_at": last_seen_at,
+        "confidence": 0.9,
+        "camera_id": camera_id
+    }
+
+
+class FakeRooms:
+    """Room presence source and broadcast sink for the publisher callbacks."""
+
+    def __init__(self):
+        self.rooms = {1: ("Room A", []), 2: ("Room B", [])}
+        self.guests = {}
+        self.watched = {1, 2}
+        self.loads = 0
+        self.sent = []
+
+    async def load_room(self, room_id):
+        self.loads += 1
+        return self.rooms.get(room_id)
+
+    async def broadcast(self, room_id, message):
+        self.sent.append(message)
+
+    def publisher(self, hz: float = 50.0) -> PresencePublisher:
+        return PresencePublisher(
+            self.load_room,
+            lambda room_id: self.guests.get(room_id, 0),
+            self.broadcast,
+            lambda room_id: room_id in self.watched,
+            hz=hz
+        )
+
+
+class TestDiffOccupants:
+    """Tests for join/leave/update diffs."""
+
+    def test_joined_left_updated(self):
+        """Test each occupant change lands in one list."""
+        old = {1: occupant(1), 2: occupant(2), 3: occupant(3)}
+        new = {1: occupant(1), 2: occupant(2, last_seen_at="10:00:05"), 4: occupant(4)}
+
+        joined, left, updated = diff_occupants(old, new)
+        assert [o["student_id"] for o in joined] == [4]
+        assert left == [3]
+        assert [o["student_id"] for o in updated] == [2]
+
+    def test_no_change(self):
+        """Test identical occupants give an empty diff."""
+        assert diff_occupants({1: occupant(1)}, {1: occupant(1)}) == ([], [], [])
+
+
+class TestPresencePublisher:
+    """Tests for coalesced, versioned presence broadcasts."""
+
+    @pytest.fixture
+    def rooms(self):
+        return FakeRooms()
+
+    def test_marks_are_coalesced_into_one_diff(self, rooms):
+        """Test many recognitions in one interval give one load and one diff."""
+        async def scenario():
+            publisher = rooms.publisher()
+            await publisher.snapshot(1)
+            rooms.rooms[1] = ("Room A", [occupant(1), occupant(2)])
+            for student_id in (1, 2, 1, 2):
+                publisher.mark_dirty(1, new_recognitions=[{"student_id": student_id}])
+            await asyncio.sleep(0.1)
+            publisher.stop()
+
+        run(scenario())
+        assert rooms.loads == 2  # snapshot + one flush
+        assert len(rooms.sent) == 1
+        diff = rooms.sent[0]
+        assert diff["type"] == "presence_diff"
+        assert diff["version"] == 2
+        assert [o["student_id"] for o in diff["joined"]] == [1, 2]
+        assert len(diff["new_recognitions"]) == 4
+        assert diff["total_count"] == 2
+
+    def test_versions_increase_by_one(self, rooms):
+        """Test consecutive diffs carry consecutive versions."""
+        async def scenario():
+            publisher = rooms.publisher()
+            first = await publisher.snapshot(1)
+
+            rooms.rooms[1] = ("Room A", [occupant(1)])
+            publisher.states[1].last_publish = 0.0
+            publisher.mark_dirty(1)
+            await publisher.flush()
+
+            rooms.rooms[1] = ("Room A", [])
+            publisher.states[1].last_publish = 0.0
+            publisher.mark_dirty(1)
+            await publisher.flush()
+            publisher.stop()
+            return first
+
+        first = run(scenario())
+        assert [m["version"] for m in rooms.sent] == [first["version"] + 1, first["version"] + 2]
+        assert rooms.sent[1]["left"] == [1]
+
+    def test_rate_limited_per_room(self, rooms):
+        """Test a room is not published again within 1/hz."""
+        async def scenario():
+            publisher = rooms.publisher(hz=1.0)
+            await publisher.snapshot(1)
+            rooms.rooms[1] = ("Room A", [occupant(1)])
+            publisher.mark_dirty(1)
+            await publisher.flush()  # within 1s of the snapshot
+            publisher.stop()
+            return publisher
+
+        publisher = run(scenario())
+        assert rooms.sent == []
+        assert publisher.states[1].dirty
+
+    def test_unchanged_room_is_not_sent(self, rooms):
+        """Test a mark without an actual change sends nothing."""
+        async def scenario():
+            publisher = rooms.publisher()
+            await publisher.snapshot(1)
+            publisher.states[1].last_publish = 0.0
+            publisher.mark_dirty(1)
+            await publisher.flush()
+            publisher.stop()
+            return publisher
+
+        publisher = run(scenario())
+        assert rooms.sent == []
+        assert publisher.unchanged == 1
+
+    def test_unwatched_room_publishes_on_snapshot(self, rooms):
+        """Test unwatched rooms skip the loop and catch up when a subscriber asks."""
+        async def scenario():
+            publisher = rooms.publisher()
+            rooms.watched = set()
+            rooms.rooms[2] = ("Room B", [occupant(5)])
+            publisher.mark_dirty(2)
+            await publisher.flush()
+            loads_before = rooms.loads
+            snapshot = await publisher.snapshot(2)
+            publisher.stop()
+            return loads_before, snapshot
+
+        loads_before, snapshot = run(scenario())
+        assert loads_before == 0
+        assert snapshot["version"] == 1
+        assert [o["student_id"] for o in snapshot["occupants"]] == [5]
+
+    def test_snapshots_seed_new_rooms_without_query(self, rooms):
+        """Test dashboard snapshots reuse the listed presence for unseen rooms."""
+        async def scenario():
+            publisher = rooms.publisher()
+            rooms.guests[1] = 2
+            listed = [{"room_id": 1, "room_name": "Room A", "occupants": [occupant(1)], "total_count": 1}]
+            snapshots = await publisher.snapshots(listed)
+            publisher.stop()
+            return snapshots
+
+        snapshots = run(scenario())
+        assert rooms.loads == 0
+        assert snapshots[0]["version"] == 1
+        assert snapshots[0]["total_people"] == 3
+
+    def test_missing_room(self, rooms):
+        """Test a deleted room has no snapshot."""
+        assert run(rooms.publisher().snapshot(99)) is None
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
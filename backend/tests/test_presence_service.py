@@ -0,0 +1,224 @@
+import pytest
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+from sqlalchemy import select
+
+from app.models import Student, Room, RoomPresence
+from app.services.presence_service import PresenceService
+from tests.helpers import run
+
+
+def student(db_id: int) -> SimpleNamespace:
+    return SimpleNamespace(
+        id=db_id,
+        student_id=f"S{db_id:03d}",
+        first_name="Ali",
+        last_name=f"Valiyev {db_id}",
+        group_name="G1"
+    )
+
+
+@pytest.fixture
+def seed_rows() -> list:
+    """Two students and two rooms."""
+    rows = []
+    for i in (1, 2):
+        rows.append(Student(id=i, student_id=f"S{i:03d}", first_name="Ali", last_name=f"Valiyev {i}", group_name="G1"))
+        rows.append(Room(id=i, name=f"Xona {i}"))
+    return rows
+
+
+class TestInMemoryPresence:
+    """Tests for presence kept in memory with timer-heap expiry."""
+
+    @pytest.fixture
+    def service(self):
+        return PresenceService()
+
+    def test_student_is_in_one_room(self, service):
+        """Test moving rooms removes the student from the old room."""
+        service.update_presence(student(1), 1, 10, 0.8)
+        service.update_presence(student(1), 2, 20, 0.9)
+
+        assert service.get_room_presence(1) == []
+        [info] = service.get_room_presence(2)
+        assert (info.student_id, info.camera_id, info.confidence) == (1, 20, 0.9)
+
+    def test_room_presence_newest_first(self, service):
+        """Test occupants are ordered by last seen time."""
+        service.update_presence(student(1), 1, 10, 0.8)
+        service.update_presence(student(2), 1, 10, 0.8)
+        assert [p.student_id for p in service.get_room_presence(1)] == [2, 1]
+
+    def test_expiry_uses_latest_refresh(self, service):
+        """Test only entries not refreshed within the timeout expire."""
+        service.update_presence(student(1), 1, 10, 0.8)
+        service.update_presence(student(2), 1, 10, 0.8)
+        # Student 1 last seen long ago, student 2 refreshed just now
+        service._entries[1].info.last_seen_at = datetime.now() - timedelta(seconds=service.presence_timeout + 5)
+        service._set_entry(1, service._entries[1])
+        service.update_presence(student(2), 1, 10, 0.9)
+
+        assert service.expire_stale() == {1: 1}
+        assert [p.student_id for p in service.get_room_presence(1)] == [2]
+        assert service.expire_stale() == {}
+        assert service._removed == {1}
+
+    def test_clear_room(self, service):
+        """Test clearing a room removes and queues deletes for its occupants."""
+        service.update_presence(student(1), 1, 10, 0.8)
+        service.update_presence(student(2), 2, 20, 0.8)
+        assert service.clear_room_presence(1) == 1
+        assert service.get_room_presence(1) == []
+        assert len(service.get_room_presence(2)) == 1
+
+
+class TestWriteBehind:
+    """Tests for batched persistence to room_presence."""
+
+    def test_flush_upserts_and_deletes(self, sessions):
+        """Test one flush writes updates and removals; later updates upsert."""
+        async def scenario():
+            service = PresenceService()
+            service.update_presence(student(1), 1, None, 0.8)
+            service.update_presence(student(2), 1, None, 0.7)
+            assert await service.flush() == 2
+
+            service.update_presence(student(1), 2, None, 0.95)
+            service.clear_room_presence(1)  # student 2
+            assert await service.flush() == 2
+            assert await service.flush() == 0
+
+            async with sessions() as db:
+                rows = (await db.execute(select(RoomPresence))).scalars().all()
+            return [(r.student_id, r.room_id, r.confidence_score) for r in rows]
+
+        assert run(scenario()) == [(1, 2, 0.95)]
+
+    def test_load_restores_current_presence(self, sessions):
+        """Test startup loads fresh rows into memory and deletes stale ones."""
+        async def scenario():
+            now = datetime.now()
+            async with sessions() as db:
+                db.add(RoomPresence(student_id=1, room_id=1, last_seen_at=now, confidence_score=0.8))
+                db.add(RoomPresence(student_id=2, room_id=1, last_seen_at=now - timedelta(hours=1)))
+                await db.commit()
+
+            service = PresenceService()
+            async with sessions() as db:
+                loaded = await service.load_from_db(db)
+                await db.commit()
+                remaining = (await db.execute(select(RoomPresence.student_id))).scalars().all()
+            return loaded, service, remaining
+
+        loaded, service, remaining = run(scenario())
+        assert loaded == 1
+        assert [p.student_id for p in service.get_room_presence(1)] == [1]
+        assert remaining == [1]
+
+    def test_stop_flushes_pending(self, sessions):
+        """Test shutdown writes changes made since the last flush."""
+        async def scenario():
+            service = PresenceService()
+            await service.start()
+            service.update_presence(student(2), 2, None, 0.9)
+            await service.stop()
+            async with sessions() as db:
+                return (await db.execute(select(RoomPresence.student_id))).scalars().all()
+
+        assert run(scenario()) == [2]
+
+    def test_removed_student_is_not_written_back(self, sessions):
+        """Test removing a student replaces its pending upsert with a delete."""
+        async def scenario():
+            service = PresenceService()
+            notified = []
+            service.add_listener(notified.append)
+            service.update_presence(student(1), 1, None, 0.8)
+            await service.flush()
+            service.update_presence(student(1), 2, None, 0.9)
+
+            room_id = service.remove_student(1)
+            assert service.remove_student(1) is None
+            await service.flush()
+            async with sessions() as db:
+                remaining = (await db.execute(select(RoomPresence.student_id))).scalars().all()
+            return room_id, notified, service, remaining
+
+        room_id, notified, service, remaining = run(scenario())
+        assert room_id == 2
+        assert notified == [{2}]
+        assert service.get_room_presence(2) == []
+        assert remaining == []
+
+
+class TestQueryCounts:
+    """Regression tests: dashboard queries must not grow with room or occupant count."""
+
+    def add_rooms(self, sessions, count: int):
+        async def add():
+            async with sessions() as db:
+                for i in range(count):
+                    db.add(Room(name=f"Qo'shimcha {i}"))
+                await db.commit()
+        run(add())
+
+    def test_all_rooms_presence_is_one_query(self, sessions, statements):
+        """Test the dashboard listing is one query for 2 or 32 rooms."""
+        service = PresenceService()
+        service.update_presence(student(1), 1, None, 0.8)
+
+        async def listing():
+            async with sessions() as db:
+                return await service.get_all_rooms_presence_with_names(db)
+
+        statements.clear()
+        assert len(run(listing())) == 2
+        small = len(statements)
+
+        self.add_rooms(sessions, 30)
+        statements.clear()
+        rooms = run(listing())
+        assert len(rooms) == 32
+        assert small == len(statements) == 1
+        assert [r["total_count"] for r in rooms if r["room_id"] == 1] == [1]
+
+    def test_stats_is_one_count_query(self, sessions, statements):
+        """Test presence stats count rooms in SQL and occupants in memory."""
+        service = PresenceService()
+        service.update_presence(student(1), 1, None, 0.8)
+        service.update_presence(student(2), 1, None, 0.8)
+        self.add_rooms(sessions, 10)
+
+        async def stats():
+            async with sessions() as db:
+                return await service.get_presence_stats(db)
+
+        statements.clear()
+        result = run(stats())
+        assert statements == ["SELECT"]
+        assert (result["total_rooms"], result["total_people_tracked"], result["occupied_rooms"]) == (12, 2, 1)
+
+    def test_flush_is_one_statement_per_kind(self, sessions, statements):
+        """Test write-behind batches all upserts and all deletes."""
+        service = PresenceService()
+
+        async def scenario():
+            service.update_presence(student(1), 1, None, 0.8)
+            service.update_presence(student(2), 2, None, 0.8)
+            await service.flush()
+            statements.clear()
+            service.update_presence(student(1), 2, None, 0.9)
+            service.clear_room_presence(2)  # student 1 and 2
+            service.update_presence(student(2), 1, None, 0.9)
+            await service.flush()
+
+        run(scenario())
+        assert statements.count("INSERT") == 1
+        assert statements.count("DELETE") == 1
+        assert statements.count("SELECT") == 0
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,126 @@
+import pytest
+import threading
+
+import cv2
+import numpy as np
+
+from app.core.config import settings
+from app.services.frame_ring import FrameRingBuffer
+from app.services.preview_encoder import PreviewTier, PreviewEncoder, encode_tiers
+
+SHAPE = (480, 640, 3)
+
+
+def leased_frame(ring: FrameRingBuffer):
+    slot, buffer = ring.begin_write()
+    buffer[:] = 128
+    ring.commit(slot, buffer)
+    return ring.acquire_latest()
+
+
+class TestPreviewTier:
+    """Tests for subscriber preview tier parsing."""
+
+    def test_defaults_to_full_size(self):
+        """Test missing params give the full-size default tier."""
+        tier = PreviewTier.from_params({})
+        assert tier == PreviewTier(0, settings.PREVIEW_MAX_FPS, settings.PREVIEW_JPEG_QUALITY)
+
+    def test_clamped_to_server_limits(self):
+        """Test requested values are clamped (params arrive as strings)."""
+        tier = PreviewTier.from_params({"max_width": "10", "fps": "1000", "quality": "100"})
+        assert tier.max_width == settings.PREVIEW_MIN_WIDTH
+        assert tier.fps == settings.PREVIEW_MAX_FPS
+        assert tier.quality == settings.PREVIEW_JPEG_QUALITY
+
+    def test_invalid_values_fall_back(self):
+        """Test garbage params do not break the subscription."""
+        assert PreviewTier.from_params({"fps": "fast"}) == PreviewTier.default()
+
+
+class TestEncodeTiers:
+    """Tests for encoding one frame for several tiers."""
+
+    def test_thumbnail_is_downscaled(self):
+        """Test a thumbnail tier is resized to its max width, keeping aspect ratio."""
+        frame = np.full(SHAPE, 100, dtype=np.uint8)
+        thumb, full = PreviewTier(320, 5, 60), PreviewTier(0, 25, 85)
+        results = encode_tiers(frame, [thumb, full])
+
+        small = cv2.imdecode(np.frombuffer(results[thumb], np.uint8), cv2.IMREAD_COLOR)
+        large = cv2.imdecode(np.frombuffer(results[full], np.uint8), cv2.IMREAD_COLOR)
+        assert small.shape == (240, 320, 3)
+        assert large.shape == SHAPE
+        assert len(results[thumb]) < len(results[full])
+
+    def test_equal_output_shares_encode(self):
+        """Test tiers that differ only in fps share the same JPEG."""
+        frame = np.full(SHAPE, 100, dtype=np.uint8)
+        a, b = PreviewTier(320, 5, 60), PreviewTier(320, 15, 60)
+        results = encode_tiers(frame, [a, b])
+        assert results[a] is results[b]
+
+    def test_quality_cap(self):
+        """Test the degradation quality cap applies to every tier."""
+        frame = np.random.default_rng(0).integers(0, 255, SHAPE, dtype=np.uint8)
+        tier = PreviewTier(0, 25, 85)
+        capped = encode_tiers(frame, [tier], quality_cap=30)
+        uncapped = encode_tiers(frame, [tier])
+        assert len(capped[tier]) < len(uncapped[tier])
+
+    def test_larger_max_width_keeps_source_size(self):
+        """Test frames are never upscaled."""
+        frame = np.full(SHAPE, 100, dtype=np.uint8)
+        tier = PreviewTier(1920, 25, 85)
+        decoded = cv2.imdecode(np.frombuffer(encode_tiers(frame, [tier])[tier], np.uint8), cv2.IMREAD_COLOR)
+        assert decoded.shape == SHAPE
+
+
+class TestPreviewEncoder:
+    """Tests for off-thread preview encoding."""
+
+    @pytest.fixture
+    def ring(self):
+        ring = FrameRingBuffer(size=3)
+        ring.allocate(SHAPE)
+        return ring
+
+    def test_encodes_off_thread_and_releases_lease(self, ring):
+        """Test the job runs on the pool and releases the pinned slot."""
+        encoder = PreviewEncoder(threads=1)
+        done = threading.Event()
+        results = {}
+
+        def on_done(frames):
+            results.update(frames)
+            results["thread"] = threading.current_thread().name
+            done.set()
+
+        lease = leased_frame(ring)
+        tier = PreviewTier(320, 5, 60)
+        assert encoder.submit(1, lease, [tier], on_done)
+        assert done.wait(5)
+
+        assert results["thread"].startswith("preview")
+        assert tier in results
+        assert lease._released
+        assert not encoder.is_busy(1)
+        assert encoder.get_stats()["tiers"][0]["frames"] == 1
+        encoder.shutdown()
+
+    def test_skips_camera_with_encode_in_flight(self, ring):
+        """Test a second frame is refused while the camera's encode is running."""
+        encoder = PreviewEncoder(threads=1)
+        gate = threading.Event()
+        encoder.submit(1, leased_frame(ring), [PreviewTier.default()], lambda frames: gate.wait(5))
+
+        lease = leased_frame(ring)
+        assert not encoder.submit(1, lease, [PreviewTier.default()], lambda frames: None)
+        assert encoder.get_stats()["skipped_busy"] == 1
+        lease.release()
+        gate.set()
+        encoder.shutdown()
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,135 @@
+import pytest
+import time
+import numpy as np
+
+av = pytest.importorskip("av")
+
+from app.core.config import settings
+from app.services.pyav_capture import PyAVCapture
+from app.services.multi_rtsp_service import RTSPStreamInstance
+
+GOP_SIZE = 25
+FRAME_COUNT = 200
+
+
+@pytest.fixture
+def h264_like_path(tmp_path):
+    """Write a local inter-frame coded video (one keyframe per GOP)."""
+    path = str(tmp_path / "camera.mp4")
+    container = av.open(path, "w")
+    stream = container.add_stream("mpeg4", rate=25)
+    stream.width = 160
+    stream.height = 120
+    stream.pix_fmt = "yuv420p"
+    stream.codec_context.gop_size = GOP_SIZE
+
+    for i in range(FRAME_COUNT):
+        image = np.full((120, 160, 3), 64, dtype=np.uint8)
+        x = i % 140
+        image[50:70, x:x + 20] = 200
+        frame = av.VideoFrame.from_ndarray(image, format="bgr24")
+        for packet in stream.encode(frame):
+            container.mux(packet)
+    for packet in stream.encode():
+        container.mux(packet)
+    container.close()
+    return path
+
+
+def read_all(capture: PyAVCapture) -> int:
+    grabbed = 0
+    while capture.grab():
+        grabbed += 1
+    return grabbed
+
+
+class TestPyAVCapture:
+    """Tests for packet-level ingest backend."""
+
+    def test_full_decode(self, h264_like_path):
+        """Test every frame is decoded in full mode."""
+        capture = PyAVCapture(h264_like_path)
+        assert capture.isOpened()
+
+        ret, frame = capture.read()
+        assert ret
+        assert frame.shape == (120, 160, 3)
+
+        assert read_all(capture) + 1 == FRAME_COUNT
+        assert capture.packets_decoded == capture.packets_demuxed
+        assert not capture.isOpened()  # end of stream closes the capture
+        capture.release()
+
+    def test_keyframes_only_decodes_one_frame_per_gop(self, h264_like_path):
+        """Test keyframe mode skips >90% of decode work."""
+        capture = PyAVCapture(h264_like_path)
+        capture.set_keyframes_only(True)
+
+        grabbed = read_all(capture)
+        capture.release()
+
+        assert grabbed == FRAME_COUNT // GOP_SIZE
+        assert capture.packets_demuxed == FRAME_COUNT
+        assert capture.packets_decoded / capture.packets_demuxed <= 0.1
+
+    def test_switch_back_waits_for_keyframe(self, h264_like_path):
+        """Test full decode resumes at the next keyframe."""
+        capture = PyAVCapture(h264_like_path)
+        capture.set_keyframes_only(True)
+        assert capture.grab()  # keyframe of GOP 0
+
+        capture.set_keyframes_only(False)
+        assert capture.grab()
+        # GOP 0 P-frames were skipped; decode resumes with GOP 1 keyframe
+        assert capture.packets_demuxed == GOP_SIZE + 1
+        assert capture.packets_decoded == 2
+
+        assert capture.grab()
+        assert capture.packets_decoded == 3
+        capture.release()
+
+    def test_missing_file(self, tmp_path):
+        """Test opening a missing source."""
+        capture = PyAVCapture(str(tmp_path / "missing.mp4"))
+        assert not capture.isOpened()
+        assert not capture.grab()
+
+
+class TestKeyframeMode:
+    """Tests for idle camera keyframe-only switching."""
+
+    def test_idle_camera_switches_to_keyframes(self, h264_like_path, monkeypatch):
+        """Test idle camera enters keyframe mode and leaves it on activity."""
+        monkeypatch.setattr(settings, "RTSP_INGEST_BACKEND", "pyav")
+
+        stream = RTSPStreamInstance(1, h264_like_path, room_id=1)
+        assert stream.connect(timeout=5)
+        assert stream.supports_keyframe_mode
+
+        stream.cadence.state = "idle"
+        stream.last_activity = time.time() - stream.idle_seconds - 1
+        stream._update_decode_mode()
+        assert stream.keyframes_only
+        assert stream.get_status()["decode_mode"] == "keyframes"
+
+        # Face found by recognition -> full decode
+        stream.cadence.state = "active"
+        stream._update_decode_mode()
+        assert not stream.keyframes_only
+
+        stream.disconnect()
+
+    def test_motion_detection(self):
+        """Test thumbnail difference detects motion."""
+        stream = RTSPStreamInstance(1, "unused", room_id=1)
+        still = np.zeros((120, 160, 3), dtype=np.uint8)
+        moved = still.copy()
+        moved[:, 80:] = 255
+
+        assert not stream._detect_motion(still)
+        assert not stream._detect_motion(still)
+        assert stream._detect_motion(moved)
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,84 @@
+import pytest
+from app.services.recognition_cadence import RecognitionCadence
+
+
+class TestRecognitionCadence:
+    """Tests for adaptive per-camera recognition cadence."""
+
+    @pytest.fixture
+    def cadence(self):
+        """Create cadence with predictable bounds."""
+        cadence = RecognitionCadence()
+        cadence.min_interval_ms = 300
+        cadence.interval_ms = 300
+        cadence.max_interval_ms = 2400
+        cadence.stable_interval_ms = 900
+        cadence.backoff_factor = 2.0
+        cadence.relax_factor = 1.5
+        return cadence
+
+    def test_backs_off_without_faces(self, cadence):
+        """Test exponential backoff while no faces are seen."""
+        intervals = []
+        for _ in range(5):
+            cadence.update(frozenset(), all_identified=True)
+            intervals.append(cadence.interval_ms)
+
+        assert intervals == [600, 1200, 2400, 2400, 2400]
+        assert cadence.state == "idle"
+
+    def test_snaps_to_fast_when_faces_appear(self, cadence):
+        """Test that new faces reset the interval."""
+        for _ in range(3):
+            cadence.update(frozenset(), all_identified=True)
+
+        cadence.update(frozenset({"s1"}), all_identified=True)
+        assert cadence.interval_ms == 300
+        assert cadence.state == "active"
+
+    def test_relaxes_when_stable_and_identified(self, cadence):
+        """Test relaxing up to the stable interval."""
+        signature = frozenset({"s1", "s2"})
+        cadence.update(signature, all_identified=True)
+        cadence.update(signature, all_identified=True)
+        assert cadence.state == "stable"
+        assert cadence.interval_ms == 450
+
+        for _ in range(5):
+            cadence.update(signature, all_identified=True)
+        assert cadence.interval_ms == 900
+
+    def test_stays_fast_with_unidentified_faces(self, cadence):
+        """Test that unidentified tracks keep the fast cadence."""
+        signature = frozenset({"s1", "g100_200"})
+        cadence.update(signature, all_identified=False)
+        cadence.update(signature, all_identified=False)
+        assert cadence.interval_ms == 300
+
+    def test_track_change_snaps_back(self, cadence):
+        """Test that a changed track set resets a relaxed cadence."""
+        cadence.update(frozenset({"s1"}), all_identified=True)
+        for _ in range(4):
+            cadence.update(frozenset({"s1"}), all_identified=True)
+        assert cadence.interval_ms > 300
+
+        cadence.update(frozenset({"s1", "s2"}), all_identified=True)
+        assert cadence.interval_ms == 300
+
+    def test_is_due_respects_floor(self, cadence):
+        """Test due check with a global interval floor."""
+        cadence.mark_run(now_ms=1000)
+        assert not cadence.is_due(now_ms=1200)
+        assert cadence.is_due(now_ms=1300)
+        assert not cadence.is_due(floor_ms=1000, now_ms=1300)
+        assert cadence.is_due(floor_ms=1000, now_ms=2000)
+
+    def test_status(self, cadence):
+        """Test status fields reported in camera status."""
+        status = cadence.to_dict()
+        assert status["recognition_interval_ms"] == 300
+        assert status["cadence_state"] == "active"
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,146 @@
+import pytest
+import queue
+import threading
+import time
+import numpy as np
+import cv2
+from multiprocessing import shared_memory
+from app.services.multi_rtsp_service import RTSPStreamInstance
+from app.services.sharded_ingest import SharedFrameRing, ShardedIngestManager, ingest_worker_main
+
+SHAPE = (120, 160, 3)
+
+
+@pytest.fixture
+def video_path(tmp_path):
+    """Write a local video file long enough to stream for a few seconds."""
+    path = str(tmp_path / "camera.avi")
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"MJPG"), 25, (160, 120))
+    for i in range(250):
+        writer.write(np.full((120, 160, 3), i % 255, dtype=np.uint8))
+    writer.release()
+    return path
+
+
+class TestSharedFrameRing:
+    """Tests for shared-memory frame slots."""
+
+    @pytest.fixture
+    def rings(self):
+        writer = SharedFrameRing.create(f"anvar_test_{id(self)}", SHAPE, np.uint8, 3)
+        reader = SharedFrameRing.attach(writer.shm.name, SHAPE, "|u1", 3)
+        yield writer, reader
+        reader.close()
+        writer.close()
+        writer.unlink()
+
+    def test_descriptor_reads_frame(self, rings):
+        """Test a (slot, seq) descriptor reads the written frame in another mapping."""
+        writer, reader = rings
+        slot, seq = writer.write(np.full(SHAPE, 7, dtype=np.uint8))
+
+        out = np.empty(SHAPE, dtype=np.uint8)
+        assert reader.read_into(slot, seq, out)
+        assert out[0, 0, 0] == 7
+
+    def test_overwritten_slot_is_rejected(self, rings):
+        """Test a stale descriptor is dropped after the writer reused the slot."""
+        writer, reader = rings
+        slot, seq = writer.write(np.full(SHAPE, 1, dtype=np.uint8))
+        for i in range(writer.slots):
+            writer.write(np.full(SHAPE, 2 + i, dtype=np.uint8))
+
+        out = np.empty(SHAPE, dtype=np.uint8)
+        assert not reader.read_into(slot, seq, out)
+
+
+class TestIngestWorker:
+    """Tests for the worker's control message handling (run in a thread)."""
+
+    def test_retried_start_replaces_stream(self, video_path, monkeypatch):
+        """Test a start repeated while connecting leaves one stream and no leaked rings."""
+        connect = RTSPStreamInstance.connect
+
+        def slow_connect(stream, timeout=30):
+            time.sleep(0.3)
+            return connect(stream, timeout)
+
+        monkeypatch.setattr(RTSPStreamInstance, "connect", slow_connect)
+        control, events = queue.Queue(), queue.Queue()
+        worker = threading.Thread(target=ingest_worker_main, args=(0, control, events), daemon=True)
+        worker.start()
+        control.put(("start", 3, video_path, 1, 10))
+        control.put(("start", 3, video_path, 1, 10))
+
+        received = []
+        while not any(e[0] == "frame" for e in received):
+            received.append(events.get(timeout=20))
+        time.sleep(0.5)
+        control.put(("shutdown",))
+        worker.join(10)
+        time.sleep(0.5)
+        while not events.empty():
+            received.append(events.get())
+
+        assert [e for e in received if e[0] == "started"] == [("started", 3, True)]
+        for name in {e[2] for e in received if e[0] == "ring"}:
+            with pytest.raises(FileNotFoundError):
+                shared_memory.SharedMemory(name=name)
+
+
+class TestShardedIngestManager:
+    """Tests for process-sharded camera ingestion."""
+
+    @pytest.fixture
+    def manager(self):
+        manager = ShardedIngestManager(workers=2)
+        yield manager
+        manager.shutdown()
+
+    def test_frames_flow_from_worker_process(self, manager, video_path):
+        """Test frames decoded in a worker reach the callback in the API process."""
+        received = []
+        got_frame = threading.Event()
+
+        def callback(frame, timestamp, room_id, camera_id):
+            received.append((camera_id, frame.shape, frame[0, 0, 0]))
+            got_frame.set()
+
+        assert manager.start_camera(3, video_path, room_id=1, frame_callback=callback, timeout=30)
+        assert got_frame.wait(20)
+
+        status = manager.get_camera_status(3)
+        assert status["ingest_shard"] == 1
+        assert received[0][1] == SHAPE
+        assert manager.get_camera_frame(3).shape == SHAPE
+
+        manager.stop_camera(3)
+        assert not manager.is_camera_active(3)
+
+    def test_killed_worker_reports_lost_cameras(self, manager, video_path):
+        """Test cameras of a worker that dies without sending events are reported lost."""
+        got_frame = threading.Event()
+        lost = threading.Event()
+        assert manager.start_camera(3, video_path, room_id=1, frame_callback=lambda *args: got_frame.set(), timeout=30)
+        assert got_frame.wait(20)
+
+        stream = manager.streams[3]
+        on_lost = stream.on_lost
+
+        def record_lost(s):
+            lost.set()
+            on_lost(s)
+
+        stream.on_lost = record_lost
+        stream.shard.process.kill()
+
+        assert lost.wait(10)
+        assert not stream.is_connected
+
+    def test_dead_camera_fails(self, manager, tmp_path):
+        """Test a camera that cannot be opened in the worker reports failure."""
+        assert not manager.start_camera(4, str(tmp_path / "missing.avi"), room_id=1, timeout=2)
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
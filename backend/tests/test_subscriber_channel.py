@@ -0,0 +1,165 @@
+import pytest
+import asyncio
+import json
+import time
+from app.services.subscriber_channel import SubscriberChannel
+from tests.helpers import run
+
+
+class FakeWebSocket:
+    """Records sent messages; optionally slow or stuck."""
+
+    def __init__(self, delay: float = 0.0):
+        self.delay = delay
+        self.messages = []
+        self.texts = []
+        self.gate = asyncio.Event()
+        self.gate.set()
+
+    async def send_text(self, text):
+        await self.gate.wait()
+        await asyncio.sleep(self.delay)
+        self.texts.append(text)
+        self.messages.append(json.loads(text))
+
+    async def send_bytes(self, data):
+        await self.gate.wait()
+        await asyncio.sleep(self.delay)
+        self.messages.append(data)
+
+
+class TestSubscriberChannel:
+    """Tests for per-subscriber bounded send queues."""
+
+    def test_slow_client_does_not_delay_others(self):
+        """Test broadcast to a fast client is not held up by a slow one."""
+        async def scenario():
+            slow_ws, fast_ws = FakeWebSocket(delay=0.5), FakeWebSocket()
+            slow = SubscriberChannel(slow_ws, "slow").start()
+            fast = SubscriberChannel(fast_ws, "fast").start()
+
+            start = time.monotonic()
+            for i in range(5):
+                for channel in (slow, fast):
+                    channel.send_presence(1, {"seq": i})
+                await asyncio.sleep(0.01)
+            elapsed = time.monotonic() - start
+
+            await asyncio.sleep(0.05)
+            slow.close()
+            fast.close()
+            return elapsed, fast_ws.messages
+
+        elapsed, fast_messages = run(scenario())
+        assert elapsed < 0.2
+        assert [m["seq"] for m in fast_messages] == [0, 1, 2, 3, 4]
+
+    def test_frames_keep_only_latest(self):
+        """Test frames queued while the client is busy are replaced by the newest."""
+        async def scenario():
+            ws = FakeWebSocket()
+            ws.gate.clear()
+            channel = SubscriberChannel(ws, "cam").start()
+
+            channel.send_frame(b"0")
+            await asyncio.sleep(0.01)  # writer picks frame 0 and blocks on the socket
+            for i in range(1, 10):
+                channel.send_frame(str(i).encode())
+
+            ws.gate.set()
+            await asyncio.sleep(0.05)
+            channel.close()
+            return ws.messages, channel.get_stats()
+
+        messages, stats = run(scenario())
+        assert messages == [b"0", b"9"]
+        assert stats["dropped"]["frame"] == 8
+        assert stats["sent"]["frame"] == 2
+
+    def test_presence_coalesced_per_room(self):
+        """Test pending presence snapshots are replaced per room, rooms are kept apart."""
+        async def scenario():
+            ws = FakeWebSocket()
+            ws.gate.clear()
+            channel = SubscriberChannel(ws, "dashboard").start()
+
+            channel.send_control({"type": "initial"})
+            await asyncio.sleep(0.01)
+            for i in range(3):
+                channel.send_presence(1, {"room_id": 1, "v": i})
+                channel.send_presence(2, {"room_id": 2, "v": i})
+            channel.send_detection({"type": "face_detection", "v": 0})
+            channel.send_detection({"type": "face_detection", "v": 1})
+
+            ws.gate.set()
+            await asyncio.sleep(0.05)
+            channel.close()
+            return ws.messages, channel.get_stats()
+
+        messages, stats = run(scenario())
+        assert messages == [
+            {"type": "initial"},
+            {"room_id": 1, "v": 2},
+            {"room_id": 2, "v": 2},
+            {"type": "face_detection", "v": 1}
+        ]
+        assert stats["dropped"]["presence"] == 4
+        assert stats["dropped"]["detection"] == 1
+
+    def test_pre_encoded_payload_sent_verbatim(self):
+        """Test a broadcast encoded once is sent as the same text to every client."""
+        async def scenario():
+            sockets = [FakeWebSocket() for _ in range(3)]
+            channels = [SubscriberChannel(ws, f"c{i}").start() for i, ws in enumerate(sockets)]
+            payload = '{"type":"presence_update","room_id":1}'
+            for channel in channels:
+                channel.send_presence(1, payload)
+            await asyncio.sleep(0.02)
+            for channel in channels:
+                channel.close()
+            return sockets, payload
+
+        sockets, payload = run(scenario())
+        for ws in sockets:
+            assert ws.texts == [payload]
+            assert ws.texts[0] is payload
+
+    def test_control_queue_is_bounded(self):
+        """Test control FIFO drops the oldest message on overflow."""
+        async def scenario():
+            ws = FakeWebSocket()
+            ws.gate.clear()
+            channel = SubscriberChannel(ws, "c", max_control=3).start()
+            for i in range(6):
+                channel.send_control({"i": i})
+            await asyncio.sleep(0)
+            stats = channel.get_stats()
+            channel.close()
+            return stats
+
+        stats = run(scenario())
+        assert stats["dropped"]["control"] == 3
+        # The writer holds one message blocked on the socket
+        assert stats["pending"] == 2
+
+    def test_stuck_client_is_closed(self):
+        """Test a client that cannot take a message within the timeout is dropped."""
+        closed = []
+
+        async def scenario():
+            ws = FakeWebSocket()
+            ws.gate.clear()
+            channel = SubscriberChannel(ws, "stuck", on_close=closed.append, send_timeout=0.1).start()
+            channel.send_frame(b"x")
+            await asyncio.sleep(0.3)
+            channel.send_frame(b"y")
+            return channel
+
+        channel = run(scenario())
+        assert closed == [channel]
+        assert channel.closed
+        assert channel.pending() == 0
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
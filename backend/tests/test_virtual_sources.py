@@ -0,0 +1,111 @@
+import pytest
+import time
+import numpy as np
+import cv2
+from app.services.multi_rtsp_service import open_capture, MultiRTSPStreamManager
+from app.services.virtual_sources import FileCapture, SyntheticCapture
+
+
+@pytest.fixture
+def video_path(tmp_path):
+    """Write a short 25 fps local video file."""
+    path = str(tmp_path / "camera.avi")
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"MJPG"), 25, (160, 120))
+    for i in range(20):
+        writer.write(np.full((120, 160, 3), i * 10, dtype=np.uint8))
+    writer.release()
+    return path
+
+
+@pytest.fixture
+def face_image(tmp_path):
+    path = str(tmp_path / "face.png")
+    cv2.imwrite(path, np.full((100, 80, 3), 255, dtype=np.uint8))
+    return path
+
+
+class TestFileCapture:
+    """Tests for file:// camera source."""
+
+    def test_open_capture_dispatches_file_url(self, video_path):
+        """Test file:// URLs open a looping FileCapture."""
+        capture = open_capture(f"file://{video_path}?pace=fast")
+        assert isinstance(capture, FileCapture)
+        assert capture.isOpened()
+        assert not capture.realtime
+        capture.release()
+
+    def test_loops_at_end_of_file(self, video_path):
+        """Test the video restarts instead of ending the stream."""
+        capture = FileCapture(video_path, loop=True, pace="fast")
+        for _ in range(50):
+            assert capture.grab()
+        assert capture.loops == 2
+        ret, frame = capture.retrieve()
+        assert ret and frame.shape == (120, 160, 3)
+        capture.release()
+
+    def test_without_loop_stream_ends(self, video_path):
+        """Test loop=0 behaves like a camera going away."""
+        capture = FileCapture(video_path, loop=False, pace="fast")
+        grabbed = 0
+        while capture.grab():
+            grabbed += 1
+        assert grabbed == 20
+
+    def test_realtime_pacing_follows_file_fps(self, video_path):
+        """Test realtime pacing delivers ~25 fps and drops frames a slow reader missed."""
+        capture = FileCapture(video_path, loop=True)
+        start = time.monotonic()
+        for _ in range(10):
+            capture.grab()
+        assert time.monotonic() - start >= 9 / 25 - 0.01
+
+        time.sleep(0.2)
+        capture.grab()
+        assert capture.skipped >= 3
+        capture.release()
+
+
+class TestSyntheticCapture:
+    """Tests for synthetic:// camera source."""
+
+    def test_parses_url(self, face_image):
+        """Test resolution, fps and sprite options come from the URL."""
+        capture = open_capture(f"synthetic://320x240?fps=10&faces={face_image}&count=2&pace=fast")
+        assert isinstance(capture, SyntheticCapture)
+        assert (capture.width, capture.height, capture.fps) == (320, 240, 10.0)
+        assert len(capture._sprites) == 2
+
+    def test_renders_into_caller_buffer(self, face_image):
+        """Test frames are rendered in place and contain the face sprite."""
+        capture = SyntheticCapture(320, 240, faces=face_image, pace="fast")
+        buffer = np.empty((240, 320, 3), dtype=np.uint8)
+
+        assert capture.grab()
+        ret, frame = capture.retrieve(buffer)
+        assert ret and frame is buffer
+        assert (frame == 255).all(axis=2).sum() > 1000
+
+        capture.grab()
+        _, second = capture.retrieve()
+        assert not np.array_equal(buffer, second)
+
+    def test_manager_streams_synthetic_camera(self):
+        """Test a synthetic camera runs through the normal stream manager."""
+        manager = MultiRTSPStreamManager()
+        frames = []
+
+        assert manager.start_camera(
+            1, "synthetic://160x120?fps=50", room_id=1,
+            frame_callback=lambda frame, ts, room_id, camera_id: frames.append(frame.shape)
+        )
+        time.sleep(0.5)
+        manager.shutdown()
+
+        assert len(frames) >= 5
+        assert frames[0] == (120, 160, 3)
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -21,6 +21,8 @@ export default function MonitoringPage() {
 
   const wsRef = useRef<WebSocket | null>(null);
   const reconnectTimeoutRef = useRef<NodeJS.Timeout | null>(null);
+  // room_id -> presence version applied locally (diffs must arrive as version + 1)
+  const versionsRef = useRef<Map<number, number>>(new Map());
 
   // Load initial data
   const loadData = async () => {
@@ -60,28 +62,44 @@ export default function MonitoringPage() {
         const data = JSON.parse(event.data);
 
         if (data.type === 'initial_all_presence' || data.type === 'all_presence_refresh') {
+          versionsRef.current = new Map(
+            data.rooms.map((r: RoomPresence & { version: number }) => [r.room_id, r.version])
+          );
           setRooms(data.rooms);
           setTotalPeople(data.total_people);
-        } else if (data.type === 'presence_update') {
-          // Update specific room
-          setRooms((prevRooms) => {
-            const updated = [...prevRooms];
-            const index = updated.findIndex((r) => r.room_id === data.room_id);
-
-            if (index >= 0) {
-              updated[index] = {
-                room_id: data.room_id,
-                room_name: data.room_name,
-                occupants: data.occupants,
-                total_count: data.total_count,
-              };
-            }
-
-            // Recalculate total
-            const newTotal = updated.reduce((sum, r) => sum + r.total_count, 0);
-            setTotalPeople(newTotal);
-
-            return updated;
+        } else if (data.type === 'presence_snapshot') {
+          // Full room state (answer to a resync)
+          versionsRef.current.set(data.room_id, data.version);
+          updateRoom(data.room_id, () => ({
+            room_id: data.room_id,
+            room_name: data.room_name,
+            occupants: data.occupants,
+            total_count: data.total_count,
+          }));
+        } else if (data.type === 'presence_diff') {
+          const version = versionsRef.current.get(data.room_id);
+          if (version !== undefined && data.version <= version) return; // already applied
+          if (version === undefined || data.version !== version + 1) {
+            // Missed a diff - ask for a fresh snapshot of this room
+            ws.send(JSON.stringify({ type: 'resync', room_id: data.room_id }));
+            return;
+          }
+          versionsRef.current.set(data.room_id, data.version);
+
+          const left = new Set<number>(data.left);
+          const changed = new Map<number, OccupantInfo>(
+            [...data.updated, ...data.joined].map((o: OccupantInfo) => [o.student_id, o])
+          );
+          updateRoom(data.room_id, (room) => {
+            const occupants = (room?.occupants || [])
+              .filter((o) => !left.has(o.student_id) && !data.joined.some((j: OccupantInfo) => j.student_id === o.student_id))
+              .map((o) => changed.get(o.student_id) || o);
+            return {
+              room_id: data.room_id,
+              room_name: data.room_name,
+              occupants: [...occupants, ...data.joined],
+              total_count: data.total_count,
+            };
           });
         }
       } catch (e) {
@@ -89,6 +107,29 @@ export default function MonitoringPage() {
       }
     };
 
+    // Replace (or add) one room and recalculate the total
+    const updateRoom = (
+      roomId: number,
+      build: (room: RoomPresence | undefined) => RoomPresence
+    ) => {
+      setRooms((prevRooms) => {
+        const updated = [...prevRooms];
+        const index = updated.findIndex((r) => r.room_id === roomId);
+
+        if (index >= 0) {
+          updated[index] = build(updated[index]);
+        } else {
+          updated.push(build(undefined));
+        }
+
+        // Recalculate total
+        const newTotal = updated.reduce((sum, r) => sum + r.total_count, 0);
+        setTotalPeople(newTotal);
+
+        return updated;
+      });
+    };
+
     ws.onclose = () => {
       console.log('WebSocket disconnected');
       setWsConnected(false);
@@ -14,6 +14,16 @@ import {
 
 const API_URL = process.env.NEXT_PUBLIC_API_URL || 'http://localhost:8000';
 
+// Camera stream preview tiers (max_width 0 = source resolution)
+interface PreviewTier {
+  max_width: number;
+  fps: number;
+  quality: number;
+}
+
+const GRID_TIER: PreviewTier = { max_width: 480, fps: 8, quality: 70 };
+const FULL_TIER: PreviewTier = { max_width: 0, fps: 25, quality: 85 };
+
 export default function RoomsPage() {
   const [rooms, setRooms] = useState<Room[]>([]);
   const [selectedRoom, setSelectedRoom] = useState<RoomDetail | null>(null);
@@ -64,11 +74,20 @@ export default function RoomsPage() {
     loadRooms();
   }, []);
 
-  // Connect to camera WebSocket for live stream
+  // Set the preview tier of a camera stream (grid thumbnail or full view)
+  const setCameraTier = (cameraId: number, tier: PreviewTier) => {
+    const ws = wsRefs.current[cameraId];
+    if (ws?.readyState === WebSocket.OPEN) {
+      ws.send(JSON.stringify({ type: 'set_tier', ...tier }));
+    }
+  };
+
+  // Connect to camera WebSocket for live stream (grid tier until opened in full view)
   const connectCameraWs = useCallback((cameraId: number) => {
     if (wsRefs.current[cameraId]?.readyState === WebSocket.OPEN) return;
 
-    const wsUrl = `${getWsUrl()}/ws/cameras/${cameraId}/stream`;
+    const { max_width, fps, quality } = GRID_TIER;
+    const wsUrl = `${getWsUrl()}/ws/cameras/${cameraId}/stream?max_width=${max_width}&fps=${fps}&quality=${quality}`;
     const ws = new WebSocket(wsUrl);
 
     ws.onopen = () => {
@@ -115,7 +134,7 @@ export default function RoomsPage() {
   useEffect(() => {
     if (selectedRoom) {
       selectedRoom.cameras.forEach(camera => {
-        if (camera.status === 'streaming') {
+        if (camera.status === 'streaming' || camera.status === 'connecting') {
           connectCameraWs(camera.id);
         } else {
           disconnectCameraWs(camera.id);
@@ -131,13 +150,25 @@ export default function RoomsPage() {
     };
   }, [selectedRoom, connectCameraWs, disconnectCameraWs]);
 
+  // Refresh statuses while cameras are connecting in the background
+  useEffect(() => {
+    if (!selectedRoom?.cameras.some(camera => camera.status === 'connecting')) return;
+
+    const timer = setTimeout(() => loadRoomDetail(selectedRoom.id), 1000);
+    return () => clearTimeout(timer);
+  }, [selectedRoom]);
+
   // Open camera fullscreen view
   const openCameraView = (camera: Camera) => {
+    setCameraTier(camera.id, FULL_TIER);
     setViewingCamera(camera);
   };
 
   // Close camera view
   const closeCameraView = () => {
+    if (viewingCamera) {
+      setCameraTier(viewingCamera.id, GRID_TIER);
+    }
     setViewingCamera(null);
   };
 
@@ -243,7 +274,7 @@ export default function RoomsPage() {
 
     try {
       const result = await roomAPI.startAllCameras(selectedRoom.id);
-      alert(`${result.started} kamera ishga tushdi, ${result.failed} xatolik`);
+      alert(`${result.started} kamera ulanmoqda, ${result.failed} xatolik`);
       loadRoomDetail(selectedRoom.id);
     } catch (err: any) {
       setError(err.response?.data?.detail || 'Kameralarni ishga tushirishda xatolik');
@@ -268,6 +299,7 @@ export default function RoomsPage() {
       case 'streaming':
         return 'bg-green-500';
       case 'connected':
+      case 'connecting':
         return 'bg-yellow-500';
       default:
         return 'bg-gray-400';
@@ -280,6 +312,8 @@ export default function RoomsPage() {
         return 'Streaming';
       case 'connected':
         return 'Ulangan';
+      case 'connecting':
+        return 'Ulanmoqda...';
       default:
         return 'O\'chiq';
     }
@@ -225,7 +225,7 @@ export interface Camera {
   rtsp_url: string;
   is_active: boolean;
   created_at: string;
-  status: 'connected' | 'streaming' | 'disconnected';
+  status: 'connecting' | 'connected' | 'streaming' | 'disconnected';
 }
 
 export interface CameraCreate {
@@ -357,7 +357,12 @@ export const roomAPI = {
     return response.data;
   },
 
-  startAllCameras: async (roomId: number, timeout = 30): Promise<{ started: number; failed: number }> => {
+  // MJPEG preview for <img src> (each frame encoded once for all viewers)
+  getCameraStreamUrl: (roomId: number, cameraId: number): string => {
+    return `${API_URL}/api/rooms/${roomId}/cameras/${cameraId}/stream`;
+  },
+
+  startAllCameras: async (roomId: number, timeout = 30): Promise<{ started: number; failed: number; connecting: number }> => {
     const response = await api.post(`/api/rooms/${roomId}/start-all`, { timeout });
     return response.data;
   },